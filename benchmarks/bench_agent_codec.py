@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+AgentMessage コーデックのマイクロベンチマーク
+
+高頻度に流れる progress_update 相当のメッセージについて、従来のJSON経路
+（to_dict + json.dumps / json.loads + from_dict）とバイナリ形式
+（agent-binary/1、msgpack があれば agent-binary/1+msgpack も）のエンコード・デコード速度と
+ワイヤーサイズを比較する。
+Socket.IO はJSON経路では辞書を json.dumps するので、その分も含めて測定する。
+
+使い方:
+    python benchmarks/bench_agent_codec.py
+    python benchmarks/bench_agent_codec.py --iterations 200000 --payload large
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, List
+from uuid import uuid4
+
+from aetherterm.common import agent_codec
+from aetherterm.common.agent_codec import (
+    CODEC_BINARY_V1,
+    CODEC_BINARY_V1_MSGPACK,
+    decode_binary,
+    encode_binary,
+)
+from aetherterm.common.agent_protocol import AgentMessage, MessageType
+
+PAYLOADS = {
+    "small": {"task_id": "build-42", "progress": 0.42},
+    "medium": {
+        "task_id": "build-42",
+        "progress": 0.42,
+        "status": "running",
+        "message": "Compiling module 17/40",
+        "details": {"files": 17, "warnings": 2},
+    },
+    "large": {
+        "task_id": "build-42",
+        "progress": 0.42,
+        "status": "running",
+        "message": "Compiling module 17/40",
+        "details": {"files": [f"src/module_{i}.py" for i in range(40)], "warnings": 2},
+    },
+}
+
+
+def make_messages(count: int, payload_kind: str) -> List[AgentMessage]:
+    task = uuid4()
+    return [
+        AgentMessage(
+            from_agent="openhands-agent-1",
+            to_agent="aetherterm-server",
+            message_type=MessageType.PROGRESS_UPDATE,
+            payload=dict(PAYLOADS[payload_kind], seq=i),
+            correlation_id=task,
+        )
+        for i in range(count)
+    ]
+
+
+def json_encode(message: AgentMessage) -> bytes:
+    return json.dumps(message.to_dict()).encode("utf-8")
+
+
+def json_decode(data: bytes) -> AgentMessage:
+    return AgentMessage.from_dict(json.loads(data))
+
+
+def measure(func: Callable, items: list, iterations: int) -> float:
+    """1件あたりの処理時間（マイクロ秒）"""
+    n = len(items)
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(items[i % n])
+    return (time.perf_counter() - start) * 1e6 / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AgentMessage codec microbenchmark")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), default="medium")
+    args = parser.parse_args()
+
+    messages = make_messages(1000, args.payload)
+    json_wire = [json_encode(m) for m in messages]
+
+    def encode_msgpack(message):
+        return encode_binary(message, use_msgpack=True)
+
+    rows = [
+        ("json", json_encode, json_decode, json_wire),
+        (CODEC_BINARY_V1, encode_binary, decode_binary, [encode_binary(m) for m in messages]),
+    ]
+    if agent_codec.msgpack is not None:
+        wire = [encode_msgpack(m) for m in messages]
+        rows.append((CODEC_BINARY_V1_MSGPACK, encode_msgpack, decode_binary, wire))
+
+    # 往復で内容が変わらないことを確認
+    for _, _, decode, wire in rows[1:]:
+        assert all(decode(b) == m for b, m in zip(wire, messages))
+
+    print(f"payload: {args.payload}")
+    print(f"{'codec':<24}{'encode us':>12}{'decode us':>12}{'bytes/msg':>12}")
+    results = {}
+    for name, encode, decode, wire in rows:
+        enc = measure(encode, messages, args.iterations)
+        dec = measure(decode, wire, args.iterations)
+        size = sum(len(w) for w in wire) / len(wire)
+        results[name] = (enc, dec, size)
+        print(f"{name:<24}{enc:>12.2f}{dec:>12.2f}{size:>12.1f}")
+
+    je, jd, js = results["json"]
+    for name, (be, bd, bs) in list(results.items())[1:]:
+        print(
+            f"{name} speedup: encode {je / be:.2f}x  decode {jd / bd:.2f}x"
+            f"  size {bs / js:.0%} of json"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+AgentManager タスクスケジューラーのシミュレーション
+
+仮想時刻の離散イベントシミュレーションで TaskScheduler を駆動し、
+キューに積んだタスク群のスループットと待ち時間（p50/p99）を優先度別に測定する。
+エージェントの処理速度はばらつかせてあり、--no-stealing と比較すると
+ワークスティーリングの効果が分かる。--manager では実際の AgentManager に
+スリープするだけのダミーエージェントを登録して同じ負荷を流す。
+
+使い方:
+    python benchmarks/bench_agent_scheduler.py
+    python benchmarks/bench_agent_scheduler.py --tasks 1000 --agents 20 --no-stealing
+    python benchmarks/bench_agent_scheduler.py --manager --time-scale 0.01
+"""
+
+import argparse
+import asyncio
+import heapq
+import random
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from aetherterm.agentshell.agents.base import (
+    AgentCapability,
+    AgentInterface,
+    AgentResult,
+    AgentTask,
+    TaskStatus,
+)
+from aetherterm.agentshell.agents.manager import AgentManager
+from aetherterm.agentshell.agents.scheduler import TaskScheduler
+
+CAPABILITIES = [
+    AgentCapability.CODE_GENERATION,
+    AgentCapability.CODE_REVIEW,
+    AgentCapability.TESTING,
+]
+
+
+def make_workload(args: argparse.Namespace, rng: random.Random) -> List[AgentTask]:
+    tasks = []
+    for _ in range(args.tasks):
+        tasks.append(
+            AgentTask(
+                type="bench",
+                priority=rng.randint(1, 10),
+                capabilities_required=[rng.choice(CAPABILITIES)],
+                context={"cost": rng.expovariate(1 / args.mean_cost)},
+            )
+        )
+    return tasks
+
+
+def agent_capabilities(index: int) -> List[AgentCapability]:
+    # 全エージェントが GENERAL 系の能力を1つ以上持ち、半数は全能力を持つ
+    if index % 2 == 0:
+        return list(CAPABILITIES)
+    return [CAPABILITIES[index % len(CAPABILITIES)]]
+
+
+def agent_speed(index: int, args: argparse.Namespace) -> float:
+    # 一部のエージェントは極端に遅い
+    return 0.25 if index % args.slow_every == 0 else 1.0
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def report(
+    label: str,
+    tasks: List[AgentTask],
+    waits: Dict[UUID, float],
+    makespan: float,
+    stats: Dict[str, Any],
+) -> None:
+    print(f"== {label}")
+    print(f"tasks: {len(waits)}/{len(tasks)} completed, makespan {makespan:.2f}s")
+    print(f"throughput: {len(waits) / makespan:.1f} tasks/s" if makespan else "throughput: -")
+    all_waits = list(waits.values())
+    print(
+        f"queue wait: p50 {percentile(all_waits, 0.5):.2f}s  "
+        f"p99 {percentile(all_waits, 0.99):.2f}s  max {max(all_waits):.2f}s"
+    )
+    for low, high in ((1, 3), (4, 7), (8, 10)):
+        band = [waits[t.id] for t in tasks if low <= t.priority <= high and t.id in waits]
+        print(
+            f"  priority {low:>2}-{high:<2}: p50 {percentile(band, 0.5):6.2f}s  "
+            f"p99 {percentile(band, 0.99):6.2f}s  (n={len(band)})"
+        )
+    print(f"stolen: {stats['stolen']}  rejected: {stats['rejected']}")
+
+
+def simulate(args: argparse.Namespace) -> None:
+    """仮想時刻での離散イベントシミュレーション"""
+    rng = random.Random(args.seed)
+    tasks = make_workload(args, rng)
+
+    now = 0.0
+    scheduler = TaskScheduler(
+        aging_interval=args.aging,
+        work_stealing=not args.no_stealing,
+        clock=lambda: now,
+    )
+    for index in range(args.agents):
+        scheduler.add_agent(f"agent-{index}", agent_capabilities(index), args.concurrency)
+
+    enqueued_at: Dict[UUID, float] = {}
+    for task in tasks:
+        scheduler.enqueue(task)
+        enqueued_at[task.id] = now
+
+    waits: Dict[UUID, float] = {}
+    events: List[tuple] = []  # (完了時刻, seq, agent_id)
+    seq = 0
+    wall_start = time.perf_counter()
+    while True:
+        for agent_id, task in scheduler.dispatch():
+            waits[task.id] = now - enqueued_at[task.id]
+            speed = agent_speed(int(agent_id.split("-")[1]), args)
+            heapq.heappush(events, (now + task.context["cost"] / speed, seq, agent_id))
+            seq += 1
+        if not events:
+            break
+        now, _, agent_id = heapq.heappop(events)
+        scheduler.task_finished(agent_id)
+    wall = time.perf_counter() - wall_start
+
+    label = "simulation" + (" (no stealing)" if args.no_stealing else "")
+    report(label, tasks, waits, now, scheduler.get_stats())
+    print(f"scheduler overhead: {wall * 1e6 / max(1, len(waits)):.1f} us/task (wall)")
+
+
+class SleepAgent(AgentInterface):
+    """コストに比例してスリープするだけのダミーエージェント"""
+
+    def __init__(
+        self,
+        agent_id: str,
+        capabilities: List[AgentCapability],
+        scale: float,
+        started: Dict[UUID, float],
+    ):
+        super().__init__(agent_id, capabilities)
+        self.scale = scale
+        self.started = started
+
+    async def initialize(self, config: Dict[str, Any]) -> bool:
+        return True
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def execute_task(self, task: AgentTask) -> AgentResult:
+        self.started[task.id] = time.perf_counter()
+        await asyncio.sleep(task.context["cost"] * self.scale)
+        return AgentResult(task_id=task.id)
+
+    async def cancel_task(self, task_id: UUID) -> bool:
+        return False
+
+    async def get_task_status(self, task_id: UUID):
+        return TaskStatus.RUNNING
+
+    async def get_task_progress(self, task_id: UUID):
+        return None
+
+    async def _wait_for_intervention_response(self, intervention):
+        return None
+
+
+async def run_manager(args: argparse.Namespace) -> None:
+    """実際の AgentManager に同じ負荷を流す"""
+    rng = random.Random(args.seed)
+    tasks = make_workload(args, rng)
+
+    manager = AgentManager(default_max_concurrency=args.concurrency, aging_interval=args.aging)
+    manager._scheduler.work_stealing = not args.no_stealing
+    started: Dict[UUID, float] = {}
+    for index in range(args.agents):
+        scale = args.time_scale / agent_speed(index, args)
+        await manager.register_agent(
+            SleepAgent(f"agent-{index}", agent_capabilities(index), scale, started)
+        )
+
+    done = asyncio.Event()
+    completed = 0
+
+    async def on_complete(task_id: UUID, result: AgentResult) -> None:
+        nonlocal completed
+        completed += 1
+        if completed == len(tasks):
+            done.set()
+
+    manager.register_completion_callback(on_complete)
+
+    start = time.perf_counter()
+    for task in tasks:
+        await manager.submit_task(task)
+    await manager.start()
+    await done.wait()
+    makespan = time.perf_counter() - start
+    stats = manager.get_scheduler_stats()
+    await manager.stop()
+
+    # 実時間は time_scale 倍に縮めてあるのでシミュレーション上の秒に戻す
+    waits = {task_id: (t - start) / args.time_scale for task_id, t in started.items()}
+    report("AgentManager", tasks, waits, makespan / args.time_scale, stats)
+    print(f"wall time: {makespan:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AgentManager scheduler simulation")
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=2, help="per-agent concurrency")
+    parser.add_argument("--mean-cost", type=float, default=1.0, help="mean task cost (s)")
+    parser.add_argument("--slow-every", type=int, default=4, help="every Nth agent is 4x slower")
+    parser.add_argument("--aging", type=float, default=1.0, help="aging interval (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-stealing", action="store_true")
+    parser.add_argument("--manager", action="store_true", help="drive the real AgentManager")
+    parser.add_argument(
+        "--time-scale", type=float, default=0.01, help="wall seconds per simulated second"
+    )
+    args = parser.parse_args()
+
+    if args.manager:
+        asyncio.run(run_manager(args))
+    else:
+        simulate(args)
+
+
+if __name__ == "__main__":
+    main()
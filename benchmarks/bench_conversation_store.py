@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ConversationMemoryManager.store_conversation の1メッセージあたりの書き込みバイト数
+
+変更前の経路（会話全体をメタデータに持つ MemoryEntry を2つ作り、SQLとRedisの
+short_term キーにそれぞれ書く）と、HierarchicalMemoryManager.store_conversations の
+経路（SQLに正本を1回、Redisの最近の会話リストに射影を1回）で、SQLのバインド値と
+Redisに書く値のバイト数、書き込み回数/sを比較する。
+
+HierarchicalMemoryManager はベクトルストアの依存関係が必要なため、ここでは同じ処理を
+ストレージアダプターに対して直接行う。SQLは一時ディレクトリのSQLite、Redisは fakeredis。
+
+使い方:
+    python benchmarks/bench_conversation_store.py
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+from sqlalchemy import event
+
+from aetherterm.langchain.config.storage_config import StorageConfig
+from aetherterm.langchain.models.conversation import ConversationEntry
+from aetherterm.langchain.models.memory import MemoryEntry, MemoryType
+from aetherterm.langchain.storage.redis_adapter import RedisStorageAdapter
+from aetherterm.langchain.storage.sql_adapter import SQLStorageAdapter
+
+SHORT_TERM_TTL = 3600
+
+
+def sample_entry(n: int) -> ConversationEntry:
+    return ConversationEntry(
+        session_id=f"bench-{n % 20}",
+        content=f"$ tail -n 5 /var/log/app.log\n{'INFO request handled in 12ms ' * 8}{n}",
+        metadata={"command": "tail -n 5 /var/log/app.log", "exit_code": 0},
+        tokens=42,
+    )
+
+
+def payload_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    return len(str(value).encode("utf-8"))
+
+
+async def make_storages(directory: str, name: str):
+    sql_storage = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{directory}/{name}.db"))
+    await sql_storage.connect()
+    redis_storage = RedisStorageAdapter(StorageConfig())
+    redis_storage._redis = fakeredis.FakeAsyncRedis()
+
+    sql_bytes = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        rows = parameters if executemany else [parameters]
+        for row in rows:
+            values = row.values() if isinstance(row, dict) else row
+            sql_bytes[0] += sum(payload_size(value) for value in values)
+
+    event.listen(sql_storage._engine.sync_engine, "before_cursor_execute", count)
+    return sql_storage, redis_storage, sql_bytes
+
+
+async def legacy_store(sql_storage, redis_storage, entry: ConversationEntry) -> int:
+    """変更前の store_conversation と同じ書き込み（Redisに書いたバイト数を返す）"""
+    common = dict(
+        id=entry.id,
+        session_id=entry.session_id,
+        content=entry.content,
+        metadata=entry.to_dict(),
+        created_at=entry.timestamp,
+        updated_at=entry.timestamp,
+        accessed_at=entry.timestamp,
+    )
+    medium = MemoryEntry(memory_type=MemoryType.MEDIUM_TERM, **common)
+    short = MemoryEntry(
+        memory_type=MemoryType.SHORT_TERM,
+        expires_at=datetime.utcnow() + timedelta(seconds=SHORT_TERM_TTL),
+        **common,
+    )
+    value = short.to_dict()
+    await asyncio.gather(
+        sql_storage.store_memory_entry(medium),
+        redis_storage.set(
+            f"short_term:{entry.session_id}:{entry.id}",
+            value,
+            ttl_seconds=SHORT_TERM_TTL,
+            group=entry.session_id,
+        ),
+    )
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+async def single_write_store(sql_storage, redis_storage, entry: ConversationEntry) -> int:
+    """HierarchicalMemoryManager.store_conversations と同じ書き込み"""
+    await asyncio.gather(
+        sql_storage.store_conversations([entry]),
+        redis_storage.cache_recent_conversations([entry]),
+    )
+    return len(redis_storage._encode(redis_storage._conversation_projection(entry)))
+
+
+async def measure(label: str, store, messages: int, concurrency: int, directory: str) -> None:
+    sql_storage, redis_storage, sql_bytes = await make_storages(directory, label)
+    entries = [sample_entry(n) for n in range(messages)]
+    queue = list(reversed(entries))
+    redis_sizes = []
+
+    async def worker() -> None:
+        while queue:
+            redis_sizes.append(await store(sql_storage, redis_storage, queue.pop()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    rate = messages / (time.perf_counter() - start)
+    await sql_storage.disconnect()
+
+    sql_per_message = sql_bytes[0] / messages
+    redis_per_message = sum(redis_sizes) / messages
+    print(
+        f"{label}: bytes/message sql {sql_per_message:,.0f} + redis {redis_per_message:,.0f}"
+        f" = {sql_per_message + redis_per_message:,.0f}, messages/s {rate:,.0f}"
+    )
+
+
+async def run(messages: int, concurrency: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        await measure("legacy", legacy_store, messages, concurrency, directory)
+        await measure("single-write", single_write_store, messages, concurrency, directory)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes written per stored conversation message")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+SyncTerminalPTYの行組み立てマイクロベンチマーク
+
+旧実装（チャンク毎にバッファ全体をjoin/splitlinesし、キーワード毎にlower()する方式）と
+LineAssembler + KeywordMatcher を比較する。
+
+使い方:
+    python benchmarks/bench_line_assembly.py
+"""
+
+import time
+from typing import Callable, List
+
+from aetherterm.agentshell.pty.line_assembler import KeywordMatcher, LineAssembler
+
+KEYWORDS = ["error", "warning", "fail"]
+CHUNK_SIZE = 4096
+
+
+def legacy_process(chunks: List[bytes]) -> int:
+    """旧実装の再現"""
+    output_buffer: List[str] = []
+    detected = 0
+    for chunk in chunks:
+        output_buffer.append(chunk.decode("utf-8", errors="ignore"))
+        full_output_line = "".join(output_buffer)
+        if "\n" in full_output_line:
+            lines = full_output_line.splitlines(keepends=True)
+            for i, line in enumerate(lines):
+                if not line.endswith("\n") and i == len(lines) - 1:
+                    output_buffer = [line]
+                    break
+                for keyword in KEYWORDS:
+                    if keyword in line.lower():
+                        detected += 1
+                        break
+            else:
+                output_buffer = []
+    return detected
+
+
+def fast_process(chunks: List[bytes]) -> int:
+    """LineAssembler + KeywordMatcher"""
+    assembler = LineAssembler()
+    matcher = KeywordMatcher(KEYWORDS)
+    detected = 0
+    for chunk in chunks:
+        for block in assembler.feed(chunk):
+            detected += len(matcher.scan(block))
+    return detected
+
+
+def split_chunks(data: bytes) -> List[bytes]:
+    return [data[i : i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+def long_line_case() -> List[bytes]:
+    """改行のない長い行（8MB）の後に改行"""
+    return split_chunks(b"x" * (8 * 1024 * 1024) + b" error\n")
+
+
+def short_lines_case() -> List[bytes]:
+    """短い行が大量に続くケース（20万行）"""
+    lines = []
+    for i in range(200_000):
+        if i % 100 == 0:
+            lines.append(f"line {i}: Build FAILED\n".encode())
+        else:
+            lines.append(f"line {i}: compiling module_{i}.py\n".encode())
+    return split_chunks(b"".join(lines))
+
+
+def measure(func: Callable[[List[bytes]], int], chunks: List[bytes], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    cases = [("long-line", long_line_case()), ("many-short-lines", short_lines_case())]
+    for name, chunks in cases:
+        total_bytes = sum(len(c) for c in chunks)
+        legacy = measure(legacy_process, chunks, repeat=1 if name == "long-line" else 3)
+        fast = measure(fast_process, chunks)
+        print(
+            f"{name:>18}: {total_bytes / 1024 / 1024:.1f} MB | "
+            f"legacy {legacy * 1000:9.1f} ms | "
+            f"fast {fast * 1000:9.1f} ms ({total_bytes / fast / 1024 / 1024:.0f} MB/s) | "
+            f"speedup x{legacy / fast:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
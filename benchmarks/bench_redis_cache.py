@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+RedisStorageAdapter の短期メモリキャッシュ
+
+従来の pickle + コマンド毎の往復（lpush / ltrim / expire）と、コーデック + パイプライン
+（MULTI/EXEC）の経路で、1エントリあたりのバイト数、会話キャッシュの書き込み回数/s、
+セッションコンテキストの読み込み回数/s（ローカルキャッシュあり・なし）を比較する。
+
+既定では fakeredis を使う（ネットワークの往復がないため、往復回数の差は小さく出る）。
+実際のRedisで計測する場合は --redis-url を指定する。
+
+使い方:
+    python benchmarks/bench_redis_cache.py
+    python benchmarks/bench_redis_cache.py --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import pickle
+import time
+
+from aetherterm.langchain.config.storage_config import StorageConfig
+from aetherterm.langchain.models.conversation import ConversationEntry
+from aetherterm.langchain.models.session import SessionContext
+from aetherterm.langchain.storage.redis_adapter import RedisStorageAdapter
+
+
+async def make_adapter(redis_url, **config) -> RedisStorageAdapter:
+    adapter = RedisStorageAdapter(StorageConfig(**config))
+    if redis_url:
+        adapter.config.redis_url = redis_url
+        await adapter.connect()
+    else:
+        import fakeredis
+
+        adapter._redis = fakeredis.FakeAsyncRedis()
+    await adapter._redis.flushdb()
+    return adapter
+
+
+def sample_entry(n: int) -> ConversationEntry:
+    return ConversationEntry(
+        session_id=f"bench-{n % 20}",
+        content=f"$ ls -la /var/log\n{'drwxr-xr-x 2 root root 4096 app.log ' * 20}{n}",
+        metadata={"command": "ls -la /var/log", "exit_code": 0},
+    )
+
+
+async def legacy_write(adapter: RedisStorageAdapter, entry: ConversationEntry) -> None:
+    """変更前の cache_recent_conversation と同じ処理"""
+    key = adapter._make_key("conversation", f"recent:{entry.session_id}")
+    await adapter._redis.lpush(key, pickle.dumps(entry.to_dict()))
+    await adapter._redis.ltrim(key, 0, 99)
+    await adapter._redis.expire(key, 3600)
+
+
+async def in_workers(concurrency: int, jobs) -> float:
+    """jobs（コルーチン関数のリスト）を concurrency 個のタスクで実行し、処理数/sを返す"""
+    queue = list(reversed(jobs))
+
+    async def worker() -> None:
+        while queue:
+            await queue.pop()()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(jobs) / (time.perf_counter() - start)
+
+
+async def run(redis_url, rows: int, reads: int, concurrency: int) -> None:
+    entry = sample_entry(0)
+    legacy_size = len(pickle.dumps(entry.to_dict()))
+    adapter = await make_adapter(redis_url)
+    codec_size = len(adapter._encode(entry.to_dict()))
+    print(f"bytes per entry: pickle {legacy_size}, codec {codec_size}")
+
+    entries = [sample_entry(n) for n in range(rows)]
+    legacy_rate = await in_workers(
+        concurrency, [lambda e=e: legacy_write(adapter, e) for e in entries]
+    )
+
+    await adapter._redis.flushdb()
+    codec_rate = await in_workers(
+        concurrency, [lambda e=e: adapter.cache_recent_conversation(e) for e in entries]
+    )
+    print(f"conversation writes/s: legacy {legacy_rate:,.0f}, pipelined {codec_rate:,.0f}")
+
+    for ttl in (0, 2.0):
+        adapter = await make_adapter(redis_url, redis_near_cache_ttl_seconds=ttl)
+        contexts = [SessionContext(session_id=f"bench-{n}") for n in range(20)]
+        for context in contexts:
+            await adapter.cache_session_context(context)
+        rate = await in_workers(
+            concurrency,
+            [
+                lambda n=n, adapter=adapter: adapter.get_session_context(f"bench-{n % 20}")
+                for n in range(reads)
+            ],
+        )
+        label = "near cache" if ttl else "redis only"
+        print(f"session context reads/s ({label}): {rate:,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Redis short-term cache throughput")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--redis-url", help="実際のRedisのURL（省略時は fakeredis）")
+    args = parser.parse_args()
+    asyncio.run(run(args.redis_url, args.rows, args.reads, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
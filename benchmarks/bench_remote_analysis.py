@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+AIAnalyzer ⇔ DummyAIServer バッチ解析プロトコルの負荷テスト
+
+同一プロセス内でDummyAIServerを起動し、BatchAnalysisClientから大量のログ行を
+投入して lines/s とRTTを測定する。batch_size=1, max_in_flight=1 は旧来の
+1行1往復方式に相当する。
+
+使い方:
+    python benchmarks/bench_remote_analysis.py --lines 500000
+    python benchmarks/bench_remote_analysis.py --batch-size 1 --in-flight 1 --lines 5000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import websockets
+
+from aetherterm.agentshell.pty_monitor.analysis_client import BatchAnalysisClient
+from aetherterm.agentshell.pty_monitor.dummy_ai_server import DummyAIServer
+
+SAMPLE_LINES = [
+    "2025-06-18 12:00:01 INFO: Command executed: ls -la",
+    "2025-06-18 12:00:02 INFO: Command executed: make build",
+    "2025-06-18 12:00:03 WARN: Command executed: sudo systemctl status",
+    "2025-06-18 12:00:04 INFO: Command executed: git status",
+    "2025-06-18 12:00:05 CRITICAL: Command executed: rm -rf /",
+]
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = DummyAIServer()
+    async with websockets.serve(server.handle_client, "127.0.0.1", 0) as ws_server:
+        port = next(iter(ws_server.sockets)).getsockname()[1]
+        client = BatchAnalysisClient(
+            f"ws://127.0.0.1:{port}",
+            batch_size=args.batch_size,
+            linger=args.linger_ms / 1000,
+            max_in_flight=args.in_flight,
+            request_timeout=60.0,
+        )
+        if not await client.start():
+            raise SystemExit("failed to connect to in-process DummyAIServer")
+
+        lines = [SAMPLE_LINES[i % len(SAMPLE_LINES)] for i in range(args.chunk)]
+        start = time.perf_counter()
+        done = 0
+        errors = 0
+        while done < args.lines:
+            chunk = lines[: min(args.chunk, args.lines - done)]
+            try:
+                await client.analyze_many(chunk)
+            except Exception:
+                errors += len(chunk)
+            done += len(chunk)
+        elapsed = time.perf_counter() - start
+
+        stats = client.get_stats()
+        await client.close()
+
+    print(
+        f"lines={done} batch_size={args.batch_size} in_flight={args.in_flight} "
+        f"linger={args.linger_ms}ms"
+    )
+    print(f"  throughput: {done / elapsed:,.0f} lines/s ({elapsed:.2f}s)")
+    print(f"  batches: {stats['batches_sent']}, avg RTT {stats['avg_rtt_ms']:.2f} ms, failed lines {errors}")
+    print(f"  server: {server.lines_analyzed} lines in {server.batches_analyzed} batches")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--linger-ms", type=float, default=2.0)
+    parser.add_argument("--in-flight", type=int, default=8)
+    parser.add_argument(
+        "--chunk", type=int, default=8192, help="lines handed to analyze_many() at a time"
+    )
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,21 @@ AetherTerm Server Package
 
 This package contains the main server components for AetherTerm,
 including the FastAPI server, Socket.IO handlers, and terminal management.
+
+create_app and start_server are imported from the server module on first access,
+so submodules such as agent_pane_manager can be used without loading the whole
+server and its dependencies.
 """
 
-from .server import create_app, start_server
+import importlib
+from typing import Any
 
 __all__ = ["create_app", "start_server"]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(".server", __name__), name)
+    globals()[name] = value
+    return value
@@ -6,10 +6,12 @@
 """
 
 import asyncio
+import itertools
+import json
 import logging
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from uuid import UUID, uuid4
 
 from ..common.agent_protocol import (
@@ -21,6 +23,12 @@ from ..common.agent_protocol import (
 
 logger = logging.getLogger(__name__)
 
+# 二次インデックスを持つペーン属性
+INDEXED_ATTRIBUTES = ("parent_session_id", "agent_type", "status")
+
+# ブロードキャスト時のハンドラー毎のタイムアウト（秒）
+DEFAULT_HANDLER_TIMEOUT = 5.0
+
 
 @dataclass
 class AgentPane:
@@ -45,12 +53,24 @@ class AgentPaneManager:
     
     エージェント用のペーンを管理し、メッセージのルーティングを行います。
     AgentServerの拡張として動作します。
+    
+    親セッション・エージェントタイプ・ステータス毎の二次インデックスを
+    作成/破棄/ステータス変更時に更新するため、一覧取得やブロードキャストの
+    対象選択はペーン総数ではなく該当ペーン数に比例します。
+    ペーンのステータスは set_pane_status() で変更してください。
     """
     
     def __init__(self):
         self._panes: Dict[str, AgentPane] = {}
         self._agent_to_pane: Dict[str, str] = {}  # agent_id -> pane_id
         self._socket_to_pane: Dict[str, str] = {}  # socket_id -> pane_id
+        # attribute -> value -> pane_id（挿入順を保つため値は None の辞書）
+        self._indexes: Dict[str, Dict[str, Dict[str, None]]] = {
+            attribute: {} for attribute in INDEXED_ATTRIBUTES
+        }
+        # pane_id -> 作成順の番号（ステータス変更後も一覧を作成順に並べるため）
+        self._creation_order: Dict[str, int] = {}
+        self._creation_seq = itertools.count()
         self._message_router: Optional[MessageRouter] = None
         self._terminal_manager = None  # AgentServerのターミナルマネージャーへの参照
         
@@ -117,7 +137,9 @@ class AgentPaneManager:
         
         # ペーンを登録
         self._panes[pane.pane_id] = pane
+        self._creation_order[pane.pane_id] = next(self._creation_seq)
         self._agent_to_pane[pane.agent_id] = pane.pane_id
+        self._index_add(pane)
         
         # コールバックを実行
         for callback in self._pane_created_callbacks:
@@ -161,6 +183,8 @@ class AgentPaneManager:
         
         # 登録を解除
         del self._panes[pane_id]
+        del self._creation_order[pane_id]
+        self._index_remove(pane)
         self._agent_to_pane.pop(pane.agent_id, None)
         if pane.socket_id:
             self._socket_to_pane.pop(pane.socket_id, None)
@@ -201,31 +225,44 @@ class AgentPaneManager:
     async def broadcast_to_agents(
         self,
         message: AgentMessage,
-        agent_types: Optional[List[str]] = None
+        agent_types: Optional[List[str]] = None,
+        parent_session_id: Optional[str] = None,
+        timeout: float = DEFAULT_HANDLER_TIMEOUT
     ) -> int:
         """
         エージェントにブロードキャスト
         
+        対象ペーンはインデックスから選択し、メッセージは1度だけシリアライズして
+        各ペーンのハンドラーへ並行に配信します（ハンドラー毎にタイムアウト）。
+        
         Args:
             message: メッセージ
             agent_types: 対象エージェントタイプ（Noneの場合は全エージェント）
+            parent_session_id: 対象の親セッション（Noneの場合は全セッション）
+            timeout: ハンドラー毎のタイムアウト（秒）
             
         Returns:
             int: 送信したエージェント数
         """
-        count = 0
+        if agent_types:
+            pane_ids: List[str] = []
+            for agent_type in dict.fromkeys(agent_types):
+                pane_ids.extend(self._select(
+                    parent_session_id=parent_session_id,
+                    agent_type=agent_type,
+                    status="active"
+                ))
+        else:
+            pane_ids = self._select(parent_session_id=parent_session_id, status="active")
         
-        for pane in self._panes.values():
-            if pane.status != "active":
-                continue
-                
-            if agent_types and pane.agent_type not in agent_types:
-                continue
-            
-            if await self.route_message("system", pane.pane_id, message):
-                count += 1
+        if not pane_ids:
+            return 0
         
-        return count
+        if self._message_router:
+            return await self._message_router.broadcast("system", pane_ids, message, timeout)
+        
+        logger.warning("メッセージルーターが設定されていません")
+        return 0
     
     def get_pane(self, pane_id: str) -> Optional[AgentPane]:
         """ペーンを取得"""
@@ -258,18 +295,103 @@ class AgentPaneManager:
         Returns:
             List[AgentPane]: ペーンのリスト
         """
-        panes = list(self._panes.values())
-        
-        if parent_session_id:
-            panes = [p for p in panes if p.parent_session_id == parent_session_id]
+        pane_ids = self._select(
+            parent_session_id=parent_session_id,
+            agent_type=agent_type,
+            status=status
+        )
+        return [self._panes[pane_id] for pane_id in pane_ids]
+    
+    def count_panes(
+        self,
+        parent_session_id: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> int:
+        """条件に一致するペーン数を取得（単一条件の場合はO(1)）"""
+        filters = self._filters(parent_session_id, agent_type, status)
+        if not filters:
+            return len(self._panes)
+        if len(filters) == 1:
+            attribute, value = filters[0]
+            return len(self._indexes[attribute].get(value, {}))
+        return len(self._select(parent_session_id, agent_type, status))
+    
+    def set_pane_status(self, pane_id: str, status: str) -> bool:
+        """
+        ペーンのステータスを変更（インデックスも更新）
         
-        if agent_type:
-            panes = [p for p in panes if p.agent_type == agent_type]
+        Args:
+            pane_id: ペーンID
+            status: 新しいステータス
+            
+        Returns:
+            bool: ペーンが存在した場合True
+        """
+        pane = self._panes.get(pane_id)
+        if not pane:
+            return False
+        if pane.status != status:
+            self._index_discard("status", pane.status, pane_id)
+            pane.status = status
+            self._indexes["status"].setdefault(status, {})[pane_id] = None
+        return True
+    
+    @staticmethod
+    def _filters(
+        parent_session_id: Optional[str],
+        agent_type: Optional[str],
+        status: Optional[str]
+    ) -> List[Tuple[str, str]]:
+        return [
+            (attribute, value)
+            for attribute, value in (
+                ("parent_session_id", parent_session_id),
+                ("agent_type", agent_type),
+                ("status", status),
+            )
+            if value
+        ]
+    
+    def _select(
+        self,
+        parent_session_id: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[str]:
+        """インデックスの積集合で条件に一致するペーンIDを作成順に取得"""
+        filters = self._filters(parent_session_id, agent_type, status)
+        if not filters:
+            return list(self._panes)
         
+        buckets = [self._indexes[attribute].get(value, {}) for attribute, value in filters]
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
+        pane_ids = [
+            pane_id for pane_id in smallest
+            if all(pane_id in bucket for bucket in others)
+        ]
         if status:
-            panes = [p for p in panes if p.status == status]
-        
-        return panes
+            # ステータスのインデックスは変更された順に並ぶため、作成順に並べ直す
+            pane_ids.sort(key=self._creation_order.__getitem__)
+        return pane_ids
+    
+    def _index_add(self, pane: AgentPane) -> None:
+        for attribute in INDEXED_ATTRIBUTES:
+            value = getattr(pane, attribute)
+            self._indexes[attribute].setdefault(value, {})[pane.pane_id] = None
+    
+    def _index_remove(self, pane: AgentPane) -> None:
+        for attribute in INDEXED_ATTRIBUTES:
+            self._index_discard(attribute, getattr(pane, attribute), pane.pane_id)
+    
+    def _index_discard(self, attribute: str, value: str, pane_id: str) -> None:
+        bucket = self._indexes[attribute].get(value)
+        if bucket is None:
+            return
+        bucket.pop(pane_id, None)
+        if not bucket:
+            del self._indexes[attribute][value]
     
     def update_socket_mapping(self, pane_id: str, socket_id: str) -> None:
         """ソケットIDマッピングを更新"""
@@ -346,7 +468,7 @@ class AgentPaneManager:
     async def _stop_agent(self, pane: AgentPane) -> None:
         """エージェントを停止"""
         logger.info(f"エージェントを停止します: {pane.agent_id}")
-        pane.status = "stopped"
+        self.set_pane_status(pane.pane_id, "stopped")
     
     async def _execute_callback(self, callback: Callable, *args) -> None:
         """コールバックを実行（同期/非同期対応）"""
@@ -367,6 +489,16 @@ class MessageRouter:
         self.pane_manager = pane_manager
         self._routes: Dict[str, List[str]] = {}  # from_pane -> [to_panes]
         self._handlers: Dict[str, Callable[[AgentMessage], None]] = {}
+        # シリアライズ済みメッセージ（JSON文字列）を受け取るハンドラーのペーン
+        self._serialized_handlers: Set[str] = set()
+        
+        # 統計情報
+        self.stats = {
+            "delivered": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "broadcasts": 0,
+        }
     
     async def route(
         self,
@@ -395,39 +527,126 @@ class MessageRouter:
                 return False
         
         # メッセージを配信
-        handler = self._handlers.get(target_pane.pane_id)
-        if handler:
-            try:
-                await self._execute_handler(handler, message)
-                return True
-            except Exception as e:
-                logger.error(f"メッセージハンドラー実行中にエラー: {e}")
-                return False
+        return await self._deliver(
+            from_pane, target_pane.pane_id, message, _SerializedMessage(message), None
+        )
+    
+    async def broadcast(
+        self,
+        from_pane: str,
+        pane_ids: Iterable[str],
+        message: AgentMessage,
+        timeout: float = DEFAULT_HANDLER_TIMEOUT
+    ) -> int:
+        """
+        複数のペーンへメッセージを並行に配信
         
-        # デフォルトの配信方法（WebSocket経由など）
-        # 実際の実装はAgentServerとの統合時に行う
-        logger.debug(f"メッセージをルーティング: {from_pane} -> {to_pane}")
+        メッセージのシリアライズは1度だけ行い、全ペーンで共有します。
+        遅いハンドラーは timeout で打ち切り、他の配信を待たせません。
+        
+        Args:
+            from_pane: 送信元ペーンID
+            pane_ids: 送信先ペーンIDのリスト
+            message: メッセージ
+            timeout: ハンドラー毎のタイムアウト（秒）
+            
+        Returns:
+            int: 配信に成功したペーン数
+        """
+        self.stats["broadcasts"] += 1
+        serialized = _SerializedMessage(message)
+        results = await asyncio.gather(*(
+            self._deliver(from_pane, pane_id, message, serialized, timeout)
+            for pane_id in pane_ids
+        ))
+        return sum(1 for delivered in results if delivered)
+    
+    async def _deliver(
+        self,
+        from_pane: str,
+        pane_id: str,
+        message: AgentMessage,
+        serialized: "_SerializedMessage",
+        timeout: Optional[float]
+    ) -> bool:
+        """1ペーンへ配信（ハンドラーの例外・タイムアウトは失敗として扱う）"""
+        handler = self._handlers.get(pane_id)
+        if not handler:
+            # デフォルトの配信方法（WebSocket経由など）
+            # 実際の実装はAgentServerとの統合時に行う
+            logger.debug(f"メッセージをルーティング: {from_pane} -> {pane_id}")
+            self.stats["delivered"] += 1
+            return True
+        
+        payload: Union[AgentMessage, str] = (
+            serialized.json if pane_id in self._serialized_handlers else message
+        )
+        try:
+            if timeout is None:
+                await self._execute_handler(handler, payload)
+            else:
+                await asyncio.wait_for(self._execute_handler(handler, payload), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            logger.warning(f"メッセージハンドラーがタイムアウトしました: {pane_id}")
+            return False
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"メッセージハンドラー実行中にエラー: {e}")
+            return False
+        
+        self.stats["delivered"] += 1
         return True
     
     def register_handler(
         self,
         pane_id: str,
-        handler: Callable[[AgentMessage], None]
+        handler: Callable[[AgentMessage], None],
+        serialized: bool = False
     ) -> None:
-        """メッセージハンドラーを登録"""
+        """
+        メッセージハンドラーを登録
+        
+        Args:
+            pane_id: ペーンID
+            handler: メッセージハンドラー
+            serialized: True の場合、AgentMessage ではなくシリアライズ済みの
+                JSON文字列を渡す（ソケットへそのまま送るハンドラー向け）
+        """
         self._handlers[pane_id] = handler
+        if serialized:
+            self._serialized_handlers.add(pane_id)
+        else:
+            self._serialized_handlers.discard(pane_id)
     
     def unregister_handler(self, pane_id: str) -> None:
         """メッセージハンドラーを解除"""
         self._handlers.pop(pane_id, None)
+        self._serialized_handlers.discard(pane_id)
     
     async def _execute_handler(
         self,
         handler: Callable[[AgentMessage], None],
-        message: AgentMessage
+        message: Union[AgentMessage, str]
     ) -> None:
         """ハンドラーを実行（同期/非同期対応）"""
         if asyncio.iscoroutinefunction(handler):
             await handler(message)
         else:
-            handler(message)
\ No newline at end of file
+            handler(message)
+
+
+class _SerializedMessage:
+    """配信先間で共有する、初回アクセス時に1度だけ作るメッセージのシリアライズ結果"""
+    
+    __slots__ = ("message", "_json")
+    
+    def __init__(self, message: AgentMessage):
+        self.message = message
+        self._json: Optional[str] = None
+    
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = json.dumps(self.message.to_dict(), ensure_ascii=False)
+        return self._json
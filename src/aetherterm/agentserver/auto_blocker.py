@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from aetherterm.common.timing_wheel import TimerHandle, get_timing_wheel
+
 log = logging.getLogger("aetherterm.auto_blocker")
 
 
@@ -38,9 +40,13 @@ class BlockState:
 class AutoBlocker:
     """自動ブロック管理クラス"""
 
-    def __init__(self, socket_io_instance=None):
+    def __init__(self, socket_io_instance=None, block_timeout: float = 300):
         self.sio = socket_io_instance
+        self.block_timeout = block_timeout
         self.blocked_sessions: dict[str, BlockState] = {}
+        # ブロックの自動解除は共有タイミングホイールで行う
+        self._wheel = get_timing_wheel()
+        self._expiry_timers: dict[str, TimerHandle] = {}
 
     def set_socket_io(self, sio_instance):
         """Socket.IOインスタンスを設定"""
@@ -82,6 +88,10 @@ class AutoBlocker:
         )
 
         self.blocked_sessions[session_id] = block_state
+        self._wheel.cancel(self._expiry_timers.pop(session_id, None))
+        self._expiry_timers[session_id] = self._wheel.schedule(
+            self.block_timeout, self._expire_blocks, session_id
+        )
 
         # クライアントにブロック指示を送信
         block_data = {
@@ -130,28 +140,13 @@ class AutoBlocker:
             log.warning(f"Invalid unlock key for session {session_id}: {unlock_key}")
             return False
 
-        # ブロック状態を削除
-        del self.blocked_sessions[session_id]
-
-        # クライアントにブロック解除を通知
-        unblock_data = {
-            "type": "auto_unblock",
-            "session_id": session_id,
-            "message": "ブロックが解除されました",
-            "timestamp": time.time(),
-        }
-
-        try:
-            import asyncio
-
-            _ = asyncio.create_task(self.sio.emit("auto_unblock", unblock_data))
-
-            log.info(f"Session {session_id} unblocked")
-            return True
-
-        except Exception as e:
-            log.error(f"Failed to send unblock signal to session {session_id}: {e}")
-            return False
+        return self._release_block(
+            session_id,
+            event="auto_unblock",
+            reason="unlock_key",
+            message="ブロックが解除されました",
+            log_message="unblocked",
+        )
 
     def is_session_blocked(self, session_id: str) -> bool:
         """セッションがブロックされているかチェック"""
@@ -167,30 +162,72 @@ class AutoBlocker:
 
     def force_unblock_session(self, session_id: str) -> bool:
         """強制的にセッションのブロックを解除(管理者用)"""
-        if session_id in self.blocked_sessions:
-            del self.blocked_sessions[session_id]
+        if session_id not in self.blocked_sessions:
+            return False
+        return self._release_block(
+            session_id,
+            event="force_unblock",
+            reason="admin",
+            message="管理者によってブロックが強制解除されました",
+            log_message="force unblocked by admin",
+        )
 
-            # クライアントに強制解除を通知
-            force_unblock_data = {
-                "type": "force_unblock",
-                "session_id": session_id,
-                "message": "管理者によってブロックが強制解除されました",
-                "timestamp": time.time(),
-            }
+    def _expire_block(self, session_id: str) -> bool:
+        """有効期限が切れたブロックを自動解除"""
+        if session_id not in self.blocked_sessions:
+            return False
+        return self._release_block(
+            session_id,
+            event="auto_unblock",
+            reason="expired",
+            message="ブロックの有効期限が切れたため自動的に解除されました",
+            log_message="unblocked: block expired",
+        )
+
+    def _release_block(
+        self, session_id: str, event: str, reason: str, message: str, log_message: str
+    ) -> bool:
+        """
+        ブロック状態を削除してクライアントに解除を通知（各解除経路の共通処理）
+
+        Args:
+            session_id: セッションID
+            event: 送信するイベント名
+            reason: 解除理由（unlock_key / admin / expired）
+            message: クライアントに表示するメッセージ
+            log_message: ログに出力する内容
+
+        Returns:
+            bool: 通知の送信成功フラグ
+        """
+        del self.blocked_sessions[session_id]
+        self._wheel.cancel(self._expiry_timers.pop(session_id, None))
 
-            try:
-                import asyncio
+        unblock_data = {
+            "type": event,
+            "session_id": session_id,
+            "reason": reason,
+            "message": message,
+            "timestamp": time.time(),
+        }
 
-                _ = asyncio.create_task(self.sio.emit("force_unblock", force_unblock_data))
+        try:
+            import asyncio
+
+            _ = asyncio.create_task(self.sio.emit(event, unblock_data))
 
-                log.info(f"Session {session_id} force unblocked by admin")
-                return True
+            log.info(f"Session {session_id} {log_message}")
+            return True
 
-            except Exception as e:
-                log.error(f"Failed to send force unblock signal to session {session_id}: {e}")
-                return False
+        except Exception as e:
+            log.error(f"Failed to send {event} signal to session {session_id}: {e}")
+            return False
 
-        return False
+    def _expire_blocks(self, session_ids: list[str]) -> None:
+        """タイマーが発火したブロックを自動解除"""
+        for session_id in session_ids:
+            self._expiry_timers.pop(session_id, None)
+            self._expire_block(session_id)
 
     def cleanup_expired_blocks(self, max_age_seconds: int = 300):
         """期限切れのブロックをクリーンアップ(5分でタイムアウト)"""
@@ -202,8 +239,7 @@ class AutoBlocker:
                 expired_sessions.append(session_id)
 
         for session_id in expired_sessions:
-            log.info(f"Auto-unblocking expired session: {session_id}")
-            self.force_unblock_session(session_id)
+            self._expire_block(session_id)
 
     def _get_severity_from_reason(self, reason: BlockReason) -> str:
         """ブロック理由から危険度を取得"""
@@ -13,6 +13,7 @@ from typing import Callable, Dict, List, Optional, Set
 import websockets
 from websockets.client import WebSocketClientProtocol
 
+from .log_analyzer import get_log_analyzer
 from .terminals.asyncio_terminal import AsyncioTerminal
 
 logger = logging.getLogger(__name__)
@@ -22,10 +23,14 @@ class ControlIntegration:
     """ControlServer統合クラス"""
 
     def __init__(
-        self, control_server_url: str = "ws://localhost:8765", agent_id: str = "agentserver_main"
+        self,
+        control_server_url: str = "ws://localhost:8765",
+        agent_id: str = "agentserver_main",
+        risk_summary_limit: int = 10,
     ):
         self.control_server_url = control_server_url
         self.agent_id = agent_id
+        self.risk_summary_limit = risk_summary_limit
 
         # WebSocket接続
         self.websocket: Optional[WebSocketClientProtocol] = None
@@ -36,6 +41,7 @@ class ControlIntegration:
         self.is_connected = False
         self.is_running = False
         self.blocked_sessions: Set[str] = set()
+        self._last_risk_summary: Optional[List[Dict]] = None
 
         # コールバック関数
         self.on_block_session: Optional[Callable] = None
@@ -105,11 +111,14 @@ class ControlIntegration:
 
                     # メッセージ受信タスクを開始
                     self.listen_task = asyncio.create_task(self._listen_for_messages())
+                    self._last_risk_summary = None
 
                 # 接続が生きているかチェック
                 if self.websocket.closed:
                     self.is_connected = False
                     logger.warning("ControlServer connection lost")
+                else:
+                    await self.send_risk_summary()
 
                 await asyncio.sleep(5)  # 5秒間隔でチェック
 
@@ -307,6 +316,30 @@ class ControlIntegration:
         except Exception as e:
             logger.error(f"Error sending session update: {e}")
 
+    async def send_risk_summary(self):
+        """リスクの高いセッションの集計をControlServerに送信（変化があった場合のみ）"""
+        if not self.is_connected or not self.websocket:
+            return
+
+        sessions = get_log_analyzer().get_top_risk_sessions(self.risk_summary_limit)
+        if sessions == self._last_risk_summary:
+            return
+
+        try:
+            summary_message = {
+                "type": "risk_summary",
+                "agent_id": self.agent_id,
+                "sessions": sessions,
+                "timestamp": datetime.now().isoformat(),
+            }
+
+            await self.websocket.send(json.dumps(summary_message))
+            self._last_risk_summary = sessions
+            logger.debug(f"Sent risk summary: {len(sessions)} sessions")
+
+        except Exception as e:
+            logger.error(f"Error sending risk summary: {e}")
+
     async def send_unblock_request(self, session_id: str, user_action: str = "ctrl_d"):
         """ブロック解除要求をControlServerに送信"""
         if not self.is_connected or not self.websocket:
@@ -3,12 +3,15 @@
 ターミナル出力をリアルタイムで監視し、危険なキーワードを検出する
 """
 
+import heapq
 import logging
 import time
 from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List, Optional
 
+from aetherterm.common.timing_wheel import TimerHandle, get_timing_wheel
+
 log = logging.getLogger("aetherterm.log_analyzer")
 
 
@@ -33,6 +36,81 @@ class DetectionResult:
     timestamp: float
 
 
+# スライディングウィンドウで数える危険度と、リスクスコアの重み
+WINDOW_SEVERITIES = (SeverityLevel.MEDIUM, SeverityLevel.HIGH, SeverityLevel.CRITICAL)
+RISK_WEIGHTS = {SeverityLevel.MEDIUM: 1, SeverityLevel.HIGH: 10, SeverityLevel.CRITICAL: 100}
+
+
+class SlidingWindowCounter:
+    """
+    危険度別の検出数を数える固定バケットのスライディングウィンドウ
+
+    ウィンドウを bucket_count 個のバケットに分け、バケット毎の件数と合計を保持します。
+    時刻が進んだ分だけ古いバケットを合計から差し引くため、記録・参照とも
+    検出件数によらず O(1) です（ウィンドウの精度はバケット幅）。
+    """
+
+    __slots__ = (
+        "window",
+        "bucket_count",
+        "_width",
+        "_epochs",
+        "_buckets",
+        "totals",
+        "last_detection",
+    )
+
+    def __init__(self, window: float, bucket_count: int = 10):
+        self.window = window
+        self.bucket_count = bucket_count
+        self._width = window / bucket_count
+        self._epochs = [-1] * bucket_count
+        self._buckets = [[0] * len(WINDOW_SEVERITIES) for _ in range(bucket_count)]
+        self.totals = [0] * len(WINDOW_SEVERITIES)
+        self.last_detection: Optional[float] = None
+
+    def _expire(self, epoch: int) -> None:
+        """ウィンドウから外れたバケットを合計から差し引く"""
+        oldest = epoch - self.bucket_count
+        for index in range(self.bucket_count):
+            if 0 <= self._epochs[index] <= oldest:
+                bucket = self._buckets[index]
+                for i, count in enumerate(bucket):
+                    self.totals[i] -= count
+                    bucket[i] = 0
+                self._epochs[index] = -1
+
+    def add(self, severity: SeverityLevel, timestamp: float) -> None:
+        """検出を記録"""
+        if severity not in RISK_WEIGHTS:
+            return
+        epoch = int(timestamp // self._width)
+        self._expire(epoch)
+        index = epoch % self.bucket_count
+        self._epochs[index] = epoch
+        slot = WINDOW_SEVERITIES.index(severity)
+        self._buckets[index][slot] += 1
+        self.totals[slot] += 1
+        self.last_detection = timestamp
+
+    def counts(self, now: Optional[float] = None) -> Dict[SeverityLevel, int]:
+        """ウィンドウ内の危険度別の検出数"""
+        self._expire(int((time.time() if now is None else now) // self._width))
+        return dict(zip(WINDOW_SEVERITIES, self.totals))
+
+    def risk_level(self, now: Optional[float] = None) -> SeverityLevel:
+        """ウィンドウ内で最も高い危険度"""
+        counts = self.counts(now)
+        for severity in reversed(WINDOW_SEVERITIES):
+            if counts[severity]:
+                return severity
+        return SeverityLevel.LOW
+
+    def risk_score(self, now: Optional[float] = None) -> int:
+        """危険度の重み付き検出数"""
+        return sum(RISK_WEIGHTS[severity] * n for severity, n in self.counts(now).items())
+
+
 class LogAnalyzer:
     """リアルタイムログ解析クラス"""
 
@@ -70,7 +148,10 @@ class LogAnalyzer:
         }
 
         # セッション別の検出履歴
-        self.session_history: Dict[str, List[DetectionResult]] = {}
+        self.session_windows: Dict[str, SlidingWindowCounter] = {}
+        # 検出が途絶えたセッションのウィンドウは共有タイミングホイールで破棄する
+        self._wheel = get_timing_wheel()
+        self._history_timers: Dict[str, TimerHandle] = {}
 
     def analyze_output(self, session_id: str, output: str) -> Optional[DetectionResult]:
         """
@@ -135,52 +216,69 @@ class LogAnalyzer:
             timestamp=time.time(),
         )
 
-        # セッション履歴に追加
-        if session_id not in self.session_history:
-            self.session_history[session_id] = []
-        self.session_history[session_id].append(result)
-
-        # 古い履歴をクリーンアップ（30秒以上前）
-        self._cleanup_old_history(session_id)
+        # セッションのウィンドウに記録
+        window = self.session_windows.get(session_id)
+        if window is None:
+            time_window = self.auto_block_conditions["time_window"]
+            window = self.session_windows[session_id] = SlidingWindowCounter(time_window)
+            self._history_timers[session_id] = self._wheel.schedule(
+                time_window, self._expire_history, session_id
+            )
+        window.add(severity, result.timestamp)
 
         log.info(f"Log analysis result for session {session_id}: {severity.value} - {message}")
 
         return result
 
-    def _cleanup_old_history(self, session_id: str):
-        """古い検出履歴をクリーンアップ"""
-        if session_id not in self.session_history:
-            return
-
+    def _expire_history(self, session_ids: List[str]):
+        """タイマーが発火したセッションのウィンドウを破棄（新しい検出があれば期限を延長）"""
         current_time = time.time()
-        time_window = self.auto_block_conditions["time_window"]
-
-        self.session_history[session_id] = [
-            result
-            for result in self.session_history[session_id]
-            if current_time - result.timestamp <= time_window
-        ]
+        for session_id in session_ids:
+            self._history_timers.pop(session_id, None)
+            window = self.session_windows.get(session_id)
+            if window is None:
+                continue
+            remaining = window.last_detection + window.window - current_time
+            if remaining > 0:
+                self._history_timers[session_id] = self._wheel.schedule(
+                    remaining, self._expire_history, session_id
+                )
+            else:
+                del self.session_windows[session_id]
 
     def get_session_risk_level(self, session_id: str) -> SeverityLevel:
         """セッションの現在のリスクレベルを取得"""
-        if session_id not in self.session_history:
+        window = self.session_windows.get(session_id)
+        if window is None:
             return SeverityLevel.LOW
+        return window.risk_level()
 
-        recent_results = self.session_history[session_id]
-        if not recent_results:
-            return SeverityLevel.LOW
+    def get_top_risk_sessions(self, limit: int = 10) -> List[Dict]:
+        """
+        リスクスコアの高いセッションを取得
 
-        # 最も高い危険度を返す
-        max_severity = SeverityLevel.LOW
-        for result in recent_results:
-            if result.severity == SeverityLevel.CRITICAL:
-                return SeverityLevel.CRITICAL
-            if result.severity == SeverityLevel.HIGH:
-                max_severity = SeverityLevel.HIGH
-            elif result.severity == SeverityLevel.MEDIUM and max_severity == SeverityLevel.LOW:
-                max_severity = SeverityLevel.MEDIUM
+        Args:
+            limit: 取得する最大件数
 
-        return max_severity
+        Returns:
+            List[Dict]: スコアの高い順のセッション別リスク集計（検出履歴そのものは含まない）
+        """
+        now = time.time()
+        scored = (
+            (window.risk_score(now), session_id, window)
+            for session_id, window in self.session_windows.items()
+        )
+        top = heapq.nlargest(limit, (entry for entry in scored if entry[0] > 0))
+        return [
+            {
+                "session_id": session_id,
+                "risk_level": window.risk_level(now).value,
+                "risk_score": score,
+                "counts": {severity.value: n for severity, n in window.counts(now).items()},
+                "last_detection": window.last_detection,
+            }
+            for score, session_id, window in top
+        ]
 
     def add_custom_keyword(self, keyword: str, severity: SeverityLevel):
         """カスタムキーワードを追加"""
@@ -203,8 +301,9 @@ class LogAnalyzer:
         log.info(f"Removed custom keyword: {keyword}")
 
     def get_statistics(self, session_id: str) -> Dict:
-        """セッションの統計情報を取得"""
-        if session_id not in self.session_history:
+        """セッションの統計情報を取得（監視ウィンドウ内の件数）"""
+        window = self.session_windows.get(session_id)
+        if window is None:
             return {
                 "total_detections": 0,
                 "critical_count": 0,
@@ -213,13 +312,13 @@ class LogAnalyzer:
                 "last_detection": None,
             }
 
-        history = self.session_history[session_id]
+        counts = window.counts()
         stats = {
-            "total_detections": len(history),
-            "critical_count": sum(1 for r in history if r.severity == SeverityLevel.CRITICAL),
-            "high_count": sum(1 for r in history if r.severity == SeverityLevel.HIGH),
-            "medium_count": sum(1 for r in history if r.severity == SeverityLevel.MEDIUM),
-            "last_detection": max(r.timestamp for r in history) if history else None,
+            "total_detections": sum(counts.values()),
+            "critical_count": counts[SeverityLevel.CRITICAL],
+            "high_count": counts[SeverityLevel.HIGH],
+            "medium_count": counts[SeverityLevel.MEDIUM],
+            "last_detection": window.last_detection,
         }
 
         return stats
@@ -404,6 +404,7 @@ async def start_server(**kwargs):
     # Register Wrapper session sync handlers
     sio.on("wrapper_session_sync", socket_handlers.wrapper_session_sync)
     sio.on("get_wrapper_sessions", socket_handlers.get_wrapper_sessions)
+    sio.on("agent_codec_negotiate", socket_handlers.agent_codec_negotiate)
 
     # Register Block/Unblock handlers
     sio.on("unblock_request", socket_handlers.unblock_request)
@@ -524,6 +525,7 @@ def setup_app(**kwargs):
     # Register AI-specific handlers
     sio.on("wrapper_session_sync", socket_handlers.wrapper_session_sync)
     sio.on("get_wrapper_sessions", socket_handlers.get_wrapper_sessions)
+    sio.on("agent_codec_negotiate", socket_handlers.agent_codec_negotiate)
     sio.on("unblock_request", socket_handlers.unblock_request)
     sio.on("get_block_status", socket_handlers.get_block_status)
 
@@ -15,12 +15,17 @@ from aetherterm.agentserver.log_analyzer import SeverityLevel, get_log_analyzer
 from aetherterm.agentserver.terminals.asyncio_terminal import AsyncioTerminal
 from aetherterm.agentserver.utils import User
 from aetherterm.agentserver.ai_services import AIService, get_ai_service
+from aetherterm.common.agent_codec import negotiate_codec
+from aetherterm.common.session_sync import SessionStateStore, compact_patch
 
 log = logging.getLogger("aetherterm.socket_handlers")
 
 # Global storage for socket.io server instance
 sio_instance = None
 
+# Wrapper sessions synchronized from agentshell (delta sync)
+wrapper_session_store = SessionStateStore()
+
 
 def set_sio_instance(sio):
     """Set the global socket.io server instance."""
@@ -100,6 +105,7 @@ async def connect(
 async def disconnect(sid, environ=None):
     """Handle client disconnection."""
     log.info(f"Client disconnected: {sid}")
+    wrapper_session_store.discard_source(sid)
 
     # Remove client from any terminal sessions and close if no clients remain
     for session_id, terminal in list(AsyncioTerminal.sessions.items()):
@@ -360,7 +366,47 @@ async def wrapper_session_sync(sid, data):
 
         log.info(f"Wrapper session sync received: {action} from PID {wrapper_info.get('pid')}")
 
-        if action == "bulk_sync":
+        response = {"status": "success", "action": action, "timestamp": data.get("timestamp")}
+
+        if action == "snapshot":
+            # 再同期用のスナップショット（この接続から来たセッションを置き換える）
+            entries = data.get("sessions", [])
+            wrapper_session_store.apply_snapshot(sid, entries)
+            log.info(f"Session snapshot: {len(entries)} sessions from wrapper")
+
+            await sio_instance.emit(
+                "wrapper_sessions_update",
+                {
+                    "action": "bulk_sync",
+                    "sessions": wrapper_session_store.sessions(sid),
+                    "wrapper_info": wrapper_info,
+                    "timestamp": data.get("timestamp"),
+                },
+            )
+
+        elif action == "delta":
+            # 差分パッチを適用し、適用できたものだけを軽量な差分としてブラウザーへ中継
+            applied = []
+            for patch in data.get("patches", []):
+                if wrapper_session_store.apply_patch(sid, patch):
+                    applied.append(compact_patch(patch))
+                else:
+                    response["resync"] = True
+
+            if response.get("resync"):
+                log.info(f"Session delta out of sync for {sid}, requesting snapshot")
+            if applied:
+                await sio_instance.emit(
+                    "wrapper_session_update",
+                    {
+                        "action": "delta",
+                        "patches": applied,
+                        "wrapper_info": wrapper_info,
+                        "timestamp": data.get("timestamp"),
+                    },
+                )
+
+        elif action == "bulk_sync":
             # 複数セッションの一括同期
             sessions = data.get("sessions", [])
             log.info(f"Bulk sync: {len(sessions)} sessions from wrapper")
@@ -395,11 +441,7 @@ async def wrapper_session_sync(sid, data):
             )
 
         # 同期完了の応答を送信
-        await sio_instance.emit(
-            "wrapper_session_sync_response",
-            {"status": "success", "action": action, "timestamp": data.get("timestamp")},
-            room=sid,
-        )
+        await sio_instance.emit("wrapper_session_sync_response", response, room=sid)
 
     except Exception as e:
         log.error(f"Error handling wrapper session sync: {e}")
@@ -426,6 +468,14 @@ async def get_wrapper_sessions(sid, data):
         )
 
 
+async def agent_codec_negotiate(sid, data):
+    """Negotiate the AgentMessage wire codec for this connection (returned as the ack)."""
+    offered = (data or {}).get("codecs") or []
+    codec = negotiate_codec(offered)
+    log.debug(f"Agent codec for {sid}: {codec}")
+    return {"codec": codec}
+
+
 async def unblock_request(sid, data):
     """Handle unblock request from client."""
     try:
@@ -27,6 +27,7 @@ import termios
 from logging import getLogger
 
 from aetherterm import utils
+from aetherterm.common.timing_wheel import get_timing_wheel
 
 from .base_terminal import BaseTerminal
 
@@ -37,6 +38,8 @@ class AsyncioTerminal(BaseTerminal):
     sessions = {}
     closed_sessions = set()  # Track closed session IDs
     session_owners = {}  # Track session owners: {session_id: user_info}
+    closed_session_ttl = 3600  # Seconds a closed session is remembered
+    _closed_session_timers = {}  # {session_id: TimerHandle}
 
     def __init__(
         self, user, path, session, socket, uri, render_string, broadcast, login, pam_profile
@@ -376,10 +379,27 @@ class AsyncioTerminal(BaseTerminal):
         # Track this session as closed (keep owner info for ownership checking)
         self.closed_sessions.add(self.session)
         # Note: We keep session_owners[self.session] for ownership checking
+        # until the tombstone expires on the shared timing wheel
+        wheel = get_timing_wheel()
+        wheel.cancel(self._closed_session_timers.pop(self.session, None))
+        self._closed_session_timers[self.session] = wheel.schedule(
+            self.closed_session_ttl, AsyncioTerminal._expire_closed_sessions, self.session
+        )
 
         # Notify clients that terminal is closed
         self.send(None)
 
+    @classmethod
+    def _expire_closed_sessions(cls, session_ids):
+        """Forget closed sessions whose tombstone has expired."""
+        for session_id in session_ids:
+            cls._closed_session_timers.pop(session_id, None)
+            cls.closed_sessions.discard(session_id)
+            # The session id may have been reused by a live terminal
+            if session_id not in cls.sessions:
+                cls.session_owners.pop(session_id, None)
+        log.debug(f"Expired {len(session_ids)} closed session(s)")
+
     async def _delayed_motd_send(self):
         """Send MOTD after shell initialization is complete."""
         try:
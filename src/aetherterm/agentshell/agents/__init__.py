@@ -3,21 +3,34 @@ AIエージェント統合モジュール
 
 このモジュールは、様々なAIエージェント（OpenHands等）との
 統合インターフェースを提供します。
+
+公開クラスは最初に参照されたときにサブモジュールから読み込みます。
+スケジューラーなどの一部だけを使う場合に、他のエージェントの依存関係を読み込まないためです。
 """
 
-from .base import AgentInterface, AgentCapability, AgentTask, AgentResult
-from .openhands import OpenHandsAgent
-from .langchain_agent import LangChainAgent
-from .command_analyzer import CommandAnalyzerAgent
-from .manager import AgentManager
+import importlib
+from typing import Any
+
+# 公開名 -> 定義しているサブモジュール
+_EXPORTS = {
+    "AgentInterface": ".base",
+    "AgentCapability": ".base",
+    "AgentTask": ".base",
+    "AgentResult": ".base",
+    "OpenHandsAgent": ".openhands",
+    "LangChainAgent": ".langchain_agent",
+    "CommandAnalyzerAgent": ".command_analyzer",
+    "AgentManager": ".manager",
+    "TaskScheduler": ".scheduler",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "AgentInterface",
-    "AgentCapability",
-    "AgentTask",
-    "AgentResult",
-    "OpenHandsAgent",
-    "LangChainAgent",
-    "CommandAnalyzerAgent",
-    "AgentManager",
-]
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
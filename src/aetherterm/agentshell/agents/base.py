@@ -149,6 +149,31 @@ class AgentInterface(ABC):
         """エージェントをシャットダウン"""
         pass
     
+    # task_queued() と task_dequeued() は任意のフックのため抽象メソッドにしない
+    # （必要なエージェントだけがオーバーライドする）
+    def task_queued(self, task: AgentTask) -> None:  # noqa: B027
+        """
+        タスクがこのエージェントのキューに入ったときに呼ばれる
+        
+        実行前に準備できるもの（コンテキストの取得など）をバックグラウンドで始めるために
+        使用します。ここで時間のかかる処理を直接行ってはいけません。
+        
+        Args:
+            task: キューに入ったタスク
+        """
+        pass
+    
+    def task_dequeued(self, task: AgentTask) -> None:  # noqa: B027
+        """
+        task_queued() したタスクが実行されずにキューから取り除かれたときに呼ばれる
+        
+        キャンセルされたタスクのために始めた準備を破棄するために使用します。
+        
+        Args:
+            task: 取り除かれたタスク
+        """
+        pass
+    
     @abstractmethod
     async def execute_task(self, task: AgentTask) -> AgentResult:
         """
@@ -7,6 +7,7 @@ LangChainの機能を使用して会話メモリ、コンテキスト管理を
 
 import logging
 import os
+import time
 from datetime import datetime
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
@@ -158,6 +159,11 @@ class LangChainAgent(AgentInterface):
         self._status = AgentStatus.BUSY
 
         try:
+            # メモリから関連情報を取得（会話を書き込むと無効になるため、開始の記録より先に行う）
+            started = time.perf_counter()
+            context = await self._get_relevant_context(task)
+            context_ms = (time.perf_counter() - started) * 1000
+
             # 会話履歴に記録
             await self._store_conversation(
                 f"タスク開始: {task.task_type} - {task.description}",
@@ -165,14 +171,18 @@ class LangChainAgent(AgentInterface):
             )
 
             # タスクタイプに応じて処理を分岐
-            result = await self._process_task(task)
+            started = time.perf_counter()
+            result = await self._process_task(task, context)
+            model_ms = (time.perf_counter() - started) * 1000
 
-            # 成功を記録
+            # 成功を記録（コンテキスト取得とタスク処理の時間は別々に記録する）
             self._task_history.append(
                 {
                     "task_id": task.task_id,
                     "task_type": task.task_type,
                     "status": "completed",
+                    "context_ms": round(context_ms, 3),
+                    "model_ms": round(model_ms, 3),
                     "timestamp": datetime.now().isoformat(),
                 }
             )
@@ -230,21 +240,19 @@ class LangChainAgent(AgentInterface):
         """ユーザー介入コールバックを設定"""
         self._intervention_callback = callback
 
-    async def _process_task(self, task: TaskData) -> Dict[str, Any]:
+    async def _process_task(self, task: TaskData, context: Dict[str, Any]) -> Dict[str, Any]:
         """
         タスクを処理
 
         Args:
             task: 処理するタスク
+            context: タスクコンテキスト
 
         Returns:
             Dict[str, Any]: 処理結果
         """
         task_type = LangChainTaskType(task.task_type)
 
-        # メモリから関連情報を取得
-        context = await self._get_relevant_context(task)
-
         # コード生成・編集系のタスクはOpenHandsに委譲
         if task_type in [
             LangChainTaskType.CODE_GENERATION,
@@ -389,28 +397,27 @@ class LangChainAgent(AgentInterface):
         if not self._conversation_memory:
             return {}
 
-        # 会話履歴から関連情報を検索
+        # 最近の会話とハイブリッド検索の結果（キュー投入時に取得を始めていればその結果）
         try:
-            recent_conversations = await self._conversation_memory.get_recent_conversations(
-                session_id=self.agent_id, limit=10
-            )
-
-            # キーワードベースで関連メモリを検索
-            keywords = task.description.split()[:5]  # 最初の5単語をキーワードとして使用
-            relevant_memories = await self._conversation_memory.search_conversations(
-                session_id=self.agent_id, query=" ".join(keywords), limit=5
+            context = await self._conversation_memory.get_context(
+                self.agent_id, task.description
             )
-
-            return {
-                "recent_conversations": recent_conversations,
-                "relevant_memories": relevant_memories,
-                "task_history": self._task_history[-5:],  # 最近の5タスク
-            }
+            return {**context, "task_history": self._task_history[-5:]}  # 最近の5タスク
 
         except Exception as e:
             logger.warning(f"コンテキスト取得中にエラーが発生しました: {e}")
             return {}
 
+    def task_queued(self, task: TaskData) -> None:
+        """タスクがキューに入った時点でコンテキストの取得を始める"""
+        if self._conversation_memory:
+            self._conversation_memory.prefetch_context(self.agent_id, task.description)
+
+    def task_dequeued(self, task: TaskData) -> None:
+        """実行されなくなったタスクのために取得を始めたコンテキストを忘れる"""
+        if self._conversation_memory:
+            self._conversation_memory.discard_prefetched_context(self.agent_id, task.description)
+
     async def _store_conversation(self, content: str, conversation_type: ConversationType) -> None:
         """会話を保存"""
         if not self._conversation_memory:
@@ -450,12 +457,12 @@ class LangChainAgent(AgentInterface):
         if "recent_conversations" in context:
             lines.append("最近の会話:")
             for conv in context["recent_conversations"][-3:]:  # 最新3件
-                lines.append(f"- {conv.get('content', '')}")
+                lines.append(f"- {conv.content}")
 
         if "relevant_memories" in context:
             lines.append("\n関連するメモリ:")
             for mem in context["relevant_memories"][:3]:  # 上位3件
-                lines.append(f"- {mem.get('content', '')}")
+                lines.append(f"- {mem.content}")
 
         if "task_history" in context:
             lines.append("\n最近のタスク:")
@@ -21,6 +21,7 @@ from .base import (
     UserIntervention,
 )
 from .openhands import OpenHandsAgent
+from .scheduler import TaskScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -31,13 +32,27 @@ class AgentManager:
     
     複数のAIエージェントを統合管理し、タスクの適切な割り当て、
     実行監視、ユーザー介入の調整を行います。
+    
+    キューに投入されたタスクは TaskScheduler により優先度順に、
+    エージェント毎の同時実行数上限の範囲で実行されます。
     """
     
-    def __init__(self):
+    def __init__(self, default_max_concurrency: int = 4, aging_interval: float = 5.0):
+        """
+        初期化
+        
+        Args:
+            default_max_concurrency: エージェント毎の同時実行数の既定値
+                （登録時の config["max_concurrent_tasks"] で上書き可能）
+            aging_interval: 待機中タスクの優先度を1段引き上げるまでの時間（秒）
+        """
         self._agents: Dict[str, AgentInterface] = {}
         self._capability_map: Dict[AgentCapability, Set[str]] = defaultdict(set)
         self._running_tasks: Dict[UUID, str] = {}  # task_id -> agent_id
-        self._task_queue: asyncio.Queue[AgentTask] = asyncio.Queue()
+        self._default_max_concurrency = default_max_concurrency
+        self._scheduler = TaskScheduler(aging_interval=aging_interval)
+        self._dispatch_event = asyncio.Event()
+        self._execution_tasks: Set[asyncio.Task] = set()
         self._is_running = False
         self._worker_task: Optional[asyncio.Task] = None
         
@@ -73,6 +88,12 @@ class AgentManager:
             except asyncio.CancelledError:
                 pass
         
+        # 実行中のタスクを停止
+        for execution in list(self._execution_tasks):
+            execution.cancel()
+        if self._execution_tasks:
+            await asyncio.gather(*self._execution_tasks, return_exceptions=True)
+        
         # すべてのエージェントをシャットダウン
         shutdown_tasks = []
         for agent in self._agents.values():
@@ -84,6 +105,7 @@ class AgentManager:
         self._agents.clear()
         self._capability_map.clear()
         self._running_tasks.clear()
+        self._scheduler = TaskScheduler(aging_interval=self._scheduler.aging_interval)
     
     async def register_agent(
         self,
@@ -113,6 +135,14 @@ class AgentManager:
             for capability in agent.get_capabilities():
                 self._capability_map[capability].add(agent.agent_id)
             
+            # スケジューラーに登録
+            self._scheduler.add_agent(
+                agent.agent_id,
+                agent.get_capabilities(),
+                (config or {}).get("max_concurrent_tasks", self._default_max_concurrency),
+            )
+            self._dispatch_event.set()
+            
             # コールバックを設定
             agent.register_intervention_callback(
                 lambda ui: self._handle_agent_intervention(agent.agent_id, ui)
@@ -154,14 +184,27 @@ class AgentManager:
         """
         タスクを送信
         
+        タスクは実行可能なエージェントのうち最も負荷の低いもののキューに入り、
+        priority（10が最高）と待ち時間の順に実行されます。
+        
         Args:
             task: 実行するタスク
             
         Returns:
             UUID: タスクID
         """
-        await self._task_queue.put(task)
-        logger.info(f"タスク {task.id} をキューに追加しました")
+        agent_id = self._scheduler.enqueue(task)
+        if agent_id is None:
+            logger.error(f"タスク {task.id} を実行できるエージェントがありません")
+            return task.id
+        
+        try:
+            self._agents[agent_id].task_queued(task)
+        except Exception as e:
+            # 事前準備の失敗でタスクの受け付けは失敗させない
+            logger.warning(f"エージェント {agent_id} の task_queued でエラーが発生しました: {e}")
+        self._dispatch_event.set()
+        logger.info(f"タスク {task.id} をキューに追加しました（エージェント {agent_id}）")
         return task.id
     
     async def execute_task_immediately(
@@ -191,6 +234,7 @@ class AgentManager:
         
         # タスクを実行
         self._running_tasks[task.id] = agent.agent_id
+        self._scheduler.task_started(agent.agent_id)
         
         try:
             result = await agent.execute_task(task)
@@ -206,6 +250,8 @@ class AgentManager:
             
         finally:
             self._running_tasks.pop(task.id, None)
+            self._scheduler.task_finished(agent.agent_id)
+            self._dispatch_event.set()
     
     async def cancel_task(self, task_id: UUID) -> bool:
         """
@@ -217,6 +263,19 @@ class AgentManager:
         Returns:
             bool: キャンセルが成功した場合True
         """
+        # 待機中ならキューから取り除く
+        entry = self._scheduler.cancel(task_id)
+        if entry is not None:
+            owner = self._agents.get(entry.owner)
+            if owner is not None:
+                try:
+                    owner.task_dequeued(entry.task)
+                except Exception as e:
+                    logger.warning(
+                        f"エージェント {entry.owner} の task_dequeued でエラーが発生しました: {e}"
+                    )
+            return True
+        
         agent_id = self._running_tasks.get(task_id)
         if not agent_id:
             return False
@@ -296,6 +355,10 @@ class AgentManager:
         """実行中のタスクを取得（task_id -> agent_id）"""
         return self._running_tasks.copy()
     
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """スケジューラーの統計（待機数、スティール数、待ち時間分位点等）を取得"""
+        return self._scheduler.get_stats()
+    
     def register_intervention_callback(
         self,
         callback: Callable[[UserIntervention, str], None]
@@ -345,26 +408,24 @@ class AgentManager:
             self._completion_callbacks.remove(callback)
     
     async def _task_worker(self) -> None:
-        """タスクキューを処理するワーカー"""
+        """タスクの投入・完了を契機に空き実行枠へタスクを割り当てるワーカー"""
         while self._is_running:
             try:
-                # タスクを取得（タイムアウト付き）
-                task = await asyncio.wait_for(
-                    self._task_queue.get(),
-                    timeout=1.0
-                )
-                
-                # エージェントを選択
-                agent = self._select_agent_for_task(task)
-                if not agent:
-                    logger.error(f"タスク {task.id} を実行できるエージェントがありません")
-                    continue
+                await self._dispatch_event.wait()
+                self._dispatch_event.clear()
                 
-                # タスクを実行（非同期）
-                asyncio.create_task(self._execute_task_async(agent, task))
-                
-            except asyncio.TimeoutError:
-                continue
+                for agent_id, task in self._scheduler.dispatch():
+                    agent = self._agents.get(agent_id)
+                    if not agent:
+                        self._scheduler.task_finished(agent_id)
+                        logger.error(f"タスク {task.id} の割り当て先エージェント {agent_id} が見つかりません")
+                        continue
+                    
+                    # タスクを実行（非同期）
+                    execution = asyncio.create_task(self._execute_task_async(agent, task))
+                    self._execution_tasks.add(execution)
+                    execution.add_done_callback(self._execution_tasks.discard)
+                    
             except Exception as e:
                 logger.error(f"タスクワーカーでエラー: {e}")
     
@@ -390,39 +451,15 @@ class AgentManager:
             logger.error(f"タスク {task.id} の実行中にエラー: {e}")
         finally:
             self._running_tasks.pop(task.id, None)
+            self._scheduler.task_finished(agent.agent_id)
+            self._dispatch_event.set()
     
     def _select_agent_for_task(self, task: AgentTask) -> Optional[AgentInterface]:
-        """タスクに適したエージェントを選択"""
-        # 必要な能力をすべてサポートするエージェントを探す
-        candidate_agents = None
-        
-        for capability in task.capabilities_required:
-            agents_with_capability = self._capability_map.get(capability, set())
-            if candidate_agents is None:
-                candidate_agents = agents_with_capability.copy()
-            else:
-                candidate_agents &= agents_with_capability
-        
-        if not candidate_agents:
+        """タスクに適したエージェントを選択（必要な能力をすべて持ち、最も負荷の低いもの）"""
+        agent_id = self._scheduler.select_agent(task)
+        if agent_id is None:
             return None
-        
-        # 最も負荷の低いエージェントを選択
-        min_load = float('inf')
-        selected_agent = None
-        
-        for agent_id in candidate_agents:
-            agent = self._agents.get(agent_id)
-            if not agent:
-                continue
-            
-            # 実行中のタスク数を負荷として使用
-            load = sum(1 for tid, aid in self._running_tasks.items() if aid == agent_id)
-            
-            if load < min_load:
-                min_load = load
-                selected_agent = agent
-        
-        return selected_agent
+        return self._agents.get(agent_id)
     
     async def _handle_agent_intervention(
         self,
@@ -0,0 +1,380 @@
+"""
+タスクスケジューラー
+
+AgentManager が使用する、優先度付き・ワークスティーリング型のタスクスケジューラーです。
+
+- エージェント毎に優先度キュー（ヒープ）を持ち、投入時に最も負荷の低いエージェントへ割り当てる
+- エージェント毎の同時実行数上限と O(1) の負荷カウンターを持つ
+- 待ち時間に応じて優先度を引き上げるエージング、timeout_seconds による期限を考慮する
+- 空きのあるエージェントは、実行可能な能力を持つ限り他のエージェントのキューからタスクを奪う
+
+スケジューラー自体は同期的なデータ構造で、タスクの実行は呼び出し側が行います。
+"""
+
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from .base import AgentCapability, AgentTask
+
+# AgentTask.priority の最大値（10が最高）
+MAX_PRIORITY = 10
+
+
+@dataclass(order=True)
+class ScheduledTask:
+    """キュー内のタスク（sort_key が小さいほど先に実行）"""
+
+    sort_key: float
+    seq: int
+    task: AgentTask = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    capabilities: FrozenSet[AgentCapability] = field(compare=False)
+    owner: str = field(compare=False)
+    removed: bool = field(default=False, compare=False)
+
+
+@dataclass
+class AgentSlot:
+    """エージェント毎のキューと負荷"""
+
+    agent_id: str
+    capabilities: FrozenSet[AgentCapability]
+    max_concurrency: int
+    running: int = 0
+    queued: int = 0
+    queue: List[ScheduledTask] = field(default_factory=list)
+
+    @property
+    def spare(self) -> int:
+        """空き実行枠の数"""
+        return self.max_concurrency - self.running
+
+    @property
+    def load(self) -> float:
+        """実行中＋待機中のタスク数を同時実行数で正規化した負荷"""
+        return (self.running + self.queued) / self.max_concurrency
+
+    def can_run(self, capabilities: FrozenSet[AgentCapability]) -> bool:
+        return capabilities <= self.capabilities
+
+    def push(self, entry: ScheduledTask) -> None:
+        entry.owner = self.agent_id
+        heapq.heappush(self.queue, entry)
+        self.queued += 1
+
+    def pop(self) -> Optional[ScheduledTask]:
+        """最優先のタスクを取り出す（削除済みエントリは読み飛ばす）"""
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            if not entry.removed:
+                self.queued -= 1
+                return entry
+        return None
+
+    def take(self, capabilities: FrozenSet[AgentCapability]) -> Optional[ScheduledTask]:
+        """指定の能力で実行できる最優先のタスクを取り出す（スティール用）"""
+        while self.queue and self.queue[0].removed:
+            heapq.heappop(self.queue)
+        if not self.queue:
+            return None
+
+        head = self.queue[0]
+        if head.capabilities <= capabilities:
+            return self.pop()
+
+        best: Optional[ScheduledTask] = None
+        for entry in self.queue:
+            if entry.removed or not entry.capabilities <= capabilities:
+                continue
+            if best is None or entry < best:
+                best = entry
+        if best is not None:
+            # ヒープからは遅延削除する
+            best.removed = True
+            self.queued -= 1
+        return best
+
+
+class TaskScheduler:
+    """
+    優先度付きワークスティーリングスケジューラー
+
+    キュー内の順序は「目標開始時刻」で決まる。優先度 p のタスクは
+    投入時刻 + (MAX_PRIORITY - p) * aging_interval を目標とするため、
+    低優先度のタスクも待ち時間が優先度差 × aging_interval を超えれば
+    後から来た高優先度タスクより先に実行される。timeout_seconds を持つタスクは
+    投入時刻 + timeout_seconds を上限とする。
+    """
+
+    def __init__(
+        self,
+        aging_interval: float = 5.0,
+        work_stealing: bool = True,
+        latency_window: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            aging_interval: 優先度1段分に相当する待ち時間（秒）
+            work_stealing: 空きのあるエージェントが他のキューからタスクを奪うか
+            latency_window: 待ち時間の分位点計算に使う直近サンプル数
+            clock: 時刻関数（シミュレーション用に差し替え可能）
+        """
+        self.aging_interval = aging_interval
+        self.work_stealing = work_stealing
+        self._clock = clock
+
+        self._slots: Dict[str, AgentSlot] = {}
+        self._capability_map: Dict[AgentCapability, Set[str]] = {}
+        self._queued: Dict[UUID, ScheduledTask] = {}
+        self._seq = itertools.count()
+
+        # 統計情報
+        self.stats = {
+            "enqueued": 0,
+            "dispatched": 0,
+            "stolen": 0,
+            "rejected": 0,
+            "cancelled": 0,
+        }
+        self._recent_wait: Deque[float] = deque(maxlen=latency_window)
+
+    # --- エージェント管理 ---
+
+    def add_agent(
+        self,
+        agent_id: str,
+        capabilities: Iterable[AgentCapability],
+        max_concurrency: int = 4,
+    ) -> None:
+        """エージェントを追加（既存の場合は能力と同時実行数を更新）"""
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        capabilities = frozenset(capabilities)
+        slot = self._slots.get(agent_id)
+        if slot is None:
+            slot = AgentSlot(agent_id, capabilities, max_concurrency)
+            self._slots[agent_id] = slot
+        else:
+            self._unindex(slot)
+            slot.capabilities = capabilities
+            slot.max_concurrency = max_concurrency
+        for capability in capabilities:
+            self._capability_map.setdefault(capability, set()).add(agent_id)
+
+    def remove_agent(self, agent_id: str) -> List[AgentTask]:
+        """
+        エージェントを削除
+
+        Returns:
+            他のエージェントへ再割り当てできなかった待機中タスク
+        """
+        slot = self._slots.pop(agent_id, None)
+        if slot is None:
+            return []
+        self._unindex(slot)
+
+        orphaned = []
+        while True:
+            entry = slot.pop()
+            if entry is None:
+                break
+            target = self._least_loaded(entry.capabilities)
+            if target is None:
+                self._queued.pop(entry.task.id, None)
+                orphaned.append(entry.task)
+            else:
+                target.push(entry)
+        return orphaned
+
+    def _unindex(self, slot: AgentSlot) -> None:
+        for capability in slot.capabilities:
+            agent_ids = self._capability_map.get(capability)
+            if agent_ids:
+                agent_ids.discard(slot.agent_id)
+                if not agent_ids:
+                    del self._capability_map[capability]
+
+    def candidates(self, capabilities: Iterable[AgentCapability]) -> Set[str]:
+        """必要な能力をすべて持つエージェントIDの集合"""
+        candidate_agents: Optional[Set[str]] = None
+        for capability in capabilities:
+            agents_with_capability = self._capability_map.get(capability, set())
+            if candidate_agents is None:
+                candidate_agents = set(agents_with_capability)
+            else:
+                candidate_agents &= agents_with_capability
+        return candidate_agents or set()
+
+    def _least_loaded(self, capabilities: FrozenSet[AgentCapability]) -> Optional[AgentSlot]:
+        selected = None
+        for agent_id in self.candidates(capabilities):
+            slot = self._slots[agent_id]
+            if selected is None or slot.load < selected.load:
+                selected = slot
+        return selected
+
+    def select_agent(self, task: AgentTask) -> Optional[str]:
+        """タスクを実行できる最も負荷の低いエージェントID"""
+        slot = self._least_loaded(frozenset(task.capabilities_required))
+        return slot.agent_id if slot else None
+
+    # --- タスク管理 ---
+
+    def sort_key(self, task: AgentTask, enqueued_at: float) -> float:
+        """キュー内の順序（目標開始時刻）"""
+        priority = max(1, min(MAX_PRIORITY, task.priority))
+        key = enqueued_at + (MAX_PRIORITY - priority) * self.aging_interval
+        if task.timeout_seconds:
+            key = min(key, enqueued_at + task.timeout_seconds)
+        return key
+
+    def enqueue(self, task: AgentTask) -> Optional[str]:
+        """
+        タスクを最も負荷の低いエージェントのキューへ追加
+
+        Returns:
+            割り当てたエージェントID。実行できるエージェントがない場合None
+        """
+        capabilities = frozenset(task.capabilities_required)
+        slot = self._least_loaded(capabilities)
+        if slot is None:
+            self.stats["rejected"] += 1
+            return None
+
+        now = self._clock()
+        entry = ScheduledTask(
+            sort_key=self.sort_key(task, now),
+            seq=next(self._seq),
+            task=task,
+            enqueued_at=now,
+            capabilities=capabilities,
+            owner=slot.agent_id,
+        )
+        slot.push(entry)
+        self._queued[task.id] = entry
+        self.stats["enqueued"] += 1
+        return slot.agent_id
+
+    def cancel(self, task_id: UUID) -> Optional[ScheduledTask]:
+        """待機中のタスクをキューから取り除き、取り除いたエントリを返す（待機中でなければNone）"""
+        entry = self._queued.pop(task_id, None)
+        if entry is None:
+            return None
+        entry.removed = True
+        slot = self._slots.get(entry.owner)
+        if slot is not None:
+            slot.queued -= 1
+        self.stats["cancelled"] += 1
+        return entry
+
+    def dispatch(self) -> List[Tuple[str, AgentTask]]:
+        """
+        空き実行枠にタスクを割り当てる
+
+        まず各エージェントが自分のキューから取り出し、それでも枠が余る
+        エージェントは最も待機タスクの多いエージェントからスティールする。
+        返したタスクは実行中として負荷に計上される。
+
+        Returns:
+            (エージェントID, タスク) のリスト
+        """
+        assignments: List[Tuple[str, AgentTask]] = []
+        idle: List[AgentSlot] = []
+
+        for slot in self._slots.values():
+            while slot.spare > 0:
+                entry = slot.pop()
+                if entry is None:
+                    idle.append(slot)
+                    break
+                self._start(slot, entry, assignments)
+
+        if self.work_stealing:
+            for slot in idle:
+                while slot.spare > 0:
+                    entry = self._steal(slot)
+                    if entry is None:
+                        break
+                    self.stats["stolen"] += 1
+                    self._start(slot, entry, assignments)
+
+        return assignments
+
+    def _steal(self, thief: AgentSlot) -> Optional[ScheduledTask]:
+        victims = sorted(
+            (slot for slot in self._slots.values() if slot is not thief and slot.queued > 0),
+            key=lambda slot: slot.queued,
+            reverse=True,
+        )
+        for victim in victims:
+            entry = victim.take(thief.capabilities)
+            if entry is not None:
+                return entry
+        return None
+
+    def _start(
+        self,
+        slot: AgentSlot,
+        entry: ScheduledTask,
+        assignments: List[Tuple[str, AgentTask]],
+    ) -> None:
+        self._queued.pop(entry.task.id, None)
+        slot.running += 1
+        self.stats["dispatched"] += 1
+        self._recent_wait.append(self._clock() - entry.enqueued_at)
+        assignments.append((slot.agent_id, entry.task))
+
+    def task_started(self, agent_id: str) -> None:
+        """キューを経由せずに開始したタスクを負荷に計上"""
+        slot = self._slots.get(agent_id)
+        if slot is not None:
+            slot.running += 1
+
+    def task_finished(self, agent_id: str) -> None:
+        """タスクの終了を負荷に反映"""
+        slot = self._slots.get(agent_id)
+        if slot is not None and slot.running > 0:
+            slot.running -= 1
+
+    # --- 参照 ---
+
+    def load(self, agent_id: str) -> int:
+        """エージェントの実行中タスク数"""
+        slot = self._slots.get(agent_id)
+        return slot.running if slot else 0
+
+    def queued_count(self) -> int:
+        """待機中のタスク数"""
+        return len(self._queued)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """スケジューラー統計を取得"""
+        recent = sorted(self._recent_wait)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(len(recent) * p))]
+
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["queued"] = len(self._queued)
+        stats["queue_wait_p50"] = percentile(0.5)
+        stats["queue_wait_p99"] = percentile(0.99)
+        stats["agents"] = {
+            agent_id: {
+                "running": slot.running,
+                "queued": slot.queued,
+                "max_concurrency": slot.max_concurrency,
+            }
+            for agent_id, slot in self._slots.items()
+        }
+        return stats
@@ -59,6 +59,9 @@ class SessionConfig:
     max_sessions: int = 100
     cleanup_interval: int = 300  # 5分
     enable_persistence: bool = True
+    persistence_fsync: str = "interval"  # always, interval, never
+    persistence_flush_interval: float = 1.0  # ジャーナルへの書き出し間隔（秒）
+    persistence_compact_threshold: int = 1000  # スナップショットに畳み込むジャーナルのレコード数
 
 
 @dataclass
@@ -218,6 +221,15 @@ class WrapperConfig:
                 enable_persistence=session_data.get(
                     "enable_persistence", config.session.enable_persistence
                 ),
+                persistence_fsync=session_data.get(
+                    "persistence_fsync", config.session.persistence_fsync
+                ),
+                persistence_flush_interval=session_data.get(
+                    "persistence_flush_interval", config.session.persistence_flush_interval
+                ),
+                persistence_compact_threshold=session_data.get(
+                    "persistence_compact_threshold", config.session.persistence_compact_threshold
+                ),
             )
 
         # ログ設定
@@ -16,6 +16,7 @@ from .sync_terminal_pty import (
     default_async_log,
     run_shell_with_async_backend,
 )
+from .line_assembler import KeywordMatcher, LineAssembler
 from .terminal_pty import TerminalBuffer, TerminalPTY
 
 __all__ = [
@@ -28,4 +29,7 @@ __all__ = [
     "TerminalUtils",
     "run_shell_with_async_backend",
     "default_async_log",
+    # 出力の行組み立て
+    "LineAssembler",
+    "KeywordMatcher",
 ]
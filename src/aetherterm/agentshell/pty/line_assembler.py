@@ -0,0 +1,181 @@
+"""
+PTY出力の行組み立てとキーワード照合
+
+SyncTerminalPTYの出力監視用の高速パス。
+- LineAssembler: bytearray上のインクリメンタルな行分割（新規バイトのみ改行を走査）
+- KeywordMatcher: 複数キーワードを1回の走査で照合するマッチャー
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+# 改行が来ないまま蓄積できる1行の最大バイト数
+DEFAULT_MAX_LINE_LENGTH = 64 * 1024
+
+
+class LineAssembler:
+    """
+    インクリメンタルな行組み立て
+
+    未完了の行だけをbytearrayに保持し、feed()で渡された新規バイトのみを
+    改行検索の対象にする。改行のない長い行が届いても走査量は入力量に比例する。
+    max_line_lengthを超えた行は強制的に切り出される。
+
+    feed()は行ごとに分割せず、完成した行の連続領域（ブロック）を返す。
+    行単位の処理が必要な箇所だけをKeywordMatcherで取り出すことで、
+    キーワードを含まない大量の短い行をPythonレベルでループせずに済む。
+    """
+
+    def __init__(self, max_line_length: int = DEFAULT_MAX_LINE_LENGTH):
+        if max_line_length <= 0:
+            raise ValueError("max_line_length must be positive")
+        self.max_line_length = max_line_length
+        self._partial = bytearray()
+        self.lines_completed = 0
+        self.truncated_lines = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        新規データを追加し、完成した行のブロックを返す
+
+        Args:
+            data: PTYから読み取った生データ
+
+        Returns:
+            ブロックのリスト。各ブロックは改行で終わる1行以上の行、
+            または最大長で切り出された1行（改行なし）
+        """
+        blocks: List[bytes] = []
+        if not data:
+            return blocks
+
+        last_newline = data.rfind(b"\n")
+        if last_newline == -1:
+            self._partial += data
+            if len(self._partial) > self.max_line_length:
+                self._flush_overflow(blocks)
+            return blocks
+
+        if self._partial:
+            self._partial += data[: last_newline + 1]
+            block = bytes(self._partial)
+            self._partial.clear()
+        else:
+            block = data[: last_newline + 1]
+
+        # 切り出し済みの行の続きが最大長を超えていれば、ブロックより前に切り出す
+        if len(block) > self.max_line_length and block.find(b"\n") > self.max_line_length:
+            self._partial += block
+            block = self._flush_head(blocks)
+
+        blocks.append(block)
+        self.lines_completed += block.count(b"\n")
+
+        if last_newline + 1 < len(data):
+            self._partial += data[last_newline + 1 :]
+            if len(self._partial) > self.max_line_length:
+                self._flush_overflow(blocks)
+
+        return blocks
+
+    def _flush_overflow(self, blocks: List[bytes]) -> None:
+        """最大長を超えた未完了行を切り出す"""
+        limit = self.max_line_length
+        while len(self._partial) > limit:
+            blocks.append(bytes(self._partial[:limit]))
+            del self._partial[:limit]
+            self.truncated_lines += 1
+            self.lines_completed += 1
+
+    def _flush_head(self, blocks: List[bytes]) -> bytes:
+        """保留領域の先頭行が最大長を超える分を切り出し、残りを返す"""
+        limit = self.max_line_length
+        while self._partial.find(b"\n", 0, limit + 1) == -1:
+            blocks.append(bytes(self._partial[:limit]))
+            del self._partial[:limit]
+            self.truncated_lines += 1
+            self.lines_completed += 1
+        block = bytes(self._partial)
+        self._partial.clear()
+        return block
+
+    def flush(self) -> Optional[bytes]:
+        """保留中の未完了行を取り出す（終了時用）"""
+        if not self._partial:
+            return None
+        line = bytes(self._partial)
+        self._partial.clear()
+        self.lines_completed += 1
+        return line
+
+    @property
+    def pending_bytes(self) -> int:
+        """保留中のバイト数"""
+        return len(self._partial)
+
+
+class KeywordMatcher:
+    """
+    複数キーワードの一括照合
+
+    ブロック全体を1回だけ小文字化し、キーワード毎の次の出現位置を
+    bytes.find()で管理する。各キーワードの走査はブロック全体で
+    1回分に収まり、ヒットした行のみを切り出す。1行につき最初に
+    現れたキーワードを1件だけ報告する。
+    小文字化はASCIIのみに作用する（bytes.lower()）。
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = [k for k in keywords if k]
+        self._lookup = {k.lower().encode("utf-8"): k for k in self.keywords}
+        # 同じ位置で複数ヒットした場合は長いキーワードを優先する
+        self._needles = sorted(self._lookup, key=len, reverse=True)
+
+    def scan(self, block: bytes) -> List[Tuple[str, bytes]]:
+        """
+        ブロック内のキーワードを含む行を検索
+
+        Args:
+            block: LineAssembler.feed()が返したブロック
+
+        Returns:
+            (キーワード, 行) のリスト
+        """
+        if not self._needles:
+            return []
+
+        lowered = block.lower()
+        next_hits = [lowered.find(needle) for needle in self._needles]
+        matches: List[Tuple[str, bytes]] = []
+        while True:
+            best = -1
+            for i, hit in enumerate(next_hits):
+                if hit != -1 and (best == -1 or hit < next_hits[best]):
+                    best = i
+            if best == -1:
+                break
+
+            hit = next_hits[best]
+            line_start = lowered.rfind(b"\n", 0, hit) + 1
+            line_end = lowered.find(b"\n", hit)
+            line_end = len(lowered) if line_end == -1 else line_end + 1
+            needle = self._needles[best]
+            matches.append((self._lookup[needle], block[line_start:line_end]))
+
+            # 同じ行に残っている出現位置を次の行以降へ進める
+            for i, hit in enumerate(next_hits):
+                if hit != -1 and hit < line_end:
+                    next_hits[i] = lowered.find(self._needles[i], line_end)
+        return matches
+
+    def search(self, line: str) -> Optional[str]:
+        """
+        1行内のキーワードを検索
+
+        Args:
+            line: 検査対象の行
+
+        Returns:
+            見つかったキーワード（見つからない場合はNone）
+        """
+        found = self.scan(line.encode("utf-8", errors="ignore"))
+        return found[0][0] if found else None
@@ -17,7 +17,6 @@ import fcntl
 import logging
 import os
 import pty
-import queue
 import select
 import signal
 import struct
@@ -25,7 +24,10 @@ import sys
 import termios
 import threading
 import tty
-from typing import Any, Callable, Dict, List, Optional
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .line_assembler import DEFAULT_MAX_LINE_LENGTH, KeywordMatcher, LineAssembler
 
 logger = logging.getLogger(__name__)
 
@@ -34,68 +36,199 @@ class AsyncWorker:
     """
     非同期イベントループを管理するクラス
 
-    メインスレッドから非同期タスクを投入し、
-    別スレッドで実行するワーカー
+    PTYスレッドとasyncioスレッドの間を有界のハンドオフキューで橋渡しする。
+    - 投入側（PTYスレッド）はdequeへの追加のみを行い、決してブロックしない
+    - ループへの起床通知は未処理の通知がない場合にのみ送る
+    - 非同期側はキューをバッチ単位で取り出し、1バッチを1タスクで処理する
+    - 非同期側が追いつかない場合は新しい項目を破棄し、キー毎に件数を集約して後で通知する
     """
 
-    def __init__(self):
+    OVERFLOW_DROP = "drop"
+    OVERFLOW_AGGREGATE = "aggregate"
+
+    def __init__(
+        self,
+        handler: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        max_pending: int = 1024,
+        batch_size: int = 64,
+        max_inflight: int = 256,
+        overflow_policy: str = OVERFLOW_AGGREGATE,
+    ):
+        if overflow_policy not in (self.OVERFLOW_DROP, self.OVERFLOW_AGGREGATE):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
         self.loop = asyncio.new_event_loop()
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
-        self.queue = queue.Queue()  # タスクをキューイングするためのスレッドセーフなキュー
+        self.handler = handler
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_inflight = max_inflight
+        self.overflow_policy = overflow_policy
         self.is_running = False
 
+        # ハンドオフキュー（append/popleftはGIL下でアトミック）
+        self._pending: Deque[Any] = deque()
+        self._started = threading.Event()
+        self._drain_scheduled = False
+        self._inflight = 0
+
+        # 溢れた項目の件数（書き込みはPTYスレッドのみ、読み取りはループスレッドのみ）
+        self._overflow_counts: Dict[str, int] = {}
+        self._overflow_reported: Dict[str, int] = {}
+
+        # 統計情報（submitted/droppedはPTYスレッド、それ以外はループスレッドが更新）
+        self.stats = {
+            "submitted": 0,
+            "dropped": 0,
+            "processed": 0,
+            "failed": 0,
+            "batches": 0,
+            "aggregated_reports": 0,
+        }
+
     def _run_loop(self):
         """asyncioイベントループを別スレッドで実行する"""
         asyncio.set_event_loop(self.loop)
-        self.is_running = True
+        self.loop.call_soon(self._started.set)
         try:
-            # キューからコルーチンを取得して実行し続ける
-            while True:
-                coro = self.queue.get()
-                if coro is None:  # 終了シグナル
-                    break
-                # コルーチンをタスクとしてスケジュール
-                asyncio.ensure_future(coro, loop=self.loop)
-                # キューのタスクが処理されるようにイベントループを短時間実行
-                self.loop.run_until_complete(
-                    asyncio.sleep(0)
-                )  # イベントループを一度だけ実行し、スケジュールされたタスクを処理
+            self.loop.run_forever()
         finally:
-            # イベントループが終了する前に残りのタスクをキャンセルしてクリーンアップ
+            # 停止前に投入済みの項目を処理し、残りのタスクを完了させる
+            self._drain(final=True)
             pending = asyncio.all_tasks(self.loop)
             if pending:
                 self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
             self.loop.close()
-            self.is_running = False
             logger.debug("非同期ワーカーのイベントループを終了しました")
 
     def start(self):
         """ワーカーを起動する"""
         if not self.thread.is_alive():
             self.thread.start()
-            # イベントループが完全に起動するのを少し待つ
-            while not self.is_running:
-                import time
-
-                time.sleep(0.01)
+            # イベントループが起動するまで待機
+            if not self._started.wait(timeout=5):
+                raise RuntimeError("非同期ワーカーのイベントループが起動しませんでした")
+            self.is_running = True
             logger.debug("非同期ワーカーを起動しました")
 
     def stop(self):
         """ワーカーを停止する"""
         if self.thread.is_alive():
-            # キューに終了シグナルを送信
-            self.queue.put_nowait(None)
+            self.is_running = False
+            self.loop.call_soon_threadsafe(self.loop.stop)
             self.thread.join(timeout=5)  # スレッドが終了するのを待つ
             if self.thread.is_alive():
                 logger.warning("非同期ワーカーのスレッドが正常に終了しませんでした")
 
+    def submit(self, item: Any, key: str = "default") -> bool:
+        """
+        PTYスレッドから項目を投入する（非ブロッキング）
+
+        Args:
+            item: handlerに渡す項目、またはコルーチン
+            key: 溢れた場合の集約キー
+
+        Returns:
+            キューに投入された場合True、破棄された場合False
+        """
+        if not self.is_running:
+            self._discard(item)
+            logger.warning("非同期ワーカーが実行されていません。タスクは投入されませんでした")
+            return False
+
+        if len(self._pending) >= self.max_pending:
+            self._discard(item)
+            self.stats["dropped"] += 1
+            self._overflow_counts[key] = self._overflow_counts.get(key, 0) + 1
+            return False
+
+        self._pending.append(item)
+        self.stats["submitted"] += 1
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.loop.call_soon_threadsafe(self._drain)
+        return True
+
     def run_async_task(self, coro):
         """メインスレッドから非同期タスクを投入する"""
-        if self.is_running:
-            # コルーチンをキューに入れて、イベントループスレッドで実行されるのを待つ
-            self.queue.put_nowait(coro)
-        else:
-            logger.warning("非同期ワーカーが実行されていません。タスクは投入されませんでした")
+        self.submit(coro)
+
+    def _drain(self, final: bool = False) -> None:
+        """キューからバッチを取り出してタスク化する（ループスレッド）"""
+        # フラグを先に下ろし、以降に追加された項目では再度起床通知させる
+        self._drain_scheduled = False
+
+        self._report_overflow()
+        while self._pending and (final or self._inflight < self.max_inflight):
+            limit = min(self.batch_size, len(self._pending))
+            if not final:
+                limit = min(limit, self.max_inflight - self._inflight)
+            batch = [self._pending.popleft() for _ in range(limit)]
+            self._inflight += len(batch)
+            self.stats["batches"] += 1
+            self.loop.create_task(self._process_batch(batch))
+
+            if not final:
+                # 1回の起床で処理するのは1バッチまで（他のコールバックを待たせない）
+                break
+
+        if self._pending and not final and self._inflight < self.max_inflight:
+            self._drain_scheduled = True
+            self.loop.call_soon(self._drain)
+
+    async def _process_batch(self, batch: List[Any]) -> None:
+        """バッチ内の項目を並行処理する"""
+        try:
+            results = await asyncio.gather(
+                *(self._invoke(item) for item in batch), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    self.stats["failed"] += 1
+                    logger.error(f"非同期タスクの実行エラー: {result}")
+                else:
+                    self.stats["processed"] += 1
+        finally:
+            self._inflight -= len(batch)
+            if self._pending and not self._drain_scheduled and not self.loop.is_closed():
+                self._drain_scheduled = True
+                self.loop.call_soon(self._drain)
+
+    async def _invoke(self, item: Any) -> Any:
+        """項目を実行する（コルーチンはそのまま、それ以外はhandlerに渡す）"""
+        if asyncio.iscoroutine(item):
+            return await item
+        if self.handler is None:
+            raise RuntimeError("handlerが設定されていません")
+        return await self.handler(item)
+
+    def _report_overflow(self) -> None:
+        """溢れた件数をキー毎に集約して通知する（ループスレッド）"""
+        if not self._overflow_counts:
+            return
+
+        for key, total in list(self._overflow_counts.items()):
+            count = total - self._overflow_reported.get(key, 0)
+            if count <= 0:
+                continue
+            self._overflow_reported[key] = total
+            logger.warning(f"非同期処理が追いつかず '{key}' の項目を {count} 件破棄しました")
+            if self.overflow_policy == self.OVERFLOW_AGGREGATE and self.handler is not None:
+                self._pending.append(f"[集約] '{key}' の検出 {count} 件を省略しました")
+                self.stats["aggregated_reports"] += 1
+
+    @staticmethod
+    def _discard(item: Any) -> None:
+        """破棄する項目の後始末（未実行コルーチンの警告を防ぐ）"""
+        if asyncio.iscoroutine(item):
+            item.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        stats = self.stats.copy()
+        stats["pending"] = len(self._pending)
+        stats["inflight"] = self._inflight
+        return stats
 
 
 class TerminalUtils:
@@ -135,13 +268,15 @@ class SyncTerminalPTY:
         session_id: str,
         keywords_to_monitor: Optional[List[str]] = None,
         async_log_callback: Optional[Callable[[str], Any]] = None,
+        max_line_length: int = DEFAULT_MAX_LINE_LENGTH,
     ):
         self.session_id = session_id
         self.keywords_to_monitor = keywords_to_monitor or ["error", "warning", "fail"]
         self.async_log_callback = async_log_callback
+        self.keyword_matcher = KeywordMatcher(self.keywords_to_monitor)
 
-        # 非同期ワーカー
-        self.async_worker = AsyncWorker()
+        # 非同期ワーカー（検出メッセージをasync_log_callbackへバッチで橋渡し）
+        self.async_worker = AsyncWorker(handler=async_log_callback)
 
         # PTY関連
         self.master_fd: Optional[int] = None
@@ -151,8 +286,8 @@ class SyncTerminalPTY:
         # ターミナル設定
         self.old_terminal_attrs: Optional[Any] = None
 
-        # 出力バッファ
-        self.output_buffer: List[str] = []
+        # 出力バッファ（未完了行のみを保持）
+        self.line_assembler = LineAssembler(max_line_length)
 
         # 統計情報
         self.stats = {
@@ -160,6 +295,7 @@ class SyncTerminalPTY:
             "bytes_written": 0,
             "keywords_detected": 0,
             "lines_processed": 0,
+            "lines_truncated": 0,
         }
 
     def start_shell(self, shell_command: Optional[str] = None) -> None:
@@ -305,42 +441,25 @@ class SyncTerminalPTY:
     def _process_output(self, output_data: bytes) -> None:
         """出力データを処理し、キーワード監視を行う"""
         try:
-            # 出力データをテキストに変換
-            output_text = output_data.decode("utf-8", errors="ignore")
-            self.output_buffer.append(output_text)
-
-            # バッファされた行を結合して監視
-            full_output_line = "".join(self.output_buffer)
-            if "\n" in full_output_line:
-                lines = full_output_line.splitlines(keepends=True)
-                for i, line in enumerate(lines):
-                    if not line.endswith("\n") and i == len(lines) - 1:
-                        # 最後の行が不完全なら残しておく
-                        self.output_buffer = [line]
-                        break
-                    # 完全な行を処理
-                    self._check_keywords_in_line(line)
-                    self.stats["lines_processed"] += 1
-                else:
-                    # 全ての行が処理された
-                    self.output_buffer = []  # バッファをクリア
+            # 新規バイトのみを走査して完成した行のブロックを取り出す
+            for block in self.line_assembler.feed(output_data):
+                for keyword, raw_line in self.keyword_matcher.scan(block):
+                    self._on_keyword_detected(keyword, raw_line.decode("utf-8", errors="ignore"))
+
+            self.stats["lines_processed"] = self.line_assembler.lines_completed
+            self.stats["lines_truncated"] = self.line_assembler.truncated_lines
 
         except Exception as e:
             logger.error(f"出力処理エラー: {e}")
 
-    def _check_keywords_in_line(self, line: str) -> None:
-        """行内のキーワードをチェック"""
-        for keyword in self.keywords_to_monitor:
-            if keyword in line.lower():
-                logger.info(f"キーワード '{keyword}' を検出: {line.strip()}")
-                self.stats["keywords_detected"] += 1
-
-                # 非同期ログタスクを投入
-                if self.async_log_callback:
-                    self.async_worker.run_async_task(
-                        self.async_log_callback(f"検出: '{keyword}' - {line.strip()}")
-                    )
-                break
+    def _on_keyword_detected(self, keyword: str, line: str) -> None:
+        """キーワード検出時の処理"""
+        logger.info(f"キーワード '{keyword}' を検出: {line.strip()}")
+        self.stats["keywords_detected"] += 1
+
+        # 非同期ログ処理を投入（PTYスレッドはブロックしない）
+        if self.async_log_callback:
+            self.async_worker.submit(f"検出: '{keyword}' - {line.strip()}", key=keyword)
 
     def cleanup(self) -> None:
         """リソースのクリーンアップ"""
@@ -380,7 +499,9 @@ class SyncTerminalPTY:
 
     def get_stats(self) -> Dict[str, Any]:
         """統計情報を取得"""
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats["async_worker"] = self.async_worker.get_stats()
+        return stats
 
     def is_running(self) -> bool:
         """シェルが実行中かどうかを確認"""
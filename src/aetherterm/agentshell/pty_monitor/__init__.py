@@ -2,15 +2,37 @@
 PTY Monitor Package
 
 PTYログ監視とAI解析による自動ブロック機能を提供するパッケージ
+
+公開クラスは最初に参照されたときにサブモジュールから読み込みます。
+RuleEngine などの一部だけを使う場合に、他のモジュールの依存関係を読み込まないためです。
 """
 
+import importlib
+from typing import Any
+
 __version__ = "1.0.0"
 __author__ = "AetherTerm Team"
 
-from .ai_analyzer import AIAnalyzer
-from .input_blocker import InputBlocker
-from .main import main
-from .pty_controller import PTYController
-from .command_interceptor import CommandInterceptor
+# 公開名 -> 定義しているサブモジュール
+_EXPORTS = {
+    "AIAnalyzer": ".ai_analyzer",
+    "BatchAnalysisClient": ".analysis_client",
+    "InputBlocker": ".input_blocker",
+    "PTYController": ".pty_controller",
+    "CommandInterceptor": ".command_interceptor",
+    "RuleEngine": ".rule_engine",
+    "RulePack": ".rule_engine",
+    "main": ".main",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = ["AIAnalyzer", "InputBlocker", "PTYController", "CommandInterceptor", "main"]
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # サブモジュール main の読み込みで属性が上書きされるため、読み込み後に設定する
+    globals()[name] = value
+    return value
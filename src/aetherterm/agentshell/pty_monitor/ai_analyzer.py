@@ -2,18 +2,16 @@
 AI Analyzer
 
 ログデータを解析して危険度を判定するAI解析機能
-簡易キーワードベースの危険度判定とWebSocket通信によるAIサーバー連携
+簡易キーワードベースの危険度判定とWebSocket通信（バッチ・パイプライン化）によるAIサーバー連携
 """
 
-import asyncio
-import json
 import logging
-import re
 from dataclasses import dataclass
 from enum import Enum
-from typing import List
+from typing import Any, Dict, List, Optional
 
-import websockets
+from .analysis_client import BatchAnalysisClient
+from .rule_engine import RuleEngine
 
 logger = logging.getLogger(__name__)
 
@@ -42,81 +40,63 @@ class AnalysisResult:
 class AIAnalyzer:
     """AI解析クラス"""
 
-    def __init__(self, ai_server_url: str = "ws://localhost:8765"):
+    def __init__(
+        self,
+        ai_server_url: str = "ws://localhost:8765",
+        rule_engine: Optional[RuleEngine] = None,
+        batch_size: int = 256,
+        linger: float = 0.005,
+        max_in_flight: int = 8,
+    ):
         """
         初期化
 
         Args:
             ai_server_url: AIサーバーのWebSocket URL
+            rule_engine: 危険コマンド検出ルールエンジン（Noneの場合はデフォルトのルールパック）
+            batch_size: AIサーバーへ1リクエストで送る最大行数
+            linger: バッチが満たない場合に送信を待つ最大時間（秒）
+            max_in_flight: 応答待ちにできる最大リクエスト数
         """
         self.ai_server_url = ai_server_url
-        self.websocket = None
-        self.connected = False
-
-        # 危険キーワードパターン（簡易AI解析）
-        self.critical_patterns = {
-            # システム破壊系
-            r"rm\s+-rf\s+/": "システム全体削除の危険性",
-            r"dd\s+if=/dev/zero": "ディスク破壊の危険性",
-            r"mkfs\.\w+": "ファイルシステム破壊の危険性",
-            r"fdisk.*delete": "パーティション削除の危険性",
-            # セキュリティ系
-            r"chmod\s+777\s+/": "ルートディレクトリの権限変更",
-            r"chown\s+.*:\s*/": "ルートディレクトリの所有者変更",
-            r"sudo\s+su\s+-": "root権限昇格",
-            r"passwd\s+root": "root パスワード変更",
-            # ネットワーク系
-            r"nc\s+.*-e\s+/bin/sh": "リバースシェル接続",
-            r"wget.*\|\s*sh": "不明スクリプトの実行",
-            r"curl.*\|\s*bash": "不明スクリプトの実行",
-            # データ漏洩系
-            r"scp\s+.*@.*:": "外部へのファイル転送",
-            r"rsync.*@.*:": "外部へのデータ同期",
-            r"tar.*\|\s*ssh": "データのリモート転送",
+        self.client: Optional[BatchAnalysisClient] = None
+        self._client_options = {
+            "batch_size": batch_size,
+            "linger": linger,
+            "max_in_flight": max_in_flight,
         }
 
-        self.high_patterns = {
-            r"sudo\s+.*": "管理者権限での実行",
-            r"systemctl\s+(stop|disable)": "システムサービス停止",
-            r"iptables\s+-F": "ファイアウォール設定削除",
-            r"crontab\s+-r": "cron設定削除",
-            r"history\s+-c": "コマンド履歴削除",
-        }
+        # 危険キーワードパターン（簡易AI解析）
+        self.rule_engine = rule_engine or RuleEngine()
 
-        self.medium_patterns = {
-            r"ps\s+aux\s*\|\s*grep": "プロセス監視",
-            r"netstat\s+-.*": "ネットワーク状態確認",
-            r"lsof\s+-i": "ネットワーク接続確認",
-            r"find\s+/.*-name": "ファイル検索",
-        }
+    @property
+    def connected(self) -> bool:
+        """AIサーバーに接続中か"""
+        return self.client is not None and self.client.connected
 
     async def connect_to_ai_server(self) -> bool:
         """
-        AIサーバーに接続
+        AIサーバーに接続（切断後は自動で再接続する）
 
         Returns:
             接続成功の場合True
         """
-        try:
-            self.websocket = await websockets.connect(self.ai_server_url)
-            self.connected = True
-            logger.info(f"Connected to AI server: {self.ai_server_url}")
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to connect to AI server: {e}")
-            self.connected = False
-            return False
+        if self.client is None:
+            self.client = BatchAnalysisClient(self.ai_server_url, **self._client_options)
+        connected = await self.client.start()
+        if not connected:
+            logger.warning("AI server unavailable, using keyword analysis until it connects")
+        return connected
 
     async def disconnect_from_ai_server(self):
         """AIサーバーから切断"""
-        if self.websocket:
+        if self.client:
             try:
-                await self.websocket.close()
+                await self.client.close()
             except Exception as e:
                 logger.error(f"Error disconnecting from AI server: {e}")
             finally:
-                self.websocket = None
-                self.connected = False
+                self.client = None
 
     async def analyze_log_line(self, log_line: str) -> AnalysisResult:
         """
@@ -132,7 +112,7 @@ class AIAnalyzer:
         local_result = self._analyze_with_keywords(log_line)
 
         # AIサーバーが利用可能な場合はAI解析も実行
-        if self.connected and self.websocket:
+        if self.connected:
             try:
                 ai_result = await self._analyze_with_ai_server(log_line)
                 # AI解析結果と簡易解析結果を統合
@@ -142,6 +122,33 @@ class AIAnalyzer:
 
         return local_result
 
+    async def analyze_log_lines(self, log_lines: List[str]) -> List[AnalysisResult]:
+        """
+        複数のログ行をまとめて解析
+
+        AIサーバーへは全行を同時に投入するため、バッチ化とパイプライン化が効く。
+
+        Args:
+            log_lines: 解析するログ行
+
+        Returns:
+            行毎の解析結果（入力と同じ順序）
+        """
+        local_results = [self._analyze_with_keywords(line) for line in log_lines]
+        if not self.connected:
+            return local_results
+
+        try:
+            remote_results = await self.client.analyze_many(log_lines)
+        except Exception as e:
+            logger.error(f"AI server analysis failed: {e!r}")
+            return local_results
+
+        return [
+            self._merge_results(local_result, self._result_from_server(remote))
+            for local_result, remote in zip(local_results, remote_results)
+        ]
+
     def _analyze_with_keywords(self, log_line: str) -> AnalysisResult:
         """
         キーワードベースの簡易解析
@@ -152,58 +159,29 @@ class AIAnalyzer:
         Returns:
             解析結果
         """
-        detected_keywords = []
-        threat_level = ThreatLevel.SAFE
-        message = "安全なログです"
-
-        # CRITICAL レベルチェック
-        for pattern, description in self.critical_patterns.items():
-            if re.search(pattern, log_line, re.IGNORECASE):
-                detected_keywords.append(f"{pattern}: {description}")
-                threat_level = ThreatLevel.CRITICAL
-                message = f"CRITICAL: {description}"
-                break
-
-        # HIGH レベルチェック（CRITICALが検出されていない場合）
-        if threat_level == ThreatLevel.SAFE:
-            for pattern, description in self.high_patterns.items():
-                if re.search(pattern, log_line, re.IGNORECASE):
-                    detected_keywords.append(f"{pattern}: {description}")
-                    threat_level = ThreatLevel.HIGH
-                    message = f"HIGH: {description}"
-                    break
-
-        # MEDIUM レベルチェック（上位レベルが検出されていない場合）
-        if threat_level == ThreatLevel.SAFE:
-            for pattern, description in self.medium_patterns.items():
-                if re.search(pattern, log_line, re.IGNORECASE):
-                    detected_keywords.append(f"{pattern}: {description}")
-                    threat_level = ThreatLevel.MEDIUM
-                    message = f"MEDIUM: {description}"
-                    break
-
-        # 信頼度計算
-        confidence = (
-            0.9
-            if threat_level == ThreatLevel.CRITICAL
-            else 0.8
-            if threat_level == ThreatLevel.HIGH
-            else 0.6
-            if threat_level == ThreatLevel.MEDIUM
-            else 0.1
-        )
-
-        # ブロック判定（CRITICAL または HIGH の場合）
-        should_block = threat_level in [ThreatLevel.CRITICAL, ThreatLevel.HIGH]
-
+        rule = self.rule_engine.match(log_line)
+        if rule is None:
+            return AnalysisResult(
+                threat_level=ThreatLevel.SAFE,
+                confidence=0.1,
+                detected_keywords=[],
+                message="安全なログです",
+                should_block=False,
+            )
+
+        policy = self.rule_engine.get_level_policy(rule.level)
         return AnalysisResult(
-            threat_level=threat_level,
-            confidence=confidence,
-            detected_keywords=detected_keywords,
-            message=message,
-            should_block=should_block,
+            threat_level=ThreatLevel(rule.level),
+            confidence=policy.confidence,
+            detected_keywords=[f"{rule.pattern}: {rule.description}"],
+            message=f"{rule.level.upper()}: {rule.description}",
+            should_block=policy.block,
         )
 
+    def get_rule_stats(self) -> Dict[str, Any]:
+        """ルール毎のヒット数と照合レイテンシを取得"""
+        return self.rule_engine.get_stats()
+
     async def _analyze_with_ai_server(self, log_line: str) -> AnalysisResult:
         """
         AIサーバーによる解析
@@ -214,26 +192,14 @@ class AIAnalyzer:
         Returns:
             解析結果
         """
-        if not self.websocket:
+        if not self.client:
             raise Exception("Not connected to AI server")
 
-        # AIサーバーにリクエスト送信
-        request = {
-            "action": "analyze",
-            "data": {"log_line": log_line, "timestamp": asyncio.get_event_loop().time()},
-        }
-
-        await self.websocket.send(json.dumps(request))
-
-        # レスポンス受信
-        response_text = await self.websocket.recv()
-        response = json.loads(response_text)
-
-        if response.get("status") != "success":
-            raise Exception(f"AI server error: {response.get('error', 'Unknown error')}")
-
-        data = response.get("data", {})
+        return self._result_from_server(await self.client.analyze(log_line))
 
+    @staticmethod
+    def _result_from_server(data: Dict[str, Any]) -> AnalysisResult:
+        """AIサーバーの行毎の解析結果を変換"""
         return AnalysisResult(
             threat_level=ThreatLevel(data.get("threat_level", "safe")),
             confidence=data.get("confidence", 0.5),
@@ -242,6 +208,10 @@ class AIAnalyzer:
             should_block=data.get("should_block", False),
         )
 
+    def get_remote_stats(self) -> Dict[str, Any]:
+        """AIサーバーとの通信統計を取得"""
+        return self.client.get_stats() if self.client else {}
+
     def _merge_results(
         self, local_result: AnalysisResult, ai_result: AnalysisResult
     ) -> AnalysisResult:
@@ -0,0 +1,401 @@
+"""
+Analysis Client
+
+AIサーバーへのバッチ解析プロトコル（パイプライン化）クライアント
+
+プロトコル:
+    request:  {"action": "analyze_batch", "id": <int>,
+               "data": {"lines": [...], "timestamp": <float>}}
+    response: {"status": "success", "id": <int>, "data": {"results": [<行毎の解析結果>, ...]}}
+
+- 行はバッチサイズに達するか linger 時間が経過した時点で1リクエストにまとめて送信する
+- 応答を待たずに最大 max_in_flight 件のリクエストを並行して送信できる
+- 切断時は自動で再接続し、未応答（未ACK）のバッチを id 順に再送する
+- batch_timeout 内に応答のないバッチ（サーバーが捨てた、id のない応答を返したなど）は
+  失敗させて in-flight の枠を空ける
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+
+class _Waiter:
+    """1回の解析要求（1行以上）の結果を集める"""
+
+    __slots__ = ("future", "results", "remaining")
+
+    def __init__(self, future: asyncio.Future, size: int):
+        self.future = future
+        self.results: List[Any] = [None] * size
+        self.remaining = size
+
+    def set_result(self, index: int, result: Any) -> None:
+        if self.future.done():
+            return
+        self.results[index] = result
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.future.set_result(self.results)
+
+    def set_exception(self, error: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+@dataclass
+class _Batch:
+    """送信単位のバッチ"""
+
+    id: int
+    lines: List[str] = field(default_factory=list)
+    slots: List[Tuple[_Waiter, int]] = field(default_factory=list)
+    sent_at: float = 0.0
+    attempts: int = 0
+    deadline: Optional[asyncio.TimerHandle] = None
+
+    def abandoned(self) -> bool:
+        """全ての呼び出し元が結果を待つのをやめたか"""
+        return all(waiter.future.done() for waiter, _ in self.slots)
+
+    def encode(self) -> str:
+        return json.dumps(
+            {
+                "action": "analyze_batch",
+                "id": self.id,
+                "data": {"lines": self.lines, "timestamp": time.time()},
+            }
+        )
+
+
+class BatchAnalysisClient:
+    """バッチ解析クライアント"""
+
+    def __init__(
+        self,
+        server_url: str,
+        batch_size: int = 256,
+        linger: float = 0.005,
+        max_in_flight: int = 8,
+        request_timeout: float = 10.0,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 10.0,
+        batch_timeout: Optional[float] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            server_url: AIサーバーのWebSocket URL
+            batch_size: 1リクエストに含める最大行数
+            linger: バッチが満たない場合に送信を待つ最大時間（秒）
+            max_in_flight: 応答待ちにできる最大リクエスト数
+            request_timeout: 1回の解析要求の結果待ちタイムアウト（秒）
+            reconnect_delay: 再接続の初期待機時間（秒）
+            max_reconnect_delay: 再接続の最大待機時間（秒）
+            batch_timeout: in-flight のバッチの応答を待つ最大時間（秒、省略時は request_timeout）
+        """
+        self.server_url = server_url
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_in_flight = max_in_flight
+        self.request_timeout = request_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.batch_timeout = batch_timeout if batch_timeout is not None else request_timeout
+
+        self.websocket = None
+        self.connected = False
+        self._running = False
+        self._next_id = 1
+        self._current: Optional[_Batch] = None
+        self._linger_handle: Optional[asyncio.TimerHandle] = None
+        self._send_queue: "asyncio.Queue[_Batch]" = asyncio.Queue()
+        self._in_flight: Dict[int, _Batch] = {}
+        self._state = asyncio.Condition()
+        self._first_attempt: Optional[asyncio.Future] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.stats = {
+            "lines_sent": 0,
+            "batches_sent": 0,
+            "batches_acked": 0,
+            "batches_replayed": 0,
+            "batches_expired": 0,
+            "reconnects": 0,
+            "errors": 0,
+            "rtt_total": 0.0,
+        }
+
+    async def start(self, connect_timeout: float = 5.0) -> bool:
+        """
+        接続を開始（以降は切断時に自動再接続）
+
+        Args:
+            connect_timeout: 初回接続を待つ最大時間（秒）
+
+        Returns:
+            初回接続に成功した場合True
+        """
+        if self._running:
+            return self.connected
+
+        self._running = True
+        self._first_attempt = asyncio.get_running_loop().create_future()
+        self._tasks = [
+            asyncio.create_task(self._connection_loop()),
+            asyncio.create_task(self._send_loop()),
+        ]
+        try:
+            await asyncio.wait_for(asyncio.shield(self._first_attempt), connect_timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.connected
+
+    async def close(self) -> None:
+        """送信を停止して切断し、未完了の結果をキャンセルする"""
+        self._running = False
+        if self._linger_handle:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self.websocket:
+            try:
+                await self.websocket.close()
+            except Exception as e:
+                logger.error(f"Error disconnecting from AI server: {e}")
+        self.websocket = None
+        self.connected = False
+
+        pending = list(self._in_flight.values())
+        if self._current:
+            pending.append(self._current)
+        while not self._send_queue.empty():
+            pending.append(self._send_queue.get_nowait())
+        for batch in pending:
+            if batch.deadline:
+                batch.deadline.cancel()
+            for waiter, _ in batch.slots:
+                waiter.future.cancel()
+        self._in_flight.clear()
+        self._current = None
+
+    async def analyze(self, log_line: str) -> Dict[str, Any]:
+        """
+        1行を解析キューに追加し、結果を待つ
+
+        Args:
+            log_line: 解析するログ行
+
+        Returns:
+            サーバーが返した行の解析結果
+        """
+        results = await self.analyze_many([log_line])
+        return results[0]
+
+    async def analyze_many(self, log_lines: List[str]) -> List[Dict[str, Any]]:
+        """
+        複数行を解析キューに追加し、全行の結果を待つ
+
+        行は他の呼び出し元の行と同じバッチに詰められ、複数のバッチに跨ることもある。
+
+        Args:
+            log_lines: 解析するログ行
+
+        Returns:
+            行毎の解析結果（入力と同じ順序）
+
+        Raises:
+            asyncio.TimeoutError: request_timeout 内に全行の結果が揃わない場合
+        """
+        if not log_lines:
+            return []
+        future = self.submit(log_lines)
+        return await asyncio.wait_for(future, self.request_timeout)
+
+    def submit(self, log_lines: List[str]) -> asyncio.Future:
+        """行を現在のバッチへ追加し、全行の結果リストを返すFutureを返す"""
+        if not self._running:
+            raise RuntimeError("Analysis client is not running")
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), len(log_lines))
+        for index, line in enumerate(log_lines):
+            if self._current is None:
+                self._current = _Batch(id=self._next_id)
+                self._next_id += 1
+                self._linger_handle = loop.call_later(self.linger, self._flush)
+
+            self._current.lines.append(line)
+            self._current.slots.append((waiter, index))
+            if len(self._current.lines) >= self.batch_size:
+                self._flush()
+        return waiter.future
+
+    def _flush(self) -> None:
+        """現在のバッチを送信キューへ移す"""
+        if self._linger_handle:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+        batch, self._current = self._current, None
+        if batch and batch.lines:
+            self._send_queue.put_nowait(batch)
+
+    async def _send_loop(self) -> None:
+        """送信キューのバッチを in-flight 上限内で送信"""
+        while self._running:
+            batch = await self._send_queue.get()
+            async with self._state:
+                await self._state.wait_for(
+                    lambda: self.connected and len(self._in_flight) < self.max_in_flight
+                )
+                self._in_flight[batch.id] = batch
+                batch.deadline = asyncio.get_running_loop().call_later(
+                    self.batch_timeout, self._expire, batch.id
+                )
+            await self._send(batch)
+
+    async def _send(self, batch: _Batch) -> None:
+        """バッチを送信（失敗時は in-flight に残し、再接続時に再送する）"""
+        websocket = self.websocket
+        if websocket is None:
+            return
+        batch.sent_at = time.monotonic()
+        batch.attempts += 1
+        try:
+            await websocket.send(batch.encode())
+        except websockets.exceptions.ConnectionClosed:
+            return
+        self.stats["batches_sent"] += 1
+        self.stats["lines_sent"] += len(batch.lines)
+
+    async def _connection_loop(self) -> None:
+        """接続・受信・再接続を管理"""
+        delay = self.reconnect_delay
+        while self._running:
+            try:
+                self.websocket = await websockets.connect(self.server_url)
+            except Exception as e:
+                logger.warning(f"Failed to connect to AI server: {e}")
+                self._resolve_first_attempt()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            delay = self.reconnect_delay
+            logger.info(f"Connected to AI server: {self.server_url}")
+            await self._replay_unacked()
+            async with self._state:
+                self.connected = True
+                self._state.notify_all()
+            self._resolve_first_attempt()
+
+            try:
+                async for message in self.websocket:
+                    self._handle_response(message)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            except Exception as e:
+                logger.error(f"AI server receive error: {e}")
+            finally:
+                self.connected = False
+
+            if self._running:
+                self.stats["reconnects"] += 1
+                logger.warning(
+                    f"AI server connection lost, {len(self._in_flight)} batch(es) awaiting replay"
+                )
+                await asyncio.sleep(delay)
+
+    async def _replay_unacked(self) -> None:
+        """未ACKのバッチを id 順に再送"""
+        for batch_id in sorted(self._in_flight):
+            batch = self._in_flight.get(batch_id)
+            if batch is None:
+                continue
+            # タイムアウト等で全ての呼び出し元が待つのをやめたバッチは捨てる
+            if batch.abandoned():
+                del self._in_flight[batch_id]
+                continue
+            self.stats["batches_replayed"] += 1
+            await self._send(batch)
+
+    def _resolve_first_attempt(self) -> None:
+        if self._first_attempt and not self._first_attempt.done():
+            self._first_attempt.set_result(None)
+
+    def _handle_response(self, message: str) -> None:
+        """応答をバッチの各行のFutureへ振り分ける"""
+        try:
+            response = json.loads(message)
+        except json.JSONDecodeError as e:
+            self.stats["errors"] += 1
+            logger.error(f"Invalid response from AI server: {e}")
+            return
+
+        batch = self._in_flight.pop(response.get("id"), None)
+        if batch is None:
+            # 再送により重複した応答、期限切れのバッチへの応答、またはバッチ以外の応答
+            return
+        batch.deadline.cancel()
+
+        self.stats["batches_acked"] += 1
+        self.stats["rtt_total"] += time.monotonic() - batch.sent_at
+        asyncio.create_task(self._notify_capacity())
+
+        if response.get("status") != "success":
+            self.stats["errors"] += 1
+            error = Exception(f"AI server error: {response.get('error', 'Unknown error')}")
+            for waiter, _ in batch.slots:
+                waiter.set_exception(error)
+            return
+
+        results = response.get("data", {}).get("results", [])
+        if len(results) != len(batch.slots):
+            error = Exception("AI server returned a wrong number of results")
+            for waiter, _ in batch.slots:
+                waiter.set_exception(error)
+            return
+
+        for (waiter, index), result in zip(batch.slots, results):
+            waiter.set_result(index, result)
+
+    def _expire(self, batch_id: int) -> None:
+        """期限内に応答のなかったバッチを失敗させ、in-flight の枠を空ける"""
+        batch = self._in_flight.pop(batch_id, None)
+        if batch is None:
+            return
+        self.stats["batches_expired"] += 1
+        logger.warning(f"AI server did not answer batch {batch_id} within {self.batch_timeout}s")
+        error = asyncio.TimeoutError(f"AI server did not answer batch {batch_id}")
+        for waiter, _ in batch.slots:
+            waiter.set_exception(error)
+        asyncio.create_task(self._notify_capacity())
+
+    async def _notify_capacity(self) -> None:
+        async with self._state:
+            self._state.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """送信統計を取得"""
+        stats = dict(self.stats)
+        acked = stats.pop("rtt_total")
+        stats["avg_rtt_ms"] = (
+            acked / self.stats["batches_acked"] * 1000 if self.stats["batches_acked"] else 0.0
+        )
+        stats["in_flight"] = len(self._in_flight)
+        stats["queued_batches"] = self._send_queue.qsize()
+        stats["connected"] = self.connected
+        return stats
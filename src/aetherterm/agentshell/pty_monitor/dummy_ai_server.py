@@ -2,18 +2,19 @@
 Dummy AI Server
 
 テスト用のダミーAIサーバー
-WebSocketでログ解析リクエストを受信し、簡易的な解析結果を返す
+WebSocketでログ解析リクエスト（単一行 / バッチ）を受信し、簡易的な解析結果を返す
 """
 
 import argparse
 import asyncio
 import json
 import logging
-import re
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import websockets
 
+from aetherterm.agentshell.pty_monitor.rule_engine import RuleEngine
+
 # ログ設定
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -24,44 +25,29 @@ logger = logging.getLogger(__name__)
 class DummyAIServer:
     """ダミーAIサーバークラス"""
 
-    def __init__(self):
-        """初期化"""
+    def __init__(self, rule_engine: Optional[RuleEngine] = None):
+        """
+        初期化
+
+        Args:
+            rule_engine: 解析用ルールエンジン（AIAnalyzerと同じルールパックを使用）
+        """
         self.connected_clients = set()
 
-        # ダミーAI解析用のパターン
-        self.analysis_patterns = {
-            # 非常に危険
-            "critical": {
-                r"rm\s+-rf\s+/": "システム全体削除の危険性が検出されました",
-                r"dd\s+if=/dev/zero": "ディスク破壊コマンドが検出されました",
-                r"mkfs\.\w+": "ファイルシステム破壊コマンドが検出されました",
-                r"chmod\s+777\s+/": "ルートディレクトリの権限変更が検出されました",
-                r"nc\s+.*-e\s+/bin/sh": "リバースシェル接続の試行が検出されました",
-            },
-            # 危険
-            "high": {
-                r"sudo\s+su\s+-": "root権限昇格の試行が検出されました",
-                r"passwd\s+root": "rootパスワード変更の試行が検出されました",
-                r"systemctl\s+(stop|disable)": "重要なシステムサービスの停止が検出されました",
-                r"iptables\s+-F": "ファイアウォール設定の削除が検出されました",
-                r"wget.*\|\s*sh": "不明なスクリプトの実行が検出されました",
-            },
-            # 中程度
-            "medium": {
-                r"sudo\s+.*": "管理者権限でのコマンド実行が検出されました",
-                r"ps\s+aux\s*\|\s*grep": "プロセス監視活動が検出されました",
-                r"netstat\s+-.*": "ネットワーク状態の調査が検出されました",
-                r"find\s+/.*-name": "システム全体でのファイル検索が検出されました",
-            },
-        }
+        # ダミーAI解析用のルールエンジン
+        self.rule_engine = rule_engine or RuleEngine()
+
+        # 統計情報
+        self.lines_analyzed = 0
+        self.batches_analyzed = 0
 
-    async def handle_client(self, websocket, path):
+    async def handle_client(self, websocket, path: Optional[str] = None):
         """
         クライアント接続処理
 
         Args:
             websocket: WebSocket接続
-            path: 接続パス
+            path: 接続パス（旧websockets APIのみ）
         """
         client_address = websocket.remote_address
         logger.info(f"New client connected: {client_address}")
@@ -86,25 +72,50 @@ class DummyAIServer:
             websocket: WebSocket接続
             message: 受信メッセージ
         """
+        request_id = None
         try:
             request = json.loads(message)
             action = request.get("action")
+            request_id = request.get("id")
 
-            if action == "analyze":
+            if action == "analyze_batch":
+                response = await self.analyze_batch(request.get("data", {}))
+            elif action == "analyze":
                 response = await self.analyze_log(request.get("data", {}))
             elif action == "ping":
                 response = {"status": "success", "data": {"message": "pong"}}
+            elif action == "stats":
+                response = {"status": "success", "data": self.get_stats()}
             else:
                 response = {"status": "error", "error": f"Unknown action: {action}"}
 
-            await websocket.send(json.dumps(response))
-
         except json.JSONDecodeError as e:
-            error_response = {"status": "error", "error": f"Invalid JSON: {e}"}
-            await websocket.send(json.dumps(error_response))
+            response = {"status": "error", "error": f"Invalid JSON: {e}"}
         except Exception as e:
-            error_response = {"status": "error", "error": f"Processing error: {e}"}
-            await websocket.send(json.dumps(error_response))
+            response = {"status": "error", "error": f"Processing error: {e}"}
+
+        # バッチプロトコルでは応答に要求IDを付けて返す
+        if request_id is not None:
+            response["id"] = request_id
+        await websocket.send(json.dumps(response))
+
+    async def analyze_batch(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        バッチ解析処理
+
+        Args:
+            data: 解析データ（lines: ログ行のリスト）
+
+        Returns:
+            行毎の解析結果
+        """
+        lines = data.get("lines", [])
+        timestamp = data.get("timestamp", 0)
+
+        results = [self._analyze_line(line, timestamp) for line in lines]
+        self.batches_analyzed += 1
+        logger.debug(f"Analyzed batch of {len(lines)} lines")
+        return {"status": "success", "data": {"results": results}}
 
     async def analyze_log(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -121,61 +132,58 @@ class DummyAIServer:
 
         logger.info(f"Analyzing log line: {log_line}")
 
-        # パターンマッチング解析
+        result = {"status": "success", "data": self._analyze_line(log_line, timestamp)}
+
+        logger.info(
+            f"Analysis result: {result['data']['threat_level']} "
+            f"(confidence: {result['data']['confidence']})"
+        )
+        return result
+
+    def _analyze_line(self, log_line: str, timestamp: float) -> Dict[str, Any]:
+        """
+        1行のパターンマッチング解析
+
+        Args:
+            log_line: 解析するログ行
+            timestamp: 要求のタイムスタンプ
+
+        Returns:
+            行の解析結果
+        """
         threat_level = "safe"
         confidence = 0.1
         detected_keywords = []
         message = "安全なログです"
         should_block = False
 
-        # Critical レベルチェック
-        for pattern, description in self.analysis_patterns["critical"].items():
-            if re.search(pattern, log_line, re.IGNORECASE):
-                threat_level = "critical"
-                confidence = 0.95
-                detected_keywords.append(f"CRITICAL: {description}")
-                message = f"CRITICAL THREAT: {description}"
-                should_block = True
-                break
-
-        # High レベルチェック（Criticalが検出されていない場合）
-        if threat_level == "safe":
-            for pattern, description in self.analysis_patterns["high"].items():
-                if re.search(pattern, log_line, re.IGNORECASE):
-                    threat_level = "high"
-                    confidence = 0.85
-                    detected_keywords.append(f"HIGH: {description}")
-                    message = f"HIGH THREAT: {description}"
-                    should_block = True
-                    break
-
-        # Medium レベルチェック（上位レベルが検出されていない場合）
-        if threat_level == "safe":
-            for pattern, description in self.analysis_patterns["medium"].items():
-                if re.search(pattern, log_line, re.IGNORECASE):
-                    threat_level = "medium"
-                    confidence = 0.70
-                    detected_keywords.append(f"MEDIUM: {description}")
-                    message = f"MEDIUM THREAT: {description}"
-                    should_block = False  # Mediumレベルではブロックしない
-                    break
-
-        # 解析結果を返す
-        result = {
-            "status": "success",
-            "data": {
-                "threat_level": threat_level,
-                "confidence": confidence,
-                "detected_keywords": detected_keywords,
-                "message": message,
-                "should_block": should_block,
-                "analysis_timestamp": timestamp,
-                "server_info": "Dummy AI Server v1.0",
-            },
+        rule = self.rule_engine.match(log_line)
+        if rule is not None:
+            policy = self.rule_engine.get_level_policy(rule.level)
+            threat_level = rule.level
+            confidence = policy.confidence
+            detected_keywords.append(f"{rule.level.upper()}: {rule.description}")
+            message = f"{rule.level.upper()} THREAT: {rule.description}"
+            should_block = policy.block
+
+        self.lines_analyzed += 1
+        return {
+            "threat_level": threat_level,
+            "confidence": confidence,
+            "detected_keywords": detected_keywords,
+            "message": message,
+            "should_block": should_block,
+            "analysis_timestamp": timestamp,
+            "server_info": "Dummy AI Server v1.0",
         }
 
-        logger.info(f"Analysis result: {threat_level} (confidence: {confidence})")
-        return result
+    def get_stats(self) -> Dict[str, Any]:
+        """解析件数とルール統計を取得"""
+        stats = self.rule_engine.get_stats()
+        stats["lines_analyzed"] = self.lines_analyzed
+        stats["batches_analyzed"] = self.batches_analyzed
+        stats["connected_clients"] = len(self.connected_clients)
+        return stats
 
     async def start_server(self, host: str = "localhost", port: int = 8765):
         """
@@ -204,6 +212,9 @@ async def main():
     parser = argparse.ArgumentParser(description="Dummy AI Server for PTY Monitor")
     parser.add_argument("--host", default="localhost", help="Server host (default: localhost)")
     parser.add_argument("--port", type=int, default=8765, help="Server port (default: 8765)")
+    parser.add_argument(
+        "--rules", default=None, help="Rule pack TOML path (default: bundled rules.toml)"
+    )
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
 
     args = parser.parse_args()
@@ -211,7 +222,7 @@ async def main():
     if args.debug:
         logging.getLogger().setLevel(logging.DEBUG)
 
-    server = DummyAIServer()
+    server = DummyAIServer(RuleEngine(args.rules))
 
     try:
         await server.start_server(args.host, args.port)
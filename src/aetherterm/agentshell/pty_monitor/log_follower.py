@@ -0,0 +1,418 @@
+"""
+Log Follower
+
+tail -f 相当のログ追跡をプロセス内で行う
+- 1スレッドで複数ファイルを追跡
+- inotify（Linux）で変更を待機し、利用できない場合はポーリングにフォールバック
+- ローテーション（inode変更）とトランケートに追従
+- 大きな再利用バッファへの readinto で読み取り、行のバッチをコールバックへ渡す
+- 1回の確認で1ファイルから読む量に上限を設け、書き込みの多いファイルが他を待たせない
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..pty.line_assembler import LineAssembler
+
+logger = logging.getLogger(__name__)
+
+# inotify 定数（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """ctypes経由の最小限のinotifyラッパー"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watches: Dict[str, int] = {}
+
+    def watch_directory(self, path: str) -> None:
+        """ディレクトリを監視対象に追加（ローテーションによる再作成も検知できる）"""
+        if path in self._watches:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        self._watches[path] = wd
+
+    def drain(self) -> int:
+        """溜まったイベントを読み捨て、イベント数を返す"""
+        count = 0
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _wd, _mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size + name_len
+                count += 1
+        return count
+
+    def close(self) -> None:
+        """inotifyを閉じる"""
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+@dataclass
+class FollowedFile:
+    """追跡中のファイル状態"""
+
+    path: str
+    max_line_length: int
+    file: Optional[object] = None
+    inode: Optional[int] = None
+    offset: int = 0
+    bytes_read: int = 0
+    lines_read: int = 0
+    rotations: int = 0
+    truncations: int = 0
+    backlog_bytes: int = 0
+    lag_seconds: float = 0.0
+    assembler: LineAssembler = field(init=False)
+
+    def __post_init__(self):
+        self.assembler = LineAssembler(self.max_line_length)
+
+
+class LogFollower:
+    """
+    複数ログファイルの追跡
+
+    1つのスレッドで全ファイルを扱い、完成した行をファイル毎のバッチで
+    コールバックに渡す。
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        callback: Callable[[str, List[str]], None],
+        buffer_size: int = 1024 * 1024,
+        poll_interval: float = 1.0,
+        max_batch_lines: int = 1024,
+        max_line_length: int = 64 * 1024,
+        use_inotify: bool = True,
+        max_read_per_pass: int = 4 * 1024 * 1024,
+    ):
+        """
+        初期化
+
+        Args:
+            paths: 追跡するファイルのパス
+            callback: (パス, 行のリスト) を受け取るコールバック（追跡スレッドから呼ばれる）
+            buffer_size: readinto に使う読み取りバッファのサイズ
+            poll_interval: ポーリング間隔（inotify使用時は取りこぼし対策の再確認間隔）
+            max_batch_lines: 1回のコールバックに渡す最大行数
+            max_line_length: 1行の最大バイト数（超過分は分割）
+            use_inotify: inotifyを使用するか
+            max_read_per_pass: 1回の確認で1ファイルから読む最大バイト数
+                （残りは待機せずに次の確認で読む）
+        """
+        self.files = [FollowedFile(os.path.abspath(p), max_line_length) for p in paths]
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.max_batch_lines = max_batch_lines
+        self.use_inotify = use_inotify
+        self.max_read_per_pass = max_read_per_pass
+
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._inotify: Optional[_Inotify] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._mode = "polling"
+
+        # スループット計測
+        self._started_at = 0.0
+        self._rate_window_start = 0.0
+        self._rate_window_bytes = 0
+        self._bytes_per_sec = 0.0
+
+    @property
+    def mode(self) -> str:
+        """待機方式（inotify / polling）"""
+        return self._mode
+
+    def start(self) -> None:
+        """追跡を開始"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                for followed in self.files:
+                    self._inotify.watch_directory(os.path.dirname(followed.path))
+            except OSError as e:
+                logger.warning(f"inotify unavailable, falling back to polling: {e}")
+                if self._inotify:
+                    self._inotify.close()
+                self._inotify = None
+        self._mode = "inotify" if self._inotify else "polling"
+
+        # 既存内容は読み飛ばし、以降の追記のみを対象にする（tail -f と同じ）
+        for followed in self.files:
+            self._open(followed, from_start=False)
+
+        self._stop_event.clear()
+        self._started_at = self._rate_window_start = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="log-follower", daemon=True)
+        self._thread.start()
+        logger.info(f"Following {len(self.files)} file(s) using {self.mode}")
+
+    def stop(self) -> None:
+        """追跡を停止"""
+        self._stop_event.set()
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+        for followed in self.files:
+            self._close(followed)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def close(self) -> None:
+        """停止してウェイクアップ用のパイプを閉じる"""
+        self.stop()
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        """追跡ループ（別スレッドで実行）"""
+        while not self._stop_event.is_set():
+            try:
+                more = False
+                for followed in self.files:
+                    more = self._check(followed) or more
+                self._update_rate()
+                if not more:
+                    # 上限まで読んだファイルがあれば待たずに続きを読む
+                    self._wait()
+            except Exception as e:
+                logger.error(f"Unexpected error in log follower: {e}")
+                self._stop_event.wait(self.poll_interval)
+
+    def _wait(self) -> None:
+        """次の変更まで待機"""
+        watched = [self._wake_r]
+        if self._inotify:
+            watched.append(self._inotify.fd)
+        ready, _, _ = select.select(watched, [], [], self.poll_interval)
+        if self._inotify and self._inotify.fd in ready:
+            self._inotify.drain()
+        if self._wake_r in ready:
+            os.read(self._wake_r, 64)
+
+    def _open(self, followed: FollowedFile, from_start: bool) -> bool:
+        """ファイルを開く"""
+        try:
+            file = open(followed.path, "rb", buffering=0)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.error(f"Failed to open {followed.path}: {e}")
+            return False
+
+        st = os.fstat(file.fileno())
+        followed.file = file
+        followed.inode = st.st_ino
+        followed.offset = 0 if from_start else st.st_size
+        file.seek(followed.offset)
+        return True
+
+    def _close(self, followed: FollowedFile) -> None:
+        """ファイルを閉じる"""
+        if followed.file is not None:
+            try:
+                followed.file.close()
+            except OSError:
+                pass
+        followed.file = None
+        followed.inode = None
+
+    def _check(self, followed: FollowedFile) -> bool:
+        """
+        ファイルの状態を確認して新しいデータを読み取る
+
+        Returns:
+            bool: 読み取りの上限に達し、未読のデータが残っている場合True
+        """
+        if followed.file is None:
+            # 起動時に存在しなかった、またはローテーション後に再作成待ち
+            if not self._open(followed, from_start=True):
+                return False
+
+        try:
+            path_inode = os.stat(followed.path).st_ino
+        except FileNotFoundError:
+            path_inode = None
+
+        if path_inode != followed.inode:
+            # ローテーション: 旧ファイルの残りを（上限なしで）読み切ってから新ファイルへ移る
+            self._read_available(followed, limit=None)
+            self._flush_partial(followed)
+            self._close(followed)
+            followed.rotations += 1
+            logger.info(f"Log rotated: {followed.path}")
+            if path_inode is not None and self._open(followed, from_start=True):
+                return self._read_available(followed, self.max_read_per_pass)
+            return False
+
+        size = os.fstat(followed.file.fileno()).st_size
+        if size < followed.offset:
+            # トランケート: 先頭から読み直す
+            followed.truncations += 1
+            followed.offset = 0
+            followed.file.seek(0)
+            followed.assembler = LineAssembler(followed.assembler.max_line_length)
+            logger.info(f"Log truncated: {followed.path}")
+
+        return self._read_available(followed, self.max_read_per_pass)
+
+    def _read_available(self, followed: FollowedFile, limit: Optional[int]) -> bool:
+        """
+        EOFまで（最大 limit バイト）読み取り、完成した行をバッチで配信する
+
+        Returns:
+            bool: limit に達して読み取りを打ち切った場合True
+        """
+        if followed.file is None:
+            return False
+
+        batch: List[str] = []
+        got_data = False
+        total = 0
+        while limit is None or total < limit:
+            view = self._view if limit is None else self._view[: limit - total]
+            read = followed.file.readinto(view)
+            if not read:
+                break
+            got_data = True
+            total += read
+            followed.offset += read
+            followed.bytes_read += read
+            self._rate_window_bytes += read
+            for block in followed.assembler.feed(bytes(self._view[:read])):
+                batch.extend(self._decode_lines(block))
+            if len(batch) >= self.max_batch_lines:
+                self._deliver(followed, batch)
+                batch = []
+
+        if batch:
+            self._deliver(followed, batch)
+
+        st = os.fstat(followed.file.fileno())
+        followed.backlog_bytes = max(0, st.st_size - followed.offset)
+        # 直前の書き込みから読み終えるまでの遅れ
+        if got_data:
+            followed.lag_seconds = max(0.0, time.time() - st.st_mtime)
+        return limit is not None and total >= limit
+
+    def _flush_partial(self, followed: FollowedFile) -> None:
+        """改行で終わらない最後の行を配信する（ローテーション時）"""
+        rest = followed.assembler.flush()
+        if rest:
+            lines = self._decode_lines(rest)
+            if lines:
+                self._deliver(followed, lines)
+
+    @staticmethod
+    def _decode_lines(block: bytes) -> List[str]:
+        """ブロックを空行を除いた行のリストに変換"""
+        lines = []
+        for line in block.decode("utf-8", errors="ignore").splitlines():
+            line = line.strip()
+            if line:
+                lines.append(line)
+        return lines
+
+    def _deliver(self, followed: FollowedFile, lines: List[str]) -> None:
+        """行のバッチをコールバックへ渡す"""
+        followed.lines_read += len(lines)
+        for start in range(0, len(lines), self.max_batch_lines):
+            try:
+                self.callback(followed.path, lines[start : start + self.max_batch_lines])
+            except Exception as e:
+                logger.error(f"Log follower callback error: {e}")
+
+    def _update_rate(self) -> None:
+        """直近1秒以上の区間でスループットを更新"""
+        now = time.monotonic()
+        elapsed = now - self._rate_window_start
+        if elapsed >= 1.0:
+            self._bytes_per_sec = self._rate_window_bytes / elapsed
+            self._rate_window_start = now
+            self._rate_window_bytes = 0
+
+    def get_stats(self) -> Dict[str, object]:
+        """追跡統計（スループットと遅延）を取得"""
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        total_bytes = sum(f.bytes_read for f in self.files)
+        return {
+            "mode": self.mode,
+            "files": {
+                f.path: {
+                    "bytes_read": f.bytes_read,
+                    "lines_read": f.lines_read,
+                    "rotations": f.rotations,
+                    "truncations": f.truncations,
+                    "backlog_bytes": f.backlog_bytes,
+                    "lag_seconds": f.lag_seconds,
+                }
+                for f in self.files
+            },
+            "bytes_read": total_bytes,
+            "bytes_per_sec": self._bytes_per_sec,
+            "avg_bytes_per_sec": total_bytes / uptime if uptime > 0 else 0.0,
+            "max_lag_seconds": max((f.lag_seconds for f in self.files), default=0.0),
+            "backlog_bytes": sum(f.backlog_bytes for f in self.files),
+        }
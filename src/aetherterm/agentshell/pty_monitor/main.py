@@ -11,6 +11,7 @@ import signal
 import sys
 import time
 from pathlib import Path
+from typing import List, Optional, Sequence, Union
 
 from .ai_analyzer import AIAnalyzer, AnalysisResult
 from .input_blocker import InputBlocker
@@ -26,16 +27,21 @@ logger = logging.getLogger(__name__)
 class PTYMonitor:
     """PTY監視メインクラス"""
 
-    def __init__(self, log_file_path: str, ai_server_url: str = "ws://localhost:8765"):
+    def __init__(
+        self,
+        log_file_path: Union[str, Sequence[str]],
+        ai_server_url: str = "ws://localhost:8765",
+    ):
         """
         初期化
 
         Args:
-            log_file_path: 監視するログファイルのパス
+            log_file_path: 監視するログファイルのパス（複数指定可）
             ai_server_url: AIサーバーのWebSocket URL
         """
         self.log_file_path = log_file_path
         self.ai_server_url = ai_server_url
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
         # コンポーネント初期化
         self.pty_controller = PTYController(log_file_path)
@@ -65,6 +71,9 @@ class PTYMonitor:
             signal.signal(signal.SIGINT, self._signal_handler)
             signal.signal(signal.SIGTERM, self._signal_handler)
 
+            # 追跡スレッドからの配信先ループ
+            self._loop = asyncio.get_running_loop()
+
             # AIサーバーに接続
             await self.ai_analyzer.connect_to_ai_server()
 
@@ -116,15 +125,38 @@ class PTYMonitor:
         self._display_stats()
         logger.info("PTY Monitor stopped")
 
-    def _on_log_data(self, log_line: str):
+    def _on_log_data(self, log_lines: List[str]):
+        """
+        ログデータ受信時のコールバック（ログ追跡スレッドから呼ばれる）
+
+        Args:
+            log_lines: 受信したログ行のバッチ
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        # 非同期解析をイベントループ側でスケジュール
+        self._loop.call_soon_threadsafe(self._schedule_batch, log_lines)
+
+    def _schedule_batch(self, log_lines: List[str]):
+        """バッチ解析タスクを作成（イベントループスレッド）"""
+        if self.running:
+            asyncio.create_task(self._analyze_log_batch(log_lines))
+
+    async def _analyze_log_batch(self, log_lines: List[str]):
         """
-        ログデータ受信時のコールバック
+        ログ行のバッチを解析（AIサーバーへはまとめて投入し、結果は行順に処理）
 
         Args:
-            log_line: 受信したログ行
+            log_lines: 解析するログ行のバッチ
         """
-        # 非同期解析をスケジュール
-        asyncio.create_task(self._analyze_log_line(log_line))
+        try:
+            results = await self.ai_analyzer.analyze_log_lines(log_lines)
+        except Exception as e:
+            logger.error(f"Error analyzing log batch: {e}")
+            return
+
+        for log_line, result in zip(log_lines, results):
+            self._handle_result(log_line, result)
 
     async def _analyze_log_line(self, log_line: str):
         """
@@ -134,28 +166,37 @@ class PTYMonitor:
             log_line: 解析するログ行
         """
         try:
-            self.stats["total_lines"] += 1
-
             # AI解析実行
             result = await self.ai_analyzer.analyze_log_line(log_line)
+            self._handle_result(log_line, result)
 
-            # 統計更新
-            self._update_stats(result)
+        except Exception as e:
+            logger.error(f"Error analyzing log line: {e}")
 
-            # ログ出力
-            logger.info(f"Log analyzed: {result.threat_level.value} - {log_line[:50]}...")
+    def _handle_result(self, log_line: str, result: AnalysisResult):
+        """
+        解析結果の反映（統計・ログ出力・ブロック判定）
 
-            if result.detected_keywords:
-                logger.warning(f"Detected keywords: {result.detected_keywords}")
+        Args:
+            log_line: 解析したログ行
+            result: 解析結果
+        """
+        self.stats["total_lines"] += 1
 
-            # ブロック判定
-            if result.should_block and not self.input_blocker.is_blocked():
-                self.stats["blocked_count"] += 1
-                self.input_blocker.block_input(result.message)
-                logger.critical(f"INPUT BLOCKED: {result.message}")
+        # 統計更新
+        self._update_stats(result)
 
-        except Exception as e:
-            logger.error(f"Error analyzing log line: {e}")
+        # ログ出力
+        logger.info(f"Log analyzed: {result.threat_level.value} - {log_line[:50]}...")
+
+        if result.detected_keywords:
+            logger.warning(f"Detected keywords: {result.detected_keywords}")
+
+        # ブロック判定
+        if result.should_block and not self.input_blocker.is_blocked():
+            self.stats["blocked_count"] += 1
+            self.input_blocker.block_input(result.message)
+            logger.critical(f"INPUT BLOCKED: {result.message}")
 
     def _update_stats(self, result: AnalysisResult):
         """
@@ -213,6 +254,9 @@ class PTYMonitor:
         medium_pct = (self.stats["medium_lines"] / total) * 100
         high_pct = (self.stats["high_lines"] / total) * 100
         critical_pct = (self.stats["critical_lines"] / total) * 100
+        follow_stats = self.pty_controller.get_stats()
+        rule_stats = self.ai_analyzer.get_rule_stats()
+        top_rules = sorted(rule_stats["rule_hits"].items(), key=lambda item: -item[1])[:5]
 
         stats_msg = f"""
 PTY Monitor Statistics:
@@ -222,7 +266,10 @@ PTY Monitor Statistics:
   High threat: {self.stats["high_lines"]} ({high_pct:.1f}%)
   Critical threat: {self.stats["critical_lines"]} ({critical_pct:.1f}%)
   Times blocked: {self.stats["blocked_count"]}
+  Log follow: {follow_stats.get("bytes_per_sec", 0.0) / 1024:.1f} KiB/s, lag {follow_stats.get("max_lag_seconds", 0.0):.2f}s, backlog {follow_stats.get("backlog_bytes", 0)} bytes ({follow_stats.get("mode", "-")})
   Currently blocked: {"Yes" if self.input_blocker.is_blocked() else "No"}
+  Rule match latency: avg {rule_stats["latency_avg_us"]:.1f}us / p99 {rule_stats["latency_p99_us"]:.1f}us
+  Top rule hits: {", ".join(f"{rule_id}={count}" for rule_id, count in top_rules) or "-"}
 """
         logger.info(stats_msg)
 
@@ -232,7 +279,12 @@ async def main():
     parser = argparse.ArgumentParser(
         description="PTY Log Monitor with AI Analysis and Auto-blocking"
     )
-    parser.add_argument("--log-file", required=True, help="Path to the log file to monitor")
+    parser.add_argument(
+        "--log-file",
+        required=True,
+        action="append",
+        help="Path to the log file to monitor (repeat to follow multiple files)",
+    )
     parser.add_argument(
         "--ai-server-url",
         default="ws://localhost:8765",
@@ -250,15 +302,16 @@ async def main():
 
     # テストログファイル作成
     if args.create_test_log:
-        await create_test_log_file(args.log_file)
+        for log_file in args.log_file:
+            await create_test_log_file(log_file)
         return
 
     # ログファイル存在確認
-    log_path = Path(args.log_file)
-    if not log_path.exists():
-        logger.error(f"Log file does not exist: {args.log_file}")
-        logger.info("Use --create-test-log to create a test log file")
-        sys.exit(1)
+    for log_file in args.log_file:
+        if not Path(log_file).exists():
+            logger.error(f"Log file does not exist: {log_file}")
+            logger.info("Use --create-test-log to create a test log file")
+            sys.exit(1)
 
     # PTY Monitor開始
     monitor = PTYMonitor(args.log_file, args.ai_server_url)
@@ -1,45 +1,53 @@
 """
 PTY Controller
 
-PTY master/slaveを使用してログファイルを監視し、
-リアルタイムでログデータを読み取る機能を提供
+ログファイルをプロセス内で追跡し（tail -f 相当）、
+リアルタイムでログデータを行のバッチとして読み取る機能を提供
 """
 
 import logging
-import os
-import pty
-import select
-import subprocess
-import threading
-from typing import Callable, Optional
+import sys
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from .log_follower import LogFollower
 
 logger = logging.getLogger(__name__)
 
 
 class PTYController:
-    """PTY制御クラス"""
-
-    def __init__(self, log_file_path: str):
+    """ログ追跡制御クラス"""
+
+    def __init__(
+        self,
+        log_file_path: Union[str, Sequence[str]],
+        use_inotify: bool = True,
+        poll_interval: float = 1.0,
+    ):
         """
         初期化
 
         Args:
-            log_file_path: 監視するログファイルのパス
+            log_file_path: 監視するログファイルのパス（複数指定可）
+            use_inotify: inotifyを使用するか（Falseの場合はポーリング）
+            poll_interval: ポーリング間隔（秒）
         """
-        self.log_file_path = log_file_path
-        self.master_fd = None
-        self.slave_fd = None
-        self.process = None
+        if isinstance(log_file_path, str):
+            self.log_file_paths = [log_file_path]
+        else:
+            self.log_file_paths = list(log_file_path)
+        self.log_file_path = self.log_file_paths[0]
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
         self.running = False
-        self.data_callback: Optional[Callable[[str], None]] = None
-        self._monitor_thread = None
+        self.data_callback: Optional[Callable[[List[str]], None]] = None
+        self._follower: Optional[LogFollower] = None
 
-    def set_data_callback(self, callback: Callable[[str], None]):
+    def set_data_callback(self, callback: Callable[[List[str]], None]):
         """
         データ受信時のコールバック関数を設定
 
         Args:
-            callback: ログデータを受信した時に呼び出される関数
+            callback: ログ行のバッチを受信した時に呼び出される関数（追跡スレッドから呼ばれる）
         """
         self.data_callback = callback
 
@@ -50,25 +58,16 @@ class PTYController:
             return
 
         try:
-            # PTY master/slave作成
-            self.master_fd, self.slave_fd = pty.openpty()
-
-            # tail -f コマンドでログファイルを監視
-            self.process = subprocess.Popen(
-                ["tail", "-f", self.log_file_path],
-                stdout=self.slave_fd,
-                stderr=self.slave_fd,
-                stdin=subprocess.PIPE,
+            self._follower = LogFollower(
+                self.log_file_paths,
+                self._on_lines,
+                poll_interval=self.poll_interval,
+                use_inotify=self.use_inotify,
             )
-
+            self._follower.start()
             self.running = True
 
-            # 監視スレッド開始
-            self._monitor_thread = threading.Thread(target=self._monitor_loop)
-            self._monitor_thread.daemon = True
-            self._monitor_thread.start()
-
-            logger.info(f"Started PTY monitoring for {self.log_file_path}")
+            logger.info(f"Started PTY monitoring for {', '.join(self.log_file_paths)}")
 
         except Exception as e:
             logger.error(f"Failed to start PTY monitoring: {e}")
@@ -79,68 +78,26 @@ class PTYController:
         """ログ監視を停止"""
         self.running = False
 
-        if self.process:
-            try:
-                self.process.terminate()
-                self.process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.process.kill()
-            except Exception as e:
-                logger.error(f"Error terminating process: {e}")
-            finally:
-                self.process = None
-
-        if self.master_fd:
+        if self._follower:
             try:
-                os.close(self.master_fd)
+                self._follower.close()
             except Exception as e:
-                logger.error(f"Error closing master fd: {e}")
+                logger.error(f"Error stopping log follower: {e}")
             finally:
-                self.master_fd = None
-
-        if self.slave_fd:
-            try:
-                os.close(self.slave_fd)
-            except Exception as e:
-                logger.error(f"Error closing slave fd: {e}")
-            finally:
-                self.slave_fd = None
-
-        if self._monitor_thread and self._monitor_thread.is_alive():
-            self._monitor_thread.join(timeout=2)
+                self._follower = None
 
         logger.info("Stopped PTY monitoring")
 
-    def _monitor_loop(self):
-        """監視ループ（別スレッドで実行）"""
-        buffer = ""
+    def _on_lines(self, path: str, lines: List[str]):
+        """追跡スレッドから行のバッチを受け取る"""
+        if self.data_callback:
+            self.data_callback(lines)
 
-        while self.running and self.master_fd:
-            try:
-                # selectでデータ待機（タイムアウト付き）
-                ready, _, _ = select.select([self.master_fd], [], [], 1.0)
-
-                if ready:
-                    # データ読み取り
-                    data = os.read(self.master_fd, 1024)
-                    if data:
-                        # バイトデータを文字列に変換
-                        text = data.decode("utf-8", errors="ignore")
-                        buffer += text
-
-                        # 行単位で処理
-                        while "\n" in buffer:
-                            line, buffer = buffer.split("\n", 1)
-                            if line.strip() and self.data_callback:
-                                self.data_callback(line.strip())
-
-            except OSError as e:
-                if self.running:
-                    logger.error(f"PTY monitoring error: {e}")
-                break
-            except Exception as e:
-                logger.error(f"Unexpected error in monitor loop: {e}")
-                break
+    def get_stats(self) -> Dict[str, object]:
+        """追跡統計（bytes/s・遅延）を取得"""
+        if not self._follower:
+            return {}
+        return self._follower.get_stats()
 
     def write_to_terminal(self, text: str):
         """
@@ -149,11 +106,11 @@ class PTYController:
         Args:
             text: 出力する文字列
         """
-        if self.master_fd:
-            try:
-                os.write(self.master_fd, text.encode("utf-8"))
-            except Exception as e:
-                logger.error(f"Failed to write to terminal: {e}")
+        try:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        except Exception as e:
+            logger.error(f"Failed to write to terminal: {e}")
 
     def is_running(self) -> bool:
         """監視が実行中かどうかを返す"""
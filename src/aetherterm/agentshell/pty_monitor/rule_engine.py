@@ -0,0 +1,365 @@
+"""
+Rule Engine
+
+危険コマンド検出ルールパックの読み込みと照合
+AIAnalyzer と DummyAIServer が同じルールパックを共有する
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+
+# 同梱のデフォルトルールパック
+DEFAULT_RULE_PACK_PATH = Path(__file__).parent / "rules.toml"
+
+# 判定の優先順（高い順）
+LEVEL_ORDER = ["critical", "high", "medium", "low"]
+
+
+class RulePackError(Exception):
+    """ルールパックの読み込み・検証エラー"""
+
+
+@dataclass
+class Rule:
+    """検出ルール"""
+
+    id: str
+    level: str
+    pattern: str
+    description: str
+    category: str = ""
+
+
+@dataclass
+class LevelPolicy:
+    """脅威レベル毎の判定ポリシー"""
+
+    confidence: float
+    block: bool
+
+
+@dataclass
+class RulePack:
+    """ルールパック"""
+
+    version: int
+    rules: List[Rule]
+    levels: Dict[str, LevelPolicy] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RulePack":
+        """辞書からルールパックを作成"""
+        try:
+            levels = {
+                name: LevelPolicy(
+                    confidence=float(policy.get("confidence", 0.5)),
+                    block=bool(policy.get("block", False)),
+                )
+                for name, policy in data.get("levels", {}).items()
+            }
+            rules = [
+                Rule(
+                    id=str(rule["id"]),
+                    level=str(rule["level"]).lower(),
+                    pattern=str(rule["pattern"]),
+                    description=str(rule.get("description", "")),
+                    category=str(rule.get("category", "")),
+                )
+                for rule in data.get("rules", [])
+            ]
+        except (KeyError, TypeError, ValueError) as e:
+            raise RulePackError(f"Invalid rule pack: {e}") from e
+
+        seen = set()
+        for rule in rules:
+            if rule.level not in LEVEL_ORDER:
+                raise RulePackError(f"Unknown level '{rule.level}' in rule '{rule.id}'")
+            if rule.id in seen:
+                raise RulePackError(f"Duplicate rule id: {rule.id}")
+            seen.add(rule.id)
+
+        return cls(version=int(data.get("version", 1)), rules=rules, levels=levels)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RulePack":
+        """TOMLファイルからルールパックを読み込み"""
+        try:
+            with open(path, "rb") as f:
+                data = tomllib.load(f)
+        except (OSError, tomllib.TOMLDecodeError) as e:
+            raise RulePackError(f"Failed to load rule pack {path}: {e}") from e
+        return cls.from_dict(data)
+
+
+_REGEX_META = set("\\.^$*+?{}[]|()")
+_OPTIONAL_QUANTIFIERS = set("?*{")
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """グループや文字クラスの外に選択（|）があるか"""
+    depth = 0
+    in_class = False
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            index += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+            # 先頭の "]" や "^]" は文字クラスの終わりではない
+            if pattern[index + 1 : index + 2] == "^":
+                index += 1
+            if pattern[index + 1 : index + 2] == "]":
+                index += 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif char == "|" and depth == 0:
+            return True
+        index += 1
+    return False
+
+
+def _literal_prefix(pattern: str) -> Optional[str]:
+    """
+    パターン先頭の必須リテラル（小文字）を抽出
+
+    ヒットする行には必ずこの文字列が含まれる。抽出できない場合はNone。
+    トップレベルに選択（a|b）がある場合、先頭の枝のリテラルは必須ではないためNone。
+    """
+    if _has_top_level_alternation(pattern):
+        return None
+
+    end = 0
+    while end < len(pattern) and pattern[end] not in _REGEX_META:
+        end += 1
+    # 直後の量指定子で最後の文字が省略可能になる場合は除外
+    if end < len(pattern) and pattern[end] in _OPTIONAL_QUANTIFIERS:
+        end -= 1
+    literal = pattern[:end]
+    return literal.lower() if len(literal) >= 2 else None
+
+
+class CompiledRulePack:
+    """
+    コンパイル済みルールパック
+
+    レベル毎に全ルールを名前付きグループの単一の選択パターンへ結合し、
+    1行につきレベル数分の走査だけで照合する。全ルールが先頭に必須リテラルを
+    持つレベルは、小文字化した行にいずれのリテラルも含まれなければ走査を省略する。
+    """
+
+    def __init__(self, pack: RulePack):
+        self.pack = pack
+        self._levels: List[Tuple[str, re.Pattern, Dict[str, Rule], Optional[List[str]]]] = []
+
+        for level in LEVEL_ORDER:
+            rules = [rule for rule in pack.rules if rule.level == level]
+            if not rules:
+                continue
+
+            groups: Dict[str, Rule] = {}
+            alternatives = []
+            literals: Optional[List[str]] = []
+            for index, rule in enumerate(rules):
+                try:
+                    re.compile(rule.pattern)
+                except re.error as e:
+                    raise RulePackError(f"Invalid pattern in rule '{rule.id}': {e}") from e
+                group = f"r{index}"
+                groups[group] = rule
+                alternatives.append(f"(?P<{group}>{rule.pattern})")
+
+                literal = _literal_prefix(rule.pattern)
+                if literal is None:
+                    literals = None
+                elif literals is not None and literal not in literals:
+                    literals.append(literal)
+
+            try:
+                combined = re.compile("|".join(alternatives), re.IGNORECASE)
+            except re.error as e:
+                raise RulePackError(f"Failed to combine '{level}' rules: {e}") from e
+            self._levels.append((level, combined, groups, literals))
+
+    def match(self, line: str) -> Optional[Rule]:
+        """最も高いレベルでヒットしたルールを返す"""
+        lowered = line.lower()
+        for _level, pattern, groups, literals in self._levels:
+            if literals is not None and not any(literal in lowered for literal in literals):
+                continue
+            match = pattern.search(line)
+            if match is None:
+                continue
+            rule = groups.get(match.lastgroup or "")
+            if rule is None:
+                # ルール側のパターンに名前付きグループがある場合の保険
+                for name, value in match.groupdict().items():
+                    if value is not None and name in groups:
+                        return groups[name]
+            return rule
+        return None
+
+
+class RuleEngine:
+    """
+    ルールエンジン
+
+    ルールパックをコンパイルして照合し、ファイル更新時に自動で再読み込みする。
+    ルール毎のヒット数と1行あたりの照合レイテンシを記録する。
+    """
+
+    def __init__(
+        self,
+        rule_pack_path: Optional[Union[str, Path]] = None,
+        reload_interval: float = 2.0,
+        latency_window: int = 1024,
+    ):
+        """
+        初期化
+
+        Args:
+            rule_pack_path: ルールパックのパス（Noneの場合は同梱のデフォルト）
+            reload_interval: ファイル更新チェックの最小間隔（秒）
+            latency_window: レイテンシ分位点計算に使う直近サンプル数
+        """
+        self.rule_pack_path = Path(rule_pack_path or DEFAULT_RULE_PACK_PATH)
+        self.reload_interval = reload_interval
+
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+        self._mtime_ns = 0
+        self._compiled = self._load()
+
+        # 統計情報
+        self.rule_hits: Dict[str, int] = {}
+        self.lines_matched = 0
+        self.reload_count = 0
+        self._latency_total_ns = 0
+        self._latency_max_ns = 0
+        self._recent_latency_ns: Deque[int] = deque(maxlen=latency_window)
+
+    @property
+    def pack(self) -> RulePack:
+        """現在のルールパック"""
+        return self._compiled.pack
+
+    def _load(self) -> CompiledRulePack:
+        """ルールパックを読み込んでコンパイル"""
+        mtime_ns = os.stat(self.rule_pack_path).st_mtime_ns
+        compiled = CompiledRulePack(RulePack.load(self.rule_pack_path))
+        self._mtime_ns = mtime_ns
+        logger.info(
+            f"Loaded rule pack {self.rule_pack_path} "
+            f"(version {compiled.pack.version}, {len(compiled.pack.rules)} rules)"
+        )
+        return compiled
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        """
+        ルールパックが更新されていれば再読み込み
+
+        読み込みに失敗した場合は現在のルールを維持する。
+
+        Returns:
+            再読み込みした場合True
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._last_check = now
+            try:
+                mtime_ns = os.stat(self.rule_pack_path).st_mtime_ns
+            except OSError as e:
+                logger.warning(f"Rule pack not accessible, keeping current rules: {e}")
+                return False
+            if not force and mtime_ns == self._mtime_ns:
+                return False
+
+            try:
+                self._compiled = self._load()
+            except (OSError, RulePackError) as e:
+                # 同じ壊れたファイルを繰り返し読まないよう mtime は記録する
+                self._mtime_ns = mtime_ns
+                logger.error(f"Rule pack reload failed, keeping current rules: {e}")
+                return False
+
+            self.reload_count += 1
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def match(self, line: str) -> Optional[Rule]:
+        """
+        ログ行を照合
+
+        Args:
+            line: 照合するログ行
+
+        Returns:
+            ヒットしたルール（最も高いレベルのもの）。なければNone
+        """
+        self.maybe_reload()
+
+        start = time.perf_counter_ns()
+        rule = self._compiled.match(line)
+        elapsed = time.perf_counter_ns() - start
+
+        self.lines_matched += 1
+        self._latency_total_ns += elapsed
+        if elapsed > self._latency_max_ns:
+            self._latency_max_ns = elapsed
+        self._recent_latency_ns.append(elapsed)
+
+        if rule is not None:
+            self.rule_hits[rule.id] = self.rule_hits.get(rule.id, 0) + 1
+        return rule
+
+    def get_level_policy(self, level: str) -> LevelPolicy:
+        """レベルの判定ポリシーを取得"""
+        return self.pack.levels.get(level, LevelPolicy(confidence=0.5, block=False))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ルール毎のヒット数とレイテンシ統計を取得"""
+        recent = sorted(self._recent_latency_ns)
+        lines = self.lines_matched
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(len(recent) * p))] / 1000
+
+        return {
+            "rule_pack": str(self.rule_pack_path),
+            "rule_pack_version": self.pack.version,
+            "rule_count": len(self.pack.rules),
+            "reload_count": self.reload_count,
+            "lines_matched": lines,
+            "rule_hits": dict(self.rule_hits),
+            "latency_avg_us": (self._latency_total_ns / lines / 1000) if lines else 0.0,
+            "latency_p50_us": percentile(0.5),
+            "latency_p99_us": percentile(0.99),
+            "latency_max_us": self._latency_max_ns / 1000,
+        }
@@ -7,17 +7,48 @@
 
 import asyncio
 import logging
+import re
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from uuid import UUID, uuid4
 
 from ...common.agent_protocol import AgentMessage, MessageBuilder, MessageType
 from ..agents.base import AgentCapability, AgentTask, TaskStatus
+from .dag_executor import DAGExecutor, DAGNode, DAGRunResult, TaskDAG
+from .resource_locks import LockMode, ResourceKey, ResourceLockManager
 
 logger = logging.getLogger(__name__)
 
+# ファイル編集の競合として扱う拡張子
+_SOURCE_EXTENSIONS = ('.py', '.js', '.ts', '.java')
+
+# 明示的にファイルとして扱うリソースの接頭辞（ディレクトリは `file:src/` のように指定）
+FILE_RESOURCE_PREFIX = "file:"
+
+# `api:users` のような種別付きリソース（行範囲の `path:10-20` とは区別する）
+_TYPED_RESOURCE = re.compile(r"^[A-Za-z][\w.+-]*:(?!\d)")
+
+
+def _file_resource(resource: str) -> Optional[str]:
+    """
+    ファイル（ディレクトリ・行範囲を含む）を指すリソースならパスを返す
+    
+    `file:` 接頭辞付きのリソースは常にファイル、それ以外の種別付きリソース（`api:users` 等）は
+    ファイルではない。接頭辞のないリソースは行範囲付きか、ソースファイルの拡張子を持つ場合のみ
+    ファイルとして扱う（`api/users` のようなパスに似たリソースはファイルではない）。
+    """
+    resource = resource.strip()
+    if resource.startswith(FILE_RESOURCE_PREFIX):
+        return resource[len(FILE_RESOURCE_PREFIX):] or None
+    if _TYPED_RESOURCE.match(resource):
+        return None
+    key = ResourceKey.parse(resource)
+    if key.line_range is not None or (bool(key.path) and key.path[-1].endswith(_SOURCE_EXTENSIONS)):
+        return resource
+    return None
+
 
 class ConflictType(str, Enum):
     """競合タイプ"""
@@ -78,7 +109,11 @@ class AgentCoordinator:
     def __init__(self):
         self._active_agents: Dict[str, Dict[str, Any]] = {}
         self._task_dependencies: Dict[UUID, TaskDependency] = {}
-        self._resource_locks: Dict[str, str] = {}  # resource -> agent_id
+        # 明示的に要求されたリソースの排他ロック
+        self._resource_locks = ResourceLockManager()
+        # タスク登録時に宣言された使用予定ファイル（競合検出用、取得は常に成功）
+        self._resource_claims = ResourceLockManager()
+        self._task_claims: Dict[UUID, Tuple[str, List[str], LockMode]] = {}
         self._pending_requests: List[InterAgentRequest] = []
         self._conflict_history: List[ConflictResolution] = []
         self._coordination_rules: List[Dict[str, Any]] = []
@@ -88,7 +123,8 @@ class AgentCoordinator:
         agent_id: str,
         task: AgentTask,
         resources: List[str],
-        dependencies: Optional[List[UUID]] = None
+        dependencies: Optional[List[UUID]] = None,
+        mode: LockMode = LockMode.WRITE
     ) -> None:
         """
         エージェントのタスクを登録
@@ -96,9 +132,16 @@ class AgentCoordinator:
         Args:
             agent_id: エージェントID
             task: タスク
-            resources: 使用するリソース（ファイル、API等）
+            resources: 使用するリソース（ファイル、`file:` 付きのディレクトリ、`path:開始-終了` の
+                行範囲、`api:users` のような種別付きリソース等）
             dependencies: 依存するタスクID
+            mode: リソースの使用モード（読み取りのみのタスクは LockMode.READ）
         """
+        # 同じタスクの再登録では、前回の宣言を解放してから登録し直す
+        previous = self._task_claims.get(task.id)
+        if previous is not None:
+            self.complete_agent_task(previous[0], task.id)
+        
         # エージェント情報を更新
         if agent_id not in self._active_agents:
             self._active_agents[agent_id] = {
@@ -118,10 +161,84 @@ class AgentCoordinator:
         )
         
         # 競合チェック
-        conflicts = await self._detect_conflicts(agent_id, task, resources)
+        conflicts = await self._detect_conflicts(agent_id, task, resources, mode)
+        
+        # 使用予定のファイルを記録（タスクの終了時に complete_agent_task で解放）
+        files = [path for path in map(_file_resource, resources) if path is not None]
+        for resource in files:
+            self._resource_claims.try_acquire(agent_id, resource, mode, force=True)
+        self._task_claims[task.id] = (agent_id, files, mode)
+        
         if conflicts:
             await self._resolve_conflicts(conflicts)
     
+    def complete_agent_task(self, agent_id: str, task_id: UUID) -> None:
+        """
+        エージェントのタスク終了（完了・失敗・キャンセル）を記録し、使用予定として宣言した
+        リソースを解放（既に解放済みの場合は何もしない）
+        
+        Args:
+            agent_id: エージェントID
+            task_id: 終了したタスクのID
+        """
+        agent_info = self._active_agents.get(agent_id)
+        if agent_info:
+            agent_info["tasks"].pop(task_id, None)
+        
+        claim = self._task_claims.pop(task_id, None)
+        if claim:
+            owner, files, mode = claim
+            for resource in files:
+                self._resource_claims.release(owner, resource, mode)
+    
+    async def acquire_resource(
+        self,
+        agent_id: str,
+        resource: str,
+        mode: LockMode = LockMode.WRITE,
+        timeout: Optional[float] = None
+    ) -> float:
+        """
+        リソースのロックを取得（競合中は解放まで待機）
+        
+        Args:
+            agent_id: エージェントID
+            resource: リソース（`src/` のようなディレクトリは配下全体をロック）
+            mode: ロックモード
+            timeout: 最大待ち時間（秒）
+            
+        Returns:
+            float: ロック待ちに要した時間（秒）
+            
+        Raises:
+            DeadlockError: エージェント間の待機がデッドロックを形成する場合
+            asyncio.TimeoutError: timeout 内に取得できない場合
+        """
+        return await self._resource_locks.acquire(agent_id, resource, mode, timeout)
+    
+    def release_resource(self, agent_id: str, resource: Optional[str] = None) -> int:
+        """
+        リソースのロックを解放
+        
+        Args:
+            agent_id: エージェントID
+            resource: 解放するリソース（省略時はエージェントの全ロック）
+            
+        Returns:
+            int: 解放したロック数
+        """
+        if resource is None:
+            return self._resource_locks.release_all(agent_id)
+        return 1 if self._resource_locks.release(agent_id, resource) else 0
+    
+    def get_lock_stats(self) -> Dict[str, Any]:
+        """ロック取得・待ち時間・デッドロックの統計を取得"""
+        return {
+            "locks": self._resource_locks.get_stats(),
+            "claims": self._resource_claims.get_stats(),
+            "waiting": self._resource_locks.get_waiting(),
+        }
+    
     async def request_inter_agent_collaboration(
         self,
         from_agent: str,
@@ -197,6 +314,9 @@ class AgentCoordinator:
             if best_task:
                 assignments[agent_id] = best_task
                 subtasks.remove(best_task)
+                self._task_dependencies.setdefault(
+                    best_task.id, TaskDependency(task_id=best_task.id)
+                )
         
         # 依存関係を設定
         if strategy == CoordinationStrategy.SEQUENTIAL:
@@ -206,6 +326,81 @@ class AgentCoordinator:
             
         return assignments
     
+    def build_task_graph(self, assignments: Dict[str, AgentTask]) -> TaskDAG:
+        """
+        割り当て済みタスクの依存グラフを構築
+        
+        depends_on は実行順序の辺に、blocks（共有リソースによる相互依存）は
+        同時実行しない排他制約になる。割り当てに含まれないタスクへの依存は無視する。
+        
+        Args:
+            assignments: エージェント別のタスク割り当て
+            
+        Returns:
+            TaskDAG: 依存グラフ
+        """
+        dag = TaskDAG()
+        for agent_id, task in assignments.items():
+            dag.add_task(task, agent_id=agent_id)
+        
+        for task_id in list(dag.nodes):
+            dependency = self._task_dependencies.get(task_id)
+            if not dependency:
+                continue
+            for upstream in dependency.depends_on:
+                if upstream in dag.nodes:
+                    dag.add_dependency(task_id, upstream)
+            for blocked in dependency.blocks:
+                if blocked in dag.nodes:
+                    dag.add_exclusion(task_id, blocked)
+        return dag
+    
+    async def execute_coordinated_work(
+        self,
+        assignments: Dict[str, AgentTask],
+        runner: Callable[[str, AgentTask, Dict[UUID, Any]], Awaitable[Any]],
+        max_parallel: int = 4,
+        dag: Optional[TaskDAG] = None
+    ) -> Tuple[TaskDAG, DAGRunResult]:
+        """
+        割り当て済みタスクを依存グラフに従って実行
+        
+        依存元がすべて完了したタスクから max_parallel 件まで並列に実行し、
+        依存元の結果を runner の第3引数で渡す。前回の dag を渡すと
+        失敗・スキップしたタスクだけを再実行する。
+        
+        Args:
+            assignments: エージェント別のタスク割り当て
+            runner: (エージェントID, タスク, 依存元の結果) を受け取り結果を返すコルーチン関数
+            max_parallel: 同時に実行するタスクの上限
+            dag: 再実行する前回の依存グラフ
+            
+        Returns:
+            Tuple[TaskDAG, DAGRunResult]: 依存グラフ（再実行用）と実行結果
+        """
+        async def run_node(node: DAGNode, upstream: Dict[UUID, Any]) -> Any:
+            return await runner(node.agent_id, node.task, upstream)
+        
+        executor = DAGExecutor(run_node, max_parallel=max_parallel)
+        if dag is None:
+            dag = self.build_task_graph(assignments)
+            result = await executor.run(dag)
+        else:
+            result = await executor.rerun_failed(dag)
+        
+        # 終了したタスク（失敗・スキップを含む）の宣言済みリソースを解放
+        for task_id in [*result.completed, *result.failed, *result.skipped]:
+            node = dag.nodes[task_id]
+            self.complete_agent_task(node.agent_id, task_id)
+        
+        logger.info(
+            f"協調作業を実行: 完了 {len(result.completed)}, 失敗 {len(result.failed)}, "
+            f"スキップ {len(result.skipped)} (所要 {result.wall_time_seconds:.2f}秒, "
+            f"クリティカルパス {len(result.critical_path)} タスク / "
+            f"{result.critical_path_seconds:.2f}秒)"
+        )
+        return dag, result
+    
     async def detect_and_resolve_conflicts(
         self,
         agent1: str,
@@ -261,37 +456,37 @@ class AgentCoordinator:
         self,
         agent_id: str,
         task: AgentTask,
-        resources: List[str]
+        resources: List[str],
+        mode: LockMode = LockMode.WRITE
     ) -> List[Dict[str, Any]]:
-        """競合を検出"""
+        """
+        競合を検出
+        
+        ロック・宣言済みリソースはパス階層と行範囲で照合するため、
+        アクティブなエージェント数によらずリソース毎にパスの深さ程度の計算で済む。
+        """
         conflicts = []
         
-        # リソース競合をチェック
         for resource in resources:
-            if resource in self._resource_locks:
-                owner = self._resource_locks[resource]
-                if owner != agent_id:
-                    conflicts.append({
-                        "type": ConflictType.RESOURCE_CONFLICT,
-                        "agents": [agent_id, owner],
-                        "resource": resource
-                    })
-        
-        # ファイル編集の競合をチェック
-        for other_agent, info in self._active_agents.items():
-            if other_agent == agent_id:
+            # 他エージェントがロック中のリソース（親ディレクトリ・子孫を含む）
+            for owner in sorted(self._resource_locks.conflicting_owners(agent_id, resource, mode)):
+                conflicts.append({
+                    "type": ConflictType.RESOURCE_CONFLICT,
+                    "agents": [agent_id, owner],
+                    "resource": resource
+                })
+            
+            # 他エージェントが編集予定のファイル（重なる行範囲を含む）
+            path = _file_resource(resource)
+            if path is None:
                 continue
-                
-            shared_resources = set(resources) & info["resources"]
-            if shared_resources:
-                # ファイルパスの競合を詳細にチェック
-                for resource in shared_resources:
-                    if resource.endswith(('.py', '.js', '.ts', '.java')):
-                        conflicts.append({
-                            "type": ConflictType.FILE_CONFLICT,
-                            "agents": [agent_id, other_agent],
-                            "file": resource
-                        })
+            claimants = self._resource_claims.conflicting_owners(agent_id, path, mode)
+            for other_agent in sorted(claimants):
+                conflicts.append({
+                    "type": ConflictType.FILE_CONFLICT,
+                    "agents": [agent_id, other_agent],
+                    "file": path
+                })
         
         return conflicts
     
@@ -530,7 +725,7 @@ class AgentCoordinator:
         # リソースの可用性チェック
         if "resource" in request.payload:
             resource = request.payload["resource"]
-            if resource in self._resource_locks:
+            if self._resource_locks.conflicting_owners(request.from_agent, resource):
                 return False
                 
         return True
@@ -573,8 +768,7 @@ class AgentCoordinator:
     ) -> None:
         """リソース要求を処理"""
         resource = request.payload.get("resource")
-        if resource and resource not in self._resource_locks:
-            self._resource_locks[resource] = request.from_agent
+        if resource and not self._resource_locks.try_acquire(request.from_agent, resource):
             logger.info(f"リソース {resource} を {request.from_agent} にロック")
     
     async def _handle_state_sync(
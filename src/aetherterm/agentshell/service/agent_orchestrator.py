@@ -122,38 +122,33 @@ class AgentOrchestrator:
             request=request
         )
         
-        response = await self.server_connector.send_message(message)
+        if not self.server_connector.is_enabled():
+            raise Exception("子エージェントの作成に失敗しました: サーバー接続が無効です")
         
-        if response and response.message_type == MessageType.TASK_CREATE:
-            # 子エージェントハンドルを作成
-            pane_id = response.payload.get("pane_id")
-            agent_id = response.payload.get("agent_id", f"{agent_type}_{task.id.hex[:8]}")
-            
-            handle = ChildAgentHandle(
+        # agentserver はタスク作成に応答しないため、送信のみ行う（切断中は再接続時に送信される）
+        await self.server_connector.send_message(message)
+        
+        # 子エージェントハンドルを作成（ペーンIDはサーバー側で決まるため未設定）
+        agent_id = f"{agent_type}_{task.id.hex[:8]}"
+        handle = ChildAgentHandle(agent_id=agent_id, task_id=task.id)
+        
+        self._child_agents[agent_id] = handle
+        
+        # アクティビティを記録
+        if self._activity_recorder:
+            await self._activity_recorder.record_agent_action(
+                session_id=self.server_connector.session_id,
                 agent_id=agent_id,
-                task_id=task.id,
-                pane_id=pane_id
+                action="エージェント起動",
+                description=f"{agent_type}エージェントを起動: {task.description}",
+                metadata={
+                    "task_id": str(task.id),
+                    "pane_id": handle.pane_id
+                }
             )
-            
-            self._child_agents[agent_id] = handle
-            
-            # アクティビティを記録
-            if self._activity_recorder:
-                await self._activity_recorder.record_agent_action(
-                    session_id=self.server_connector.session_id,
-                    agent_id=agent_id,
-                    action="エージェント起動",
-                    description=f"{agent_type}エージェントを起動: {task.description}",
-                    metadata={
-                        "task_id": str(task.id),
-                        "pane_id": pane_id
-                    }
-                )
-            
-            logger.info(f"子エージェント {agent_id} を作成しました（ペーン: {pane_id}）")
-            return handle
-        else:
-            raise Exception("子エージェントの作成に失敗しました")
+        
+        logger.info(f"子エージェント {agent_id} の作成を要求しました")
+        return handle
     
     async def cancel_child_agent(self, agent_id: str) -> bool:
         """
@@ -176,13 +171,14 @@ class AgentOrchestrator:
             payload={"task_id": str(handle.task_id)}
         )
         
-        response = await self.server_connector.send_message(message)
-        
-        if response and response.message_type == MessageType.TASK_CANCEL:
-            handle.status = "cancelled"
-            return True
+        if not self.server_connector.is_enabled():
+            return False
         
-        return False
+        # キャンセルにも応答はないため、送信した時点でキャンセル済みとする
+        await self.server_connector.send_message(message)
+        handle.status = "cancelled"
+        self._coordinator.complete_agent_task(agent_id, handle.task_id)
+        return True
     
     async def handle_child_progress(
         self,
@@ -448,6 +444,7 @@ class AgentOrchestrator:
         handle = self._child_agents.get(agent_id)
         if handle:
             handle.status = "completed"
+            self._coordinator.complete_agent_task(agent_id, handle.task_id)
         
         # コールバックを呼び出し
         for callback in self._completion_callbacks:
@@ -474,6 +471,7 @@ class AgentOrchestrator:
         handle = self._child_agents.get(agent_id)
         if handle:
             handle.status = "failed"
+            self._coordinator.complete_agent_task(agent_id, handle.task_id)
         
         error = payload.get("error", "Unknown error")
         
@@ -0,0 +1,395 @@
+"""
+DAG実行エンジン
+
+AgentCoordinator が記録したタスク依存関係をグラフとして実行します。
+
+- 依存関係をトポロジカル順に解決し、実行可能になったタスクを並列数上限まで同時に開始する
+- 依存元タスクの結果を依存先タスクへ渡す
+- 失敗したタスクの子孫はスキップし、後から失敗・スキップ分だけを再実行できる
+- 実行後にクリティカルパス（全体の所要時間を決めたタスクの連鎖）と待ち時間を算出する
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from ..agents.base import AgentTask, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+
+class NodeStatus(str, Enum):
+    """DAGノードの状態"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    SKIPPED = "skipped"  # 依存元の失敗により未実行
+
+
+class DAGCycleError(ValueError):
+    """依存関係に循環がある"""
+
+
+@dataclass
+class DAGNode:
+    """DAGのノード（1タスク）"""
+    task: AgentTask
+    agent_id: Optional[str] = None
+    depends_on: Set[UUID] = field(default_factory=set)
+    exclusive_with: Set[UUID] = field(default_factory=set)  # 同時に実行しないタスク
+    status: NodeStatus = NodeStatus.PENDING
+    result: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    ready_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def id(self) -> UUID:
+        return self.task.id
+
+    @property
+    def duration(self) -> float:
+        """実行時間（秒）"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    @property
+    def wait_time(self) -> float:
+        """実行可能になってから開始するまでの待ち時間（秒）"""
+        if self.ready_at is None or self.started_at is None:
+            return 0.0
+        return self.started_at - self.ready_at
+
+
+class TaskDAG:
+    """タスク依存グラフ"""
+
+    def __init__(self):
+        self.nodes: Dict[UUID, DAGNode] = {}
+        self._dependents: Dict[UUID, Set[UUID]] = {}
+
+    def add_task(
+        self,
+        task: AgentTask,
+        agent_id: Optional[str] = None,
+        depends_on: Iterable[UUID] = (),
+    ) -> DAGNode:
+        """タスクを追加"""
+        node = self.nodes.get(task.id)
+        if node is None:
+            node = DAGNode(task=task, agent_id=agent_id)
+            self.nodes[task.id] = node
+            self._dependents.setdefault(task.id, set())
+        elif agent_id is not None:
+            node.agent_id = agent_id
+        for dependency in depends_on:
+            self.add_dependency(task.id, dependency)
+        return node
+
+    def add_dependency(self, task_id: UUID, depends_on: UUID) -> None:
+        """task_id が depends_on の完了を待つ依存関係を追加"""
+        if task_id == depends_on:
+            raise DAGCycleError(f"タスク {task_id} が自身に依存しています")
+        self.nodes[task_id].depends_on.add(depends_on)
+        self._dependents.setdefault(depends_on, set()).add(task_id)
+
+    def add_exclusion(self, task_a: UUID, task_b: UUID) -> None:
+        """2つのタスクを同時に実行しないようにする（共有リソースの保護）"""
+        if task_a == task_b:
+            return
+        self.nodes[task_a].exclusive_with.add(task_b)
+        self.nodes[task_b].exclusive_with.add(task_a)
+
+    def dependents(self, task_id: UUID) -> Set[UUID]:
+        """task_id の完了を待つタスク"""
+        return self._dependents.get(task_id, set())
+
+    def topological_order(self) -> List[UUID]:
+        """
+        トポロジカル順序を取得
+
+        Raises:
+            ValueError: 存在しないタスクへの依存がある場合
+            DAGCycleError: 依存関係が循環している場合
+        """
+        in_degree: Dict[UUID, int] = {}
+        for task_id, node in self.nodes.items():
+            missing = node.depends_on - self.nodes.keys()
+            if missing:
+                raise ValueError(f"タスク {task_id} が未登録のタスクに依存しています: {missing}")
+            in_degree[task_id] = len(node.depends_on)
+
+        ready = [task_id for task_id, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            task_id = ready.pop()
+            order.append(task_id)
+            for dependent in self.dependents(task_id):
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(order) != len(self.nodes):
+            cyclic = sorted(str(task_id) for task_id, degree in in_degree.items() if degree > 0)
+            raise DAGCycleError(f"依存関係が循環しています: {cyclic}")
+        return order
+
+    def descendants(self, task_id: UUID) -> Set[UUID]:
+        """task_id に直接・間接に依存するタスク"""
+        found: Set[UUID] = set()
+        stack = list(self.dependents(task_id))
+        while stack:
+            current = stack.pop()
+            if current in found:
+                continue
+            found.add(current)
+            stack.extend(self.dependents(current))
+        return found
+
+    def reset_failed(self) -> Set[UUID]:
+        """失敗・スキップしたタスクを未実行に戻す（完了済みの結果は保持）"""
+        reset = set()
+        for node in self.nodes.values():
+            if node.status in (NodeStatus.FAILED, NodeStatus.SKIPPED):
+                node.status = NodeStatus.PENDING
+                node.error = None
+                node.result = None
+                node.ready_at = node.started_at = node.finished_at = None
+                node.task.status = TaskStatus.PENDING
+                reset.add(node.id)
+        return reset
+
+    def critical_path(self) -> Tuple[List[UUID], float]:
+        """
+        クリティカルパスを算出
+
+        最後に終了したタスクから、各タスクの開始を最後に待たせた依存元
+        （最も遅く終了した依存元）を辿った連鎖を返す。
+
+        Returns:
+            (開始順のタスクIDリスト, 最初の開始から最後の終了までの時間)
+        """
+        finished = [node for node in self.nodes.values() if node.finished_at is not None]
+        if not finished:
+            return [], 0.0
+
+        node = max(finished, key=lambda n: n.finished_at)
+        end = node.finished_at
+        path = [node.id]
+        while True:
+            gating = [
+                self.nodes[dependency]
+                for dependency in node.depends_on
+                if self.nodes[dependency].finished_at is not None
+            ]
+            if not gating:
+                break
+            node = max(gating, key=lambda n: n.finished_at)
+            path.append(node.id)
+        path.reverse()
+
+        start = min(n.started_at for n in finished if n.started_at is not None)
+        return path, end - start
+
+
+@dataclass
+class DAGRunResult:
+    """DAG実行結果"""
+    completed: List[UUID] = field(default_factory=list)
+    failed: Dict[UUID, str] = field(default_factory=dict)
+    skipped: List[UUID] = field(default_factory=list)
+    results: Dict[UUID, Any] = field(default_factory=dict)
+    wall_time_seconds: float = 0.0
+    critical_path: List[UUID] = field(default_factory=list)
+    critical_path_seconds: float = 0.0
+    timings: Dict[UUID, Dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def success(self) -> bool:
+        return not self.failed and not self.skipped
+
+
+# 依存先をスキップさせる状態
+_UNFINISHED = (NodeStatus.FAILED, NodeStatus.SKIPPED)
+
+# ランナー: (ノード, 依存元タスクIDと結果) -> 結果
+DAGRunner = Callable[[DAGNode, Dict[UUID, Any]], Awaitable[Any]]
+
+
+class DAGExecutor:
+    """
+    DAG実行エンジン
+
+    実行可能なタスクは priority の高い順に、max_parallel 件まで同時に実行する。
+    """
+
+    def __init__(self, runner: DAGRunner, max_parallel: int = 4):
+        """
+        初期化
+
+        Args:
+            runner: タスクを実行するコルーチン関数
+            max_parallel: 同時に実行するタスクの上限
+        """
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be at least 1")
+        self.runner = runner
+        self.max_parallel = max_parallel
+
+    async def run(self, dag: TaskDAG) -> DAGRunResult:
+        """
+        未実行のタスクをすべて実行
+
+        完了済みのタスクは再実行せず、その結果を依存先へ渡す。
+
+        Returns:
+            DAGRunResult: 実行結果とタイミング
+        """
+        order = dag.topological_order()  # 循環・未登録依存の検証も行う
+
+        remaining: Dict[UUID, int] = {}
+        ready: List[Tuple[int, int, UUID]] = []
+        seq = itertools.count()
+        started_at = time.monotonic()
+
+        def make_ready(node: DAGNode) -> None:
+            node.ready_at = time.monotonic()
+            heapq.heappush(ready, (-node.task.priority, next(seq), node.id))
+
+        # 依存元のスキップが子孫まで伝わるよう、トポロジカル順に確認する
+        for task_id in order:
+            node = dag.nodes[task_id]
+            if node.status != NodeStatus.PENDING:
+                continue
+            if any(dag.nodes[d].status in _UNFINISHED for d in node.depends_on):
+                self._skip(dag, node)
+                continue
+            remaining[node.id] = sum(
+                1 for d in node.depends_on if dag.nodes[d].status != NodeStatus.COMPLETED
+            )
+            if remaining[node.id] == 0:
+                make_ready(node)
+
+        running: Dict[asyncio.Task, UUID] = {}
+        try:
+            while ready or running:
+                self._start_ready(dag, ready, running)
+                if not running:
+                    # 排他制約のみで止まることはない（実行中がなければ必ず開始できる）
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for execution in done:
+                    node = dag.nodes[running.pop(execution)]
+                    node.finished_at = time.monotonic()
+                    node.task.completed_at = datetime.utcnow()
+
+                    # ランナー自身が取り消された場合は exception() が例外を送出する
+                    if execution.cancelled():
+                        error: Optional[BaseException] = asyncio.CancelledError()
+                    else:
+                        error = execution.exception()
+                    if error is None:
+                        node.status = NodeStatus.COMPLETED
+                        node.task.status = TaskStatus.COMPLETED
+                        node.result = execution.result()
+                        for dependent_id in dag.dependents(node.id):
+                            if dependent_id not in remaining:
+                                continue
+                            remaining[dependent_id] -= 1
+                            if remaining[dependent_id] == 0:
+                                make_ready(dag.nodes[dependent_id])
+                    else:
+                        node.status = NodeStatus.FAILED
+                        node.task.status = TaskStatus.FAILED
+                        node.error = str(error) or error.__class__.__name__
+                        logger.error(f"タスク {node.id} が失敗しました: {node.error}")
+                        for descendant_id in dag.descendants(node.id):
+                            descendant = dag.nodes[descendant_id]
+                            if descendant.status == NodeStatus.PENDING:
+                                self._skip(dag, descendant)
+                                remaining.pop(descendant_id, None)
+                        ready[:] = [
+                            entry for entry in ready
+                            if dag.nodes[entry[2]].status == NodeStatus.PENDING
+                        ]
+                        heapq.heapify(ready)
+        finally:
+            # 中断された場合は実行中のタスクを取り消して未実行に戻す
+            for execution, task_id in running.items():
+                execution.cancel()
+                dag.nodes[task_id].status = NodeStatus.PENDING
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return self._collect(dag, time.monotonic() - started_at)
+
+    async def rerun_failed(self, dag: TaskDAG) -> DAGRunResult:
+        """失敗したタスクとその子孫だけを再実行"""
+        reset = dag.reset_failed()
+        logger.info(f"{len(reset)} 件のタスクを再実行します")
+        return await self.run(dag)
+
+    def _start_ready(
+        self,
+        dag: TaskDAG,
+        ready: List[Tuple[int, int, UUID]],
+        running: Dict[asyncio.Task, UUID],
+    ) -> None:
+        deferred = []
+        running_ids = set(running.values())
+        while ready and len(running) < self.max_parallel:
+            entry = heapq.heappop(ready)
+            node = dag.nodes[entry[2]]
+            if node.exclusive_with & running_ids:
+                deferred.append(entry)
+                continue
+
+            node.status = NodeStatus.RUNNING
+            node.attempts += 1
+            node.started_at = time.monotonic()
+            node.task.status = TaskStatus.RUNNING
+            node.task.started_at = datetime.utcnow()
+            upstream = {d: dag.nodes[d].result for d in node.depends_on}
+            execution = asyncio.create_task(self.runner(node, upstream))
+            running[execution] = node.id
+            running_ids.add(node.id)
+
+        for entry in deferred:
+            heapq.heappush(ready, entry)
+
+    @staticmethod
+    def _skip(dag: TaskDAG, node: DAGNode) -> None:
+        node.status = NodeStatus.SKIPPED
+        node.task.status = TaskStatus.CANCELLED
+
+    @staticmethod
+    def _collect(dag: TaskDAG, wall_time: float) -> DAGRunResult:
+        result = DAGRunResult(wall_time_seconds=wall_time)
+        for node in dag.nodes.values():
+            if node.status == NodeStatus.COMPLETED:
+                result.completed.append(node.id)
+                result.results[node.id] = node.result
+            elif node.status == NodeStatus.FAILED:
+                result.failed[node.id] = node.error or ""
+            elif node.status == NodeStatus.SKIPPED:
+                result.skipped.append(node.id)
+            if node.started_at is not None:
+                result.timings[node.id] = {
+                    "wait_seconds": node.wait_time,
+                    "run_seconds": node.duration,
+                }
+
+        result.critical_path, result.critical_path_seconds = dag.critical_path()
+        return result
@@ -0,0 +1,558 @@
+"""
+リソースロックマネージャー
+
+AgentCoordinator の競合検出に使用する階層型ロックマネージャーです。
+
+- リソースパスをトライ木で管理し、読み取り/書き込みのインテントロックを持つ。
+  `src/` のロックは `src/a.py` のロックと競合する
+- `path:10-20` 形式のリソースは行範囲ロックとして扱い、ファイル毎の区間木で
+  重なりを判定する（重ならない行範囲の編集は競合しない）
+- 競合判定はパスの深さと区間木の対数時間で済み、アクティブなエージェント数に依存しない
+- 待機中のエージェント間の wait-for グラフからデッドロックを検出する
+"""
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+# 行範囲付きリソース（例: src/app.py:10-20, src/app.py:42）
+_RANGE_SUFFIX = re.compile(r"^(?P<path>.+):(?P<start>\d+)(?:-(?P<end>\d+))?$")
+
+
+class LockMode(str, Enum):
+    """ロックモード"""
+    READ = "read"
+    WRITE = "write"
+
+
+class DeadlockError(Exception):
+    """ロック待ちがデッドロックを形成する"""
+
+    def __init__(self, owner: str, cycle: List[str]):
+        super().__init__(f"Deadlock detected: {' -> '.join(cycle)}")
+        self.owner = owner
+        self.cycle = cycle
+
+
+@dataclass(frozen=True)
+class ResourceKey:
+    """正規化したリソース（パス要素と任意の行範囲）"""
+    path: Tuple[str, ...]
+    line_range: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def parse(cls, resource: str) -> "ResourceKey":
+        """リソース文字列を解析"""
+        resource = resource.strip()
+        line_range = None
+        match = _RANGE_SUFFIX.match(resource)
+        if match:
+            start = int(match.group("start"))
+            end = int(match.group("end") or start)
+            resource = match.group("path")
+            line_range = (min(start, end), max(start, end))
+
+        parts = [part for part in resource.split("/") if part and part != "."]
+        if resource.startswith("/"):
+            parts.insert(0, "/")
+        return cls(tuple(parts), line_range)
+
+    def __str__(self) -> str:
+        path = "/".join(self.path).replace("//", "/", 1)
+        if self.line_range:
+            return f"{path}:{self.line_range[0]}-{self.line_range[1]}"
+        return path
+
+
+def _modes_conflict(a: LockMode, b: LockMode) -> bool:
+    return a == LockMode.WRITE or b == LockMode.WRITE
+
+
+class _IntervalNode:
+    __slots__ = ("key", "start", "end", "owner", "mode", "count", "priority", "max_end", "left", "right")
+
+    def __init__(self, start: int, end: int, owner: str, mode: LockMode):
+        self.key = (start, end, owner, mode.value)
+        self.start = start
+        self.end = end
+        self.owner = owner
+        self.mode = mode
+        self.count = 1
+        self.priority = random.random()
+        self.max_end = end
+        self.left: Optional["_IntervalNode"] = None
+        self.right: Optional["_IntervalNode"] = None
+
+    def update(self) -> None:
+        max_end = self.end
+        if self.left is not None and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+class IntervalTree:
+    """
+    行範囲ロック用の区間木（最大終端で拡張したトリープ）
+
+    同じ (開始, 終了, 所有者, モード) の登録は参照カウントで扱う。
+    """
+
+    def __init__(self):
+        self._root: Optional[_IntervalNode] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, start: int, end: int, owner: str, mode: LockMode) -> None:
+        self._root = self._insert(self._root, _IntervalNode(start, end, owner, mode))
+        self._size += 1
+
+    def remove(self, start: int, end: int, owner: str, mode: LockMode) -> bool:
+        key = (start, end, owner, mode.value)
+        removed = [False]
+        self._root = self._remove(self._root, key, removed)
+        if removed[0]:
+            self._size -= 1
+        return removed[0]
+
+    def overlapping(self, start: int, end: int) -> Iterator[Tuple[int, int, str, LockMode]]:
+        """[start, end] と重なる区間を列挙"""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end < start:
+                continue
+            stack.append(node.left)
+            if node.start > end:
+                continue
+            if node.end >= start:
+                yield node.start, node.end, node.owner, node.mode
+            stack.append(node.right)
+
+    def _insert(self, node: Optional[_IntervalNode], new: _IntervalNode) -> _IntervalNode:
+        if node is None:
+            return new
+        if new.key == node.key:
+            node.count += 1
+            return node
+        if new.key < node.key:
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = self._rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = self._rotate_left(node)
+        node.update()
+        return node
+
+    def _remove(
+        self, node: Optional[_IntervalNode], key: tuple, removed: List[bool]
+    ) -> Optional[_IntervalNode]:
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self._remove(node.left, key, removed)
+        elif key > node.key:
+            node.right = self._remove(node.right, key, removed)
+        else:
+            removed[0] = True
+            if node.count > 1:
+                node.count -= 1
+                return node
+            return self._merge(node.left, node.right)
+        node.update()
+        return node
+
+    def _merge(
+        self, left: Optional[_IntervalNode], right: Optional[_IntervalNode]
+    ) -> Optional[_IntervalNode]:
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+    @staticmethod
+    def _rotate_right(node: _IntervalNode) -> _IntervalNode:
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        node.update()
+        pivot.update()
+        return pivot
+
+    @staticmethod
+    def _rotate_left(node: _IntervalNode) -> _IntervalNode:
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        node.update()
+        pivot.update()
+        return pivot
+
+
+class _PathNode:
+    """パストライ木のノード"""
+
+    __slots__ = ("name", "parent", "children", "locks", "intents", "ranges")
+
+    def __init__(self, name: str, parent: Optional["_PathNode"]):
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, "_PathNode"] = {}
+        # このノード全体に対するロック: mode -> owner -> count
+        self.locks: Dict[LockMode, Dict[str, int]] = {LockMode.READ: {}, LockMode.WRITE: {}}
+        # 配下（子孫・行範囲）に対するロックのインテント: mode -> owner -> count
+        self.intents: Dict[LockMode, Dict[str, int]] = {LockMode.READ: {}, LockMode.WRITE: {}}
+        self.ranges: Optional[IntervalTree] = None
+
+    def is_empty(self) -> bool:
+        return (
+            not self.children
+            and not any(self.locks.values())
+            and not any(self.intents.values())
+            and not self.ranges
+        )
+
+
+def _increment(counter: Dict[str, int], owner: str) -> None:
+    counter[owner] = counter.get(owner, 0) + 1
+
+
+def _decrement(counter: Dict[str, int], owner: str) -> None:
+    count = counter.get(owner, 0) - 1
+    if count > 0:
+        counter[owner] = count
+    else:
+        counter.pop(owner, None)
+
+
+def _others(counter: Dict[str, int], owner: str) -> Iterator[str]:
+    for other in counter:
+        if other != owner:
+            yield other
+
+
+class ResourceLockManager:
+    """
+    階層型リソースロックマネージャー
+
+    ロックは所有者（エージェントID）単位で、同じ所有者の同じロックは再入可能。
+    同じ所有者のロック同士は競合しない。
+    """
+
+    def __init__(self, latency_window: int = 1024):
+        """
+        初期化
+
+        Args:
+            latency_window: ロック待ち時間の分位点計算に使う直近サンプル数
+        """
+        self._root = _PathNode("", None)
+        self._held: Dict[str, Dict[Tuple[ResourceKey, LockMode], int]] = {}
+        self._waits_for: Dict[str, Set[str]] = {}
+        self._waiters: List[asyncio.Future] = []
+
+        # 統計情報
+        self.stats = {
+            "acquired": 0,
+            "released": 0,
+            "conflicts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "deadlocks": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+        self._recent_wait: Deque[float] = deque(maxlen=latency_window)
+
+    # --- 競合判定 ---
+
+    def conflicting_owners(
+        self, owner: str, resource: str, mode: LockMode = LockMode.WRITE
+    ) -> Set[str]:
+        """
+        指定のロックを取得した場合に競合する他の所有者
+
+        Args:
+            owner: ロックを要求する所有者
+            resource: リソース（パス、または path:開始-終了 の行範囲）
+            mode: ロックモード
+
+        Returns:
+            競合する所有者の集合（空なら取得可能）
+        """
+        return self._conflicts(owner, ResourceKey.parse(resource), mode)
+
+    def _conflicts(self, owner: str, key: ResourceKey, mode: LockMode) -> Set[str]:
+        conflicts: Set[str] = set()
+
+        # 祖先（自身を含む）全体へのロック
+        node: Optional[_PathNode] = self._root
+        for part in key.path:
+            node = node.children.get(part)
+            if node is None:
+                return conflicts
+            conflicts.update(_others(node.locks[LockMode.WRITE], owner))
+            if mode == LockMode.WRITE:
+                conflicts.update(_others(node.locks[LockMode.READ], owner))
+
+        if key.line_range is None:
+            # 配下へのロック（行範囲ロックを含む）
+            conflicts.update(_others(node.intents[LockMode.WRITE], owner))
+            if mode == LockMode.WRITE:
+                conflicts.update(_others(node.intents[LockMode.READ], owner))
+        elif node.ranges:
+            start, end = key.line_range
+            for _start, _end, other, other_mode in node.ranges.overlapping(start, end):
+                if other != owner and _modes_conflict(mode, other_mode):
+                    conflicts.add(other)
+        return conflicts
+
+    # --- 取得・解放 ---
+
+    def try_acquire(
+        self,
+        owner: str,
+        resource: str,
+        mode: LockMode = LockMode.WRITE,
+        force: bool = False,
+    ) -> Set[str]:
+        """
+        ロックを待たずに取得
+
+        Args:
+            owner: 所有者
+            resource: リソース
+            mode: ロックモード
+            force: 競合があっても登録する（宣言済みの使用予定リソースの記録用）
+
+        Returns:
+            競合する所有者の集合。空なら取得済み（force の場合は常に登録済み）
+        """
+        key = ResourceKey.parse(resource)
+        conflicts = self._conflicts(owner, key, mode)
+        if conflicts:
+            self.stats["conflicts"] += 1
+            if not force:
+                return conflicts
+        self._add(owner, key, mode)
+        return conflicts
+
+    async def acquire(
+        self,
+        owner: str,
+        resource: str,
+        mode: LockMode = LockMode.WRITE,
+        timeout: Optional[float] = None,
+    ) -> float:
+        """
+        ロックを取得（競合中は解放されるまで待つ）
+
+        Args:
+            owner: 所有者
+            resource: リソース
+            mode: ロックモード
+            timeout: 最大待ち時間（秒）
+
+        Returns:
+            ロック待ちに要した時間（秒）
+
+        Raises:
+            DeadlockError: 待機がデッドロックを形成する場合
+            asyncio.TimeoutError: timeout 内に取得できない場合
+        """
+        key = ResourceKey.parse(resource)
+        conflicts = self._conflicts(owner, key, mode)
+        if not conflicts:
+            self._add(owner, key, mode)
+            return 0.0
+
+        self.stats["conflicts"] += 1
+        self.stats["waits"] += 1
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        try:
+            while conflicts:
+                self._waits_for[owner] = conflicts
+                cycle = self._find_cycle(owner)
+                if cycle:
+                    self.stats["deadlocks"] += 1
+                    raise DeadlockError(owner, cycle)
+
+                # いずれかのロックが解放されたら再判定する
+                remaining = None if deadline is None else deadline - time.monotonic()
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+                try:
+                    if remaining is not None and remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    raise
+                finally:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                conflicts = self._conflicts(owner, key, mode)
+            self._add(owner, key, mode)
+        finally:
+            self._waits_for.pop(owner, None)
+
+        waited = time.monotonic() - start
+        self.stats["wait_time_total"] += waited
+        self.stats["wait_time_max"] = max(self.stats["wait_time_max"], waited)
+        self._recent_wait.append(waited)
+        return waited
+
+    def release(self, owner: str, resource: str, mode: Optional[LockMode] = None) -> bool:
+        """
+        ロックを1つ解放
+
+        Args:
+            owner: 所有者
+            resource: リソース
+            mode: ロックモード（省略時は保持しているいずれか）
+
+        Returns:
+            解放した場合True
+        """
+        key = ResourceKey.parse(resource)
+        held = self._held.get(owner, {})
+        modes = [mode] if mode else [LockMode.WRITE, LockMode.READ]
+        for candidate in modes:
+            if (key, candidate) in held:
+                self._remove(owner, key, candidate)
+                self._notify()
+                return True
+        return False
+
+    def release_all(self, owner: str) -> int:
+        """所有者の全ロックを解放し、解放した数を返す"""
+        held = self._held.get(owner, {})
+        released = 0
+        for (key, mode), count in list(held.items()):
+            for _ in range(count):
+                self._remove(owner, key, mode)
+                released += 1
+        if released:
+            self._notify()
+        return released
+
+    def held_by(self, owner: str) -> List[str]:
+        """所有者が保持しているリソース"""
+        return [str(key) for key, _mode in self._held.get(owner, {})]
+
+    def _notify(self) -> None:
+        """ロック待ちを起こす"""
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _add(self, owner: str, key: ResourceKey, mode: LockMode) -> None:
+        node = self._root
+        for part in key.path:
+            _increment(node.intents[mode], owner)
+            child = node.children.get(part)
+            if child is None:
+                child = _PathNode(part, node)
+                node.children[part] = child
+            node = child
+
+        if key.line_range is None:
+            _increment(node.locks[mode], owner)
+        else:
+            _increment(node.intents[mode], owner)
+            if node.ranges is None:
+                node.ranges = IntervalTree()
+            node.ranges.insert(key.line_range[0], key.line_range[1], owner, mode)
+
+        held = self._held.setdefault(owner, {})
+        held[(key, mode)] = held.get((key, mode), 0) + 1
+        self.stats["acquired"] += 1
+
+    def _remove(self, owner: str, key: ResourceKey, mode: LockMode) -> None:
+        held = self._held[owner]
+        held[(key, mode)] -= 1
+        if held[(key, mode)] == 0:
+            del held[(key, mode)]
+        if not held:
+            del self._held[owner]
+
+        node = self._root
+        path_nodes = [node]
+        for part in key.path:
+            _decrement(node.intents[mode], owner)
+            node = node.children[part]
+            path_nodes.append(node)
+
+        if key.line_range is None:
+            _decrement(node.locks[mode], owner)
+        else:
+            _decrement(node.intents[mode], owner)
+            node.ranges.remove(key.line_range[0], key.line_range[1], owner, mode)
+            if not node.ranges:
+                node.ranges = None
+
+        # 空になったノードを刈り取る
+        for child in reversed(path_nodes[1:]):
+            if not child.is_empty():
+                break
+            del child.parent.children[child.name]
+        self.stats["released"] += 1
+
+    # --- デッドロック検出 ---
+
+    def _find_cycle(self, owner: str) -> Optional[List[str]]:
+        """owner から wait-for グラフを辿って owner に戻る経路を探す"""
+        stack: List[Tuple[str, List[str]]] = [(owner, [owner])]
+        visited: Set[str] = set()
+        while stack:
+            current, path = stack.pop()
+            for blocker in self._waits_for.get(current, ()):
+                if blocker == owner:
+                    return path + [owner]
+                if blocker not in visited:
+                    visited.add(blocker)
+                    stack.append((blocker, path + [blocker]))
+        return None
+
+    def get_waiting(self) -> Dict[str, List[str]]:
+        """待機中の所有者と、待っている相手"""
+        return {owner: sorted(blockers) for owner, blockers in self._waits_for.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ロック統計（待ち時間の分位点を含む）を取得"""
+        recent = sorted(self._recent_wait)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(len(recent) * p))]
+
+        stats: Dict[str, Any] = dict(self.stats)
+        waits = stats["waits"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / waits if waits else 0.0
+        stats["wait_time_p50"] = percentile(0.5)
+        stats["wait_time_p99"] = percentile(0.99)
+        stats["owners"] = len(self._held)
+        stats["locks_held"] = sum(sum(held.values()) for held in self._held.values())
+        stats["waiting"] = len(self._waits_for)
+        return stats
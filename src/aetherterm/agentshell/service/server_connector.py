@@ -7,11 +7,20 @@ AetherTermサーバーとのオプショナルな連携を管理します。
 
 import asyncio
 import logging
+from collections import deque
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Union
+from uuid import UUID
 
 import socketio
 
+from ...common.agent_codec import (
+    CODEC_JSON,
+    SUPPORTED_CODECS,
+    decode_message,
+    encode_message,
+    negotiate_codec,
+)
 from ...common.agent_protocol import AgentMessage, MessageType
 from ..domain.models import WrapperSession
 
@@ -32,11 +41,15 @@ class ServerConnector:
         auto_connect: bool = True,
         retry_interval: int = 5,
         max_retries: int = 5,
+        request_timeout: float = 30.0,
+        max_queued_messages: int = 1000,
     ):
         self.server_url = server_url
         self.auto_connect = auto_connect
         self.retry_interval = retry_interval
         self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.max_queued_messages = max_queued_messages
 
         self._socket_client: Optional[socketio.AsyncClient] = None
         self._is_connected = False
@@ -46,6 +59,24 @@ class ServerConnector:
         self._sync_callbacks: List[Callable] = []
         self._message_handlers: Dict[MessageType, List[Callable[[AgentMessage], None]]] = {}
         self.session_id: str = "default"
+        # 接続毎にネゴシエーションするエージェントメッセージのコーデック
+        self._codec = CODEC_JSON
+        self._connected_task: Optional[asyncio.Task] = None
+
+        # RPC: 応答待ちのリクエスト（message_id -> Future）と送信済みのもの
+        self._pending: Dict[UUID, asyncio.Future] = {}
+        self._in_flight: Set[UUID] = set()
+        # 受信したリクエストを処理中のタスク（リクエストの message_id -> Task）
+        self._serving: Dict[UUID, asyncio.Task] = {}
+        self._request_handlers: Dict[
+            MessageType, Callable[[AgentMessage], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]]
+        ] = {}
+        self._background_tasks: Set[asyncio.Task] = set()
+
+        # 切断中に溜める送信キュー（上限を超えたら古いものから破棄）
+        self._outbound: Deque[AgentMessage] = deque()
+        self._flushing = False
+        self._dropped_messages = 0
 
     async def start(self) -> bool:
         """
@@ -86,6 +117,17 @@ class ServerConnector:
             except asyncio.CancelledError:
                 pass
 
+        if self._connected_task and not self._connected_task.done():
+            self._connected_task.cancel()
+
+        # 応答待ちのリクエストと処理中のリクエストを終了させる
+        self._in_flight.clear()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("サーバー連携が停止されました"))
+        for task in list(self._serving.values()):
+            task.cancel()
+
         # ソケット接続を切断
         if self._socket_client and self._socket_client.connected:
             await self._socket_client.disconnect()
@@ -223,6 +265,10 @@ class ServerConnector:
             "auto_connect": self.auto_connect,
             "retry_count": self._retry_count,
             "max_retries": self.max_retries,
+            "codec": self._codec,
+            "pending_requests": len(self._pending),
+            "queued_messages": len(self._outbound),
+            "dropped_messages": self._dropped_messages,
         }
 
     async def _connect(self) -> None:
@@ -261,6 +307,11 @@ class ServerConnector:
             self._is_connected = True
             self._retry_count = 0
 
+            # コーデックのネゴシエーションと送信キューのフラッシュ
+            # （応答待ちで受信ループを塞がないよう別タスクで行う）
+            self._codec = CODEC_JSON
+            self._connected_task = asyncio.create_task(self._on_connected())
+
             # 同期コールバックを実行
             for callback in self._sync_callbacks:
                 try:
@@ -275,6 +326,17 @@ class ServerConnector:
         async def disconnect():
             logger.warning("AetherTermサーバーから切断されました")
             self._is_connected = False
+            self._codec = CODEC_JSON
+
+            # 送信済みのリクエストへの応答はもう届かない
+            in_flight = list(self._in_flight)
+            self._in_flight.clear()
+            for message_id in in_flight:
+                future = self._pending.get(message_id)
+                if future and not future.done():
+                    future.set_exception(
+                        ConnectionError("応答を受信する前にサーバーから切断されました")
+                    )
 
             # 同期コールバックを実行
             for callback in self._sync_callbacks:
@@ -317,11 +379,33 @@ class ServerConnector:
         async def agent_message(data):
             """エージェントメッセージを受信"""
             try:
-                message = AgentMessage.from_dict(data)
+                message = decode_message(data)
                 await self._handle_agent_message(message)
             except Exception as e:
                 logger.error(f"エージェントメッセージの処理に失敗しました: {e}")
 
+    async def _on_connected(self) -> None:
+        """接続後の処理（コーデックのネゴシエーション後に送信キューをフラッシュ）"""
+        await self._negotiate_codec()
+        await self._flush_outbound()
+
+    async def _negotiate_codec(self) -> None:
+        """
+        エージェントメッセージのコーデックをサーバーとネゴシエーション
+
+        サーバーが未対応、または応答がない場合はJSONのまま使用します。
+        """
+        try:
+            response = await self._socket_client.call(
+                "agent_codec_negotiate", {"codecs": SUPPORTED_CODECS}, timeout=2
+            )
+            codec = response.get("codec") if isinstance(response, dict) else None
+            self._codec = negotiate_codec([codec]) if codec else CODEC_JSON
+            logger.info(f"エージェントメッセージのコーデック: {self._codec}")
+        except Exception as e:
+            self._codec = CODEC_JSON
+            logger.debug(f"コーデックのネゴシエーションに失敗したためJSONを使用します: {e}")
+
     async def _schedule_reconnect(self) -> None:
         """再接続をスケジュール"""
         if self._retry_count >= self.max_retries:
@@ -364,32 +448,199 @@ class ServerConnector:
             self._is_enabled = False
             asyncio.create_task(self.stop())
 
-    async def send_message(self, message: AgentMessage) -> Optional[AgentMessage]:
+    async def send_message(
+        self,
+        message: AgentMessage,
+        wait_reply: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Optional[AgentMessage]:
         """
         エージェントメッセージを送信
-        
+
+        切断中は送信キューに溜め、再接続時にまとめて送信します。
+
         Args:
             message: 送信するメッセージ
-            
+            wait_reply: 応答を待つ場合True（request() を使用）
+            timeout: 応答待ちのタイムアウト秒数（省略時は request_timeout）
+
         Returns:
-            Optional[AgentMessage]: 応答メッセージ（同期的な場合）
+            Optional[AgentMessage]: 応答メッセージ（wait_reply の場合）
         """
-        if not self.is_connected():
+        if not self._is_enabled:
             logger.warning("サーバーに接続されていません。メッセージを送信できません。")
             return None
-        
+
+        if wait_reply:
+            try:
+                return await self.request(message, timeout=timeout)
+            except (asyncio.TimeoutError, ConnectionError) as e:
+                logger.warning(f"応答を受信できませんでした: {message.message_type} ({e!r})")
+                return None
+
         try:
-            # メッセージを送信
-            await self._socket_client.emit("agent_message", message.to_dict())
+            await self._transmit(message)
             logger.debug(f"エージェントメッセージを送信しました: {message.message_type}")
-            
-            # 同期的な応答は現時点では実装しない（非同期通信のため）
-            return None
-            
         except Exception as e:
             logger.error(f"メッセージ送信中にエラーが発生しました: {e}")
-            return None
-    
+        return None
+
+    async def request(
+        self, message: AgentMessage, timeout: Optional[float] = None
+    ) -> AgentMessage:
+        """
+        リクエストを送信して応答を待つ
+
+        応答は reply_to がリクエストの message_id と一致するメッセージです。
+        複数のリクエストを同時に発行でき、応答は到着順に対応する呼び出し元へ返されます。
+        タイムアウトまたはキャンセルされた場合、送信済みであれば相手に TASK_CANCEL を通知し、
+        未送信であれば送信キューから取り除きます。
+
+        Args:
+            message: リクエストメッセージ
+            timeout: タイムアウト秒数（省略時は request_timeout）
+
+        Returns:
+            AgentMessage: 応答メッセージ
+
+        Raises:
+            asyncio.TimeoutError: タイムアウトした場合
+            ConnectionError: 連携が無効、または応答前に切断された場合
+        """
+        if not self._is_enabled:
+            raise ConnectionError("サーバー連携が無効です")
+
+        if message.correlation_id is None:
+            message.correlation_id = message.message_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message.message_id] = future
+        try:
+            await self._transmit(message)
+            return await asyncio.wait_for(future, timeout or self.request_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError, ConnectionError):
+            self._abandon_request(message)
+            raise
+        finally:
+            self._pending.pop(message.message_id, None)
+            self._in_flight.discard(message.message_id)
+
+    def register_request_handler(
+        self,
+        message_type: MessageType,
+        handler: Callable[[AgentMessage], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]],
+    ) -> None:
+        """
+        リクエストハンドラーを登録
+
+        ハンドラーの戻り値（payload）は同じメッセージタイプの応答として返信されます。
+        例外が発生した場合は TASK_FAILED で返信します。
+
+        Args:
+            message_type: メッセージタイプ
+            handler: ハンドラー関数（payload の辞書を返す）
+        """
+        self._request_handlers[message_type] = handler
+
+    async def _transmit(self, message: AgentMessage) -> None:
+        """接続中なら送信し、切断中またはキューに未送信分があればキューに積む"""
+        if self._is_connected and not self._outbound and not self._flushing:
+            try:
+                await self._emit_message(message)
+                return
+            except Exception as e:
+                logger.warning(f"送信に失敗したためキューに積みます: {e}")
+        self._enqueue(message)
+
+    async def _emit_message(self, message: AgentMessage) -> None:
+        await self._socket_client.emit("agent_message", encode_message(message, self._codec))
+        if message.message_id in self._pending:
+            self._in_flight.add(message.message_id)
+
+    def _enqueue(self, message: AgentMessage) -> None:
+        if len(self._outbound) >= self.max_queued_messages:
+            dropped = self._outbound.popleft()
+            self._dropped_messages += 1
+            future = self._pending.get(dropped.message_id)
+            if future and not future.done():
+                future.set_exception(ConnectionError("送信キューが溢れたため破棄されました"))
+            logger.warning(
+                f"送信キューが上限に達したため古いメッセージを破棄しました: {dropped.message_type}"
+            )
+        self._outbound.append(message)
+
+    async def _flush_outbound(self) -> None:
+        """切断中に溜めたメッセージを順番に送信"""
+        if self._flushing:
+            return
+        self._flushing = True
+        sent = 0
+        try:
+            while self._outbound and self._is_connected:
+                message = self._outbound.popleft()
+                try:
+                    await self._emit_message(message)
+                except Exception as e:
+                    self._outbound.appendleft(message)
+                    logger.warning(f"送信キューのフラッシュを中断しました: {e}")
+                    break
+                sent += 1
+        finally:
+            self._flushing = False
+        if sent:
+            logger.info(
+                f"送信キューのメッセージを送信しました: {sent}件（残り{len(self._outbound)}件）"
+            )
+
+    def _abandon_request(self, message: AgentMessage) -> None:
+        """タイムアウト・キャンセルされたリクエストの後始末"""
+        if message.message_id in self._in_flight:
+            cancel = AgentMessage(
+                from_agent=message.from_agent,
+                to_agent=message.to_agent,
+                message_type=MessageType.TASK_CANCEL,
+                payload={"reason": "request_cancelled"},
+                correlation_id=message.correlation_id,
+                reply_to=message.message_id,
+            )
+            self._spawn(self._transmit(cancel))
+        else:
+            try:
+                self._outbound.remove(message)
+            except ValueError:
+                pass
+
+    def _spawn(self, coro: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _serve_request(self, handler: Callable, message: AgentMessage) -> None:
+        """受信したリクエストをハンドラーで処理して返信"""
+        try:
+            result = handler(message)
+            if asyncio.iscoroutine(result):
+                result = await result
+            reply_type, payload = message.message_type, result or {}
+        except asyncio.CancelledError:
+            logger.debug(f"リクエストの処理がキャンセルされました: {message.message_id}")
+            return
+        except Exception as e:
+            logger.error(f"リクエストハンドラー実行中にエラー: {e}")
+            reply_type, payload = MessageType.TASK_FAILED, {"error": str(e)}
+
+        await self._transmit(
+            AgentMessage(
+                from_agent=message.to_agent,
+                to_agent=message.from_agent,
+                message_type=reply_type,
+                payload=payload,
+                correlation_id=message.correlation_id or message.message_id,
+                reply_to=message.message_id,
+            )
+        )
+
     def register_handler(
         self,
         message_type: MessageType,
@@ -433,6 +684,34 @@ class ServerConnector:
         Args:
             message: 受信したメッセージ
         """
+        if message.reply_to is not None:
+            # 処理中のリクエストに対するキャンセル通知
+            if message.message_type == MessageType.TASK_CANCEL:
+                serving = self._serving.get(message.reply_to)
+                if serving is not None:
+                    serving.cancel()
+                    return
+            # 発行したリクエストへの応答
+            future = self._pending.get(message.reply_to)
+            if future is not None:
+                if not future.done():
+                    future.set_result(message)
+                return
+            # タイムアウト後に届いた応答などは新しいリクエストとして扱わない
+            # （双方が同じタイプを処理する場合に応答が往復し続けるため）
+            logger.debug(
+                f"対応するリクエストのない応答を破棄しました: {message.message_type} "
+                f"(reply_to: {message.reply_to})"
+            )
+            return
+
+        request_handler = self._request_handlers.get(message.message_type)
+        if request_handler is not None:
+            task = self._spawn(self._serve_request(request_handler, message))
+            self._serving[message.message_id] = task
+            task.add_done_callback(lambda _: self._serving.pop(message.message_id, None))
+            return
+
         handlers = self._message_handlers.get(message.message_type, [])
         
         if not handlers:
@@ -0,0 +1,273 @@
+"""
+セッション永続化ジャーナル
+
+SessionService のセッション情報をライトビハインドで永続化します。
+
+- 変更されたセッションは mark() で記録しておき、まとめて書き出す
+- 書き出しは変更されたフィールドだけの差分レコードをジャーナル（JSON Lines）に追記する
+- レコードが一定数たまったら全セッションをスナップショットに書き込み、ジャーナルを空にする
+- 読み込み時はスナップショットにジャーナルを順に適用する。末尾の書きかけのレコードは捨てる
+
+スナップショットは世代番号とセッション情報の組
+（{"generation": 世代, "sessions": {セッションID -> WrapperSession.to_dict()}}）です。
+世代番号のない従来のセッション永続化ファイルは世代0として読み込みます。
+ジャーナルのレコードには、そのレコードが前提とするスナップショットの世代を記録します。
+スナップショットの置き換え後、ジャーナルの切り詰め前にクラッシュしても、
+古い世代のレコードは読み込み時に捨てられるため、新しいスナップショットを上書きしません。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ...common.session_sync import OP_REMOVE, SessionDeltaTracker
+from ..domain.models import WrapperSession
+from ..utils import ensure_directory, safe_read_file
+
+logger = logging.getLogger(__name__)
+
+
+class FsyncPolicy(Enum):
+    """ジャーナル書き込み時の fsync ポリシー"""
+
+    ALWAYS = "always"  # 書き出し毎に fsync
+    INTERVAL = "interval"  # fsync_interval 秒に1回まで
+    NEVER = "never"  # OSに任せる
+
+
+class SessionJournal:
+    """セッション情報のライトビハインドジャーナル"""
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        fsync_policy: FsyncPolicy = FsyncPolicy.INTERVAL,
+        fsync_interval: float = 1.0,
+        compact_threshold: int = 1000,
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path.with_suffix(snapshot_path.suffix + ".journal")
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+
+        self._tracker = SessionDeltaTracker()
+        self._dirty: Dict[str, None] = {}
+        self._file = None
+        self._journal_records = 0
+        self._last_fsync = 0.0
+        self._generation = 0
+        # append() と close() は別スレッドから呼ばれ、fsync タイマーも別スレッドで動く
+        self._file_lock = threading.Lock()
+        self._unsynced = False
+        self._sync_timer: Optional[threading.Timer] = None
+        self._stats = {"records": 0, "flushes": 0, "fsyncs": 0, "compactions": 0, "replayed": 0}
+
+    @property
+    def pending(self) -> int:
+        """未書き出しの変更があるセッション数"""
+        return len(self._dirty)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self._journal_records >= self.compact_threshold
+
+    def mark(self, session_id: str) -> None:
+        """セッションの変更（作成・更新・削除）を記録"""
+        self._dirty[session_id] = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        スナップショットとジャーナルからセッション情報を復元
+
+        Returns:
+            Dict[str, Dict[str, Any]]: セッションID -> WrapperSession.to_dict() 形式の辞書
+        """
+        sessions: Dict[str, Dict[str, Any]] = {}
+        generation = 0
+        content = safe_read_file(self.snapshot_path)
+        if content:
+            try:
+                data = json.loads(content)
+            except json.JSONDecodeError as e:
+                logger.error(f"セッションのスナップショットが壊れています: {e}")
+            else:
+                if isinstance(data.get("sessions"), dict) and "generation" in data:
+                    generation = data["generation"]
+                    sessions = data["sessions"]
+                else:
+                    # 世代番号のない従来の形式
+                    sessions = data
+        self._generation = generation
+
+        content = safe_read_file(self.journal_path)
+        replayed = 0
+        stale = 0
+        for line in (content or "").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # クラッシュ時の書きかけのレコード。以降は信用しない
+                logger.warning("ジャーナル末尾の不完全なレコードを破棄しました")
+                break
+            if record.get("gen", 0) < generation:
+                # スナップショットに含まれている（切り詰め前にクラッシュした）レコード
+                stale += 1
+                continue
+            session_id = record["wrapper_id"]
+            if record["op"] == OP_REMOVE:
+                sessions.pop(session_id, None)
+            else:
+                state = sessions.setdefault(session_id, {"environment": {}})
+                state.update(record.get("fields", {}))
+                if "environment" in record:
+                    state["environment"] = record["environment"]
+            replayed += 1
+
+        self._stats["replayed"] = replayed
+        if stale:
+            logger.info(f"スナップショットより古いジャーナルのレコードを破棄しました: {stale}件")
+        logger.debug(f"ジャーナルを再生しました: {replayed}件")
+        return sessions
+
+    def collect(self, sessions: Dict[str, WrapperSession]) -> List[str]:
+        """
+        記録された変更を差分レコードにする
+
+        セッションの状態を読むため、セッションを変更するのと同じスレッドで呼び出します。
+        """
+        dirty, self._dirty = self._dirty, {}
+        lines = []
+        for session_id in dirty:
+            session = sessions.get(session_id)
+            if session is not None:
+                record = self._tracker.diff(session.to_dict())
+            else:
+                record = self._tracker.remove(session_id)
+            if record is not None:
+                record["gen"] = self._generation
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        return lines
+
+    def append(self, lines: List[str]) -> None:
+        """差分レコードをジャーナルに追記（ファイルI/Oのみなので別スレッドで実行できる）"""
+        if not lines:
+            return
+        with self._file_lock:
+            if self._file is None:
+                ensure_directory(self.journal_path.parent)
+                self._file = open(self.journal_path, "a", encoding="utf-8")
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self._journal_records += len(lines)
+            self._stats["records"] += len(lines)
+            self._stats["flushes"] += 1
+
+            now = time.monotonic()
+            if self.fsync_policy is FsyncPolicy.ALWAYS:
+                self._fsync_locked(now)
+            elif self.fsync_policy is FsyncPolicy.INTERVAL:
+                elapsed = now - self._last_fsync
+                if elapsed >= self.fsync_interval:
+                    self._fsync_locked(now)
+                else:
+                    # 次のレコードが来なくても末尾が fsync されるようにタイマーで後追いする
+                    self._unsynced = True
+                    if self._sync_timer is None:
+                        self._sync_timer = threading.Timer(
+                            self.fsync_interval - elapsed, self.sync
+                        )
+                        self._sync_timer.daemon = True
+                        self._sync_timer.start()
+
+    def sync(self) -> None:
+        """fsync されていないジャーナルの末尾を fsync（INTERVAL ポリシーのタイマーから呼ばれる）"""
+        with self._file_lock:
+            self._sync_timer = None
+            if self._file is not None and self._unsynced:
+                self._fsync_locked(time.monotonic())
+
+    def _fsync_locked(self, now: float) -> None:
+        os.fsync(self._file.fileno())
+        self._last_fsync = now
+        self._unsynced = False
+        self._stats["fsyncs"] += 1
+
+    def prepare_snapshot(self, sessions: Dict[str, WrapperSession]) -> str:
+        """
+        全セッションのスナップショットを生成
+
+        スナップショットに含まれるので、記録済みの変更は破棄されます。
+        世代を進めるので、以降のレコードはこのスナップショットを前提とします。
+        collect() と同じく、セッションを変更するのと同じスレッドで呼び出します。
+        """
+        data = {session_id: session.to_dict() for session_id, session in sessions.items()}
+        self._tracker.snapshot(data.values())
+        self._dirty.clear()
+        self._generation += 1
+        return json.dumps(
+            {"generation": self._generation, "sessions": data}, ensure_ascii=False
+        )
+
+    def write_snapshot(self, content: str) -> bool:
+        """
+        スナップショットを書き込み、ジャーナルを空にする
+
+        スナップショットが確実に書き込まれてからジャーナルを切り詰めます。
+        切り詰める前にクラッシュしても、残ったレコードは世代が古いので読み込み時に捨てられます。
+        """
+        temp_path = self.snapshot_path.with_suffix(self.snapshot_path.suffix + ".tmp")
+        try:
+            ensure_directory(self.snapshot_path.parent)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                if self.fsync_policy is not FsyncPolicy.NEVER:
+                    os.fsync(f.fileno())
+            temp_path.replace(self.snapshot_path)
+
+            self.close()
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+        except OSError as e:
+            logger.error(f"セッションのスナップショットの書き込みに失敗しました: {e}")
+            return False
+
+        self._journal_records = 0
+        self._stats["compactions"] += 1
+        return True
+
+    def close(self) -> None:
+        """ジャーナルファイルを閉じる（fsync されていない末尾があれば fsync する）"""
+        with self._file_lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._file is not None:
+                if self._unsynced:
+                    self._fsync_locked(time.monotonic())
+                self._file.close()
+                self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "pending": len(self._dirty),
+            "journal_records": self._journal_records,
+            "generation": self._generation,
+            "fsync_policy": self.fsync_policy.value,
+        }
+
+
+def fsync_policy_from_config(value: Optional[str]) -> FsyncPolicy:
+    """設定値から FsyncPolicy を取得（不明な値は INTERVAL）"""
+    try:
+        return FsyncPolicy(value)
+    except ValueError:
+        logger.warning(f"不明な fsync ポリシー: {value}（interval を使用します）")
+        return FsyncPolicy.INTERVAL
@@ -6,7 +6,6 @@
 """
 
 import asyncio
-import json
 import logging
 import os
 from datetime import datetime
@@ -15,12 +14,18 @@ from typing import Any, Callable, Dict, List, Optional
 
 import socketio
 
+from ...common.session_sync import SessionDeltaTracker
+from ...common.timing_wheel import TimerHandle, get_timing_wheel
 from ..config import SessionConfig
 from ..domain.models import WrapperSession
-from ..utils import AsyncTimer, generate_session_id, safe_read_file, safe_write_file
+from ..utils import AsyncTimer, generate_session_id, running_pids
+from .session_journal import SessionJournal, fsync_policy_from_config
 
 logger = logging.getLogger(__name__)
 
+# 変更をまとめて1回の送信にするための待ち時間（秒）
+SYNC_FLUSH_DELAY = 0.05
+
 
 class SessionService:
     """
@@ -40,8 +45,17 @@ class SessionService:
         self.config = config
         self._sessions: Dict[str, WrapperSession] = {}
         self._pid_to_session: Dict[int, str] = {}
-        self._cleanup_timer: Optional[AsyncTimer] = None
+        # 期限切れ判定は共有タイミングホイールで行う（セッションID -> タイマー）
+        self._wheel = get_timing_wheel()
+        self._expiry_timers: Dict[str, TimerHandle] = {}
         self._persistence_path = Path("/tmp/aetherterm_sessions.json")
+        self._journal = SessionJournal(
+            self._persistence_path,
+            fsync_policy=fsync_policy_from_config(config.persistence_fsync),
+            compact_threshold=config.persistence_compact_threshold,
+        )
+        self._persist_handle: Optional[asyncio.TimerHandle] = None
+        self._persist_task: Optional[asyncio.Task] = None
 
         # AetherTermサーバーとの連携設定
         self.aetherterm_server_url = aetherterm_server_url
@@ -50,6 +64,13 @@ class SessionService:
         self._sync_enabled = False
         self._sync_timer: Optional[AsyncTimer] = None
 
+        # 差分同期: 送信済み状態の追跡と、未送信の変更があるセッションID
+        self._sync_tracker = SessionDeltaTracker()
+        self._dirty_sessions: Dict[str, None] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._resync_requested = False
+
         # 永続化が有効な場合は既存セッションを復元
         if self.config.enable_persistence:
             self._load_sessions()
@@ -58,12 +79,11 @@ class SessionService:
         """セッション管理を開始"""
         logger.info("セッション管理を開始します")
 
-        # クリーンアップタイマーを開始
-        if self._cleanup_timer is None:
-            self._cleanup_timer = AsyncTimer(
-                interval=self.config.cleanup_interval, callback=self._cleanup_expired_sessions
-            )
-            await self._cleanup_timer.start()
+        # 既存セッション（復元したものを含む）の期限切れタイマーを登録
+        for session_id, session in self._sessions.items():
+            if session_id not in self._expiry_timers:
+                self._schedule_expiry(session_id, self._remaining_lifetime(session))
+        self._wheel.start()
 
         # AetherTermサーバーとの連携を開始
         await self._start_aetherterm_sync()
@@ -75,19 +95,25 @@ class SessionService:
         # AetherTermサーバーとの連携を停止
         await self._stop_aetherterm_sync()
 
-        # クリーンアップタイマーを停止
-        if self._cleanup_timer is not None:
-            await self._cleanup_timer.stop()
-            self._cleanup_timer = None
+        # 期限切れタイマーを解除
+        for handle in self._expiry_timers.values():
+            self._wheel.cancel(handle)
+        self._expiry_timers.clear()
 
         # 同期タイマーを停止
         if self._sync_timer is not None:
             await self._sync_timer.stop()
             self._sync_timer = None
 
-        # セッション情報を永続化
+        # 未書き出しの変更を含めてスナップショットに書き込む
         if self.config.enable_persistence:
+            if self._persist_handle is not None:
+                self._persist_handle.cancel()
+                self._persist_handle = None
+            if self._persist_task is not None and not self._persist_task.done():
+                await self._persist_task
             self._save_sessions()
+            self._journal.close()
 
     def create_session(self, pid: int, **kwargs) -> str:
         """
@@ -129,12 +155,13 @@ class SessionService:
 
         logger.info(f"新しいセッションを作成しました: {session_id} (PID: {pid})")
 
+        self._schedule_expiry(session_id, self.config.session_timeout)
+
         # 永続化
-        if self.config.enable_persistence:
-            self._save_sessions()
+        self._persist(session_id)
 
         # AetherTermサーバーに同期
-        asyncio.create_task(self._sync_session_to_aetherterm(session_info, "created"))
+        self._mark_dirty(session_id)
 
         return session_id
 
@@ -196,11 +223,10 @@ class SessionService:
         session.update_activity()
 
         # 永続化
-        if self.config.enable_persistence:
-            self._save_sessions()
+        self._persist(session_id)
 
         # AetherTermサーバーに同期
-        asyncio.create_task(self._sync_session_to_aetherterm(session, "updated"))
+        self._mark_dirty(session_id)
 
         return True
 
@@ -221,18 +247,18 @@ class SessionService:
         # セッション状態を更新してから削除
         session.status = "closed"
 
-        # AetherTermサーバーに同期（削除前に通知）
-        asyncio.create_task(self._sync_session_to_aetherterm(session, "closed"))
-
         # マッピングから削除
         self._pid_to_session.pop(session.shell_pid, None)
         self._sessions.pop(session_id, None)
+        self._wheel.cancel(self._expiry_timers.pop(session_id, None))
+
+        # AetherTermサーバーに同期
+        self._mark_dirty(session_id)
 
         logger.info(f"セッションを削除しました: {session_id}")
 
         # 永続化
-        if self.config.enable_persistence:
-            self._save_sessions()
+        self._persist(session_id)
 
         return True
 
@@ -262,30 +288,84 @@ class SessionService:
         """現在のセッション数を取得"""
         return len(self._sessions)
 
-    async def _cleanup_expired_sessions(self) -> None:
-        """期限切れセッションのクリーンアップ"""
-        expired_sessions = []
+    def _remaining_lifetime(self, session: WrapperSession) -> float:
+        idle = (datetime.now() - session.last_activity).total_seconds()
+        return self.config.session_timeout - idle
 
-        for session_id, session in self._sessions.items():
-            if session.is_expired(self.config.session_timeout):
-                expired_sessions.append(session_id)
+    def _schedule_expiry(self, session_id: str, delay: float) -> None:
+        self._expiry_timers[session_id] = self._wheel.schedule(
+            max(0.0, delay), self._expire_sessions, session_id
+        )
 
-        if expired_sessions:
-            logger.info(f"期限切れセッションをクリーンアップします: {len(expired_sessions)}個")
+    def _expire_sessions(self, session_ids: List[str]) -> None:
+        """
+        期限切れタイマーが発火したセッションを処理
 
-            for session_id in expired_sessions:
+        アクティビティのたびにタイマーを登録し直す代わりに、発火時に最終活動時刻を確認し、
+        まだ期限内であれば残り時間で登録し直します。
+        """
+        expired = []
+        for session_id in session_ids:
+            self._expiry_timers.pop(session_id, None)
+            session = self._sessions.get(session_id)
+            if session is None:
+                continue
+            remaining = self._remaining_lifetime(session)
+            if remaining > 0:
+                self._schedule_expiry(session_id, remaining)
+            else:
+                expired.append(session_id)
+
+        if expired:
+            logger.info(f"期限切れセッションをクリーンアップします: {len(expired)}個")
+            for session_id in expired:
                 self.remove_session(session_id)
 
-    def _save_sessions(self) -> None:
-        """セッション情報を永続化"""
+    def _persist(self, session_id: str) -> None:
+        """セッションの変更を記録し、まとめてジャーナルに書き出すようスケジュール"""
+        if not self.config.enable_persistence:
+            return
+        self._journal.mark(session_id)
+        if self._persist_handle is not None:
+            return
         try:
-            sessions_data = {
-                session_id: session.to_dict() for session_id, session in self._sessions.items()
-            }
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # イベントループ外ではその場で書き出す
+            self._journal.append(self._journal.collect(self._sessions))
+            return
+        self._persist_handle = loop.call_later(
+            self.config.persistence_flush_interval, self._start_persist
+        )
+
+    def _start_persist(self) -> None:
+        self._persist_handle = None
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_task = asyncio.create_task(self._flush_journal())
+        else:
+            self._persist_handle = asyncio.get_running_loop().call_later(
+                self.config.persistence_flush_interval, self._start_persist
+            )
+
+    async def _flush_journal(self) -> None:
+        """記録された変更をジャーナルに追記し、必要ならスナップショットに畳み込む"""
+        try:
+            # セッションの読み取りはイベントループ上で行い、ファイルI/Oだけを別スレッドで行う
+            lines = self._journal.collect(self._sessions)
+            await asyncio.to_thread(self._journal.append, lines)
 
-            content = json.dumps(sessions_data, indent=2, ensure_ascii=False)
+            if self._journal.needs_compaction:
+                content = self._journal.prepare_snapshot(self._sessions)
+                await asyncio.to_thread(self._journal.write_snapshot, content)
 
-            if not safe_write_file(self._persistence_path, content):
+        except Exception as e:
+            logger.error(f"セッション情報の永続化でエラーが発生しました: {e}")
+
+    def _save_sessions(self) -> None:
+        """全セッションをスナップショットとして永続化"""
+        try:
+            content = self._journal.prepare_snapshot(self._sessions)
+            if not self._journal.write_snapshot(content):
                 logger.error("セッション情報の永続化に失敗しました")
 
         except Exception as e:
@@ -294,32 +374,34 @@ class SessionService:
     def _load_sessions(self) -> None:
         """永続化されたセッション情報を復元"""
         try:
-            content = safe_read_file(self._persistence_path)
-            if not content:
+            sessions_data = self._journal.load()
+            if not sessions_data and not self._journal.journal_path.exists():
                 return
 
-            sessions_data = json.loads(content)
+            # プロセスがまだ実行中かは一括で確認する
+            shell_pids = {}
+            for session_id, session_dict in sessions_data.items():
+                shell_pids[session_id] = session_dict.get("shell_pid")
+            alive = running_pids(pid for pid in shell_pids.values() if isinstance(pid, int))
 
             for session_id, session_dict in sessions_data.items():
+                if shell_pids[session_id] not in alive:
+                    continue
                 try:
                     session = WrapperSession.from_dict(session_dict)
-
-                    # プロセスがまだ実行中かチェック
-                    from ..utils import is_process_running
-
-                    if is_process_running(session.shell_pid):
-                        self._sessions[session_id] = session
-                        self._pid_to_session[session.shell_pid] = session_id
-                        logger.debug(f"セッションを復元しました: {session_id}")
-                    else:
-                        logger.debug(
-                            f"プロセスが終了しているためセッションをスキップ: {session_id}"
-                        )
-
+                    self._sessions[session_id] = session
+                    self._pid_to_session[session.shell_pid] = session_id
                 except Exception as e:
                     logger.warning(f"セッション {session_id} の復元に失敗しました: {e}")
 
-            logger.info(f"セッション情報を復元しました: {len(self._sessions)}個")
+            skipped = len(sessions_data) - len(self._sessions)
+            logger.info(
+                f"セッション情報を復元しました: {len(self._sessions)}個"
+                f"（終了済み・復元失敗 {skipped}個をスキップ）"
+            )
+
+            # 復元した状態をスナップショットに畳み込み、ジャーナルを空にする
+            self._save_sessions()
 
         except Exception as e:
             logger.error(f"セッション情報の復元でエラーが発生しました: {e}")
@@ -335,6 +417,7 @@ class SessionService:
             "session_timeout": self.config.session_timeout,
             "oldest_session": min((s.created_at for s in self._sessions.values()), default=None),
             "newest_session": max((s.created_at for s in self._sessions.values()), default=None),
+            "persistence": self._journal.get_stats() if self.config.enable_persistence else None,
         }
 
     async def _start_aetherterm_sync(self) -> None:
@@ -352,7 +435,7 @@ class SessionService:
             async def connect():
                 logger.info("AetherTermサーバーに接続しました")
                 self._sync_enabled = True
-                # 既存セッションを同期
+                # 既存セッションをスナップショットで同期
                 await self._sync_all_sessions()
 
             @self._socket_client.event
@@ -363,6 +446,10 @@ class SessionService:
             @self._socket_client.event
             async def wrapper_session_sync_response(data):
                 logger.debug(f"セッション同期レスポンス: {data}")
+                if isinstance(data, dict) and data.get("resync"):
+                    # サーバー側の状態とずれているのでスナップショットを送り直す
+                    self._resync_requested = True
+                    self._schedule_flush()
 
             # サーバーに接続
             await self._socket_client.connect(self.aetherterm_server_url)
@@ -385,41 +472,89 @@ class SessionService:
             if self._socket_client and self._socket_client.connected:
                 await self._socket_client.disconnect()
             self._sync_enabled = False
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
             logger.info("AetherTermサーバーとの同期を停止しました")
         except Exception as e:
             logger.error(f"AetherTermサーバーとの同期停止に失敗しました: {e}")
 
-    async def _sync_session_to_aetherterm(self, session: WrapperSession, action: str) -> None:
-        """セッション情報をAetherTermサーバーに同期"""
+    def _mark_dirty(self, session_id: str) -> None:
+        """セッションの変更を記録し、まとめて同期するようスケジュール"""
+        self._dirty_sessions[session_id] = None
+        if self._sync_enabled:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # イベントループ外では次回の定期同期で送信
+        self._flush_handle = loop.call_later(SYNC_FLUSH_DELAY, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_session_deltas())
+        else:
+            self._schedule_flush()  # 送信中なら完了後に再度フラッシュ
+
+    async def _flush_session_deltas(self) -> None:
+        """溜まった変更を差分パッチとして1回で送信"""
         if not self._sync_enabled or not self._socket_client:
             return
+        if self._resync_requested:
+            await self._sync_all_sessions()
+            return
+
+        dirty, self._dirty_sessions = self._dirty_sessions, {}
+        patches = []
+        for session_id in dirty:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                patch = self._sync_tracker.diff(session.to_dict())
+            else:
+                patch = self._sync_tracker.remove(session_id)
+            if patch is not None:
+                patches.append(patch)
+        if not patches:
+            return
 
         try:
-            sync_data = {
-                "action": action,  # created, updated, closed
-                "session": session.to_dict(),
-                "timestamp": datetime.now().isoformat(),
-                "wrapper_info": {
-                    "pid": os.getpid(),
-                    "hostname": os.uname().nodename,
+            await self._socket_client.emit(
+                "wrapper_session_sync",
+                {
+                    "action": "delta",
+                    "patches": patches,
+                    "timestamp": datetime.now().isoformat(),
+                    "wrapper_info": {
+                        "pid": os.getpid(),
+                        "hostname": os.uname().nodename,
+                    },
                 },
-            }
-
-            await self._socket_client.emit("wrapper_session_sync", sync_data)
-            logger.debug(f"セッション同期送信: {session.session_id} ({action})")
+            )
+            logger.debug(f"セッション差分同期送信: {len(patches)}件")
 
         except Exception as e:
+            # 送信済みとして記録した状態が信用できないので次回はスナップショットを送る
             logger.error(f"セッション同期に失敗しました: {e}")
+            self._resync_requested = True
 
     async def _sync_all_sessions(self) -> None:
-        """全セッションをAetherTermサーバーに同期"""
+        """全セッションのスナップショットをAetherTermサーバーに同期（再同期用）"""
         if not self._sync_enabled:
             return
 
+        self._resync_requested = False
+        self._dirty_sessions.clear()
         try:
             sessions_data = {
-                "action": "bulk_sync",
-                "sessions": [session.to_dict() for session in self._sessions.values()],
+                "action": "snapshot",
+                "sessions": self._sync_tracker.snapshot(
+                    session.to_dict() for session in self._sessions.values()
+                ),
                 "timestamp": datetime.now().isoformat(),
                 "wrapper_info": {
                     "pid": os.getpid(),
@@ -432,11 +567,12 @@ class SessionService:
 
         except Exception as e:
             logger.error(f"全セッション同期に失敗しました: {e}")
+            self._resync_requested = True
 
     async def _periodic_sync(self) -> None:
-        """定期的なセッション同期"""
-        if self._sync_enabled:
-            await self._sync_all_sessions()
+        """定期的なセッション同期（未送信の差分、または要求された再同期のみ送信）"""
+        if self._sync_enabled and (self._dirty_sessions or self._resync_requested):
+            await self._flush_session_deltas()
 
     def enable_aetherterm_sync(self, server_url: str = None) -> None:
         """AetherTermサーバーとの同期を有効化"""
@@ -457,5 +593,6 @@ class SessionService:
             "sync_enabled": self._sync_enabled,
             "server_url": self.aetherterm_server_url,
             "connected": self._socket_client.connected if self._socket_client else False,
+            "pending_changes": len(self._dirty_sessions),
             "last_sync": datetime.now().isoformat() if self._sync_enabled else None,
         }
@@ -13,7 +13,7 @@ import uuid
 from collections.abc import Awaitable
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +61,27 @@ def is_process_running(pid: int) -> bool:
         return False
 
 
+def running_pids(pids: Iterable[int]) -> Set[int]:
+    """
+    指定されたPIDのうち実行中のものを一括で取得
+
+    /proc が利用できる場合はプロセス一覧を1回だけ読み込み、
+    利用できない場合は is_process_running() で1つずつ確認します。
+
+    Args:
+        pids: プロセスIDのリスト
+
+    Returns:
+        Set[int]: 実行中のプロセスID
+    """
+    pids = set(pids)
+    try:
+        alive = {int(name) for name in os.listdir("/proc") if name.isdigit()}
+        return pids & alive
+    except OSError:
+        return {pid for pid in pids if is_process_running(pid)}
+
+
 def safe_kill_process(pid: int, timeout: int = 5) -> bool:
     """
     プロセスを安全に終了させる
@@ -0,0 +1,265 @@
+"""
+AgentMessage コーデック
+
+エージェントバス上の AgentMessage のワイヤーフォーマットを定義します。
+
+- "agent-binary/1+msgpack": バイナリ形式。UUID は16バイト、タイムスタンプは int64 の
+  UNIXエポックからのマイクロ秒、メッセージタイプは1バイトのコードで表し、payload は msgpack で
+  格納する。msgpack がインストールされている場合のみ対応する
+- "agent-binary/1": 同じバイナリ形式で、payload をコンパクトなJSONで格納する
+  （msgpack のない相手でも復元できる）
+- "json": AgentMessage.to_dict() の辞書（従来形式、フォールバック）
+
+使用するコーデックは接続毎に negotiate_codec() で決定します。受信側は形式をデータから判別するため、
+payload の形式もフレーム毎のフラグで示します。
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Union
+from uuid import UUID
+
+from .agent_protocol import AgentMessage, MessageType
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CODEC_BINARY_V1_MSGPACK = "agent-binary/1+msgpack"
+CODEC_BINARY_V1 = "agent-binary/1"
+CODEC_JSON = "json"
+
+# 優先順（先頭ほど優先）。msgpack のない環境では msgpack の payload を提示しない
+SUPPORTED_CODECS = ([CODEC_BINARY_V1_MSGPACK] if msgpack is not None else []) + [
+    CODEC_BINARY_V1,
+    CODEC_JSON,
+]
+
+_MAGIC = b"AM"
+_VERSION = 1
+
+# フラグ
+_FLAG_CORRELATION_ID = 0x01
+_FLAG_REPLY_TO = 0x02
+_FLAG_AWARE_TIMESTAMP = 0x04  # タイムゾーン付き（UTCで格納）
+_FLAG_PAYLOAD_MSGPACK = 0x08  # payload が msgpack（なければJSON、空の payload には付けない）
+
+# magic, version, flags, message_id, timestamp(us), message type code
+_HEADER = struct.Struct(">2sBB16sqB")
+# from_agent 長, to_agent 長, payload 長
+_LENGTHS = struct.Struct(">HHI")
+
+# v1 のメッセージタイプコード表。互換性のため既存の値の順序は変更せず、追加は末尾に行う。
+# 表にないタイプはコード255の後に値の文字列を格納する。
+_MESSAGE_TYPES_V1 = (
+    "task_create",
+    "task_cancel",
+    "task_complete",
+    "task_failed",
+    "pane_create",
+    "pane_destroy",
+    "pane_resize",
+    "pane_focus",
+    "progress_update",
+    "status_update",
+    "log_message",
+    "intervention_request",
+    "intervention_response",
+    "agent_register",
+    "agent_unregister",
+    "agent_heartbeat",
+    "sync_request",
+    "sync_response",
+)
+_TYPE_TO_CODE = {value: code for code, value in enumerate(_MESSAGE_TYPES_V1)}
+_CODE_TO_TYPE = {code: MessageType(value) for code, value in enumerate(_MESSAGE_TYPES_V1)}
+_EXTENDED_TYPE = 255
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_json_decoder = json.JSONDecoder()
+
+
+class CodecError(ValueError):
+    """メッセージのエンコード・デコードエラー"""
+
+
+def negotiate_codec(offered: Iterable[str]) -> str:
+    """
+    相手が提示したコーデックのうち、こちらも対応する最初のものを選ぶ
+
+    Args:
+        offered: 相手が対応するコーデック（優先順）
+
+    Returns:
+        選択したコーデック（共通のものがなければ "json"）
+    """
+    for codec in offered:
+        if codec in SUPPORTED_CODECS:
+            return codec
+    return CODEC_JSON
+
+
+def _encode_payload(payload: Dict[str, Any], use_msgpack: bool) -> bytes:
+    if use_msgpack:
+        return msgpack.packb(payload, use_bin_type=True)
+    return _json_encoder.encode(payload).encode("utf-8")
+
+
+def _decode_payload(data: bytes, is_msgpack: bool) -> Dict[str, Any]:
+    if not data:
+        return {}
+    if is_msgpack:
+        if msgpack is None:
+            raise CodecError("payload is msgpack-encoded but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    return _json_decoder.decode(data.decode("utf-8"))
+
+
+def encode_binary(message: AgentMessage, use_msgpack: bool = False) -> bytes:
+    """
+    AgentMessage をバイナリ形式にエンコード
+
+    Args:
+        message: メッセージ
+        use_msgpack: payload を msgpack で格納するか（False の場合はJSON）
+
+    Raises:
+        CodecError: msgpack がインストールされていないのに use_msgpack を指定した場合
+    """
+    if use_msgpack and msgpack is None:
+        raise CodecError("msgpack payloads requested but msgpack is not installed")
+
+    flags = 0
+    timestamp = message.timestamp
+    if timestamp.tzinfo is not None:
+        flags |= _FLAG_AWARE_TIMESTAMP
+        micros = (timestamp - _EPOCH_UTC) // _MICROSECOND
+    else:
+        micros = (timestamp - _EPOCH) // _MICROSECOND
+
+    type_value = message.message_type.value
+    type_code = _TYPE_TO_CODE.get(type_value, _EXTENDED_TYPE)
+
+    parts = []
+    if message.correlation_id is not None:
+        flags |= _FLAG_CORRELATION_ID
+        parts.append(message.correlation_id.bytes)
+    if message.reply_to is not None:
+        flags |= _FLAG_REPLY_TO
+        parts.append(message.reply_to.bytes)
+    if type_code == _EXTENDED_TYPE:
+        extended = type_value.encode("utf-8")
+        parts.append(bytes((len(extended),)) + extended)
+
+    from_agent = message.from_agent.encode("utf-8")
+    to_agent = message.to_agent.encode("utf-8")
+    payload = b""
+    if message.payload:
+        payload = _encode_payload(message.payload, use_msgpack)
+        if use_msgpack:
+            flags |= _FLAG_PAYLOAD_MSGPACK
+
+    header = _HEADER.pack(_MAGIC, _VERSION, flags, message.message_id.bytes, micros, type_code)
+    lengths = _LENGTHS.pack(len(from_agent), len(to_agent), len(payload))
+    return b"".join((header, *parts, lengths, from_agent, to_agent, payload))
+
+
+def decode_binary(data: bytes) -> AgentMessage:
+    """バイナリ形式から AgentMessage を復元"""
+    try:
+        magic, version, flags, message_id, micros, type_code = _HEADER.unpack_from(data, 0)
+    except struct.error as e:
+        raise CodecError(f"Truncated message header: {e}") from e
+    if magic != _MAGIC:
+        raise CodecError("Not an agent-binary message")
+    if version != _VERSION:
+        raise CodecError(f"Unsupported agent-binary version: {version}")
+
+    offset = _HEADER.size
+    try:
+        correlation_id = reply_to = None
+        if flags & _FLAG_CORRELATION_ID:
+            correlation_id = UUID(bytes=data[offset:offset + 16])
+            offset += 16
+        if flags & _FLAG_REPLY_TO:
+            reply_to = UUID(bytes=data[offset:offset + 16])
+            offset += 16
+
+        if type_code == _EXTENDED_TYPE:
+            length = data[offset]
+            message_type = MessageType(data[offset + 1:offset + 1 + length].decode("utf-8"))
+            offset += 1 + length
+        else:
+            message_type = _CODE_TO_TYPE[type_code]
+
+        from_length, to_length, payload_length = _LENGTHS.unpack_from(data, offset)
+        offset += _LENGTHS.size
+        from_agent = data[offset:offset + from_length].decode("utf-8")
+        offset += from_length
+        to_agent = data[offset:offset + to_length].decode("utf-8")
+        offset += to_length
+        if offset + payload_length != len(data):
+            raise CodecError("Message length does not match its header")
+        payload = _decode_payload(data[offset:], bool(flags & _FLAG_PAYLOAD_MSGPACK))
+    except CodecError:
+        raise
+    except (KeyError, IndexError, ValueError, struct.error) as e:
+        raise CodecError(f"Malformed agent-binary message: {e}") from e
+
+    if flags & _FLAG_AWARE_TIMESTAMP:
+        timestamp = _EPOCH_UTC + micros * _MICROSECOND
+    else:
+        timestamp = _EPOCH + micros * _MICROSECOND
+
+    return AgentMessage(
+        message_id=UUID(bytes=message_id),
+        from_agent=from_agent,
+        to_agent=to_agent,
+        message_type=message_type,
+        timestamp=timestamp,
+        payload=payload,
+        correlation_id=correlation_id,
+        reply_to=reply_to,
+    )
+
+
+def encode_message(message: AgentMessage, codec: str) -> Union[bytes, Dict[str, Any]]:
+    """
+    コーデックに従って AgentMessage をエンコード
+
+    Args:
+        message: メッセージ
+        codec: コーデック名
+
+    Returns:
+        バイナリ形式なら bytes、JSON形式なら辞書
+    """
+    if codec == CODEC_BINARY_V1_MSGPACK:
+        return encode_binary(message, use_msgpack=True)
+    if codec == CODEC_BINARY_V1:
+        return encode_binary(message)
+    return message.to_dict()
+
+
+def decode_message(data: Union[bytes, bytearray, memoryview, Dict[str, Any]]) -> AgentMessage:
+    """
+    受信データから AgentMessage を復元（形式は自動判別）
+
+    Args:
+        data: バイナリ形式の bytes、または to_dict() 形式の辞書
+
+    Returns:
+        AgentMessage
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return decode_binary(bytes(data))
+    if isinstance(data, dict):
+        return AgentMessage.from_dict(data)
+    raise CodecError(f"Unsupported message representation: {type(data).__name__}")
+
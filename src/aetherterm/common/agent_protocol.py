@@ -52,7 +52,7 @@ class PaneType(str, Enum):
     REPORT = "report"
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentMessage:
     """エージェント間メッセージ"""
     message_id: UUID = field(default_factory=uuid4)
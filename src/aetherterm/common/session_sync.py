@@ -0,0 +1,230 @@
+"""
+Wrapperセッションの差分同期
+
+agentshell（送信側）と agentserver（受信側）の間で WrapperSession を
+リビジョン付きの差分パッチでやり取りするための共通コンポーネントです。
+
+- 送信側の SessionDeltaTracker は最後に送った内容を覚えておき、変更された
+  フィールドだけをパッチにする。環境変数はハッシュで比較し、変わった時だけ送る
+- 受信側の SessionStateStore はパッチを適用する。base_rev が合わない、または
+  環境変数のハッシュが未知の場合は適用せず、送信側にスナップショットでの
+  再同期を要求する
+
+パッチ形式:
+    {"op": "upsert", "wrapper_id": ..., "rev": n, "base_rev": n - 1,
+     "fields": {変更されたフィールド}, "env_hash": ..., "environment": {...}（変更時のみ）}
+    {"op": "remove", "wrapper_id": ..., "rev": n, "base_rev": n - 1}
+"""
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+OP_UPSERT = "upsert"
+OP_REMOVE = "remove"
+
+
+def environment_hash(environment: Dict[str, str]) -> str:
+    """環境変数の内容ハッシュ"""
+    encoded = json.dumps(environment, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def session_fields(session_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """同期対象のフィールド（環境変数を除く）。後から変更されても比較できるようコピーする"""
+    fields = {key: value for key, value in session_dict.items() if key != "environment"}
+    if isinstance(fields.get("terminal_size"), tuple):
+        fields["terminal_size"] = list(fields["terminal_size"])
+    fields["metadata"] = copy.deepcopy(fields.get("metadata", {}))
+    return fields
+
+
+class SessionDeltaTracker:
+    """
+    送信済みのセッション状態を追跡し、差分パッチを生成する
+
+    環境変数のハッシュは辞書オブジェクトごとに一度だけ計算します
+    （環境変数は置き換えられることはあっても、その場で書き換えられない前提）。
+    """
+
+    def __init__(self):
+        self._sent: Dict[str, Dict[str, Any]] = {}
+        self._env_hashes: Dict[str, str] = {}
+        self._revisions: Dict[str, int] = {}
+        self._hash_cache: Dict[str, Tuple[int, str]] = {}
+
+    def _environment_hash(self, wrapper_id: str, environment: Dict[str, str]) -> str:
+        cached = self._hash_cache.get(wrapper_id)
+        if cached is not None and cached[0] == id(environment):
+            return cached[1]
+        digest = environment_hash(environment)
+        self._hash_cache[wrapper_id] = (id(environment), digest)
+        return digest
+
+    def diff(self, session_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        前回送信時からの差分パッチを生成
+
+        Args:
+            session_dict: WrapperSession.to_dict() の結果
+
+        Returns:
+            Optional[Dict[str, Any]]: パッチ（変更がなければNone）
+        """
+        wrapper_id = session_dict["wrapper_id"]
+        environment = session_dict.get("environment", {})
+        fields = session_fields(session_dict)
+        env_hash = self._environment_hash(wrapper_id, environment)
+
+        previous = self._sent.get(wrapper_id)
+        if previous is None:
+            changed = fields
+        else:
+            changed = {key: value for key, value in fields.items() if previous.get(key) != value}
+        env_changed = self._env_hashes.get(wrapper_id) != env_hash
+        if not changed and not env_changed:
+            return None
+
+        revision = self._revisions.get(wrapper_id, 0) + 1
+        self._revisions[wrapper_id] = revision
+        self._sent[wrapper_id] = fields
+        self._env_hashes[wrapper_id] = env_hash
+
+        patch = {
+            "op": OP_UPSERT,
+            "wrapper_id": wrapper_id,
+            "rev": revision,
+            "base_rev": revision - 1,
+            "fields": changed,
+            "env_hash": env_hash,
+        }
+        if env_changed:
+            patch["environment"] = environment
+        return patch
+
+    def remove(self, wrapper_id: str) -> Optional[Dict[str, Any]]:
+        """削除パッチを生成（未送信のセッションならNone）"""
+        self._hash_cache.pop(wrapper_id, None)
+        self._env_hashes.pop(wrapper_id, None)
+        if self._sent.pop(wrapper_id, None) is None:
+            self._revisions.pop(wrapper_id, None)
+            return None
+        revision = self._revisions.pop(wrapper_id) + 1
+        return {"op": OP_REMOVE, "wrapper_id": wrapper_id, "rev": revision, "base_rev": revision - 1}
+
+    def snapshot(self, session_dicts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        全セッションのスナップショットを生成（再同期用）
+
+        追跡状態はスナップショットの内容で置き換えられます。
+        """
+        self._sent.clear()
+        self._env_hashes.clear()
+        entries = []
+        for session_dict in session_dicts:
+            patch = self.diff(session_dict)
+            patch.pop("op")
+            patch.pop("base_rev")
+            entries.append(patch)
+
+        alive = {entry["wrapper_id"] for entry in entries}
+        for wrapper_id in list(self._revisions):
+            if wrapper_id not in alive:
+                del self._revisions[wrapper_id]
+                self._hash_cache.pop(wrapper_id, None)
+        return entries
+
+    def reset(self) -> None:
+        """追跡状態を破棄（次回はスナップショットが必要）"""
+        self._sent.clear()
+        self._env_hashes.clear()
+
+
+class SessionStateStore:
+    """受信側のセッション状態。パッチとスナップショットを適用する"""
+
+    def __init__(self):
+        # wrapper_id -> {"rev", "fields", "env_hash", "environment", "source"}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def apply_snapshot(self, source: str, entries: Iterable[Dict[str, Any]]) -> None:
+        """
+        スナップショットを適用
+
+        同じ送信元の既存セッションのうち、スナップショットに含まれないものは削除します。
+        """
+        for wrapper_id in [w for w, s in self._sessions.items() if s["source"] == source]:
+            del self._sessions[wrapper_id]
+        for entry in entries:
+            self._sessions[entry["wrapper_id"]] = {
+                "rev": entry["rev"],
+                "fields": dict(entry.get("fields", {})),
+                "env_hash": entry.get("env_hash"),
+                "environment": entry.get("environment", {}),
+                "source": source,
+            }
+
+    def apply_patch(self, source: str, patch: Dict[str, Any]) -> bool:
+        """
+        パッチを適用
+
+        Returns:
+            bool: 適用できた場合True（Falseなら送信元に再同期を要求する）
+        """
+        wrapper_id = patch["wrapper_id"]
+        current = self._sessions.get(wrapper_id)
+
+        if patch["op"] == OP_REMOVE:
+            self._sessions.pop(wrapper_id, None)
+            return True
+
+        if current is None:
+            if patch["base_rev"] != 0 or "environment" not in patch:
+                return False
+            current = {"rev": 0, "fields": {}, "env_hash": None, "environment": {}}
+        elif current["rev"] != patch["base_rev"]:
+            return False
+        elif "environment" not in patch and current["env_hash"] != patch.get("env_hash"):
+            return False
+
+        current["fields"].update(patch.get("fields", {}))
+        current["rev"] = patch["rev"]
+        current["env_hash"] = patch.get("env_hash")
+        if "environment" in patch:
+            current["environment"] = patch["environment"]
+        current["source"] = source
+        self._sessions[wrapper_id] = current
+        return True
+
+    def get(self, wrapper_id: str) -> Optional[Dict[str, Any]]:
+        """セッションを WrapperSession.to_dict() と同じ形式で取得"""
+        state = self._sessions.get(wrapper_id)
+        if state is None:
+            return None
+        return {**state["fields"], "environment": state["environment"]}
+
+    def revision(self, wrapper_id: str) -> int:
+        """セッションの現在のリビジョン（未知なら0）"""
+        state = self._sessions.get(wrapper_id)
+        return state["rev"] if state else 0
+
+    def sessions(self, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """セッション一覧（source を指定するとその送信元のもののみ）"""
+        return [
+            self.get(wrapper_id)
+            for wrapper_id, state in self._sessions.items()
+            if source is None or state["source"] == source
+        ]
+
+    def discard_source(self, source: str) -> None:
+        """送信元のセッションをすべて削除"""
+        self.apply_snapshot(source, [])
+
+
+def compact_patch(patch: Dict[str, Any]) -> Dict[str, Any]:
+    """ブラウザー向けの差分（環境変数の本体は含めない）"""
+    return {key: value for key, value in patch.items() if key != "environment"}
@@ -0,0 +1,279 @@
+"""
+階層型タイミングホイール
+
+セッションやブロック状態などの期限切れ処理をプロセス全体で共有するタイマーです。
+登録・キャンセルは O(1) で、期限切れになったタイマーはまとめて処理されます。
+各コンポーネントが保持しているエントリを定期的に全件走査する必要がなくなります。
+
+- 1段目は tick 単位の slots 個のスロット、2段目以降は1つ下の段の1周分を1スロットとする
+- 遠い期限のタイマーは上の段に置かれ、時刻が近づくと下の段に移される（カスケード）
+- コールバックは同じ tick で期限切れになったキーのリストを受け取る
+
+使用例:
+    wheel = get_timing_wheel()
+    handle = wheel.schedule(300, expire_blocks, session_id)
+    wheel.cancel(handle)
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 期限切れキーのリストを受け取るコールバック
+BatchCallback = Callable[[List[Any]], Union[None, Awaitable[None]]]
+
+
+class TimerHandle:
+    """登録されたタイマー"""
+
+    __slots__ = ("expiry_tick", "callback", "key", "_bucket")
+
+    def __init__(self, expiry_tick: int, callback: BatchCallback, key: Any):
+        self.expiry_tick = expiry_tick
+        self.callback = callback
+        self.key = key
+        self._bucket: Optional[Dict["TimerHandle", None]] = None
+
+    @property
+    def active(self) -> bool:
+        """まだ発火もキャンセルもされていない場合True"""
+        return self._bucket is not None
+
+
+class TimingWheel:
+    """
+    階層型タイミングホイール
+
+    Args:
+        tick: 1スロットの時間幅（秒）。期限の精度になる
+        slots: 1段あたりのスロット数（2のべき乗）
+        levels: 段数。tick * slots ** levels 秒より先の期限はオーバーフロー領域に置く
+        clock: 時刻関数（テスト用）
+    """
+
+    def __init__(
+        self,
+        tick: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._clock = clock
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+
+        self._origin = clock()
+        self._current_tick = 0
+        self._wheels: List[List[Dict[TimerHandle, None]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: Dict[TimerHandle, None] = {}
+        # 既に期限を過ぎた状態で登録されたタイマー（次の advance で発火）
+        self._due: Dict[TimerHandle, None] = {}
+        self._count = 0
+
+        self._driver: Optional[asyncio.Task] = None
+        self._stats = {"scheduled": 0, "cancelled": 0, "fired": 0, "cascaded": 0, "batches": 0}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tick_of(self, when: float) -> int:
+        return math.ceil((when - self._origin) / self.tick)
+
+    def _place(self, handle: TimerHandle) -> None:
+        delta = handle.expiry_tick - self._current_tick
+        if delta <= 0:
+            bucket = self._wheels[0][self._current_tick & self._mask]
+        else:
+            bucket = self._overflow
+            for level in range(self.levels):
+                if delta < 1 << (self._bits * (level + 1)):
+                    index = (handle.expiry_tick >> (self._bits * level)) & self._mask
+                    bucket = self._wheels[level][index]
+                    break
+        bucket[handle] = None
+        handle._bucket = bucket
+
+    def schedule(self, delay: float, callback: BatchCallback, key: Any = None) -> TimerHandle:
+        """
+        delay 秒後に期限切れになるタイマーを登録
+
+        Args:
+            delay: 期限までの秒数
+            callback: 期限切れになったキーのリストを受け取るコールバック
+            key: コールバックに渡すキー
+
+        Returns:
+            TimerHandle: キャンセル用のハンドル
+        """
+        return self.schedule_at(self._clock() + delay, callback, key)
+
+    def schedule_at(self, when: float, callback: BatchCallback, key: Any = None) -> TimerHandle:
+        """時刻 when（clock と同じ時間軸）に期限切れになるタイマーを登録"""
+        handle = TimerHandle(self._tick_of(when), callback, key)
+        if handle.expiry_tick <= self._current_tick:
+            self._due[handle] = None
+            handle._bucket = self._due
+        else:
+            self._place(handle)
+        self._count += 1
+        self._stats["scheduled"] += 1
+        self.start()
+        return handle
+
+    def cancel(self, handle: Optional[TimerHandle]) -> bool:
+        """
+        タイマーをキャンセル
+
+        Returns:
+            bool: キャンセルした場合True（既に発火・キャンセル済みならFalse）
+        """
+        if handle is None or handle._bucket is None:
+            return False
+        del handle._bucket[handle]
+        handle._bucket = None
+        self._count -= 1
+        self._stats["cancelled"] += 1
+        return True
+
+    def reschedule(self, handle: Optional[TimerHandle], delay: float) -> Optional[TimerHandle]:
+        """キャンセルして同じコールバック・キーで登録し直す（アクティビティによる延長など）"""
+        if handle is None:
+            return None
+        self.cancel(handle)
+        return self.schedule(delay, handle.callback, handle.key)
+
+    def _cascade(self, tick: int) -> None:
+        """1段目が一周した時に、上の段の該当スロットを下の段に移す"""
+        for level in range(1, self.levels):
+            index = (tick >> (self._bits * level)) & self._mask
+            bucket = self._wheels[level][index]
+            if bucket:
+                self._wheels[level][index] = {}
+                for handle in bucket:
+                    self._place(handle)
+                self._stats["cascaded"] += len(bucket)
+            if level == self.levels - 1 and self._overflow:
+                # 最上段のスロットが進むたびにオーバーフロー領域を見直す
+                overflow, self._overflow = self._overflow, {}
+                for handle in overflow:
+                    self._place(handle)
+            if index != 0:
+                break
+
+    def advance(self, now: Optional[float] = None) -> List[TimerHandle]:
+        """
+        時刻を now まで進め、期限切れになったタイマーを取り出す
+
+        Returns:
+            List[TimerHandle]: 期限切れのタイマー（期限順）
+        """
+        target = math.floor(((self._clock() if now is None else now) - self._origin) / self.tick)
+        expired: List[TimerHandle] = list(self._due)
+        self._due.clear()
+
+        while self._current_tick < target:
+            if self._count - len(expired) <= 0:
+                # 空なら走査せずに時刻だけ進める
+                self._current_tick = target
+                break
+            self._current_tick += 1
+            tick = self._current_tick
+            if tick & self._mask == 0:
+                self._cascade(tick)
+            bucket = self._wheels[0][tick & self._mask]
+            if bucket:
+                self._wheels[0][tick & self._mask] = {}
+                expired.extend(bucket)
+
+        for handle in expired:
+            handle._bucket = None
+        self._count -= len(expired)
+        self._stats["fired"] += len(expired)
+        return expired
+
+    def run_expired(self, now: Optional[float] = None) -> List[Awaitable[None]]:
+        """
+        期限切れのタイマーをコールバック毎にまとめて実行
+
+        Returns:
+            List[Awaitable[None]]: 非同期コールバックが返したコルーチン
+        """
+        batches: Dict[BatchCallback, List[Any]] = {}
+        for handle in self.advance(now):
+            batches.setdefault(handle.callback, []).append(handle.key)
+
+        pending = []
+        for callback, keys in batches.items():
+            self._stats["batches"] += 1
+            try:
+                result = callback(keys)
+                if asyncio.iscoroutine(result):
+                    pending.append(result)
+            except Exception as e:
+                logger.error(f"タイマーコールバックの実行に失敗しました: {e}")
+        return pending
+
+    def start(self) -> None:
+        """
+        駆動タスクを開始（タイマー登録時にも自動的に開始される）
+
+        イベントループ外で登録されたタイマーがある場合、ループ開始後に呼び出します。
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # イベントループ外では advance()/run_expired() を直接呼ぶ
+        if self._driver is not None and not self._driver.done() and self._driver.get_loop() is loop:
+            return
+        self._driver = loop.create_task(self._drive())
+
+    async def _drive(self) -> None:
+        """tick 毎に期限切れのタイマーを処理する"""
+        try:
+            while self._count:
+                await asyncio.sleep(self.tick)
+                for coro in self.run_expired():
+                    try:
+                        await coro
+                    except Exception as e:
+                        logger.error(f"タイマーコールバックの実行に失敗しました: {e}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self._driver is asyncio.current_task():
+                self._driver = None
+
+    async def stop(self) -> None:
+        """駆動タスクを停止（登録済みのタイマーは残る）"""
+        if self._driver is not None:
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pending": self._count, "tick": self.tick}
+
+
+# プロセス全体で共有するインスタンス
+_timing_wheel: Optional[TimingWheel] = None
+
+
+def get_timing_wheel() -> TimingWheel:
+    """共有タイミングホイールを取得"""
+    global _timing_wheel
+    if _timing_wheel is None:
+        _timing_wheel = TimingWheel()
+    return _timing_wheel
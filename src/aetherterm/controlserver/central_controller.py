@@ -5,6 +5,7 @@ CentralController - 中央制御システム
 """
 
 import asyncio
+import heapq
 import json
 import logging
 import uuid
@@ -59,6 +60,8 @@ class CentralController:
         self.active_sessions: Dict[str, SessionInfo] = {}
         self.active_blocks: Dict[str, BlockCommand] = {}
         self.block_history: List[BlockCommand] = []
+        # AgentServer別のリスク上位セッション {agent_id: [集計, ...]}
+        self.session_risks: Dict[str, List[Dict]] = {}
 
         # WebSocketサーバー
         self.server = None
@@ -191,6 +194,8 @@ class CentralController:
             await self.handle_block_confirmation(data, agent_id)
         elif message_type == "unblock_request":
             await self.handle_unblock_request(data, agent_id)
+        elif message_type == "risk_summary":
+            await self.handle_risk_summary(data, agent_id)
         else:
             logger.debug(f"Received message from {agent_id}: {message_type}")
 
@@ -384,6 +389,7 @@ class CentralController:
                 break
         if agent_to_remove:
             del self.agent_servers[agent_to_remove]
+            self.session_risks.pop(agent_to_remove, None)
 
         # 管理者クライアントから削除
         self.admin_clients.discard(websocket)
@@ -398,6 +404,7 @@ class CentralController:
             "active_blocks": len(self.active_blocks),
             "sessions": [asdict(session) for session in self.active_sessions.values()],
             "blocks": [asdict(block) for block in self.active_blocks.values()],
+            "risk_sessions": self.get_top_risk_sessions(),
         }
 
         await websocket.send(json.dumps(status))
@@ -457,6 +464,31 @@ class CentralController:
             }
         )
 
+    async def handle_risk_summary(self, data: Dict, agent_id: str):
+        """リスク集計の受信処理"""
+        sessions = data.get("sessions", [])
+        if sessions:
+            self.session_risks[agent_id] = sessions
+        else:
+            self.session_risks.pop(agent_id, None)
+
+        await self.broadcast_to_admins(
+            {
+                "type": "risk_summary",
+                "sessions": self.get_top_risk_sessions(),
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
+
+    def get_top_risk_sessions(self, limit: int = 10) -> List[Dict]:
+        """全AgentServerを通したリスク上位セッション"""
+        sessions = [
+            {**session, "agent_server_id": agent_id}
+            for agent_id, agent_sessions in self.session_risks.items()
+            for session in agent_sessions
+        ]
+        return heapq.nlargest(limit, sessions, key=lambda session: session.get("risk_score", 0))
+
     def get_status_summary(self) -> Dict:
         """状態サマリーを取得"""
         return {
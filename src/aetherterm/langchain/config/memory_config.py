@@ -50,6 +50,26 @@ class MemoryConfig:
     cleanup_batch_size: int = 1000  # クリーンアップバッチサイズ
     auto_cleanup_enabled: bool = True
 
+    # 階層間の移動（ティアリング）設定
+    tiering_enabled: bool = True
+    tiering_interval_seconds: int = 300  # ティアリングの実行間隔
+    tiering_heat_half_life_seconds: int = 3600  # アクセス頻度（ヒート）の半減期
+    tiering_promote_heat: float = 3.0  # 中期メモリを短期キャッシュに昇格するヒート
+    tiering_demote_heat: float = 0.5  # これを下回ると短期キャッシュから降格する
+    tiering_demote_after_seconds: int = 1800  # 短期メモリを中期メモリへ移すまでの最短時間
+    tiering_short_term_budget_bytes: int = 16 * 1024 * 1024  # 昇格したエントリの合計上限
+    tiering_archive_after_days: int = 7  # これより古い会話を要約して長期メモリに移す
+    tiering_archive_chunk_size: int = 20  # 1件の要約にまとめる会話数
+    tiering_archive_max_chars: int = 2000  # 要約の最大文字数
+    tiering_max_embeddings_per_run: int = 100  # 1回の実行で生成する埋め込み数（コスト上限）
+    tiering_max_tracked_entries: int = 50000  # アクセス統計を保持する最大エントリ数
+
+    # エージェントのコンテキスト取得設定
+    context_recent_limit: int = 10  # コンテキストに含める最近の会話数
+    context_relevant_limit: int = 5  # コンテキストに含める関連メモリ数（ハイブリッド検索）
+    context_cache_ttl_seconds: int = 300  # 取得したコンテキストを再利用する最長時間
+    context_cache_max_entries: int = 256  # キャッシュする (セッション, クエリ) の最大数
+
     # パフォーマンス設定
     enable_async_operations: bool = True
     max_concurrent_operations: int = 10
@@ -96,6 +116,51 @@ class MemoryConfig:
         if self.embedding_batch_size <= 0:
             errors.append("embedding_batch_sizeは正の値である必要があります")
 
+        # ティアリング設定の検証
+        if self.tiering_interval_seconds <= 0:
+            errors.append("tiering_interval_secondsは正の値である必要があります")
+
+        if self.tiering_heat_half_life_seconds <= 0:
+            errors.append("tiering_heat_half_life_secondsは正の値である必要があります")
+
+        if not 0.0 <= self.tiering_demote_heat < self.tiering_promote_heat:
+            errors.append(
+                "tiering_demote_heatは0以上かつtiering_promote_heatより小さい必要があります"
+            )
+
+        if not 0 < self.tiering_demote_after_seconds < self.short_term_ttl_seconds:
+            errors.append(
+                "tiering_demote_after_secondsは正の値かつshort_term_ttl_secondsより"
+                "短い必要があります"
+            )
+
+        if self.tiering_short_term_budget_bytes <= 0:
+            errors.append("tiering_short_term_budget_bytesは正の値である必要があります")
+
+        if not 0 < self.tiering_archive_after_days < self.medium_term_days:
+            errors.append(
+                "tiering_archive_after_daysは正の値かつmedium_term_daysより短い必要があります"
+            )
+
+        if self.tiering_archive_chunk_size <= 0:
+            errors.append("tiering_archive_chunk_sizeは正の値である必要があります")
+
+        if self.tiering_max_embeddings_per_run < 0:
+            errors.append("tiering_max_embeddings_per_runは0以上である必要があります")
+
+        if self.tiering_max_tracked_entries <= 0:
+            errors.append("tiering_max_tracked_entriesは正の値である必要があります")
+
+        # コンテキスト取得設定の検証
+        if self.context_recent_limit < 0 or self.context_relevant_limit < 0:
+            errors.append("context_recent_limitとcontext_relevant_limitは0以上である必要があります")
+
+        if self.context_cache_ttl_seconds < 0:
+            errors.append("context_cache_ttl_secondsは0以上である必要があります")
+
+        if self.context_cache_max_entries <= 0:
+            errors.append("context_cache_max_entriesは正の値である必要があります")
+
         # パフォーマンス設定の検証
         if self.max_concurrent_operations <= 0:
             errors.append("max_concurrent_operationsは正の値である必要があります")
@@ -161,6 +226,22 @@ class MemoryConfig:
             "cleanup_interval_hours": self.cleanup_interval_hours,
             "cleanup_batch_size": self.cleanup_batch_size,
             "auto_cleanup_enabled": self.auto_cleanup_enabled,
+            "tiering_enabled": self.tiering_enabled,
+            "tiering_interval_seconds": self.tiering_interval_seconds,
+            "tiering_heat_half_life_seconds": self.tiering_heat_half_life_seconds,
+            "tiering_promote_heat": self.tiering_promote_heat,
+            "tiering_demote_heat": self.tiering_demote_heat,
+            "tiering_demote_after_seconds": self.tiering_demote_after_seconds,
+            "tiering_short_term_budget_bytes": self.tiering_short_term_budget_bytes,
+            "tiering_archive_after_days": self.tiering_archive_after_days,
+            "tiering_archive_chunk_size": self.tiering_archive_chunk_size,
+            "tiering_archive_max_chars": self.tiering_archive_max_chars,
+            "tiering_max_embeddings_per_run": self.tiering_max_embeddings_per_run,
+            "tiering_max_tracked_entries": self.tiering_max_tracked_entries,
+            "context_recent_limit": self.context_recent_limit,
+            "context_relevant_limit": self.context_relevant_limit,
+            "context_cache_ttl_seconds": self.context_cache_ttl_seconds,
+            "context_cache_max_entries": self.context_cache_max_entries,
             "enable_async_operations": self.enable_async_operations,
             "max_concurrent_operations": self.max_concurrent_operations,
             "operation_timeout_seconds": self.operation_timeout_seconds,
@@ -17,6 +17,7 @@ class VectorStoreType(Enum):
     FAISS = "faiss"
     PINECONE = "pinecone"
     PGVECTOR = "pgvector"
+    NUMPY = "numpy"
 
 
 class DatabaseType(Enum):
@@ -36,6 +37,7 @@ class StorageConfig:
     vector_store_path: str = "./data/vector_store"
     vector_index_type: str = "hnsw"  # hnsw, ivf, flat
     vector_distance_metric: str = "cosine"  # cosine, euclidean, dot_product
+    vector_save_interval_seconds: int = 30  # インデックスを保存する間隔（追加のたびには保存しない）
 
     # Chroma設定
     chroma_host: Optional[str] = None
@@ -48,6 +50,11 @@ class StorageConfig:
     faiss_nprobe: int = 10
     faiss_use_gpu: bool = False
 
+    # NumPyインデックス設定
+    numpy_ivf_threshold: int = 50000  # この件数を超えたらIVF（近似検索）を学習する。0で常に厳密検索
+    numpy_ivf_nprobe: int = 8
+    numpy_max_segments: int = 16  # セグメント数がこれを超えたらまとめ直す
+
     # Pinecone設定
     pinecone_api_key: Optional[str] = None
     pinecone_environment: str = "us-west1-gcp"
@@ -80,13 +87,23 @@ class StorageConfig:
     redis_connection_pool_size: int = 50
     redis_socket_timeout: int = 5
     redis_socket_connect_timeout: int = 5
+    redis_near_cache_ttl_seconds: float = 2.0  # セッションコンテキストのローカルキャッシュ（0で無効）
+    redis_near_cache_max_entries: int = 1024
 
     # キャッシュ設定
     enable_query_cache: bool = True
     query_cache_ttl_seconds: int = 1800  # 30分
     enable_embedding_cache: bool = True
     embedding_cache_ttl_seconds: int = 86400  # 24時間
+    embedding_cache_max_entries: int = 10000  # メモリ上のLRUの最大件数
+    embedding_cache_max_bytes: int = 64 * 1024 * 1024  # メモリ上のLRUの最大バイト数
+    embedding_cache_path: Optional[str] = None  # 指定時は再起動後も使えるディスク層を使う
+    embedding_cache_disk_entries: int = 100000  # ディスク層の最大件数
     cache_compression_enabled: bool = True
+    cache_compression_threshold_bytes: int = 1024  # これ以上の大きさの値を圧縮する
+    cache_max_ttl_seconds: int = 86400  # TTL未指定のキャッシュのTTL（これより長いキーは掃除対象）
+    cache_cleanup_batch_size: int = 500  # クリーンアップでSCAN/UNLINKする1回の件数
+    cache_cleanup_pause_ms: int = 10  # クリーンアップのバッチ間の待ち時間
 
     # バックアップ設定
     backup_enabled: bool = True
@@ -97,6 +114,11 @@ class StorageConfig:
 
     # パフォーマンス設定
     batch_insert_size: int = 1000
+    enable_write_batching: bool = True  # 会話書き込みのグループコミット
+    write_batch_max_delay_ms: int = 5  # バッチを閉じるまでの最大待ち時間
+    write_queue_max_size: int = 10000  # 書き込み待ちキューの上限（超えると呼び出し元が待つ）
+    embedding_batch_size: int = 64  # 1回の埋め込みAPI呼び出しにまとめる最大件数
+    embedding_batch_max_delay_ms: int = 5  # 埋め込み要求をまとめるまでの最大待ち時間
     connection_timeout_seconds: int = 30
     query_timeout_seconds: int = 60
     enable_connection_pooling: bool = True
@@ -131,9 +153,54 @@ class StorageConfig:
         if self.redis_database < 0:
             errors.append("redis_databaseは0以上である必要があります")
 
+        if self.redis_near_cache_ttl_seconds < 0:
+            errors.append("redis_near_cache_ttl_secondsは0以上である必要があります")
+
+        if self.redis_near_cache_max_entries <= 0:
+            errors.append("redis_near_cache_max_entriesは正の値である必要があります")
+
+        if self.cache_max_ttl_seconds <= 0:
+            errors.append("cache_max_ttl_secondsは正の値である必要があります")
+
+        if self.cache_cleanup_batch_size <= 0:
+            errors.append("cache_cleanup_batch_sizeは正の値である必要があります")
+
+        if self.cache_cleanup_pause_ms < 0:
+            errors.append("cache_cleanup_pause_msは0以上である必要があります")
+
+        if self.vector_save_interval_seconds <= 0:
+            errors.append("vector_save_interval_secondsは正の値である必要があります")
+
+        if self.numpy_ivf_threshold < 0:
+            errors.append("numpy_ivf_thresholdは0以上である必要があります")
+
+        if self.numpy_ivf_nprobe <= 0:
+            errors.append("numpy_ivf_nprobeは正の値である必要があります")
+
         if self.batch_insert_size <= 0:
             errors.append("batch_insert_sizeは正の値である必要があります")
 
+        if self.write_batch_max_delay_ms < 0:
+            errors.append("write_batch_max_delay_msは0以上である必要があります")
+
+        if self.write_queue_max_size <= 0:
+            errors.append("write_queue_max_sizeは正の値である必要があります")
+
+        if self.embedding_cache_max_entries <= 0:
+            errors.append("embedding_cache_max_entriesは正の値である必要があります")
+
+        if self.embedding_cache_max_bytes <= 0:
+            errors.append("embedding_cache_max_bytesは正の値である必要があります")
+
+        if self.embedding_cache_disk_entries <= 0:
+            errors.append("embedding_cache_disk_entriesは正の値である必要があります")
+
+        if self.embedding_batch_size <= 0:
+            errors.append("embedding_batch_sizeは正の値である必要があります")
+
+        if self.embedding_batch_max_delay_ms < 0:
+            errors.append("embedding_batch_max_delay_msは0以上である必要があります")
+
         if self.connection_timeout_seconds <= 0:
             errors.append("connection_timeout_secondsは正の値である必要があります")
 
@@ -205,6 +272,15 @@ class StorageConfig:
                 }
             )
 
+        elif self.vector_store_type == VectorStoreType.NUMPY:
+            base_config.update(
+                {
+                    "ivf_threshold": self.numpy_ivf_threshold,
+                    "ivf_nprobe": self.numpy_ivf_nprobe,
+                    "max_segments": self.numpy_max_segments,
+                }
+            )
+
         elif self.vector_store_type == VectorStoreType.PINECONE:
             base_config.update(
                 {
@@ -227,8 +303,17 @@ class StorageConfig:
             "embedding_cache": {
                 "enabled": self.enable_embedding_cache,
                 "ttl_seconds": self.embedding_cache_ttl_seconds,
+                "max_entries": self.embedding_cache_max_entries,
+                "max_bytes": self.embedding_cache_max_bytes,
+                "path": self.embedding_cache_path,
+                "disk_entries": self.embedding_cache_disk_entries,
             },
             "compression_enabled": self.cache_compression_enabled,
+            "compression_threshold_bytes": self.cache_compression_threshold_bytes,
+            "near_cache": {
+                "ttl_seconds": self.redis_near_cache_ttl_seconds,
+                "max_entries": self.redis_near_cache_max_entries,
+            },
         }
 
     def to_dict(self) -> Dict[str, Any]:
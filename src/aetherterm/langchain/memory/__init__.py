@@ -4,6 +4,12 @@ LangChain統合メモリ管理パッケージ
 
 from .conversation_memory import ConversationMemoryManager
 from .hierarchical_memory import HierarchicalMemoryManager
+from .memory_tiering import MemoryTieringEngine
 from .session_memory import SessionMemoryManager
 
-__all__ = ["ConversationMemoryManager", "HierarchicalMemoryManager", "SessionMemoryManager"]
+__all__ = [
+    "ConversationMemoryManager",
+    "HierarchicalMemoryManager",
+    "MemoryTieringEngine",
+    "SessionMemoryManager",
+]
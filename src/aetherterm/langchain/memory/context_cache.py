@@ -0,0 +1,160 @@
+"""
+セッション毎のコンテキスト取得キャッシュ
+
+タスク毎に行っていた関連コンテキストの取得（最近の会話とハイブリッド検索）の結果を
+(セッションID, クエリ) 毎に保持します。
+
+- セッションに会話が書き込まれると invalidate() でそのセッションの結果をすべて無効にする
+  （セッション毎の世代番号で判定するため、書き込みと並行して取得した結果も使われない）
+- prefetch() はタスクがキューに入った時点で取得をバックグラウンドで始める。取得中の結果は
+  get() が待つため、同じ取得を二重に行わない
+- prefetch() されたクエリは get() で使われるまで覚えておき、その間に無効化された場合は
+  次に使われるもの（最も古いもの）だけを取得し直す（前のタスクの書き込みで、待機中のタスクの
+  準備が無駄にならないように）。書き込みが続く間は rewarm_delay 秒待ってからまとめて1回取得する
+- 覚えておくクエリは TTL を過ぎたもの、キャッシュから追い出されたもの、discard() されたもの
+  （タスクのキャンセルなど）を忘れるため、キャッシュの最大件数を超えて増えない
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (セッションID, クエリ) からコンテキストを取得するコルーチン関数
+ContextLoader = Callable[[str, str], Awaitable[Any]]
+
+
+class SessionContextCache:
+    """
+    コンテキスト取得結果のキャッシュ
+
+    Args:
+        loader: コンテキストを取得するコルーチン関数
+        ttl_seconds: 書き込みがなくても取得し直すまでの時間
+        max_entries: 保持する最大件数（古いものから削除）
+        rewarm_delay: 無効化から prefetch() 済みのクエリを取得し直すまでの時間
+    """
+
+    def __init__(
+        self,
+        loader: ContextLoader,
+        ttl_seconds: float = 300,
+        max_entries: int = 256,
+        rewarm_delay: float = 0.1,
+    ):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.rewarm_delay = rewarm_delay
+
+        # (セッションID, クエリ) -> (世代, 取得開始時刻, 取得結果の Future)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, float, asyncio.Future]]" = (
+            OrderedDict()
+        )
+        self._generations: Dict[str, int] = {}
+        # セッションID -> prefetch() 済みで未使用のクエリ（古い順）と prefetch() の時刻
+        self._wanted: Dict[str, "OrderedDict[str, float]"] = {}
+        self._rewarm_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._stats = {"hits": 0, "misses": 0, "prefetches": 0, "invalidations": 0}
+
+    def _valid(self, key: Tuple[str, str]) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        generation, started, future = entry
+        if generation != self._generations.get(key[0], 0):
+            return False
+        if time.monotonic() - started > self.ttl_seconds:
+            return False
+        # 失敗した取得は使わない
+        return not (future.done() and future.exception() is not None)
+
+    def _load(self, key: Tuple[str, str]) -> asyncio.Future:
+        future = asyncio.ensure_future(self._loader(*key))
+        # 取得失敗を「取得されなかった例外」として記録させない
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._entries[key] = (self._generations.get(key[0], 0), time.monotonic(), future)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._forget(*evicted)
+        return future
+
+    def _forget(self, session_id: str, query: str) -> None:
+        wanted = self._wanted.get(session_id)
+        if wanted is not None:
+            wanted.pop(query, None)
+            if not wanted:
+                del self._wanted[session_id]
+
+    def _next_wanted(self, session_id: str) -> Optional[str]:
+        """次に使われる prefetch() 済みのクエリ（TTL を過ぎたものは忘れる）"""
+        wanted = self._wanted.get(session_id)
+        if wanted is None:
+            return None
+        expires = time.monotonic() - self.ttl_seconds
+        for query, prefetched_at in list(wanted.items()):
+            if prefetched_at >= expires:
+                return query
+            self._forget(session_id, query)
+        return None
+
+    async def get(self, session_id: str, query: str) -> Any:
+        """コンテキストを取得（有効なキャッシュか取得中の結果があればそれを使う）"""
+        key = (session_id, query)
+        self._forget(session_id, query)
+        if self._valid(key):
+            self._stats["hits"] += 1
+            self._entries.move_to_end(key)
+            future = self._entries[key][2]
+        else:
+            self._stats["misses"] += 1
+            future = self._load(key)
+        return await asyncio.shield(future)
+
+    def prefetch(self, session_id: str, query: str) -> None:
+        """コンテキストの取得をバックグラウンドで開始（既に有効な結果があれば何もしない）"""
+        key = (session_id, query)
+        if not self._valid(key):
+            self._stats["prefetches"] += 1
+            self._load(key)
+        wanted = self._wanted.setdefault(session_id, OrderedDict())
+        wanted[query] = time.monotonic()
+
+    def discard(self, session_id: str, query: str) -> None:
+        """prefetch() したクエリを使わなくなった（タスクのキャンセルなど）"""
+        self._forget(session_id, query)
+
+    def invalidate(self, session_id: str) -> None:
+        """セッションの結果を無効化（次に使われる prefetch() 済みのクエリは取得し直す）"""
+        self._generations[session_id] = self._generations.get(session_id, 0) + 1
+        self._stats["invalidations"] += 1
+
+        handle = self._rewarm_handles.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+        if self._next_wanted(session_id) is not None:
+            loop = asyncio.get_running_loop()
+            self._rewarm_handles[session_id] = loop.call_later(
+                self.rewarm_delay, self._rewarm, session_id
+            )
+
+    def _rewarm(self, session_id: str) -> None:
+        self._rewarm_handles.pop(session_id, None)
+        query = self._next_wanted(session_id)
+        if query is not None and not self._valid((session_id, query)):
+            self._stats["prefetches"] += 1
+            self._load((session_id, query))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュ統計を取得"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "prefetched_queries": sum(len(wanted) for wanted in self._wanted.values()),
+        }
@@ -4,13 +4,13 @@
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from ..config.langchain_config import LangChainConfig
 from ..config.memory_config import MemoryConfig, MemoryStrategy
 from ..models.conversation import ConversationEntry, ConversationType, MessageRole
-from ..models.memory import MemoryEntry, MemoryType
+from ..models.memory import MemoryType
+from .context_cache import SessionContextCache
 from .hierarchical_memory import HierarchicalMemoryManager
 
 logger = logging.getLogger(__name__)
@@ -41,6 +41,13 @@ class ConversationMemoryManager:
         self.hierarchical_memory = hierarchical_memory_manager
         self._logger = logger
 
+        # エージェントのタスク毎のコンテキスト取得結果（会話の書き込みで無効化）
+        self.context_cache = SessionContextCache(
+            self._load_context,
+            ttl_seconds=memory_config.context_cache_ttl_seconds,
+            max_entries=memory_config.context_cache_max_entries,
+        )
+
     async def store_conversation(
         self,
         session_id: str,
@@ -89,43 +96,9 @@ class ConversationMemoryManager:
                 confidence_score=confidence_score,
             )
 
-            # ConversationEntryをMemoryEntryに変換し、階層化メモリに保存
-            memory_entry = MemoryEntry(
-                id=entry.id,
-                session_id=entry.session_id,
-                memory_type=MemoryType.MEDIUM_TERM,  # 会話は中期メモリに保存
-                content=entry.content,
-                content_type="text",
-                priority=self._determine_priority(conversation_type),
-                metadata=entry.to_dict(),  # ConversationEntry全体をメタデータとして保存
-                created_at=entry.timestamp,
-                updated_at=entry.timestamp,
-                accessed_at=entry.timestamp,
-                embedding=entry.embedding,  # 埋め込みはHierarchicalMemoryManagerで生成される
-                embedding_model=self.langchain_config.embedding_model,
-            )
-
-            # 短期メモリにも保存（Redis）
-            short_term_memory_entry = MemoryEntry(
-                id=entry.id,
-                session_id=entry.session_id,
-                memory_type=MemoryType.SHORT_TERM,
-                content=entry.content,
-                content_type="text",
-                priority=self._determine_priority(conversation_type),
-                metadata=entry.to_dict(),
-                created_at=entry.timestamp,
-                updated_at=entry.timestamp,
-                accessed_at=entry.timestamp,
-                expires_at=datetime.utcnow()
-                + timedelta(seconds=self.memory_config.short_term_ttl_seconds),
-            )
-
-            # 並列で保存
-            await asyncio.gather(
-                self.hierarchical_memory.store_memory_entry(memory_entry),
-                self.hierarchical_memory.store_memory_entry(short_term_memory_entry),
-            )
+            # 正本をSQLに1回だけ書き込み、Redisには最近の会話として射影だけを保存
+            await self.hierarchical_memory.store_conversations([entry])
+            self.context_cache.invalidate(session_id)
 
             self._logger.info(f"会話エントリを保存しました: {entry.id} (session: {session_id})")
             return str(entry.id)
@@ -226,6 +199,84 @@ class ConversationMemoryManager:
             self._logger.error(f"類似会話検索中にエラーが発生: {e}")
             return []
 
+    async def get_context(self, session_id: str, query: str) -> Dict[str, Any]:
+        """
+        タスクのコンテキスト（最近の会話と関連メモリ）を取得します。
+
+        セッションに会話が書き込まれるまでは、同じクエリに対して前回の結果
+        （prefetch_context() で取得中の結果を含む）を再利用します。
+
+        Args:
+            session_id: セッションID。
+            query: 関連メモリの検索クエリ（タスクの説明など）。
+
+        Returns:
+            Dict[str, Any]: recent_conversations（古い順）と relevant_memories（関連度順）。
+        """
+        return await self.context_cache.get(session_id, query)
+
+    def prefetch_context(self, session_id: str, query: str) -> None:
+        """
+        get_context() の結果をバックグラウンドで取得しておきます（タスクのキュー投入時など）。
+
+        Args:
+            session_id: セッションID。
+            query: 関連メモリの検索クエリ。
+        """
+        self.context_cache.prefetch(session_id, query)
+
+    def discard_prefetched_context(self, session_id: str, query: str) -> None:
+        """
+        prefetch_context() した取得を使わなくなったことを伝えます（タスクのキャンセル時など）。
+
+        Args:
+            session_id: セッションID。
+            query: prefetch_context() に渡したクエリ。
+        """
+        self.context_cache.discard(session_id, query)
+
+    async def _load_context(self, session_id: str, query: str) -> Dict[str, Any]:
+        """最近の会話とハイブリッド検索の結果を並行して取得"""
+        recent_conversations, relevant_memories = await asyncio.gather(
+            self._load_recent_conversations(session_id),
+            self._load_relevant_memories(session_id, query),
+        )
+        return {
+            "recent_conversations": recent_conversations,
+            "relevant_memories": relevant_memories,
+        }
+
+    async def _load_recent_conversations(self, session_id: str) -> List[ConversationEntry]:
+        limit = self.memory_config.context_recent_limit
+        if limit == 0:
+            return []
+        try:
+            # 最近の会話はRedisのリストから取得し、キャッシュにない場合のみSQLを参照
+            conversations = await self.hierarchical_memory.redis_storage.get_recent_conversations(
+                session_id, limit
+            )
+            if not conversations:
+                conversations = await self.hierarchical_memory.sql_storage.retrieve_conversations(
+                    session_id=session_id, limit=limit
+                )
+        except Exception as e:
+            self._logger.warning(f"最近の会話の取得に失敗: {e}")
+            return []
+        # どちらも新しい順のため、古い順に並べ直す
+        return list(reversed(conversations))
+
+    async def _load_relevant_memories(self, session_id: str, query: str) -> List[Any]:
+        limit = self.memory_config.context_relevant_limit
+        if limit == 0 or not query.strip():
+            return []
+        try:
+            return await self.hierarchical_memory.get_context_entries(
+                query, session_id=session_id, limit=limit, strategy=MemoryStrategy.HYBRID
+            )
+        except Exception as e:
+            self._logger.warning(f"関連メモリの検索に失敗: {e}")
+            return []
+
     async def cleanup_old_conversations(self) -> int:
         """
         設定された保持日数に基づいて古い会話データをクリーンアップします。
@@ -270,11 +321,3 @@ class ConversationMemoryManager:
         except Exception as e:
             self._logger.error(f"会話統計情報取得中にエラーが発生: {e}")
             return {"error": str(e)}
-
-    def _determine_priority(self, conversation_type: ConversationType) -> MemoryType:
-        """会話タイプに基づいてメモリ優先度を決定します。"""
-        if conversation_type in [ConversationType.ERROR_MESSAGE, ConversationType.SYSTEM_MESSAGE]:
-            return MemoryType.LONG_TERM  # 重要な情報は長期メモリへ
-        if conversation_type == ConversationType.USER_INPUT:
-            return MemoryType.MEDIUM_TERM
-        return MemoryType.SHORT_TERM  # AI応答やコマンド実行は短期・中期で十分な場合が多い
@@ -6,9 +6,11 @@ import asyncio
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
+from uuid import UUID
 
 from ..config.langchain_config import LangChainConfig
 from ..config.memory_config import MemoryConfig, MemoryStrategy
+from ..models.conversation import ConversationEntry
 from ..models.memory import (
     ContextEntry,
     MemoryEntry,
@@ -19,6 +21,7 @@ from ..models.memory import (
 from ..storage.redis_adapter import RedisStorageAdapter
 from ..storage.sql_adapter import SQLStorageAdapter
 from ..storage.vector_adapter import VectorStoreAdapter
+from .memory_tiering import MemoryTieringEngine, Summarizer
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +39,7 @@ class HierarchicalMemoryManager:
         redis_storage: RedisStorageAdapter,
         sql_storage: SQLStorageAdapter,
         vector_storage: VectorStoreAdapter,
+        summarizer: Optional[Summarizer] = None,
     ):
         """
         初期化
@@ -46,6 +50,7 @@ class HierarchicalMemoryManager:
             redis_storage: Redisストレージアダプター（短期メモリ）
             sql_storage: SQLストレージアダプター（中期メモリ）
             vector_storage: ベクトルストレージアダプター（長期メモリ）
+            summarizer: 古い会話を長期メモリに移すときの要約関数（省略時は簡易要約）
         """
         self.langchain_config = langchain_config
         self.memory_config = memory_config
@@ -54,6 +59,11 @@ class HierarchicalMemoryManager:
         self.vector_storage = vector_storage
         self._logger = logger
 
+        # アクセス頻度に基づく階層間の移動
+        self.tiering = MemoryTieringEngine(
+            memory_config, redis_storage, sql_storage, vector_storage, summarizer=summarizer
+        )
+
         self._is_initialized = False
 
     async def initialize(self) -> None:
@@ -73,6 +83,8 @@ class HierarchicalMemoryManager:
                 self.vector_storage.connect(),
             )
             self._is_initialized = True
+            if self.memory_config.tiering_enabled:
+                self.tiering.start()
             self._logger.info("HierarchicalMemoryManagerの初期化が完了しました。")
         except Exception as e:
             self._logger.error(f"HierarchicalMemoryManagerの初期化に失敗: {e}")
@@ -89,6 +101,7 @@ class HierarchicalMemoryManager:
         self._logger.info("HierarchicalMemoryManagerをシャットダウン中...")
 
         try:
+            await self.tiering.stop()
             await asyncio.gather(
                 self.redis_storage.disconnect(),
                 self.sql_storage.disconnect(),
@@ -120,7 +133,9 @@ class HierarchicalMemoryManager:
                     self._get_memory_key(entry),
                     entry.to_dict(),
                     ttl_seconds=self.memory_config.short_term_ttl_seconds,
+                    group=entry.session_id,
                 )
+                self.tiering.record_write(entry)
                 self._logger.debug(f"短期メモリに保存: {entry.id}")
             elif entry.memory_type == MemoryType.MEDIUM_TERM:
                 # SQLに保存
@@ -135,7 +150,8 @@ class HierarchicalMemoryManager:
                     content_id=str(entry.id),
                     content=entry.content,
                     embedding=entry.embedding,
-                    metadata=entry.metadata,
+                    # 検索結果からエントリを復元できるようにセッションIDも保存する
+                    metadata={**entry.metadata, "session_id": entry.session_id},
                 )
                 self._logger.debug(f"長期メモリに保存: {entry.id}")
             else:
@@ -148,6 +164,34 @@ class HierarchicalMemoryManager:
             )
             raise
 
+    async def store_conversations(self, entries: List[ConversationEntry]) -> List[str]:
+        """
+        会話エントリをまとめて保存します。
+
+        会話の正本は中期メモリ（SQL）に1回だけ書き込み、短期メモリ（Redis）には
+        最近の会話リストに軽量な射影を1回のパイプラインで追加します。
+
+        Args:
+            entries: 保存する会話エントリ（古い順）。
+
+        Returns:
+            List[str]: 保存されたエントリのID。
+        """
+        if not self._is_initialized:
+            raise RuntimeError("MemoryManagerが初期化されていません。")
+
+        entry_ids, cached = await asyncio.gather(
+            self.sql_storage.store_conversations(entries),
+            self.redis_storage.cache_recent_conversations(entries),
+            return_exceptions=True,
+        )
+        if isinstance(entry_ids, Exception):
+            raise entry_ids
+        if isinstance(cached, Exception):
+            # 正本は保存済みのため、キャッシュの失敗では呼び出し元を失敗させない
+            self._logger.warning(f"最近の会話のキャッシュに失敗: {cached}")
+        return entry_ids
+
     async def retrieve_memory_entry(
         self, entry_id: str, memory_type: MemoryType
     ) -> Optional[MemoryEntry]:
@@ -166,23 +210,31 @@ class HierarchicalMemoryManager:
 
         try:
             data = None
-            if memory_type == MemoryType.SHORT_TERM:
-                data = await self.redis_storage.get(
-                    self._get_memory_key_by_id(entry_id, memory_type)
-                )
-            elif memory_type == MemoryType.MEDIUM_TERM:
-                data = await self.sql_storage.retrieve_memory_entry(entry_id)
-            elif memory_type == MemoryType.LONG_TERM:
-                # 長期メモリからは直接IDで取得する機能は通常提供されない（検索が主）
-                # ここでは簡易的に、SQLから取得できると仮定
-                data = await self.sql_storage.retrieve_memory_entry(entry_id)
-
-            if data:
-                if isinstance(data, dict):
-                    return MemoryEntry.from_dict(data)
-                if isinstance(data, MemoryEntry):
-                    return data
-            return None
+            # 短期キャッシュにある（昇格した）エントリはキャッシュから取得
+            cached_key = self.tiering.cached_key(entry_id)
+            if cached_key and memory_type != MemoryType.LONG_TERM:
+                data = await self.redis_storage.get(cached_key)
+
+            if data is None:
+                if memory_type == MemoryType.SHORT_TERM:
+                    data = await self.redis_storage.get(
+                        self._get_memory_key_by_id(entry_id, memory_type)
+                    )
+                elif memory_type == MemoryType.MEDIUM_TERM:
+                    data = await self.sql_storage.retrieve_memory_entry(entry_id)
+                elif memory_type == MemoryType.LONG_TERM:
+                    # 長期メモリからは直接IDで取得する機能は通常提供されない（検索が主）
+                    # ここでは簡易的に、SQLから取得できると仮定
+                    data = await self.sql_storage.retrieve_memory_entry(entry_id)
+
+            entry = None
+            if isinstance(data, dict):
+                entry = MemoryEntry.from_dict(data)
+            elif isinstance(data, MemoryEntry):
+                entry = data
+            if entry is not None:
+                self.tiering.record_access([entry])
+            return entry
         except Exception as e:
             self._logger.error(f"メモリエントリの取得に失敗 ({entry_id}, {memory_type.value}): {e}")
             return None
@@ -245,6 +297,7 @@ class HierarchicalMemoryManager:
 
         # 最終的な結果を制限
         final_results = unique_results[:limit]
+        self.tiering.record_access(final_results)
 
         end_time = datetime.utcnow()
         search_time_ms = int((end_time - start_time).total_seconds() * 1000)
@@ -291,21 +344,22 @@ class HierarchicalMemoryManager:
         self, query: str, session_id: Optional[str], limit: int
     ) -> List[MemoryEntry]:
         """中期メモリ（SQL）を検索"""
-        # SQLStorageAdapterのsearch_conversationsを呼び出す
-        conversations = await self.sql_storage.search_conversations(
+        # 全文検索インデックスによる関連度順の検索
+        conversations = await self.sql_storage.search_conversations_ranked(
             query=query, session_id=session_id, limit=limit
         )
 
         entries = []
-        for conv in conversations:
+        for conv, score in conversations:
             entries.append(
                 MemoryEntry(
                     id=conv.id,
                     session_id=conv.session_id,
                     memory_type=MemoryType.MEDIUM_TERM,
                     content=conv.content,
+                    metadata=conv.to_dict(),
                     created_at=conv.timestamp,
-                    relevance_score=0.6,  # 中程度の関連度を仮定
+                    relevance_score=score,
                 )
             )
         return entries
@@ -318,23 +372,47 @@ class HierarchicalMemoryManager:
         if session_id:
             filters["session_id"] = session_id
 
-        results = await self.vector_storage.similarity_search(
+        # 本文とメタデータも検索結果と一緒に受け取る
+        results = await self.vector_storage.similarity_search_documents(
             query=query, limit=limit, threshold=threshold, filters=filters
         )
+        if not results:
+            return []
+
+        # SQLに元のエントリがあるものは1回のクエリでまとめて取得
+        originals = await self.sql_storage.retrieve_many(
+            [doc.metadata["content_id"] for doc, _ in results if "content_id" in doc.metadata]
+        )
 
         entries = []
-        for content_id, score in results:
-            # ここではcontent_idから元のコンテンツを復元する必要がある
-            # 簡易的に、SQLから取得できると仮定
-            original_entry = await self.sql_storage.retrieve_memory_entry(content_id)
-            if original_entry:
+        for doc, score in results:
+            content_id = doc.metadata.get("content_id")
+            original = originals.get(content_id) if content_id else None
+            if original:
+                entries.append(
+                    MemoryEntry(
+                        id=original.id,
+                        session_id=original.session_id,
+                        memory_type=MemoryType.LONG_TERM,
+                        content=original.content,
+                        metadata=original.metadata,
+                        created_at=original.created_at,
+                        relevance_score=score,
+                    )
+                )
+            elif content_id:
+                # ベクトルストアにのみ保存された長期メモリはドキュメントから復元
+                created_at = doc.metadata.get("created_at") or doc.metadata.get("timestamp")
                 entries.append(
                     MemoryEntry(
-                        id=original_entry.id,
-                        session_id=original_entry.session_id,
+                        id=content_id,
+                        session_id=doc.metadata.get("session_id", ""),
                         memory_type=MemoryType.LONG_TERM,
-                        content=original_entry.content,
-                        created_at=original_entry.created_at,
+                        content=doc.page_content,
+                        metadata=dict(doc.metadata),
+                        created_at=(
+                            datetime.fromisoformat(created_at) if created_at else datetime.utcnow()
+                        ),
                         relevance_score=score,
                     )
                 )
@@ -435,7 +513,9 @@ class HierarchicalMemoryManager:
         else:
             self._logger.warning(f"Vector Store統計情報の取得に失敗: {vector_stats}")
 
-        # TODO: 平均関連度スコア、最もアクセスされたエントリ、最古/最新エントリの計算
+        stats.most_accessed_entries = [UUID(entry_id) for entry_id in self.tiering.most_accessed()]
+
+        # TODO: 平均関連度スコア、最古/最新エントリの計算
 
         self._logger.info(f"メモリ統計情報を取得しました: {stats.total_entries}件")
         return stats
@@ -462,17 +542,19 @@ class HierarchicalMemoryManager:
         deleted_counts[MemoryType.SHORT_TERM.value] += await self.redis_storage.cleanup_old_cache()
 
         # 中期メモリのクリーンアップ
-        deleted_counts[
-            MemoryType.MEDIUM_TERM.value
-        ] += await self.sql_storage.delete_old_conversations(self.memory_config.medium_term_days)
+        deleted_ids = await self.sql_storage.delete_old_conversation_ids(
+            self.memory_config.medium_term_days, batch_size=self.memory_config.cleanup_batch_size
+        )
+        deleted_counts[MemoryType.MEDIUM_TERM.value] += len(deleted_ids)
 
         # 長期メモリのクリーンアップ (Vector Store)
-        # Vector Storeのクリーンアップは、SQLの会話IDに基づいて行う
-        # TODO: SQLから古い会話IDを取得し、それらの埋め込みをVector Storeから削除するロジックが必要
-        # 現状はSQLの削除件数を長期メモリの削除件数として仮定
-        deleted_counts[MemoryType.LONG_TERM.value] += await self.vector_storage.delete_embeddings(
-            []
-        )  # ダミー呼び出し
+        # 削除した会話と同じIDで保存された埋め込みと、短期キャッシュの複製も削除する
+        for start in range(0, len(deleted_ids), self.memory_config.cleanup_batch_size):
+            batch = deleted_ids[start : start + self.memory_config.cleanup_batch_size]
+            deleted_counts[
+                MemoryType.LONG_TERM.value
+            ] += await self.vector_storage.delete_embeddings(batch)
+        await self.tiering.forget(deleted_ids)
 
         self._logger.info(f"古いメモリのクリーンアップが完了しました: {deleted_counts}")
         return deleted_counts
@@ -0,0 +1,504 @@
+"""
+階層化メモリのティアリングエンジン
+
+アクセス頻度に基づいてメモリエントリを階層間で移動します。
+
+- ヒート: アクセスの度に1加算され、tiering_heat_half_life_seconds で半減する値
+- 昇格: ヒートが tiering_promote_heat 以上の中期メモリ（SQL）を短期キャッシュ（Redis）に複製
+- 降格: ヒートが tiering_demote_heat を下回った複製をキャッシュから外す。短期メモリとして
+  保存されたエントリは作成から tiering_demote_after_seconds 経つと、TTLで失われる前に
+  中期メモリへ移す（ヒートが高ければ同じ実行の昇格でキャッシュに戻る）
+- アーカイブ: tiering_archive_after_days より古い会話をセッション毎に要約し、埋め込みを
+  まとめて生成して長期メモリ（ベクトルストア）に保存
+- 予算: 短期キャッシュの複製は max_short_term_entries 件・tiering_short_term_budget_bytes
+  以内とし、超える場合はヒートの低いものから追い出す。1回の実行で生成する埋め込みは
+  tiering_max_embeddings_per_run 件までとし、長期メモリが max_long_term_entries 件に
+  達している場合はアーカイブしない
+
+アクセス統計はプロセス内に tiering_max_tracked_entries 件まで保持します（LRU）。
+アーカイブ済みの位置はRedisに記録し、再起動後はそこから続けます。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import NAMESPACE_URL, uuid5
+
+from ..config.memory_config import MemoryConfig
+from ..models.conversation import ConversationEntry
+from ..models.memory import MemoryEntry, MemoryType
+
+logger = logging.getLogger(__name__)
+
+# 最後にアーカイブした会話の時刻とIDを保存するキャッシュキー
+ARCHIVE_WATERMARK_KEY = "tiering:archive_watermark"
+
+# 会話のリストから要約を作るコルーチン関数（LLMによる要約など）
+Summarizer = Callable[[List[ConversationEntry]], Awaitable[str]]
+
+
+def memory_cache_key(session_id: str, entry_id: str) -> str:
+    """短期キャッシュ（Redis）上のメモリエントリのキー"""
+    return f"{MemoryType.SHORT_TERM.value}:{session_id}:{entry_id}"
+
+
+@dataclass
+class _TrackedEntry:
+    """エントリ毎のアクセス統計"""
+
+    session_id: str
+    memory_type: MemoryType
+    size_bytes: int
+    created_at: float
+    heat: float = 0.0
+    access_count: int = 0
+    last_access: float = 0.0
+    promoted_until: float = 0.0  # 中期メモリの複製が短期キャッシュにある期限
+
+    def heat_at(self, now: float, half_life: float) -> float:
+        if not self.heat:
+            return 0.0
+        return self.heat * 0.5 ** ((now - self.last_access) / half_life)
+
+    def is_promoted(self, now: float) -> bool:
+        return self.promoted_until > now
+
+
+class MemoryTieringEngine:
+    """
+    メモリエントリを階層間で移動するバックグラウンドエンジン
+
+    Args:
+        memory_config: メモリ設定
+        redis_storage: 短期メモリ（RedisStorageAdapter）
+        sql_storage: 中期メモリ（SQLStorageAdapter）
+        vector_storage: 長期メモリ（VectorStoreAdapter）
+        summarizer: アーカイブ時の要約関数（Noneの場合は各発言を切り詰めて連結する）
+    """
+
+    def __init__(
+        self,
+        memory_config: MemoryConfig,
+        redis_storage,
+        sql_storage,
+        vector_storage,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        self.memory_config = memory_config
+        self.redis_storage = redis_storage
+        self.sql_storage = sql_storage
+        self.vector_storage = vector_storage
+        self.summarizer = summarizer
+
+        self._entries: "OrderedDict[str, _TrackedEntry]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # 最後にアーカイブした会話の (timestamp, id)
+        self._archive_watermark: Optional[Tuple[datetime, str]] = None
+        self._stats = {
+            "runs": 0,
+            "promoted": 0,
+            "demoted": 0,
+            "evicted": 0,
+            "archived_conversations": 0,
+            "summaries": 0,
+        }
+
+    # アクセスの記録
+
+    def record_write(self, entry: MemoryEntry) -> None:
+        """短期メモリとして保存されたエントリを記録（降格の対象にする）"""
+        if entry.memory_type != MemoryType.SHORT_TERM:
+            return
+        self._track(
+            str(entry.id),
+            _TrackedEntry(
+                session_id=entry.session_id,
+                memory_type=MemoryType.SHORT_TERM,
+                size_bytes=len(entry.content.encode("utf-8")),
+                created_at=time.time(),
+            ),
+        )
+
+    def record_access(self, entries: List[MemoryEntry]) -> None:
+        """
+        検索・取得で返したエントリのアクセスを記録
+
+        エントリの access_count と accessed_at も更新します。
+        """
+        now = time.time()
+        half_life = self.memory_config.tiering_heat_half_life_seconds
+        for entry in entries:
+            entry_id = str(entry.id)
+            tracked = self._entries.get(entry_id)
+            if tracked is None:
+                # 昇格できるのはSQLに元のエントリがある中期メモリだけ
+                if entry.memory_type != MemoryType.MEDIUM_TERM:
+                    entry.accessed_at = datetime.utcnow()
+                    entry.access_count += 1
+                    continue
+                tracked = _TrackedEntry(
+                    session_id=entry.session_id,
+                    memory_type=MemoryType.MEDIUM_TERM,
+                    size_bytes=len(entry.content.encode("utf-8")),
+                    created_at=now,
+                )
+                self._track(entry_id, tracked)
+            else:
+                self._entries.move_to_end(entry_id)
+
+            tracked.heat = tracked.heat_at(now, half_life) + 1.0
+            tracked.last_access = now
+            tracked.access_count += 1
+            entry.accessed_at = datetime.utcnow()
+            entry.access_count = tracked.access_count
+
+    def _track(self, entry_id: str, tracked: _TrackedEntry) -> None:
+        self._entries[entry_id] = tracked
+        self._entries.move_to_end(entry_id)
+        # 追い出したエントリの複製はTTLで消える
+        while len(self._entries) > self.memory_config.tiering_max_tracked_entries:
+            self._entries.popitem(last=False)
+
+    def cached_key(self, entry_id: str) -> Optional[str]:
+        """エントリが短期キャッシュにある場合はそのキーを返す"""
+        tracked = self._entries.get(str(entry_id))
+        if tracked is None:
+            return None
+        if tracked.memory_type == MemoryType.SHORT_TERM or tracked.is_promoted(time.time()):
+            return memory_cache_key(tracked.session_id, str(entry_id))
+        return None
+
+    def most_accessed(self, limit: int = 10) -> List[str]:
+        """ヒートの高い順のエントリID"""
+        now = time.time()
+        half_life = self.memory_config.tiering_heat_half_life_seconds
+        ranked = sorted(
+            self._entries.items(), key=lambda item: item[1].heat_at(now, half_life), reverse=True
+        )
+        return [entry_id for entry_id, tracked in ranked[:limit] if tracked.heat]
+
+    # ティアリング
+
+    def start(self) -> None:
+        """tiering_interval_seconds 毎に run_once() を実行するタスクを開始"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self) -> None:
+        """定期実行を停止"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.memory_config.tiering_interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"メモリのティアリングに失敗: {e}")
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        降格・昇格・アーカイブを1回実行
+
+        Returns:
+            Dict[str, int]: 今回の移動件数（promoted, demoted, evicted, archived_conversations,
+            summaries）
+        """
+        async with self._lock:
+            result = {"promoted": 0, "demoted": 0, "evicted": 0}
+            result["demoted"] = await self._demote()
+            result["promoted"], result["evicted"] = await self._promote()
+            result.update(await self._archive())
+
+            self._stats["runs"] += 1
+            for name, count in result.items():
+                self._stats[name] += count
+            if any(result.values()):
+                logger.info(f"メモリのティアリングを実行しました: {result}")
+            return result
+
+    async def _demote(self) -> int:
+        """冷えた複製をキャッシュから外し、古くなった短期メモリを中期メモリへ移す"""
+        now = time.time()
+        half_life = self.memory_config.tiering_heat_half_life_seconds
+
+        cold = [
+            entry_id
+            for entry_id, tracked in self._entries.items()
+            if tracked.is_promoted(now)
+            and tracked.heat_at(now, half_life) < self.memory_config.tiering_demote_heat
+        ]
+        demoted = await self._evict(cold)
+
+        aged = {
+            entry_id: memory_cache_key(tracked.session_id, entry_id)
+            for entry_id, tracked in self._entries.items()
+            if tracked.memory_type == MemoryType.SHORT_TERM
+            and now - tracked.created_at >= self.memory_config.tiering_demote_after_seconds
+        }
+        if not aged:
+            return demoted
+
+        values = await self.redis_storage.get_many(list(aged.values()))
+        # 中期メモリにも書き込まれているエントリ（会話など）は移さずにキャッシュから外す
+        existing = await self.sql_storage.retrieve_many(list(aged))
+        entries = []
+        for entry_id, cache_key in aged.items():
+            data = values.get(cache_key)
+            if isinstance(data, dict) and entry_id not in existing:
+                entry = MemoryEntry.from_dict(data)
+                entry.memory_type = MemoryType.MEDIUM_TERM
+                entries.append(entry)
+
+        # 中期メモリへの書き込みに失敗した場合は短期メモリに残す
+        await self.sql_storage.store_memory_entries(entries)
+        await self.redis_storage.delete_many(list(aged.values()))
+
+        stored = {str(entry.id) for entry in entries} | set(existing)
+        for entry_id in aged:
+            # 待機中に記録件数の上限で追い出されたエントリは記録し直さない
+            tracked = self._entries.get(entry_id)
+            if tracked is None:
+                continue
+            if entry_id in stored:
+                tracked.memory_type = MemoryType.MEDIUM_TERM
+            else:
+                # TTLで既に消えていた
+                del self._entries[entry_id]
+        return demoted + len(stored)
+
+    async def _evict(self, entry_ids: List[str]) -> int:
+        """複製を短期キャッシュから削除"""
+        cache_keys = []
+        for entry_id in entry_ids:
+            tracked = self._entries.get(entry_id)
+            if tracked is not None:
+                cache_keys.append(memory_cache_key(tracked.session_id, entry_id))
+        if not cache_keys:
+            return 0
+        await self.redis_storage.delete_many(cache_keys)
+        for entry_id in entry_ids:
+            tracked = self._entries.get(entry_id)
+            if tracked is not None:
+                tracked.promoted_until = 0.0
+        return len(cache_keys)
+
+    async def _promote(self) -> Tuple[int, int]:
+        """ヒートの高い中期メモリを予算内で短期キャッシュに複製"""
+        now = time.time()
+        config = self.memory_config
+        half_life = config.tiering_heat_half_life_seconds
+
+        candidates = []
+        cached = []
+        used_entries = 0
+        used_bytes = 0
+        for entry_id, tracked in self._entries.items():
+            heat = tracked.heat_at(now, half_life)
+            if tracked.is_promoted(now):
+                cached.append((heat, entry_id))
+                used_entries += 1
+                used_bytes += tracked.size_bytes
+            elif tracked.memory_type == MemoryType.SHORT_TERM:
+                used_entries += 1
+                used_bytes += tracked.size_bytes
+            elif heat >= config.tiering_promote_heat:
+                candidates.append((heat, entry_id))
+        if not candidates:
+            return 0, 0
+
+        candidates.sort(reverse=True)
+        cached.sort()  # 冷えている順
+
+        def over_budget(size: int) -> bool:
+            return (
+                used_entries + 1 > config.max_short_term_entries
+                or used_bytes + size > config.tiering_short_term_budget_bytes
+            )
+
+        selected: List[str] = []
+        victims: List[str] = []
+        for heat, entry_id in candidates:
+            size = self._entries[entry_id].size_bytes
+            # 候補より冷えている複製だけを追い出す
+            while over_budget(size) and cached and cached[0][0] < heat:
+                _, victim = cached.pop(0)
+                victims.append(victim)
+                used_entries -= 1
+                used_bytes -= self._entries[victim].size_bytes
+            if over_budget(size):
+                break
+            selected.append(entry_id)
+            used_entries += 1
+            used_bytes += size
+
+        evicted = await self._evict(victims)
+        if not selected:
+            return 0, evicted
+
+        originals = await self.sql_storage.retrieve_many(selected)
+        items = []
+        for entry_id in selected:
+            if entry_id not in self._entries:
+                # 待機中に記録件数の上限で追い出された
+                continue
+            original = originals.get(entry_id)
+            if original is None:
+                # SQLから削除済み
+                del self._entries[entry_id]
+                continue
+            cache_key = memory_cache_key(original.session_id, entry_id)
+            items.append((cache_key, original.to_dict(), original.session_id))
+        await self.redis_storage.set_many(items, ttl_seconds=config.short_term_ttl_seconds)
+
+        promoted_until = now + config.short_term_ttl_seconds
+        for entry_id in selected:
+            if entry_id in self._entries:
+                self._entries[entry_id].promoted_until = promoted_until
+        return len(items), evicted
+
+    async def _archive(self) -> Dict[str, int]:
+        """古い会話をセッション毎に要約し、埋め込みをまとめて生成して長期メモリに保存"""
+        config = self.memory_config
+        budget = config.tiering_max_embeddings_per_run
+        if budget <= 0:
+            return {}
+
+        stats = await self.vector_storage.get_embedding_statistics()
+        if stats.get("total_documents", 0) >= config.max_long_term_entries:
+            logger.warning("長期メモリが上限に達しているため会話をアーカイブしません")
+            return {}
+
+        since = await self._load_watermark()
+        until = datetime.utcnow() - timedelta(days=config.tiering_archive_after_days)
+        conversations = await self.sql_storage.retrieve_conversations_between(
+            since[0] if since else None,
+            until,
+            limit=budget * config.tiering_archive_chunk_size,
+            after_id=since[1] if since else None,
+        )
+        if not conversations:
+            return {}
+
+        # 古い順に、セッション毎に最大 tiering_archive_chunk_size 件ずつまとめる
+        chunks: List[List[ConversationEntry]] = []
+        open_chunks: Dict[str, List[ConversationEntry]] = {}
+        watermark = since
+        for conv in conversations:
+            chunk = open_chunks.get(conv.session_id)
+            if chunk is None or len(chunk) >= config.tiering_archive_chunk_size:
+                if len(chunks) >= budget:
+                    break
+                chunk = open_chunks[conv.session_id] = []
+                chunks.append(chunk)
+            chunk.append(conv)
+            watermark = (conv.timestamp, str(conv.id))
+
+        summaries = await asyncio.gather(*(self._summarize(chunk) for chunk in chunks))
+        embeddings = await self.vector_storage.generate_embeddings(list(summaries))
+        await self.vector_storage.store_embeddings(
+            [
+                (self._archive_id(chunk), summary, embedding, self._archive_metadata(chunk))
+                for chunk, summary, embedding in zip(chunks, summaries, embeddings)
+            ]
+        )
+        await self._save_watermark(watermark)
+
+        return {
+            "archived_conversations": sum(len(chunk) for chunk in chunks),
+            "summaries": len(chunks),
+        }
+
+    async def _summarize(self, chunk: List[ConversationEntry]) -> str:
+        if self.summarizer is not None:
+            return await self.summarizer(chunk)
+
+        max_chars = self.memory_config.tiering_archive_max_chars
+        per_line = max(max_chars // len(chunk), 40)
+        lines = []
+        for conv in chunk:
+            content = " ".join(conv.content.split())
+            if len(content) > per_line:
+                content = content[: per_line - 1] + "…"
+            lines.append(f"{conv.role.value}: {content}")
+        return "\n".join(lines)[:max_chars]
+
+    @staticmethod
+    def _archive_id(chunk: List[ConversationEntry]) -> str:
+        # 同じ会話から作った要約は同じIDにする（再アーカイブ時は置き換え）
+        return str(uuid5(NAMESPACE_URL, f"archive:{chunk[0].session_id}:{chunk[0].id}"))
+
+    @staticmethod
+    def _archive_metadata(chunk: List[ConversationEntry]) -> Dict[str, Any]:
+        return {
+            "session_id": chunk[0].session_id,
+            "source": "tiering_archive",
+            "conversation_count": len(chunk),
+            "created_at": chunk[0].timestamp.isoformat(),
+            "end_time": chunk[-1].timestamp.isoformat(),
+        }
+
+    async def _load_watermark(self) -> Optional[Tuple[datetime, str]]:
+        if self._archive_watermark is None:
+            value = await self.redis_storage.get(ARCHIVE_WATERMARK_KEY)
+            if isinstance(value, dict):
+                self._archive_watermark = (
+                    datetime.fromisoformat(value["timestamp"]),
+                    value["id"],
+                )
+            elif isinstance(value, str):
+                # 時刻だけの以前の形式。同じ時刻の行は読み直す（要約は同じIDで置き換わる）
+                self._archive_watermark = (datetime.fromisoformat(value), "")
+        return self._archive_watermark
+
+    async def _save_watermark(self, watermark: Optional[Tuple[datetime, str]]) -> None:
+        if watermark is None:
+            return
+        self._archive_watermark = watermark
+        timestamp, entry_id = watermark
+        await self.redis_storage.set(
+            ARCHIVE_WATERMARK_KEY, {"timestamp": timestamp.isoformat(), "id": entry_id}
+        )
+
+    # クリーンアップ
+
+    async def forget(self, entry_ids: List[str]) -> None:
+        """
+        削除されたエントリの統計と短期キャッシュの複製を削除
+
+        実行中のティアリングが削除したエントリを昇格しないよう、完了を待ってから削除します。
+        """
+        async with self._lock:
+            now = time.time()
+            cache_keys = []
+            for entry_id in entry_ids:
+                tracked = self._entries.pop(str(entry_id), None)
+                if tracked is not None and tracked.is_promoted(now):
+                    cache_keys.append(memory_cache_key(tracked.session_id, str(entry_id)))
+            await self.redis_storage.delete_many(cache_keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ティアリング統計を取得"""
+        now = time.time()
+        promoted = [tracked for tracked in self._entries.values() if tracked.is_promoted(now)]
+        return {
+            **self._stats,
+            "tracked_entries": len(self._entries),
+            "promoted_entries": len(promoted),
+            "promoted_bytes": sum(tracked.size_bytes for tracked in promoted),
+            "archive_watermark": (
+                self._archive_watermark[0].isoformat() if self._archive_watermark else None
+            ),
+        }
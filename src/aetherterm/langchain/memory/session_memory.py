@@ -185,12 +185,13 @@ class SessionMemoryManager:
                 self.langchain_config.retention_days * 24 * 60
             )  # LangChainConfigの保持日数を分に変換
 
-            deleted_count = await self.hierarchical_memory.sql_storage.cleanup_expired_sessions(
+            expired_session_ids = await self.hierarchical_memory.sql_storage.expire_sessions(
                 timeout_minutes=timeout_minutes
             )
+            deleted_count = len(expired_session_ids)
 
-            # Redisからも古いセッションキャッシュを削除
-            await self.hierarchical_memory.redis_storage.clear_pattern("session:*")
+            # Redisからも期限切れセッションのキャッシュだけを削除（キー空間は走査しない）
+            await self.hierarchical_memory.redis_storage.clear_sessions(expired_session_ids)
 
             self._logger.info(f"期限切れセッションをクリーンアップしました: {deleted_count}件")
             return deleted_count
@@ -0,0 +1,186 @@
+"""
+グループコミットライター
+
+多数の呼び出し元からの書き込みをキューに集め、まとめて1回のトランザクションで
+書き込みます。呼び出し元はエントリ毎の Future で自分の書き込みの完了（または失敗）を
+待つことができます。
+
+- 最初のエントリが届いてから max_delay 秒、または max_batch_size 件たまるまで待ってから書き込む
+- キューは max_queue_size 件までで、満杯の場合 submit() は空きが出るまで待つ（バックプレッシャー）
+- バッチの書き込みに失敗した場合は1件ずつ書き直し、失敗したエントリだけに例外を返す
+- close() はキューに残っているエントリをすべて書き込んでから停止する
+
+write_batch がエントリと同じ順序の結果のリストを返した場合、各エントリの Future には
+対応する結果が設定されます（埋め込み生成のように、まとめて処理して結果を返す用途）。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# キューの終端を表す番兵
+_CLOSE = object()
+
+
+class GroupCommitWriter(Generic[T]):
+    """
+    書き込みをまとめて行うライター
+
+    Args:
+        write_batch: エントリのリストを1回で書き込むコルーチン関数（結果のリストを返してもよい）
+        max_batch_size: 1回に書き込む最大件数
+        max_delay: 最初のエントリからバッチを閉じるまでの最大待ち時間（秒）
+        max_queue_size: キューに保持する最大件数
+        name: ログ出力用の名前
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[T]], Awaitable[Optional[List[Any]]]],
+        max_batch_size: int = 500,
+        max_delay: float = 0.005,
+        max_queue_size: int = 10000,
+        name: str = "writer",
+    ):
+        self._write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_queue_size = max_queue_size
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "fallbacks": 0,
+            "write_time": 0.0,
+        }
+
+    @property
+    def pending(self) -> int:
+        """書き込み待ちの件数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, item: T) -> Any:
+        """
+        エントリを書き込み、完了を待つ
+
+        Returns:
+            Any: write_batch が返したこのエントリの結果（返さない場合はNone）
+
+        Raises:
+            RuntimeError: close() 後に呼び出された場合
+            Exception: このエントリの書き込みに失敗した場合はその例外
+        """
+        return await (await self.enqueue(item))
+
+    async def enqueue(self, item: T) -> "asyncio.Future[Any]":
+        """
+        エントリをキューに入れ、書き込み完了を表す Future を返す
+
+        キューが満杯の場合は空きが出るまで待ちます。
+        """
+        if self._closing:
+            raise RuntimeError(f"{self.name} は停止しています")
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        self._stats["submitted"] += 1
+        return future
+
+    async def _collect(self, first: Tuple[T, asyncio.Future]) -> Tuple[List, bool]:
+        """最初のエントリから max_delay 秒または max_batch_size 件までバッチを集める"""
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            try:
+                queued = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    queued = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if queued is _CLOSE:
+                return batch, True
+            batch.append(queued)
+        return batch, False
+
+    async def _run(self) -> None:
+        """キューからバッチを取り出して書き込む"""
+        closed = False
+        while not closed:
+            first = await self._queue.get()
+            if first is _CLOSE:
+                break
+            batch, closed = await self._collect(first)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        started = time.perf_counter()
+        try:
+            results = await self._write_batch(items)
+        except Exception as e:
+            logger.warning(f"{self.name}: バッチ書き込みに失敗したため1件ずつ書き込みます: {e}")
+            self._stats["fallbacks"] += 1
+            for item, future in batch:
+                try:
+                    item_results = await self._write_batch([item])
+                except Exception as item_error:
+                    self._stats["failed"] += 1
+                    if not future.done():
+                        future.set_exception(item_error)
+                else:
+                    self._stats["written"] += 1
+                    if not future.done():
+                        future.set_result(item_results[0] if item_results is not None else None)
+        else:
+            self._stats["written"] += len(batch)
+            for index, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(results[index] if results is not None else None)
+        finally:
+            self._stats["batches"] += 1
+            self._stats["write_time"] += time.perf_counter() - started
+
+    async def close(self) -> None:
+        """キューに残っているエントリを書き込んでから停止（以降の書き込みはエラーになる）"""
+        self._closing = True
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(_CLOSE)
+        await self._task
+
+        # 停止処理中にキューに入ったエントリは書き込まれない
+        while not self._queue.empty():
+            queued = self._queue.get_nowait()
+            if queued is not _CLOSE and not queued[1].done():
+                queued[1].set_exception(RuntimeError(f"{self.name} は停止しています"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """書き込み統計を取得"""
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "pending": self.pending,
+            "average_batch_size": self._stats["written"] / batches if batches else 0.0,
+        }
@@ -0,0 +1,278 @@
+"""
+埋め込みベクトルキャッシュ
+
+テキストのハッシュをキーに埋め込みベクトルを保持する2層のキャッシュです。
+
+- メモリ層: 件数とバイト数の両方に上限があるLRU（float32で保持）
+- ディスク層（任意）: メモリマップした float32 行列と、行ごとのキーを保存したファイル。
+  再起動後も前回の埋め込みを再利用できる。容量に達すると古い行から上書きする（リングバッファ）
+
+ディスク層のファイル構成（path ディレクトリ内）:
+    meta.json       次元数・容量・次に書き込む行
+    vectors.f32     capacity x dimension の float32 行列
+    keys.bin        各行のキー（16バイトのダイジェスト、未使用行はゼロ）
+    checksums.bin   各行のキーとベクトルの CRC32
+
+行を上書きするときはキーを消してから行列を書き、最後にキーを書くため、書き込み途中で
+プロセスが停止してもキーと行列が食い違うことはありません。
+ただし各ファイルは別々のメモリマップなので、OSのクラッシュや電源断ではページ単位で
+一部のファイルの変更だけがディスクに残ることがあります。そのため行ごとのチェックサムを
+読み出し時に確認し、一致しない行は破棄してキャッシュミスとして扱います。
+起動時の索引は keys.bin から作り直します。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 16
+
+
+def embedding_key(text: str, model: str = "") -> bytes:
+    """テキストと埋め込みモデルからキャッシュキーを作成"""
+    digest = hashlib.blake2b(digest_size=KEY_SIZE)
+    digest.update(model.encode())
+    digest.update(b"\0")
+    digest.update(text.encode())
+    return digest.digest()
+
+
+def _row_checksum(key: bytes, vector: "np.ndarray") -> int:
+    """キーと float32 ベクトルのバイト列の CRC32"""
+    return zlib.crc32(vector.tobytes(), zlib.crc32(key))
+
+
+class DiskEmbeddingStore:
+    """
+    メモリマップした埋め込みベクトルの永続ストア
+
+    Args:
+        path: 保存先ディレクトリ
+        capacity: 保存する最大件数
+    """
+
+    def __init__(self, path: str, capacity: int = 100000):
+        if np is None:
+            raise ImportError("numpy パッケージがインストールされていません")
+
+        self.path = Path(path)
+        self.capacity = capacity
+        self.dimension: Optional[int] = None
+        self._vectors = None
+        self._keys = None
+        self._checksums = None
+        self._index: Dict[bytes, int] = {}
+        self._next_row = 0
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load(self) -> None:
+        """既存のストアを開く（なければ最初の書き込み時に作成）"""
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta["capacity"] != self.capacity:
+                logger.info("埋め込みキャッシュの容量が変わったため作り直します")
+                return
+            self._open(meta["dimension"], mode="r+")
+            self._next_row = meta.get("next_row", 0) % self.capacity
+
+            for row in np.flatnonzero(self._keys.any(axis=1)):
+                self._index[self._keys[row].tobytes()] = int(row)
+            logger.info(f"埋め込みキャッシュを読み込みました: {len(self._index)}件")
+        except Exception as e:
+            logger.warning(f"埋め込みキャッシュを読み込めないため作り直します: {e}")
+            self.dimension = None
+            self._vectors = None
+            self._keys = None
+            self._checksums = None
+            self._index.clear()
+            self._next_row = 0
+
+    def _open(self, dimension: int, mode: str) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self._vectors = np.memmap(
+            self.path / "vectors.f32",
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.capacity, dimension),
+        )
+        self._keys = np.memmap(
+            self.path / "keys.bin", dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_SIZE)
+        )
+        self._checksums = np.memmap(
+            self.path / "checksums.bin", dtype=np.uint32, mode=mode, shape=(self.capacity,)
+        )
+
+    def _create(self, dimension: int) -> None:
+        self._open(dimension, mode="w+")
+        self._index.clear()
+        self._next_row = 0
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta_path = self.path / "meta.json"
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "dimension": self.dimension,
+                    "capacity": self.capacity,
+                    "next_row": self._next_row,
+                }
+            )
+        )
+        os.replace(tmp_path, meta_path)
+
+    def get(self, key: bytes) -> Optional["np.ndarray"]:
+        row = self._index.get(key)
+        if row is None:
+            return None
+        vector = np.array(self._vectors[row])
+        if _row_checksum(key, vector) != int(self._checksums[row]):
+            # クラッシュで行列・キー・チェックサムの一部だけがディスクに残った行
+            logger.warning("埋め込みキャッシュの壊れた行を破棄しました")
+            del self._index[key]
+            self._keys[row] = 0
+            return None
+        return vector
+
+    def put(self, key: bytes, vector: "np.ndarray") -> None:
+        if self.dimension != len(vector):
+            if self.dimension is not None:
+                logger.info("埋め込みの次元数が変わったため埋め込みキャッシュを作り直します")
+            self._create(len(vector))
+        if key in self._index:
+            return
+
+        row = self._next_row
+        self._index.pop(self._keys[row].tobytes(), None)
+
+        self._keys[row] = 0
+        self._vectors[row] = vector
+        self._checksums[row] = _row_checksum(key, self._vectors[row])
+        self._keys[row] = np.frombuffer(key, dtype=np.uint8)
+        self._index[key] = row
+        self._next_row = (row + 1) % self.capacity
+
+    def flush(self) -> None:
+        """メモリマップの内容をディスクに書き出す"""
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        self._checksums.flush()
+        self._keys.flush()
+        self._write_meta()
+
+
+class EmbeddingCache:
+    """
+    件数・バイト数上限付きのLRU埋め込みキャッシュ（任意でディスク層付き）
+
+    Args:
+        max_entries: メモリ層に保持する最大件数
+        max_bytes: メモリ層に保持する最大バイト数
+        disk_path: ディスク層の保存先（Noneの場合はメモリ層のみ）
+        disk_capacity: ディスク層に保存する最大件数
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_path: Optional[str] = None,
+        disk_capacity: int = 100000,
+    ):
+        if np is None:
+            raise ImportError("numpy パッケージがインストールされていません")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._disk = DiskEmbeddingStore(disk_path, disk_capacity) if disk_path else None
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        """キャッシュから取得（メモリ層になければディスク層を見る）"""
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return vector.tolist()
+
+        if self._disk is not None:
+            vector = self._disk.get(key)
+            if vector is not None:
+                self._stats["disk_hits"] += 1
+                self._remember(key, vector)
+                return vector.tolist()
+
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key: bytes, embedding: List[float]) -> None:
+        """キャッシュに保存"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._remember(key, vector)
+        if self._disk is not None:
+            self._disk.put(key, vector)
+
+    def _remember(self, key: bytes, vector: "np.ndarray") -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._stats["evictions"] += 1
+
+    def flush(self) -> None:
+        """ディスク層の内容を書き出す"""
+        if self._disk is not None:
+            self._disk.flush()
+
+    def clear(self) -> None:
+        """メモリ層を空にする（ディスク層は残す）"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュ統計を取得"""
+        lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": (self._stats["hits"] + self._stats["disk_hits"]) / lookups
+            if lookups
+            else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "disk_entries": len(self._disk) if self._disk is not None else 0,
+        }
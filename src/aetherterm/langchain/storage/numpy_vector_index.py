@@ -0,0 +1,555 @@
+"""
+NumPyによるインプロセスのベクトルインデックス
+
+LangChain のベクトルストアを使わずに、埋め込みを float32 の連続した行列で保持して
+コサイン類似度の上位k件を求めます。小〜中規模のコーパス向けです。
+
+- 厳密検索: 正規化済みの行列とクエリの内積をまとめて計算し、argpartition で上位k件を選ぶ
+- IVF（任意）: 件数が ivf_threshold を超えたら k-means で重心を学習し、クエリに近い
+  nprobe 個のリストに属する行だけを評価する（近似検索）
+- メタデータでの絞り込み（session_id は行ごとのコード配列で一括比較する）
+
+保存は追記のみのセグメントファイルで行います。save() は前回の保存以降に追加された行だけを
+新しいセグメントとして書き、削除は tombstones.jsonl に追記します。セグメントや削除済みの行が
+増えたら compact() で生きている行だけのベースセグメントにまとめ直します
+（どちらもファイルの書き込みはスレッドで行い、その間も追加・削除・検索を受け付ける）。
+
+ファイル構成（path ディレクトリ内）:
+    meta.json           次元数とベースセグメントの番号
+    seg-000001.jsonl    行ごとのID・本文・メタデータ
+    seg-000001.npy      行ごとの正規化済みベクトル（最後に書くため、書き込み完了の印を兼ねる）
+    tombstones.jsonl    削除されたIDと、その削除が適用される（これより前の）セグメント番号
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PATTERN = re.compile(r"^seg-(\d+)\.npy$")
+
+# 検索結果: (ID, 本文, メタデータ, コサイン類似度)
+SearchHit = Tuple[str, str, Dict[str, Any], float]
+
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _grow(array: "np.ndarray", capacity: int) -> "np.ndarray":
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _train_ivf(
+    vectors: "np.ndarray", count: int, nlist: int, iterations: int = 10, seed: int = 0
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    球面k-meansで重心を学習し、先頭 count 行をリストに割り当てる
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (重心, 行ごとのリスト番号)
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(count, min(count, nlist * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        filled = np.bincount(labels, minlength=nlist) > 0
+        # 空になったリストは前回の重心のまま
+        centroids[filled] = _normalize(sums[filled])
+
+    assignments = np.empty(count, dtype=np.int32)
+    for start in range(0, count, 8192):
+        chunk = vectors[start : min(start + 8192, count)]
+        assignments[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return centroids, assignments
+
+
+class NumpyVectorIndex:
+    """
+    NumPyのベクトルインデックス
+
+    Args:
+        path: 保存先ディレクトリ（Noneの場合は保存しない）
+        ivf_threshold: IVFを学習する件数（0でIVFを使わない）
+        nprobe: IVF検索で評価するリストの数
+        max_segments: compact() が必要と判断するセグメント数
+    """
+
+    # 削除済みの行がこの割合を超えたら compact() が必要と判断する
+    COMPACTION_DEAD_RATIO = 0.3
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ivf_threshold: int = 50000,
+        nprobe: int = 8,
+        max_segments: int = 16,
+    ):
+        if np is None:
+            raise ImportError("numpy パッケージがインストールされていません")
+
+        self.path = Path(path) if path else None
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.max_segments = max_segments
+
+        self.dimension: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._live = np.zeros(0, dtype=bool)
+        self._session_codes = np.zeros(0, dtype=np.int32)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._count = 0
+        self._live_count = 0
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._id_to_row: Dict[str, int] = {}
+        # session_id -> コード（0はsession_idなし）
+        self._session_ids: Dict[str, int] = {}
+
+        # IVF
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_count = 0
+
+        # 保存状態
+        self._saved_count = 0
+        self._pending_deletes: List[Dict[str, Any]] = []
+        self._next_segment = 1
+        self._segment_count = 0
+        self._maintenance_lock = asyncio.Lock()
+
+        if self.path:
+            self._load()
+
+    @property
+    def document_count(self) -> int:
+        """削除されていない行の件数"""
+        return self._live_count
+
+    # 追加・削除
+
+    def add(
+        self,
+        content_id: str,
+        embedding: List[float],
+        document: str = "",
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """ベクトルを追加（同じIDがあれば置き換える）"""
+        self.add_many([content_id], [embedding], [document], [metadata or {}])
+
+    def add_many(
+        self,
+        content_ids: List[str],
+        embeddings: Any,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """ベクトルをまとめて追加（同じIDがあれば置き換える）"""
+        if not content_ids:
+            return
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(content_ids), -1))
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(f"ベクトルの次元数が一致しません: {vectors.shape[1]} != {self.dimension}")
+
+        self._reserve(len(content_ids))
+        start = self._count
+        end = start + len(content_ids)
+        self._vectors[start:end] = vectors
+        self._live[start:end] = True
+        if self._centroids is not None:
+            self._assignments[start:end] = np.argmax(vectors @ self._centroids.T, axis=1)
+
+        for row, content_id, document, metadata in zip(
+            range(start, end), content_ids, documents, metadatas
+        ):
+            previous = self._id_to_row.get(content_id)
+            if previous is not None:
+                self._delete_row(previous)
+            session_id = metadata.get("session_id")
+            self._session_codes[row] = (
+                self._session_ids.setdefault(session_id, len(self._session_ids) + 1)
+                if session_id is not None
+                else 0
+            )
+            self._ids.append(content_id)
+            self._documents.append(document)
+            self._metadatas.append(metadata)
+            self._id_to_row[content_id] = row
+
+        self._count = end
+        self._live_count += len(content_ids)
+
+    def delete(self, content_ids: List[str]) -> int:
+        """ベクトルを削除し、削除した件数を返す"""
+        deleted = 0
+        for content_id in content_ids:
+            row = self._id_to_row.get(content_id)
+            if row is not None:
+                self._delete_row(row)
+                deleted += 1
+        return deleted
+
+    def _delete_row(self, row: int) -> None:
+        self._live[row] = False
+        self._live_count -= 1
+        content_id = self._ids[row]
+        if self._id_to_row.get(content_id) == row:
+            del self._id_to_row[content_id]
+        if row < self._saved_count:
+            # 保存済みの行は次に書くセグメントより前のものとして削除を記録する
+            self._pending_deletes.append({"id": content_id, "segment": self._next_segment})
+
+    def _reserve(self, rows: int) -> None:
+        capacity = len(self._live)
+        if self._count + rows <= capacity:
+            return
+        capacity = max(1024, capacity * 2, self._count + rows)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[: self._count] = self._vectors[: self._count]
+        self._vectors = vectors
+        self._live = _grow(self._live, capacity)
+        self._session_codes = _grow(self._session_codes, capacity)
+        self._assignments = _grow(self._assignments, capacity)
+
+    # 検索
+
+    def get_vector(self, content_id: str) -> Optional[List[float]]:
+        """IDから正規化済みのベクトルを取得"""
+        row = self._id_to_row.get(content_id)
+        return self._vectors[row].tolist() if row is not None else None
+
+    def search(
+        self, embedding: List[float], k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchHit]:
+        """
+        コサイン類似度の上位k件を検索
+
+        Args:
+            embedding: クエリのベクトル
+            k: 取得件数
+            filters: メタデータの一致条件（session_id など）
+
+        Returns:
+            List[SearchHit]: 類似度の高い順の (ID, 本文, メタデータ, 類似度)
+        """
+        if self._live_count == 0 or k <= 0:
+            return []
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+        count = self._count
+        filters = dict(filters or {})
+        mask = None
+
+        session_id = filters.pop("session_id", None)
+        if session_id is not None:
+            code = self._session_ids.get(session_id)
+            if code is None:
+                return []
+            mask = self._session_codes[:count] == code
+
+        if self._centroids is not None:
+            nprobe = min(self.nprobe, len(self._centroids))
+            probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+            in_probes = np.isin(self._assignments[:count], probes)
+            mask = in_probes if mask is None else mask & in_probes
+
+        if mask is None and not filters:
+            rows = None
+            scores = self._vectors[:count] @ query
+            scores[~self._live[:count]] = -np.inf
+        else:
+            live = self._live[:count]
+            rows = np.flatnonzero(live if mask is None else mask & live)
+            if filters:
+                rows = np.array(
+                    [row for row in rows if self._matches(self._metadatas[row], filters)],
+                    dtype=np.int64,
+                )
+            if len(rows) == 0:
+                return []
+            scores = self._vectors[rows] @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        hits = []
+        for index in top:
+            score = float(scores[index])
+            if score == -np.inf:
+                break
+            row = int(index) if rows is None else int(rows[index])
+            hits.append((self._ids[row], self._documents[row], self._metadatas[row], score))
+        return hits
+
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        return all(metadata.get(key) == value for key, value in filters.items())
+
+    # IVF
+
+    def needs_training(self) -> bool:
+        """IVFの（再）学習が必要か（件数が閾値を超え、前回の学習時の2倍になった）"""
+        return (
+            self.ivf_threshold > 0
+            and self._live_count >= self.ivf_threshold
+            and self._live_count >= 2 * self._trained_count
+        )
+
+    async def train(self) -> None:
+        """IVFの重心を学習（計算はスレッドで行う）"""
+        async with self._maintenance_lock:
+            count = self._count
+            nlist = max(1, int(np.sqrt(self._live_count)))
+            loop = asyncio.get_running_loop()
+            # 先頭 count 行は書き換えられないため、そのままスレッドに渡せる
+            centroids, assignments = await loop.run_in_executor(
+                None, _train_ivf, self._vectors, count, nlist
+            )
+
+            self._assignments[:count] = assignments
+            if self._count > count:
+                # 学習中に追加された行を割り当てる
+                added = self._vectors[count : self._count]
+                self._assignments[count : self._count] = np.argmax(added @ centroids.T, axis=1)
+            self._centroids = centroids
+            self._trained_count = self._live_count
+            logger.info(f"IVFを学習しました: {nlist}リスト, {self._live_count}件")
+
+    # 保存
+
+    def _segment_paths(self, segment: int) -> Tuple[Path, Path]:
+        return (
+            self.path / f"seg-{segment:06d}.jsonl",
+            self.path / f"seg-{segment:06d}.npy",
+        )
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        return {
+            "id": self._ids[row],
+            "document": self._documents[row],
+            "metadata": self._metadatas[row],
+        }
+
+    def _write_segment(
+        self, segment: int, vectors: "np.ndarray", records: List[Dict[str, Any]]
+    ) -> None:
+        records_path, vectors_path = self._segment_paths(segment)
+        tmp_path = records_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, records_path)
+
+        tmp_path = vectors_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, vectors)
+        os.replace(tmp_path, vectors_path)
+
+    def _write_meta(self, base_segment: int) -> None:
+        meta_path = self.path / "meta.json"
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"dimension": self.dimension, "base_segment": base_segment}))
+        os.replace(tmp_path, meta_path)
+
+    async def save(self) -> None:
+        """前回の保存以降に追加された行と削除を書き込む（実行中の compact() / train() を待つ）"""
+        async with self._maintenance_lock:
+            await self._save()
+
+    async def _save(self) -> None:
+        if self.path is None or self.dimension is None:
+            return
+
+        # 書き込む内容はここで確定し、ファイルの書き込みだけをスレッドで行う
+        saved_count = self._saved_count
+        segment = vectors = records = None
+        if self._count > self._saved_count:
+            rows = np.flatnonzero(self._live[self._saved_count : self._count]) + self._saved_count
+            if len(rows):
+                segment = self._next_segment
+                vectors = self._vectors[rows]
+                records = [self._record(row) for row in rows]
+                self._next_segment += 1
+                self._segment_count += 1
+            self._saved_count = self._count
+        tombstones, self._pending_deletes = self._pending_deletes, []
+
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, self._write_changes, segment, vectors, records, tombstones
+            )
+        except Exception:
+            # 次の save() で書き直す
+            self._saved_count = saved_count
+            self._pending_deletes = tombstones + self._pending_deletes
+            if segment is not None:
+                self._segment_count -= 1
+            raise
+
+    def _write_changes(
+        self,
+        segment: Optional[int],
+        vectors: Optional["np.ndarray"],
+        records: Optional[List[Dict[str, Any]]],
+        tombstones: List[Dict[str, Any]],
+    ) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        if not (self.path / "meta.json").exists():
+            self._write_meta(base_segment=0)
+
+        if segment is not None:
+            self._write_segment(segment, vectors, records)
+
+        if tombstones:
+            with open(self.path / "tombstones.jsonl", "a", encoding="utf-8") as f:
+                for tombstone in tombstones:
+                    f.write(json.dumps(tombstone) + "\n")
+
+    def needs_compaction(self) -> bool:
+        """compact() が必要か（セグメントが多い、または削除済みの行が多い）"""
+        dead = self._count - self._live_count
+        return self._segment_count > self.max_segments or (
+            dead > 0 and dead / self._count > self.COMPACTION_DEAD_RATIO
+        )
+
+    async def compact(self) -> None:
+        """
+        生きている行だけにまとめ直す
+
+        保存先がある場合は生きている行をベースセグメントとして書き直し、古いセグメントと
+        削除記録を消します。ファイルの書き込み中に追加・削除された行は次の save() で保存されます。
+        """
+        async with self._maintenance_lock:
+            dead = self._count - self._live_count
+            if self._vectors is None or (dead == 0 and self._segment_count <= 1):
+                # 空のインデックスや、既にまとまっている場合は何もしない
+                return
+
+            await self._save()
+            snapshot = self._count
+
+            if self.path is not None and self.dimension is not None:
+                rows = np.flatnonzero(self._live[:snapshot])
+                records = [self._record(row) for row in rows]
+                segment = self._next_segment
+                self._next_segment += 1
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(
+                    None, self._write_base, segment, self._vectors, rows, records
+                )
+                self._segment_count = 1
+
+            # 書き込み中に追加・削除された行も含めて、生きている行だけを残す
+            keep = np.flatnonzero(self._live[: self._count])
+            saved = int(np.searchsorted(keep, snapshot))
+            self._vectors = self._vectors[keep]
+            self._live = np.ones(len(keep), dtype=bool)
+            self._session_codes = self._session_codes[keep]
+            self._assignments = self._assignments[keep]
+            self._ids = [self._ids[row] for row in keep]
+            self._documents = [self._documents[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._id_to_row = {content_id: row for row, content_id in enumerate(self._ids)}
+            self._count = self._live_count = len(keep)
+            self._saved_count = saved
+
+            logger.info(f"ベクトルインデックスをまとめ直しました: {len(keep)}件")
+
+    def _write_base(
+        self, segment: int, vectors: "np.ndarray", rows: "np.ndarray", records: List[Dict[str, Any]]
+    ) -> None:
+        self._write_segment(segment, vectors[rows], records)
+        self._write_meta(base_segment=segment)
+
+        # ベースより前のセグメントと削除記録は不要になる
+        for path in self.path.glob("seg-*.npy"):
+            match = _SEGMENT_PATTERN.match(path.name)
+            if match and int(match.group(1)) < segment:
+                path.unlink()
+                path.with_suffix(".jsonl").unlink(missing_ok=True)
+        (self.path / "tombstones.jsonl").unlink(missing_ok=True)
+
+    async def close(self) -> None:
+        """実行中の compact() / train() を待ってから保存"""
+        await self.save()
+
+    def _load(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+
+        meta = json.loads(meta_path.read_text())
+        base_segment = meta.get("base_segment", 0)
+        segments = sorted(
+            int(match.group(1))
+            for match in (_SEGMENT_PATTERN.match(path.name) for path in self.path.glob("seg-*.npy"))
+            if match and int(match.group(1)) >= base_segment
+        )
+
+        row_segments: List[int] = []
+        for segment in segments:
+            records_path, vectors_path = self._segment_paths(segment)
+            vectors = np.load(vectors_path)
+            with open(records_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            if len(records) != len(vectors):
+                logger.warning(f"壊れたセグメントを読み飛ばします: {vectors_path}")
+                continue
+            self.add_many(
+                [record["id"] for record in records],
+                vectors,
+                [record["document"] for record in records],
+                [record["metadata"] for record in records],
+            )
+            row_segments.extend([segment] * len(records))
+
+        tombstones_path = self.path / "tombstones.jsonl"
+        if tombstones_path.exists():
+            with open(tombstones_path, encoding="utf-8") as f:
+                for line in f:
+                    tombstone = json.loads(line)
+                    row = self._id_to_row.get(tombstone["id"])
+                    if row is not None and row_segments[row] < tombstone["segment"]:
+                        self._delete_row(row)
+
+        self.dimension = self.dimension or meta.get("dimension")
+        self._saved_count = self._count
+        self._next_segment = max(segments, default=base_segment) + 1
+        self._segment_count = len(segments)
+        logger.info(f"ベクトルインデックスを読み込みました: {self._live_count}件")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """インデックスの統計を取得"""
+        return {
+            "documents": self._live_count,
+            "rows": self._count,
+            "dimension": self.dimension,
+            "segments": self._segment_count,
+            "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+            "unsaved_rows": self._count - self._saved_count,
+            "unsaved_deletes": len(self._pending_deletes),
+        }
@@ -2,10 +2,13 @@
 Redisストレージアダプター（短期メモリ用）
 """
 
+import asyncio
 import json
 import logging
 import pickle
-from typing import Any, Dict, List, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import redis.asyncio as redis
 from redis.asyncio import Redis
@@ -14,6 +17,7 @@ from ..config.storage_config import StorageConfig
 from ..models.conversation import ConversationEntry
 from ..models.session import SessionContext
 from .base_storage import BaseStorageAdapter, CacheStorageAdapter
+from .redis_codec import decode_value, encode_value, is_encoded
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,11 @@ logger = logging.getLogger(__name__)
 class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
     """Redisストレージアダプター"""
 
+    # セッション毎に保持する最近の会話の件数とTTL
+    RECENT_CONVERSATION_LIMIT = 100
+    RECENT_CONVERSATION_TTL = 3600
+    SESSION_CONTEXT_TTL = 7200
+
     def __init__(self, config: StorageConfig):
         """
         初期化
@@ -42,8 +51,18 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             "cache": "aetherterm:cache:",
             "embedding": "aetherterm:embed:",
             "summary": "aetherterm:summary:",
+            # セッション毎に書き込んだキーの集合（セッション単位の削除に使う）
+            "group": "aetherterm:group:",
         }
 
+        # よく読まれるセッションコンテキストのローカルキャッシュ（session_id -> (期限, 値)）
+        self._near_cache: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._near_cache_stats = {"hits": 0, "misses": 0}
+
+        # バックグラウンドのクリーンアップ
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._cleanup_progress: Dict[str, Any] = {"running": False}
+
     async def _connect_impl(self) -> None:
         """Redis接続実装"""
         try:
@@ -65,6 +84,14 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
 
     async def _disconnect_impl(self) -> None:
         """Redis切断実装"""
+        self._near_cache.clear()
+        if self._cleanup_task and not self._cleanup_task.done():
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+        self._cleanup_task = None
         if self._redis:
             await self._redis.close()
             self._redis = None
@@ -88,6 +115,28 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
         """キーを生成"""
         return f"{self.key_prefixes[prefix]}{key}"
 
+    def _track_in_group(self, pipe, group: str, key: str, ttl_seconds: int) -> None:
+        """キーをセッションのキー集合に登録（集合は書き込みの度にメンバー以上のTTLで延長）"""
+        group_key = self._make_key("group", group)
+        pipe.sadd(group_key, key)
+        pipe.expire(group_key, max(ttl_seconds, self.config.cache_max_ttl_seconds))
+
+    def _encode(self, value: Any) -> bytes:
+        """キャッシュ値をエンコード"""
+        threshold = (
+            self.config.cache_compression_threshold_bytes
+            if self.config.cache_compression_enabled
+            else None
+        )
+        return encode_value(value, threshold)
+
+    def _decode(self, data: bytes) -> Optional[Any]:
+        """キャッシュ値を復元（旧形式の値はキャッシュミスとして扱う）"""
+        if not is_encoded(data):
+            self._logger.debug("旧形式のキャッシュ値を無視します")
+            return None
+        return decode_value(data)
+
     async def cache_recent_conversation(self, entry: ConversationEntry) -> None:
         """
         最近の会話をキャッシュ
@@ -95,31 +144,70 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
         Args:
             entry: 会話エントリ
         """
+        await self.cache_recent_conversations([entry])
+
+    async def cache_recent_conversations(self, entries: List[ConversationEntry]) -> None:
+        """
+        最近の会話をまとめてキャッシュ
+
+        追加・件数制限・TTL設定を1つのトランザクション（MULTI/EXEC）で送ります。
+
+        Args:
+            entries: 会話エントリ（古い順）
+        """
+        if not entries:
+            return
         if not self._redis:
             await self.connect()
 
         try:
             # セッション別の最近の会話リストに追加
-            session_key = self._make_key("conversation", f"recent:{entry.session_id}")
-
-            # エントリをシリアライズ
-            serialized_entry = pickle.dumps(entry.to_dict())
-
-            # リストの先頭に追加
-            await self._redis.lpush(session_key, serialized_entry)
-
-            # リストサイズを制限（最新100件まで）
-            await self._redis.ltrim(session_key, 0, 99)
-
-            # TTLを設定（1時間）
-            await self._redis.expire(session_key, 3600)
-
-            self._logger.debug(f"会話をキャッシュしました: {entry.id}")
+            by_session: Dict[str, List[bytes]] = {}
+            for entry in entries:
+                by_session.setdefault(entry.session_id, []).append(
+                    self._encode(self._conversation_projection(entry))
+                )
+
+            async with self._redis.pipeline(transaction=True) as pipe:
+                for session_id, serialized_entries in by_session.items():
+                    session_key = self._make_key("conversation", f"recent:{session_id}")
+                    pipe.lpush(session_key, *serialized_entries)
+                    pipe.ltrim(session_key, 0, self.RECENT_CONVERSATION_LIMIT - 1)
+                    pipe.expire(session_key, self.RECENT_CONVERSATION_TTL)
+                    self._track_in_group(
+                        pipe, session_id, session_key, self.RECENT_CONVERSATION_TTL
+                    )
+                await pipe.execute()
+
+            self._logger.debug(f"会話をキャッシュしました: {len(entries)}件")
 
         except Exception as e:
             self._logger.error(f"会話キャッシュエラー: {e}")
             raise
 
+    @staticmethod
+    def _conversation_projection(entry: ConversationEntry) -> Dict[str, Any]:
+        """
+        キャッシュする会話の射影
+
+        正本はSQLにあるため、埋め込みと空の項目、ConversationEntry.from_dict() で
+        復元される既定値（thread_id, metadata の created_at）は保存しません。
+        """
+        data = entry.to_dict()
+        del data["embedding"]
+        if data["thread_id"] == entry.session_id:
+            del data["thread_id"]
+        metadata = {
+            key: value
+            for key, value in entry.metadata.items()
+            if not (key == "created_at" and value == data["timestamp"])
+        }
+        if metadata:
+            data["metadata"] = metadata
+        else:
+            del data["metadata"]
+        return {key: value for key, value in data.items() if value is not None}
+
     async def get_recent_conversations(
         self, session_id: str, limit: int = 10
     ) -> List[ConversationEntry]:
@@ -145,7 +233,9 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             conversations = []
             for serialized_entry in serialized_entries:
                 try:
-                    entry_dict = pickle.loads(serialized_entry)
+                    entry_dict = self._decode(serialized_entry)
+                    if entry_dict is None:
+                        continue
                     conversation = ConversationEntry.from_dict(entry_dict)
                     conversations.append(conversation)
                 except Exception as e:
@@ -173,10 +263,16 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             session_key = self._make_key("session", context.session_id)
 
             # コンテキストをシリアライズ
-            serialized_context = pickle.dumps(context.to_dict())
+            serialized_context = self._encode(context.to_dict())
 
             # キャッシュに保存（TTL: 2時間）
-            await self._redis.setex(session_key, 7200, serialized_context)
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.setex(session_key, self.SESSION_CONTEXT_TTL, serialized_context)
+                self._track_in_group(
+                    pipe, context.session_id, session_key, self.SESSION_CONTEXT_TTL
+                )
+                await pipe.execute()
+            self._remember_near(context.session_id, serialized_context)
 
             self._logger.debug(f"セッションコンテキストをキャッシュしました: {context.session_id}")
 
@@ -188,6 +284,9 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
         """
         セッションコンテキストを取得
 
+        直近に読み書きしたコンテキストは redis_near_cache_ttl_seconds の間、
+        Redisに問い合わせずにローカルキャッシュから返します。
+
         Args:
             session_id: セッションID
 
@@ -198,51 +297,168 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             await self.connect()
 
         try:
-            session_key = self._make_key("session", session_id)
-
-            serialized_context = await self._redis.get(session_key)
-            if not serialized_context:
+            serialized_context = self._lookup_near(session_id)
+            if serialized_context is None:
+                session_key = self._make_key("session", session_id)
+                serialized_context = await self._redis.get(session_key)
+                if not serialized_context:
+                    return None
+                self._remember_near(session_id, serialized_context)
+
+            context_dict = self._decode(serialized_context)
+            if context_dict is None:
                 return None
-
-            context_dict = pickle.loads(serialized_context)
+            # 呼び出し元が変更しても共有されないよう、毎回復元する
             return SessionContext.from_dict(context_dict)
 
         except Exception as e:
             self._logger.error(f"セッション取得エラー: {e}")
             return None
 
+    def _lookup_near(self, session_id: str) -> Optional[bytes]:
+        cached = self._near_cache.get(session_id)
+        if cached is not None:
+            expires_at, value = cached
+            if expires_at > time.monotonic():
+                self._near_cache.move_to_end(session_id)
+                self._near_cache_stats["hits"] += 1
+                return value
+            del self._near_cache[session_id]
+        self._near_cache_stats["misses"] += 1
+        return None
+
+    def _remember_near(self, session_id: str, value: bytes) -> None:
+        ttl = self.config.redis_near_cache_ttl_seconds
+        if ttl <= 0:
+            return
+        self._near_cache[session_id] = (time.monotonic() + ttl, value)
+        self._near_cache.move_to_end(session_id)
+        while len(self._near_cache) > self.config.redis_near_cache_max_entries:
+            self._near_cache.popitem(last=False)
+
+    def invalidate_session_context(self, session_id: str) -> None:
+        """ローカルキャッシュのセッションコンテキストを破棄"""
+        self._near_cache.pop(session_id, None)
+
+    async def clear_session(self, session_id: str) -> int:
+        """
+        セッションのキャッシュをすべて削除
+
+        キー空間を走査せず、セッションのキー集合に登録されたキーだけを削除します。
+
+        Returns:
+            int: 削除されたキー数
+        """
+        return await self.clear_sessions([session_id])
+
+    async def clear_sessions(self, session_ids: List[str]) -> int:
+        """複数セッションのキャッシュをまとめて削除"""
+        if not session_ids:
+            return 0
+        if not self._redis:
+            await self.connect()
+
+        try:
+            group_keys = [self._make_key("group", session_id) for session_id in session_ids]
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for group_key in group_keys:
+                    pipe.smembers(group_key)
+                members = await pipe.execute()
+
+            keys = [key for group in members for key in group] + group_keys
+            deleted_count = 0
+            for start in range(0, len(keys), self.config.cache_cleanup_batch_size):
+                batch = keys[start : start + self.config.cache_cleanup_batch_size]
+                deleted_count += await self._redis.unlink(*batch)
+
+            for session_id in session_ids:
+                self.invalidate_session_context(session_id)
+
+            self._logger.debug(f"セッションのキャッシュを削除しました: {deleted_count}件")
+            return deleted_count
+
+        except Exception as e:
+            self._logger.error(f"セッションキャッシュ削除エラー: {e}")
+            return 0
+
+    async def _scan_batches(self, pattern: str):
+        """SCANの結果を cache_cleanup_batch_size 件ずつ返す（バッチ間で一時停止する）"""
+        batch_size = self.config.cache_cleanup_batch_size
+        pause = self.config.cache_cleanup_pause_ms / 1000
+        cursor = 0
+        while True:
+            cursor, keys = await self._redis.scan(cursor, match=pattern, count=batch_size)
+            if keys:
+                yield keys
+            if cursor == 0:
+                break
+            # 稼働中の端末のコマンドを待たせないよう、バッチの間でRedisを空ける
+            await asyncio.sleep(pause)
+
     async def cleanup_old_cache(self) -> int:
         """
         古いキャッシュをクリーンアップ
 
+        このアダプターはすべてのキーをTTL付きで書き込むため、通常の期限切れはRedisが
+        削除します。ここではTTLのない（または cache_max_ttl_seconds より長い）キーだけを
+        SCANのバッチ毎に1回のパイプラインでTTLを確認し、UNLINKで削除します。
+        進捗は get_cleanup_progress() で確認できます。
+
         Returns:
             int: クリーンアップされたキー数
         """
         if not self._redis:
             await self.connect()
 
+        progress = self._cleanup_progress = {
+            "running": True,
+            "started_at": time.time(),
+            "prefix": None,
+            "scanned": 0,
+            "deleted": 0,
+            "batches": 0,
+        }
         try:
-            deleted_count = 0
-
             # 各プレフィックスのキーをスキャン
             for prefix in self.key_prefixes.values():
-                pattern = f"{prefix}*"
+                progress["prefix"] = prefix
 
-                async for key in self._redis.scan_iter(match=pattern, count=100):
-                    # TTLをチェック
-                    ttl = await self._redis.ttl(key)
+                async for keys in self._scan_batches(f"{prefix}*"):
+                    async with self._redis.pipeline(transaction=False) as pipe:
+                        for key in keys:
+                            pipe.ttl(key)
+                        ttls = await pipe.execute()
 
                     # TTLが-1（永続）または非常に長い場合は削除対象
-                    if ttl == -1 or ttl > 86400:  # 24時間以上
-                        await self._redis.delete(key)
-                        deleted_count += 1
-
-            self._logger.info(f"古いキャッシュをクリーンアップしました: {deleted_count}件")
-            return deleted_count
+                    stale = [
+                        key
+                        for key, ttl in zip(keys, ttls)
+                        if ttl == -1 or ttl > self.config.cache_max_ttl_seconds
+                    ]
+                    if stale:
+                        progress["deleted"] += await self._redis.unlink(*stale)
+                    progress["scanned"] += len(keys)
+                    progress["batches"] += 1
+
+            self._logger.info(f"古いキャッシュをクリーンアップしました: {progress['deleted']}件")
+            return progress["deleted"]
 
         except Exception as e:
             self._logger.error(f"キャッシュクリーンアップエラー: {e}")
-            return 0
+            return progress["deleted"]
+        finally:
+            progress["running"] = False
+            progress["finished_at"] = time.time()
+
+    def start_background_cleanup(self) -> asyncio.Task:
+        """cleanup_old_cache() をバックグラウンドで実行（実行中ならそのタスクを返す）"""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self.cleanup_old_cache())
+        return self._cleanup_task
+
+    def get_cleanup_progress(self) -> Dict[str, Any]:
+        """実行中（または前回）のクリーンアップの進捗を取得"""
+        return dict(self._cleanup_progress)
 
     # CacheStorageAdapter実装
 
@@ -257,48 +473,124 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
 
             if value is None:
                 return None
-
-            # JSON形式で保存されている場合はJSONとしてデコード
-            try:
-                return json.loads(value.decode("utf-8"))
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                # バイナリデータの場合はpickleでデシリアライズ
-                try:
-                    return pickle.loads(value)
-                except:
-                    # 文字列として返す
-                    return value.decode("utf-8")
+            return self._deserialize_cache_value(value)
 
         except Exception as e:
             self._logger.error(f"キャッシュ取得エラー: {e}")
             return None
 
-    async def set(self, key: str, value: Any, ttl_seconds: int = None) -> None:
-        """キャッシュに値を設定"""
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """複数の値を1回のMGETで取得（見つからないキーは含まない）"""
+        if not keys:
+            return {}
         if not self._redis:
             await self.connect()
 
         try:
-            cache_key = self._make_key("cache", key)
+            values = await self._redis.mget([self._make_key("cache", key) for key in keys])
+            return {
+                key: self._deserialize_cache_value(value)
+                for key, value in zip(keys, values)
+                if value is not None
+            }
 
-            # 値をシリアライズ
-            if isinstance(value, (dict, list)):
-                serialized_value = json.dumps(value, ensure_ascii=False).encode("utf-8")
-            elif isinstance(value, str):
-                serialized_value = value.encode("utf-8")
-            else:
-                serialized_value = pickle.dumps(value)
+        except Exception as e:
+            self._logger.error(f"キャッシュ一括取得エラー: {e}")
+            return {}
+
+    @staticmethod
+    def _serialize_cache_value(value: Any) -> bytes:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if isinstance(value, str):
+            return value.encode("utf-8")
+        return pickle.dumps(value)
+
+    @staticmethod
+    def _deserialize_cache_value(value: bytes) -> Any:
+        # JSON形式で保存されている場合はJSONとしてデコード
+        try:
+            return json.loads(value.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # バイナリデータの場合はpickleでデシリアライズ
+            try:
+                return pickle.loads(value)
+            except:
+                # 文字列として返す
+                return value.decode("utf-8")
+
+    async def set(
+        self, key: str, value: Any, ttl_seconds: int = None, group: Optional[str] = None
+    ) -> None:
+        """
+        キャッシュに値を設定
+
+        group（セッションID）を指定すると clear_session() でまとめて削除できます。
+        """
+        if not self._redis:
+            await self.connect()
 
-            # TTLが指定されている場合
-            if ttl_seconds:
+        try:
+            cache_key = self._make_key("cache", key)
+            serialized_value = self._serialize_cache_value(value)
+
+            # TTLがない場合も cache_max_ttl_seconds で期限切れにする（Redis側で削除される）
+            ttl_seconds = ttl_seconds or self.config.cache_max_ttl_seconds
+            if group is None:
                 await self._redis.setex(cache_key, ttl_seconds, serialized_value)
             else:
-                await self._redis.set(cache_key, serialized_value)
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    pipe.setex(cache_key, ttl_seconds, serialized_value)
+                    self._track_in_group(pipe, group, cache_key, ttl_seconds)
+                    await pipe.execute()
 
         except Exception as e:
             self._logger.error(f"キャッシュ設定エラー: {e}")
             raise
 
+    async def set_many(
+        self, items: List[Tuple[str, Any, Optional[str]]], ttl_seconds: int = None
+    ) -> None:
+        """
+        複数の値を1回のパイプラインで設定
+
+        Args:
+            items: (キー, 値, group) のリスト（groupは set() と同じ）
+            ttl_seconds: TTL（未指定の場合は cache_max_ttl_seconds）
+        """
+        if not items:
+            return
+        if not self._redis:
+            await self.connect()
+
+        try:
+            ttl_seconds = ttl_seconds or self.config.cache_max_ttl_seconds
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value, group in items:
+                    cache_key = self._make_key("cache", key)
+                    pipe.setex(cache_key, ttl_seconds, self._serialize_cache_value(value))
+                    if group is not None:
+                        self._track_in_group(pipe, group, cache_key, ttl_seconds)
+                await pipe.execute()
+
+        except Exception as e:
+            self._logger.error(f"キャッシュ一括設定エラー: {e}")
+            raise
+
+    async def delete_many(self, keys: List[str]) -> int:
+        """複数のキーをUNLINKで削除し、削除した件数を返す"""
+        if not keys:
+            return 0
+        if not self._redis:
+            await self.connect()
+
+        try:
+            return await self._redis.unlink(*(self._make_key("cache", key) for key in keys))
+
+        except Exception as e:
+            self._logger.error(f"キャッシュ一括削除エラー: {e}")
+            return 0
+
     async def delete(self, key: str) -> bool:
         """キャッシュから値を削除"""
         if not self._redis:
@@ -328,7 +620,7 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             return False
 
     async def clear_pattern(self, pattern: str) -> int:
-        """パターンにマッチするキーを削除"""
+        """パターンにマッチするキーを削除（SCANのバッチ毎にUNLINK）"""
         if not self._redis:
             await self.connect()
 
@@ -336,9 +628,8 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             cache_pattern = self._make_key("cache", pattern)
             deleted_count = 0
 
-            async for key in self._redis.scan_iter(match=cache_pattern, count=100):
-                await self._redis.delete(key)
-                deleted_count += 1
+            async for keys in self._scan_batches(cache_pattern):
+                deleted_count += await self._redis.unlink(*keys)
 
             return deleted_count
 
@@ -358,8 +649,8 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
             key_counts = {}
             for prefix_name, prefix in self.key_prefixes.items():
                 count = 0
-                async for _ in self._redis.scan_iter(match=f"{prefix}*", count=100):
-                    count += 1
+                async for keys in self._scan_batches(f"{prefix}*"):
+                    count += len(keys)
                 key_counts[prefix_name] = count
 
             return {
@@ -368,6 +659,11 @@ class RedisStorageAdapter(BaseStorageAdapter, CacheStorageAdapter):
                 "memory_usage": info.get("used_memory"),
                 "memory_usage_human": info.get("used_memory_human"),
                 "hit_rate": self._calculate_hit_rate(info),
+                "near_cache": {
+                    **self._near_cache_stats,
+                    "entries": len(self._near_cache),
+                },
+                "cleanup": self.get_cleanup_progress(),
                 "connected_clients": info.get("connected_clients"),
             }
 
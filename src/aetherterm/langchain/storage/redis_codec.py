@@ -0,0 +1,99 @@
+"""
+Redisキャッシュ値のコーデック
+
+短期メモリとしてRedisに保存する to_dict() の辞書を、pickle の代わりに
+バージョン付きのコンパクトなバイナリ形式で表します。
+
+- 形式: magic(2バイト "AC") + バージョン(1バイト) + フラグ(1バイト) + 本体
+- 本体は msgpack が利用可能なら msgpack、なければコンパクトなJSON
+- 本体が圧縮閾値以上の場合は zlib で圧縮する（小さくならない場合は圧縮しない）
+
+pickle と違い、デコードで任意のオブジェクトが生成されることはありません。
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_MAGIC = b"AC"
+_VERSION = 1
+
+# フラグ
+_FLAG_MSGPACK = 0x01  # 本体が msgpack（なければJSON）
+_FLAG_ZLIB = 0x02  # 本体が zlib で圧縮されている
+
+_HEADER = struct.Struct(">2sBB")
+
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class CacheCodecError(ValueError):
+    """キャッシュ値のエンコード・デコードエラー"""
+
+
+def encode_value(
+    value: Any, compression_threshold: Optional[int] = DEFAULT_COMPRESSION_THRESHOLD
+) -> bytes:
+    """
+    値をエンコード
+
+    Args:
+        value: to_dict() の辞書など（対応しない型は文字列として格納）
+        compression_threshold: 圧縮する本体の最小バイト数（Noneの場合は圧縮しない）
+
+    Returns:
+        bytes: エンコードした値
+    """
+    flags = 0
+    if msgpack is not None:
+        body = msgpack.packb(value, use_bin_type=True, default=str)
+        flags |= _FLAG_MSGPACK
+    else:
+        body = _json_encoder.encode(value).encode("utf-8")
+
+    if compression_threshold is not None and len(body) >= compression_threshold:
+        compressed = zlib.compress(body)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= _FLAG_ZLIB
+
+    return _HEADER.pack(_MAGIC, _VERSION, flags) + body
+
+
+def is_encoded(data: bytes) -> bool:
+    """このコーデックでエンコードされた値か（pickle などの旧形式と区別する）"""
+    return data[:2] == _MAGIC
+
+
+def decode_value(data: bytes) -> Any:
+    """エンコードされた値を復元"""
+    try:
+        magic, version, flags = _HEADER.unpack_from(data, 0)
+    except struct.error as e:
+        raise CacheCodecError(f"ヘッダーが不完全です: {e}") from e
+    if magic != _MAGIC:
+        raise CacheCodecError("このコーデックでエンコードされた値ではありません")
+    if version != _VERSION:
+        raise CacheCodecError(f"対応していないバージョンです: {version}")
+
+    body = data[_HEADER.size :]
+    try:
+        if flags & _FLAG_ZLIB:
+            body = zlib.decompress(body)
+        if flags & _FLAG_MSGPACK:
+            if msgpack is None:
+                raise CacheCodecError("msgpack でエンコードされていますが msgpack がありません")
+            return msgpack.unpackb(body, raw=False)
+        return json.loads(body.decode("utf-8"))
+    except CacheCodecError:
+        raise
+    except Exception as e:
+        raise CacheCodecError(f"値を復元できません: {e}") from e
@@ -2,9 +2,11 @@
 SQLストレージアダプター（中期メモリ用）
 """
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
 try:
     import sqlalchemy as sa
@@ -21,6 +23,7 @@ try:
         and_,
         delete,
         func,
+        insert,
         or_,
         select,
         update,
@@ -36,6 +39,7 @@ except ImportError:
 
 from ..config.storage_config import StorageConfig
 from ..models.conversation import ConversationEntry, ConversationType, MessageRole
+from ..models.memory import MemoryEntry, MemoryType
 from ..models.session import SessionContext, SessionStatus, SessionSummary, SessionType
 from .base_storage import (
     BaseStorageAdapter,
@@ -43,9 +47,20 @@ from .base_storage import (
     SessionStorageAdapter,
     SummaryStorageAdapter,
 )
+from .batch_writer import GroupCommitWriter
+from .sql_fulltext import (
+    apply_fulltext_search,
+    create_fulltext_indexes,
+    fulltext_terms,
+    normalize_score,
+    rebuild_fulltext_indexes,
+)
 
 logger = logging.getLogger(__name__)
 
+# 全文検索インデックスが使えない場合（LIKE検索）の関連度
+LIKE_MATCH_SCORE = 0.6
+
 # SQLAlchemy Base
 Base = declarative_base()
 
@@ -178,6 +193,9 @@ class SQLStorageAdapter(
 ):
     """SQLストレージアダプター"""
 
+    # retrieve_many() で1回の IN 句に含めるIDの最大数
+    IN_CLAUSE_CHUNK_SIZE = 500
+
     def __init__(self, config: StorageConfig):
         """
         初期化
@@ -192,6 +210,10 @@ class SQLStorageAdapter(
         self.config = config
         self._engine = None
         self._session_factory = None
+        # 会話の書き込みはグループコミットでまとめる（接続時に作成）
+        self._conversation_writer: Optional[GroupCommitWriter[Dict[str, Any]]] = None
+        # 全文検索バックエンド（fts5 / pg_trgm、使えない場合はNone）
+        self._fulltext_backend: Optional[str] = None
 
     async def _connect_impl(self) -> None:
         """SQL接続実装"""
@@ -217,9 +239,19 @@ class SQLStorageAdapter(
                 self._engine, class_=AsyncSession, expire_on_commit=False
             )
 
-            # テーブル作成
+            # テーブルと全文検索インデックスの作成
             async with self._engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+                self._fulltext_backend = await create_fulltext_indexes(conn)
+
+            if self.config.enable_write_batching:
+                self._conversation_writer = GroupCommitWriter(
+                    self._insert_conversations,
+                    max_batch_size=self.config.batch_insert_size,
+                    max_delay=self.config.write_batch_max_delay_ms / 1000,
+                    max_queue_size=self.config.write_queue_max_size,
+                    name="conversation_writer",
+                )
 
             self._logger.info("SQLデータベースに接続しました")
 
@@ -229,6 +261,11 @@ class SQLStorageAdapter(
 
     async def _disconnect_impl(self) -> None:
         """SQL切断実装"""
+        # 書き込み待ちの会話を書き出してから切断する
+        if self._conversation_writer is not None:
+            await self._conversation_writer.close()
+            self._conversation_writer = None
+
         if self._engine:
             await self._engine.dispose()
             self._engine = None
@@ -253,44 +290,213 @@ class SQLStorageAdapter(
                 "engine_pool_size": self._engine.pool.size(),
                 "engine_pool_checked_in": self._engine.pool.checkedin(),
                 "engine_pool_checked_out": self._engine.pool.checkedout(),
+                "fulltext_backend": self._fulltext_backend,
+                "conversation_writer": self._conversation_writer.get_stats()
+                if self._conversation_writer
+                else None,
             }
 
     # MemoryStorageAdapter実装
 
+    @staticmethod
+    def _conversation_row(entry: ConversationEntry) -> Dict[str, Any]:
+        """会話エントリをconversationsテーブルの行に変換"""
+        return {
+            "id": str(entry.id),
+            "session_id": entry.session_id,
+            "conversation_type": entry.conversation_type.value,
+            "role": entry.role.value,
+            "content": entry.content,
+            "metadata": entry.metadata,
+            "timestamp": entry.timestamp,
+            "created_at": datetime.utcnow(),
+            "parent_id": str(entry.parent_id) if entry.parent_id else None,
+            "thread_id": entry.thread_id,
+            "tokens": entry.tokens,
+            "model_name": entry.model_name,
+            "processing_time_ms": entry.processing_time_ms,
+            "confidence_score": entry.confidence_score,
+        }
+
+    async def _insert_conversations(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        会話行を1トランザクションで書き込む
+
+        行のリストを渡すと1回の executemany になります（PostgreSQL では SQLAlchemy が
+        複数行の INSERT ... VALUES にまとめる）。行を埋め込んだ VALUES 文を毎回
+        組み立てるよりコンパイル済みの文を再利用できる分速くなります。
+        """
+        async with self._session_factory() as session:
+            await session.execute(insert(ConversationModel), rows)
+            await session.commit()
+
     async def store_conversation(self, entry: ConversationEntry) -> str:
-        """会話エントリを保存"""
+        """
+        会話エントリを保存
+
+        書き込みバッチが有効な場合は他の書き込みとまとめてコミットされ、
+        このエントリがコミットされた時点で戻ります。
+        """
         if not self._engine:
             await self.connect()
 
         try:
-            async with self._session_factory() as session:
-                conversation = ConversationModel(
-                    id=str(entry.id),
-                    session_id=entry.session_id,
-                    conversation_type=entry.conversation_type.value,
-                    role=entry.role.value,
-                    content=entry.content,
-                    metadata=entry.metadata,
-                    timestamp=entry.timestamp,
-                    created_at=datetime.utcnow(),
-                    parent_id=str(entry.parent_id) if entry.parent_id else None,
-                    thread_id=entry.thread_id,
-                    tokens=entry.tokens,
-                    model_name=entry.model_name,
-                    processing_time_ms=entry.processing_time_ms,
-                    confidence_score=entry.confidence_score,
-                )
+            row = self._conversation_row(entry)
+            if self._conversation_writer is not None:
+                await self._conversation_writer.submit(row)
+            else:
+                await self._insert_conversations([row])
 
-                session.add(conversation)
-                await session.commit()
-
-                self._logger.debug(f"会話を保存しました: {entry.id}")
-                return str(entry.id)
+            self._logger.debug(f"会話を保存しました: {entry.id}")
+            return str(entry.id)
 
         except Exception as e:
             self._logger.error(f"会話保存エラー: {e}")
             raise
 
+    async def store_conversations(self, entries: List[ConversationEntry]) -> List[str]:
+        """
+        複数の会話エントリをまとめて保存
+
+        Returns:
+            List[str]: 保存されたエントリのID（entries と同じ順序）
+        """
+        if not entries:
+            return []
+        if not self._engine:
+            await self.connect()
+
+        rows = [self._conversation_row(entry) for entry in entries]
+        if self._conversation_writer is not None:
+            futures = [await self._conversation_writer.enqueue(row) for row in rows]
+            await asyncio.gather(*futures)
+        else:
+            await self._insert_conversations(rows)
+
+        self._logger.debug(f"会話を保存しました: {len(entries)}件")
+        return [str(entry.id) for entry in entries]
+
+    async def store_memory_entry(self, entry: MemoryEntry) -> str:
+        """
+        中期メモリエントリを保存
+
+        中期メモリは会話テーブルに保存します。会話エントリをメタデータに持つ
+        エントリ（ConversationMemoryManager が作成するもの）はその会話として、
+        それ以外はシステムメッセージとして保存します。
+        """
+        return await self.store_conversation(self._conversation_from_memory_entry(entry))
+
+    async def store_memory_entries(self, entries: List[MemoryEntry]) -> List[str]:
+        """中期メモリエントリをまとめて保存"""
+        return await self.store_conversations(
+            [self._conversation_from_memory_entry(entry) for entry in entries]
+        )
+
+    @staticmethod
+    def _conversation_from_memory_entry(entry: MemoryEntry) -> ConversationEntry:
+        if "conversation_type" in entry.metadata and "role" in entry.metadata:
+            return ConversationEntry.from_dict(entry.metadata)
+        return ConversationEntry(
+            id=entry.id,
+            session_id=entry.session_id,
+            conversation_type=ConversationType.SYSTEM_MESSAGE,
+            role=MessageRole.SYSTEM,
+            content=entry.content,
+            metadata=dict(entry.metadata),
+            timestamp=entry.created_at,
+        )
+
+    async def retrieve_memory_entry(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """
+        中期メモリエントリを取得
+
+        Returns:
+            Optional[Dict[str, Any]]: MemoryEntry.to_dict() 形式の辞書（見つからない場合はNone）
+        """
+        if not self._engine:
+            await self.connect()
+
+        try:
+            async with self._session_factory() as session:
+                conv = await session.get(ConversationModel, str(entry_id))
+                if conv is None:
+                    return None
+                return self._memory_entry_from_model(conv).to_dict()
+
+        except Exception as e:
+            self._logger.error(f"メモリエントリ取得エラー: {e}")
+            return None
+
+    async def retrieve_many(self, entry_ids: List[str]) -> Dict[str, MemoryEntry]:
+        """
+        中期メモリエントリをまとめて取得
+
+        IDごとに問い合わせず、WHERE id IN (...) でまとめて取得します。
+
+        Args:
+            entry_ids: 取得するエントリのIDのリスト
+
+        Returns:
+            Dict[str, MemoryEntry]: IDをキーとしたメモリエントリ（見つからないIDは含まない）
+        """
+        ids = list(dict.fromkeys(str(entry_id) for entry_id in entry_ids))
+        if not ids:
+            return {}
+
+        if not self._engine:
+            await self.connect()
+
+        try:
+            entries: Dict[str, MemoryEntry] = {}
+            async with self._session_factory() as session:
+                # SQLiteのバインド変数の上限を超えないように分割する
+                for start in range(0, len(ids), self.IN_CLAUSE_CHUNK_SIZE):
+                    chunk = ids[start : start + self.IN_CLAUSE_CHUNK_SIZE]
+                    result = await session.execute(
+                        select(ConversationModel).where(ConversationModel.id.in_(chunk))
+                    )
+                    for conv in result.scalars():
+                        entries[conv.id] = self._memory_entry_from_model(conv)
+            return entries
+
+        except Exception as e:
+            self._logger.error(f"メモリエントリ一括取得エラー: {e}")
+            return {}
+
+    @staticmethod
+    def _conversation_from_model(conv: "ConversationModel") -> ConversationEntry:
+        """会話行を会話エントリに変換"""
+        return ConversationEntry(
+            id=conv.id,
+            session_id=conv.session_id,
+            conversation_type=ConversationType(conv.conversation_type),
+            role=MessageRole(conv.role),
+            content=conv.content,
+            metadata=conv.metadata or {},
+            timestamp=conv.timestamp,
+            parent_id=conv.parent_id if conv.parent_id else None,
+            thread_id=conv.thread_id,
+            tokens=conv.tokens,
+            model_name=conv.model_name,
+            processing_time_ms=conv.processing_time_ms,
+            confidence_score=conv.confidence_score,
+        )
+
+    @classmethod
+    def _memory_entry_from_model(cls, conv: "ConversationModel") -> MemoryEntry:
+        """会話行を中期メモリエントリに変換"""
+        conversation = cls._conversation_from_model(conv)
+        return MemoryEntry(
+            id=UUID(str(conv.id)),
+            session_id=conv.session_id,
+            memory_type=MemoryType.MEDIUM_TERM,
+            content=conv.content,
+            metadata=conversation.to_dict(),
+            created_at=conv.timestamp,
+            updated_at=conv.timestamp,
+            accessed_at=conv.timestamp,
+        )
+
     async def retrieve_conversations(
         self, session_id: str, limit: int = 10, offset: int = 0
     ) -> List[ConversationEntry]:
@@ -311,24 +517,7 @@ class SQLStorageAdapter(
                 result = await session.execute(stmt)
                 conversations = result.scalars().all()
 
-                entries = []
-                for conv in conversations:
-                    entry = ConversationEntry(
-                        id=conv.id,
-                        session_id=conv.session_id,
-                        conversation_type=ConversationType(conv.conversation_type),
-                        role=MessageRole(conv.role),
-                        content=conv.content,
-                        metadata=conv.metadata or {},
-                        timestamp=conv.timestamp,
-                        parent_id=conv.parent_id if conv.parent_id else None,
-                        thread_id=conv.thread_id,
-                        tokens=conv.tokens,
-                        model_name=conv.model_name,
-                        processing_time_ms=conv.processing_time_ms,
-                        confidence_score=conv.confidence_score,
-                    )
-                    entries.append(entry)
+                entries = [self._conversation_from_model(conv) for conv in conversations]
 
                 self._logger.debug(f"会話履歴を取得しました: {len(entries)}件")
                 return entries
@@ -338,71 +527,188 @@ class SQLStorageAdapter(
             return []
 
     async def search_conversations(
-        self, query: str, session_id: Optional[str] = None, limit: int = 10, threshold: float = 0.7
+        self,
+        query: str,
+        session_id: Optional[str] = None,
+        limit: int = 10,
+        threshold: float = 0.7,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
     ) -> List[ConversationEntry]:
-        """会話を検索（テキスト検索）"""
+        """会話を検索（全文検索、関連度順）"""
+        results = await self.search_conversations_ranked(
+            query, session_id=session_id, limit=limit, since=since, until=until
+        )
+        return [entry for entry, _ in results]
+
+    async def search_conversations_ranked(
+        self,
+        query: str,
+        session_id: Optional[str] = None,
+        limit: int = 10,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Tuple[ConversationEntry, float]]:
+        """
+        会話を全文検索し、関連度と一緒に返す
+
+        Args:
+            query: 検索クエリ（いずれかの語を含む会話を検索する）
+            session_id: セッションID（指定時はセッション内検索）
+            limit: 取得件数制限
+            since: この時刻以降の会話のみ
+            until: この時刻以前の会話のみ
+
+        Returns:
+            List[Tuple[ConversationEntry, float]]: (会話エントリ, 0〜1の関連度) の関連度順のリスト
+        """
         if not self._engine:
             await self.connect()
 
         try:
             async with self._session_factory() as session:
-                stmt = select(ConversationModel).where(ConversationModel.content.contains(query))
-
+                stmt = select(ConversationModel)
                 if session_id:
                     stmt = stmt.where(ConversationModel.session_id == session_id)
-
-                stmt = stmt.order_by(ConversationModel.timestamp.desc()).limit(limit)
-
-                result = await session.execute(stmt)
-                conversations = result.scalars().all()
-
-                entries = []
-                for conv in conversations:
-                    entry = ConversationEntry(
-                        id=conv.id,
-                        session_id=conv.session_id,
-                        conversation_type=ConversationType(conv.conversation_type),
-                        role=MessageRole(conv.role),
-                        content=conv.content,
-                        metadata=conv.metadata or {},
-                        timestamp=conv.timestamp,
-                        parent_id=conv.parent_id if conv.parent_id else None,
-                        thread_id=conv.thread_id,
-                        tokens=conv.tokens,
-                        model_name=conv.model_name,
-                        processing_time_ms=conv.processing_time_ms,
-                        confidence_score=conv.confidence_score,
+                if since:
+                    stmt = stmt.where(ConversationModel.timestamp >= since)
+                if until:
+                    stmt = stmt.where(ConversationModel.timestamp <= until)
+
+                terms = fulltext_terms(query)
+                if self._fulltext_backend and terms:
+                    stmt, _ = apply_fulltext_search(
+                        stmt, self._fulltext_backend, ConversationModel.__tablename__, terms
+                    )
+                    result = await session.execute(stmt.limit(limit))
+                    results = [
+                        (
+                            self._conversation_from_model(conv),
+                            normalize_score(self._fulltext_backend, raw_score),
+                        )
+                        for conv, raw_score in result.all()
+                    ]
+                else:
+                    stmt = (
+                        stmt.where(ConversationModel.content.contains(query))
+                        .order_by(ConversationModel.timestamp.desc())
+                        .limit(limit)
                     )
-                    entries.append(entry)
+                    result = await session.execute(stmt)
+                    results = [
+                        (self._conversation_from_model(conv), LIKE_MATCH_SCORE)
+                        for conv in result.scalars().all()
+                    ]
 
-                self._logger.debug(f"会話検索結果: {len(entries)}件")
-                return entries
+                self._logger.debug(f"会話検索結果: {len(results)}件")
+                return results
 
         except Exception as e:
             self._logger.error(f"会話検索エラー: {e}")
             return []
 
+    async def rebuild_search_index(self) -> None:
+        """全文検索インデックスを作り直す（SQLiteでVACUUMした後など）"""
+        if not self._engine:
+            await self.connect()
+
+        async with self._engine.begin() as conn:
+            await rebuild_fulltext_indexes(conn, self._fulltext_backend)
+        self._logger.info("全文検索インデックスを再構築しました")
+
     async def delete_old_conversations(self, days: int) -> int:
         """古い会話を削除"""
+        return len(await self.delete_old_conversation_ids(days))
+
+    async def delete_old_conversation_ids(self, days: int, batch_size: int = 1000) -> List[str]:
+        """
+        古い会話を batch_size 件ずつ削除し、削除した会話のIDを返す
+
+        ベクトルストアやキャッシュに残っている同じIDのデータを削除するために使います。
+        バッチ毎にコミットするため、大量に削除してもロックを長く保持しません。
+        """
         if not self._engine:
             await self.connect()
 
+        deleted_ids: List[str] = []
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-            async with self._session_factory() as session:
-                stmt = delete(ConversationModel).where(ConversationModel.timestamp < cutoff_date)
+            while True:
+                async with self._session_factory() as session:
+                    result = await session.execute(
+                        select(ConversationModel.id)
+                        .where(ConversationModel.timestamp < cutoff_date)
+                        .limit(batch_size)
+                    )
+                    ids = [str(conv_id) for conv_id in result.scalars()]
+                    if not ids:
+                        break
 
-                result = await session.execute(stmt)
-                await session.commit()
+                    await session.execute(
+                        delete(ConversationModel).where(ConversationModel.id.in_(ids))
+                    )
+                    await session.commit()
+                deleted_ids.extend(ids)
 
-                deleted_count = result.rowcount
-                self._logger.info(f"古い会話を削除しました: {deleted_count}件")
-                return deleted_count
+            self._logger.info(f"古い会話を削除しました: {len(deleted_ids)}件")
+            return deleted_ids
 
         except Exception as e:
             self._logger.error(f"会話削除エラー: {e}")
-            return 0
+            return deleted_ids
+
+    async def retrieve_conversations_between(
+        self,
+        since: Optional[datetime],
+        until: datetime,
+        limit: int = 1000,
+        after_id: Optional[str] = None,
+    ) -> List[ConversationEntry]:
+        """
+        全セッションの会話を期間で (timestamp, id) の昇順に取得
+
+        (timestamp, id) をキーにページングするため、前回の最後の行の timestamp と id を
+        since と after_id に渡すと、同じ時刻の行を読み飛ばさずに続きを取得できます。
+
+        Args:
+            since: この時刻より後（after_id を指定した場合は同じ時刻で id が after_id より
+                後の行も含む。Noneの場合は制限なし）
+            until: この時刻以前
+            limit: 取得する最大件数
+            after_id: since と同じ時刻の行のうち、この id 以前の行を除く
+        """
+        if not self._engine:
+            await self.connect()
+
+        try:
+            conditions = [ConversationModel.timestamp <= until]
+            if since is not None:
+                if after_id is None:
+                    conditions.append(ConversationModel.timestamp > since)
+                else:
+                    conditions.append(
+                        or_(
+                            ConversationModel.timestamp > since,
+                            and_(
+                                ConversationModel.timestamp == since,
+                                ConversationModel.id > after_id,
+                            ),
+                        )
+                    )
+
+            async with self._session_factory() as session:
+                result = await session.execute(
+                    select(ConversationModel)
+                    .where(and_(*conditions))
+                    .order_by(ConversationModel.timestamp, ConversationModel.id)
+                    .limit(limit)
+                )
+                return [self._conversation_from_model(conv) for conv in result.scalars()]
+
+        except Exception as e:
+            self._logger.error(f"期間指定の会話取得エラー: {e}")
+            return []
 
     async def get_conversation_statistics(self, session_id: str) -> Dict[str, Any]:
         """会話統計情報を取得"""
@@ -617,34 +923,43 @@ class SQLStorageAdapter(
 
     async def cleanup_expired_sessions(self, timeout_minutes: int = 60) -> int:
         """期限切れセッションをクリーンアップ"""
+        return len(await self.expire_sessions(timeout_minutes))
+
+    async def expire_sessions(self, timeout_minutes: int = 60) -> List[str]:
+        """
+        期限切れセッションを expired にし、そのセッションIDを返す
+
+        キャッシュ側でセッション単位の削除を行うために使います。
+        """
         if not self._engine:
             await self.connect()
 
         try:
             cutoff_time = datetime.utcnow() - timedelta(minutes=timeout_minutes)
+            expired = and_(
+                SessionModel.status == "active",
+                SessionModel.last_activity < cutoff_time,
+            )
 
             async with self._session_factory() as session:
-                stmt = (
-                    update(SessionModel)
-                    .where(
-                        and_(
-                            SessionModel.status == "active",
-                            SessionModel.last_activity < cutoff_time,
-                        )
-                    )
-                    .values(status="expired", end_time=datetime.utcnow())
-                )
+                result = await session.execute(select(SessionModel.session_id).where(expired))
+                session_ids = [str(session_id) for session_id in result.scalars()]
 
-                result = await session.execute(stmt)
+                for start in range(0, len(session_ids), self.IN_CLAUSE_CHUNK_SIZE):
+                    chunk = session_ids[start : start + self.IN_CLAUSE_CHUNK_SIZE]
+                    await session.execute(
+                        update(SessionModel)
+                        .where(and_(expired, SessionModel.session_id.in_(chunk)))
+                        .values(status="expired", end_time=datetime.utcnow())
+                    )
                 await session.commit()
 
-                expired_count = result.rowcount
-                self._logger.info(f"期限切れセッションをクリーンアップしました: {expired_count}件")
-                return expired_count
+                self._logger.info(f"期限切れセッションをクリーンアップしました: {len(session_ids)}件")
+                return session_ids
 
         except Exception as e:
             self._logger.error(f"セッションクリーンアップエラー: {e}")
-            return 0
+            return []
 
     # SummaryStorageAdapter実装
 
@@ -687,6 +1002,24 @@ class SQLStorageAdapter(
             self._logger.error(f"要約保存エラー: {e}")
             raise
 
+    @staticmethod
+    def _summary_from_model(summary_model: "SummaryModel") -> SessionSummary:
+        """要約行を要約に変換"""
+        return SessionSummary(
+            session_id=summary_model.session_id,
+            summary_type=summary_model.summary_type,
+            content=summary_model.content,
+            total_conversations=summary_model.total_conversations,
+            total_commands=summary_model.total_commands,
+            total_errors=summary_model.total_errors,
+            total_tokens=summary_model.total_tokens,
+            duration_minutes=summary_model.duration_minutes,
+            start_time=summary_model.start_time,
+            end_time=summary_model.end_time,
+            created_at=summary_model.created_at,
+            metadata=summary_model.metadata or {},
+        )
+
     async def retrieve_summaries(
         self, session_id: str, summary_type: Optional[str] = None
     ) -> List[SessionSummary]:
@@ -706,63 +1039,62 @@ class SQLStorageAdapter(
                 result = await session.execute(stmt)
                 summary_models = result.scalars().all()
 
-                summaries = []
-                for summary_model in summary_models:
-                    summary = SessionSummary(
-                        session_id=summary_model.session_id,
-                        summary_type=summary_model.summary_type,
-                        content=summary_model.content,
-                        total_conversations=summary_model.total_conversations,
-                        total_commands=summary_model.total_commands,
-                        total_errors=summary_model.total_errors,
-                        total_tokens=summary_model.total_tokens,
-                        duration_minutes=summary_model.duration_minutes,
-                        start_time=summary_model.start_time,
-                        end_time=summary_model.end_time,
-                        created_at=summary_model.created_at,
-                        metadata=summary_model.metadata or {},
-                    )
-                    summaries.append(summary)
-
-                return summaries
+                return [self._summary_from_model(summary_model) for summary_model in summary_models]
 
         except Exception as e:
             self._logger.error(f"要約取得エラー: {e}")
             return []
 
-    async def search_summaries(self, query: str, limit: int = 10) -> List[SessionSummary]:
-        """要約を検索"""
+    async def search_summaries(
+        self,
+        query: str,
+        limit: int = 10,
+        session_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[SessionSummary]:
+        """
+        要約を検索（全文検索、関連度順）
+
+        since / until を指定すると、対象期間がその範囲と重なる要約のみを返します。
+        関連度は各要約の metadata["relevance_score"] に設定されます。
+        """
         if not self._engine:
             await self.connect()
 
         try:
             async with self._session_factory() as session:
-                stmt = (
-                    select(SummaryModel)
-                    .where(SummaryModel.content.contains(query))
-                    .order_by(SummaryModel.created_at.desc())
-                    .limit(limit)
-                )
-
-                result = await session.execute(stmt)
-                summary_models = result.scalars().all()
+                stmt = select(SummaryModel)
+                if session_id:
+                    stmt = stmt.where(SummaryModel.session_id == session_id)
+                if since:
+                    stmt = stmt.where(SummaryModel.end_time >= since)
+                if until:
+                    stmt = stmt.where(SummaryModel.start_time <= until)
+
+                terms = fulltext_terms(query)
+                if self._fulltext_backend and terms:
+                    stmt, _ = apply_fulltext_search(
+                        stmt, self._fulltext_backend, SummaryModel.__tablename__, terms
+                    )
+                    result = await session.execute(stmt.limit(limit))
+                    rows = [
+                        (summary_model, normalize_score(self._fulltext_backend, raw_score))
+                        for summary_model, raw_score in result.all()
+                    ]
+                else:
+                    stmt = (
+                        stmt.where(SummaryModel.content.contains(query))
+                        .order_by(SummaryModel.created_at.desc())
+                        .limit(limit)
+                    )
+                    result = await session.execute(stmt)
+                    rows = [(summary_model, LIKE_MATCH_SCORE) for summary_model in result.scalars()]
 
                 summaries = []
-                for summary_model in summary_models:
-                    summary = SessionSummary(
-                        session_id=summary_model.session_id,
-                        summary_type=summary_model.summary_type,
-                        content=summary_model.content,
-                        total_conversations=summary_model.total_conversations,
-                        total_commands=summary_model.total_commands,
-                        total_errors=summary_model.total_errors,
-                        total_tokens=summary_model.total_tokens,
-                        duration_minutes=summary_model.duration_minutes,
-                        start_time=summary_model.start_time,
-                        end_time=summary_model.end_time,
-                        created_at=summary_model.created_at,
-                        metadata=summary_model.metadata or {},
-                    )
+                for summary_model, score in rows:
+                    summary = self._summary_from_model(summary_model)
+                    summary.metadata = {**summary.metadata, "relevance_score": score}
                     summaries.append(summary)
 
                 return summaries
@@ -0,0 +1,216 @@
+"""
+SQLストレージの全文検索インデックス
+
+会話・要約の本文に全文検索インデックスを作成し、関連度順の検索文を組み立てます。
+日本語のように空白で区切らない文章や語の一部でも一致するよう、どちらのバックエンドも
+3文字単位（トライグラム）で索引を作り、部分文字列として検索します。
+
+- SQLite（3.34以降）: trigram トークナイザの FTS5 外部コンテンツテーブル（<table>_fts）を
+  トリガーで本体と同期し、bm25() で順位付け。3文字未満の語を含む検索は LIKE で行う
+- PostgreSQL: pg_trgm の GIN インデックスを使った ILIKE 検索で、word_similarity() で順位付け
+- それ以外（または trigram が使えない SQLite）: 従来どおり LIKE 検索
+
+検索語はいずれかを含む行に一致します（OR）。インデックスは接続時に冪等なDDLで作成され、
+既存のデータベースでは初回に既存行から構築されます（以前の単語単位のインデックスは
+作り直します）。SQLite の外部コンテンツテーブルは rowid で本体と対応付けるため、
+VACUUM 後は rebuild_fulltext_indexes() で作り直してください。
+"""
+
+import logging
+import re
+from typing import List, Optional, Tuple
+
+try:
+    from sqlalchemy import column, func, literal, literal_column, or_, table, text
+except ImportError:
+    text = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_FTS5 = "fts5"
+BACKEND_TRIGRAM = "pg_trgm"
+
+# 全文検索インデックスを張るテーブル（本文は content 列）
+FULLTEXT_TABLES = ("conversations", "summaries")
+
+# 関連度で順位付けできないときに新しい順に並べるための列
+_RECENCY_COLUMNS = {"conversations": "timestamp", "summaries": "created_at"}
+
+# trigram トークナイザは SQLite 3.34 以降
+SQLITE_TRIGRAM_VERSION = (3, 34, 0)
+
+# トライグラムの長さ。これより短い語は索引で検索できない
+TRIGRAM_LENGTH = 3
+
+_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _sqlite_ddl(name: str) -> List[str]:
+    fts = f"{name}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} "
+        f"USING fts5(content, content='{name}', content_rowid='rowid', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {fts}(rowid, content) VALUES (new.rowid, new.content); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.rowid, old.content); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF content ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.rowid, old.content); "
+        f"INSERT INTO {fts}(rowid, content) VALUES (new.rowid, new.content); END",
+    ]
+
+
+def _postgres_ddl(name: str) -> List[str]:
+    return [
+        # 以前の tsvector の生成列（単語単位で日本語を検索できない）は削除する
+        f"DROP INDEX IF EXISTS idx_{name}_search_vector",
+        f"ALTER TABLE {name} DROP COLUMN IF EXISTS search_vector",
+        f"CREATE INDEX IF NOT EXISTS idx_{name}_content_trgm "
+        f"ON {name} USING GIN (content gin_trgm_ops)",
+    ]
+
+
+async def _sqlite_version(conn) -> Tuple[int, ...]:
+    version = (await conn.execute(text("SELECT sqlite_version()"))).scalar()
+    return tuple(int(part) for part in version.split("."))
+
+
+async def create_fulltext_indexes(conn) -> Optional[str]:
+    """
+    全文検索インデックスを作成（既にあれば何もしない）
+
+    Args:
+        conn: AsyncConnection（トランザクション内）
+
+    Returns:
+        Optional[str]: 使用する全文検索バックエンド（使えない場合はNone）
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        version = await _sqlite_version(conn)
+        if version < SQLITE_TRIGRAM_VERSION:
+            logger.warning(
+                f"SQLite {'.'.join(map(str, version))} は trigram トークナイザに"
+                "対応していないため全文検索インデックスを作成しません"
+            )
+            return None
+
+        existing = {
+            row[0]: row[1] or ""
+            for row in await conn.execute(
+                text(
+                    "SELECT name, sql FROM sqlite_master "
+                    "WHERE type = 'table' AND name LIKE '%_fts'"
+                )
+            )
+        }
+        try:
+            for name in FULLTEXT_TABLES:
+                fts = f"{name}_fts"
+                rebuild = fts not in existing
+                if not rebuild and "trigram" not in existing[fts]:
+                    # 以前の単語単位のインデックスは trigram で作り直す
+                    await conn.execute(text(f"DROP TABLE {fts}"))
+                    rebuild = True
+                for statement in _sqlite_ddl(name):
+                    await conn.execute(text(statement))
+                if rebuild:
+                    # 既存の行からインデックスを構築
+                    await conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        except Exception as e:
+            logger.warning(f"FTS5が利用できないため全文検索インデックスを作成しません: {e}")
+            return None
+        return BACKEND_FTS5
+
+    if dialect == "postgresql":
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except Exception as e:
+            logger.warning(f"pg_trgmが利用できないため全文検索インデックスを作成しません: {e}")
+            return None
+        for name in FULLTEXT_TABLES:
+            for statement in _postgres_ddl(name):
+                await conn.execute(text(statement))
+        return BACKEND_TRIGRAM
+
+    return None
+
+
+async def rebuild_fulltext_indexes(conn, backend: Optional[str]) -> None:
+    """全文検索インデックスを本体テーブルから作り直す"""
+    if backend == BACKEND_FTS5:
+        for name in FULLTEXT_TABLES:
+            await conn.execute(text(f"INSERT INTO {name}_fts({name}_fts) VALUES ('rebuild')"))
+    elif backend == BACKEND_TRIGRAM:
+        for name in FULLTEXT_TABLES:
+            await conn.execute(text(f"REINDEX INDEX idx_{name}_content_trgm"))
+
+
+def fulltext_terms(query: str) -> List[str]:
+    """検索クエリを語に分割（演算子などの記号は除く）"""
+    return _TERM_PATTERN.findall(query.lower())
+
+
+def apply_fulltext_search(stmt, backend: str, table_name: str, terms: List[str]) -> Tuple:
+    """
+    select文に全文検索の条件と順位付けを追加
+
+    いずれかの語を部分文字列として含む行（OR）を関連度の高い順に返します。
+    SQLite で3文字未満の語を含む場合はトライグラムで検索できないため、全ての語を LIKE で
+    検索し、関連度は一律（normalize_score() で0.5）で新しい順に並べます。
+
+    Args:
+        stmt: 本体テーブルを対象とするselect文
+        backend: create_fulltext_indexes() が返したバックエンド
+        table_name: 本体テーブル名
+        terms: fulltext_terms() で分割した語
+
+    Returns:
+        Tuple: (select文, 生スコアの列)
+    """
+    content = literal_column(f"{table_name}.content")
+
+    if backend == BACKEND_FTS5:
+        if any(len(term) < TRIGRAM_LENGTH for term in terms):
+            score = literal(0.0).label("fulltext_score")
+            recency = literal_column(f"{table_name}.{_RECENCY_COLUMNS[table_name]}")
+            stmt = (
+                stmt.add_columns(score)
+                .where(or_(*(content.contains(term, autoescape=True) for term in terms)))
+                .order_by(recency.desc())
+            )
+            return stmt, score
+
+        fts = table(f"{table_name}_fts", column("rowid"))
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        score = func.bm25(literal_column(fts.name)).label("fulltext_score")
+        stmt = (
+            stmt.add_columns(score)
+            .join(fts, fts.c.rowid == literal_column(f"{table_name}.rowid"))
+            .where(literal_column(fts.name).op("MATCH")(match))
+            .order_by(score)
+        )
+        return stmt, score
+
+    similarity = sum(func.word_similarity(term, content) for term in terms)
+    score = similarity.label("fulltext_score")
+    stmt = (
+        stmt.add_columns(score)
+        .where(or_(*(content.icontains(term, autoescape=True) for term in terms)))
+        .order_by(score.desc())
+    )
+    return stmt, score
+
+
+def normalize_score(backend: str, raw: float) -> float:
+    """
+    生スコアを0.5〜1の関連度に変換（大きいほど関連が高い）
+
+    一致した行は少なくとも0.5とします。bm25() は全行に現れる語のスコアがほぼ0になるため、
+    他の階層の検索結果と並べたときに一致した行が埋もれないようにしています。
+    """
+    # bm25() は関連が高いほど小さい（負の）値になる
+    value = -raw if backend == BACKEND_FTS5 else raw
+    value = max(0.0, float(value or 0.0))
+    return 0.5 + 0.5 * value / (1.0 + value)
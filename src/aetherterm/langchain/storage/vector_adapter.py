@@ -2,7 +2,7 @@
 ベクトルストレージアダプター（長期メモリ用）
 """
 
-import hashlib
+import asyncio
 import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
@@ -19,6 +19,9 @@ from langchain.schema import Document
 from ..config.storage_config import StorageConfig, VectorStoreType
 from ..models.conversation import ConversationEntry, ConversationType, MessageRole
 from .base_storage import BaseStorageAdapter, VectorStorageAdapter
+from .batch_writer import GroupCommitWriter
+from .embedding_cache import EmbeddingCache, embedding_key
+from .numpy_vector_index import NumpyVectorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -40,16 +43,39 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
         self.config = config
         self._embeddings = None
         self._vector_store = None
-        self._embedding_cache = {}  # 簡易キャッシュ
+        self._embedding_model = ""
+        # 埋め込みキャッシュ（件数・バイト数上限付きLRU、任意でディスク層）
+        self._embedding_cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(
+                max_entries=config.embedding_cache_max_entries,
+                max_bytes=config.embedding_cache_max_bytes,
+                disk_path=config.embedding_cache_path,
+                disk_capacity=config.embedding_cache_disk_entries,
+            )
+            if config.enable_embedding_cache
+            else None
+        )
+        # 同時に届いた埋め込み要求を1回の aembed_documents にまとめる
+        self._embedding_batcher: Optional[GroupCommitWriter[str]] = None
+        # インデックスの定期保存（FAISSは追加のたびではなく、変更があった時だけ保存する）
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._vector_store_dirty = False
 
     async def _connect_impl(self) -> None:
         """ベクトルストア接続実装"""
         try:
             # 埋め込みモデルの初期化
             await self._initialize_embeddings()
+            self._embedding_batcher = GroupCommitWriter(
+                self._embed_batch,
+                max_batch_size=self.config.embedding_batch_size,
+                max_delay=self.config.embedding_batch_max_delay_ms / 1000,
+                name="embedding batcher",
+            )
 
             # ベクトルストアの初期化
             await self._initialize_vector_store()
+            self._maintenance_task = asyncio.create_task(self._maintain_vector_store())
 
             self._logger.info(
                 f"ベクトルストア({self.config.vector_store_type.value})に接続しました"
@@ -61,7 +87,24 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
 
     async def _disconnect_impl(self) -> None:
         """ベクトルストア切断実装"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+
         if self._vector_store:
+            # 保存していない変更を書き込む
+            try:
+                if self._uses_numpy_index:
+                    await self._vector_store.close()
+                else:
+                    await self._save_vector_store()
+            except Exception as e:
+                self._logger.error(f"ベクトルストア保存エラー: {e}")
+
             # Chromaの場合は明示的にクライアントを閉じる
             if hasattr(self._vector_store, "_client"):
                 try:
@@ -71,8 +114,13 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
 
             self._vector_store = None
 
+        if self._embedding_batcher:
+            await self._embedding_batcher.close()
+            self._embedding_batcher = None
+
         self._embeddings = None
-        self._embedding_cache.clear()
+        if self._embedding_cache is not None:
+            self._embedding_cache.flush()
 
     async def _health_check_impl(self) -> Dict[str, Any]:
         """ベクトルストアヘルスチェック実装"""
@@ -86,13 +134,15 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             health_info = {
                 "vector_store_type": self.config.vector_store_type.value,
                 "embedding_dimension": len(test_embedding),
-                "cache_size": len(self._embedding_cache),
+                "cache_size": self._embedding_cache_size(),
             }
 
             # ベクトルストア固有の情報
             if self.config.vector_store_type == VectorStoreType.CHROMA:
                 if hasattr(self._vector_store, "_collection"):
                     health_info["collection_count"] = self._vector_store._collection.count()
+            elif self._uses_numpy_index:
+                health_info["collection_count"] = self._vector_store.document_count
 
             return health_info
 
@@ -102,6 +152,7 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
     async def _initialize_embeddings(self) -> None:
         """埋め込みモデルの初期化"""
         embedding_model = self.config.to_dict().get("embedding_model", "text-embedding-ada-002")
+        self._embedding_model = embedding_model
 
         if embedding_model.startswith("text-embedding"):
             # OpenAI埋め込み
@@ -122,6 +173,8 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             await self._initialize_chroma()
         elif self.config.vector_store_type == VectorStoreType.FAISS:
             await self._initialize_faiss()
+        elif self.config.vector_store_type == VectorStoreType.NUMPY:
+            await self._initialize_numpy()
         else:
             raise ValueError(f"サポートされていないベクトルストア: {self.config.vector_store_type}")
 
@@ -155,32 +208,119 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             # ダミードキュメントを削除
             self._vector_store.delete([0])
 
+    async def _initialize_numpy(self) -> None:
+        """NumPyベクトルインデックスの初期化"""
+        loop = asyncio.get_running_loop()
+        # 既存のセグメントの読み込みはスレッドで行う
+        self._vector_store = await loop.run_in_executor(
+            None,
+            lambda: NumpyVectorIndex(
+                path=self.config.vector_store_path,
+                ivf_threshold=self.config.numpy_ivf_threshold,
+                nprobe=self.config.numpy_ivf_nprobe,
+                max_segments=self.config.numpy_max_segments,
+            ),
+        )
+
+    @property
+    def _uses_numpy_index(self) -> bool:
+        return isinstance(self._vector_store, NumpyVectorIndex)
+
+    async def _maintain_vector_store(self) -> None:
+        """ベクトルストアを定期的に保存・最適化"""
+        while True:
+            await asyncio.sleep(self.config.vector_save_interval_seconds)
+            try:
+                await self._save_vector_store()
+            except Exception as e:
+                self._logger.error(f"ベクトルストア保存エラー: {e}")
+
+    async def _save_vector_store(self) -> None:
+        """前回の保存以降の変更を書き込む"""
+        if self._uses_numpy_index:
+            index = self._vector_store
+            await index.save()
+            if index.needs_training():
+                await index.train()
+            if index.needs_compaction():
+                await index.compact()
+        elif self.config.vector_store_type == VectorStoreType.FAISS and self._vector_store_dirty:
+            self._vector_store_dirty = False
+            self._vector_store.save_local(self.config.vector_store_path)
+
     # VectorStorageAdapter実装
 
     async def generate_embedding(self, text: str) -> List[float]:
         """テキストの埋め込みベクトルを生成"""
+        return (await self.generate_embeddings([text]))[0]
+
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        複数テキストの埋め込みベクトルを生成
+
+        キャッシュにないテキストだけを埋め込みます。同時に届いた他の要求とまとめて
+        1回の aembed_documents 呼び出しで処理されます。
+
+        Returns:
+            List[List[float]]: texts と同じ順序の埋め込みベクトル
+        """
         if not self._embeddings:
             await self.connect()
 
         try:
-            # キャッシュチェック
-            text_hash = hashlib.md5(text.encode()).hexdigest()
-            if text_hash in self._embedding_cache:
-                return self._embedding_cache[text_hash]
-
-            # 埋め込み生成
-            embedding = await self._embeddings.aembed_query(text)
-
-            # キャッシュに保存（サイズ制限）
-            if len(self._embedding_cache) < 1000:
-                self._embedding_cache[text_hash] = embedding
+            results: List[Optional[List[float]]] = [None] * len(texts)
+            # キャッシュにないテキスト（キー -> texts内の位置）
+            missing: Dict[bytes, List[int]] = {}
+            for index, text in enumerate(texts):
+                key = embedding_key(text, self._embedding_model)
+                cached = None
+                if self._embedding_cache is not None:
+                    cached = self._embedding_cache.get(key)
+                if cached is not None:
+                    results[index] = cached
+                else:
+                    missing.setdefault(key, []).append(index)
+
+            if missing:
+                embeddings = await asyncio.gather(
+                    *(
+                        self._embedding_batcher.submit(texts[indexes[0]])
+                        for indexes in missing.values()
+                    )
+                )
+                for (key, indexes), embedding in zip(missing.items(), embeddings):
+                    if self._embedding_cache is not None:
+                        self._embedding_cache.put(key, embedding)
+                    for index in indexes:
+                        results[index] = embedding
 
-            return embedding
+            return results
 
         except Exception as e:
             self._logger.error(f"埋め込み生成エラー: {e}")
             raise
 
+    def _embedding_cache_size(self) -> int:
+        return len(self._embedding_cache) if self._embedding_cache is not None else 0
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """まとめた埋め込み要求を1回で処理"""
+        return await self._embeddings.aembed_documents(texts)
+
+    def _embedding_throughput(self) -> Dict[str, Any]:
+        """埋め込み生成の処理量"""
+        if not self._embedding_batcher:
+            return {}
+        stats = self._embedding_batcher.get_stats()
+        return {
+            "embedded": stats["written"],
+            "api_calls": stats["batches"],
+            "average_batch_size": stats["average_batch_size"],
+            "embeddings_per_second": stats["written"] / stats["write_time"]
+            if stats["write_time"]
+            else 0.0,
+        }
+
     async def store_embedding(
         self, content_id: str, content: str, embedding: List[float], metadata: Dict[str, Any] = None
     ) -> str:
@@ -193,14 +333,20 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             doc_metadata["content_id"] = content_id
             doc_metadata["timestamp"] = datetime.utcnow().isoformat()
 
+            if self._uses_numpy_index:
+                # 保存は _maintain_vector_store() でまとめて行う
+                self._vector_store.add(content_id, embedding, content, doc_metadata)
+                self._logger.debug(f"埋め込みを保存しました: {content_id}")
+                return content_id
+
             document = Document(page_content=content, metadata=doc_metadata)
 
             # ベクトルストアに追加
             ids = await self._vector_store.aadd_documents([document])
 
-            # FAISSの場合は保存
+            # FAISSの場合は次の定期保存で書き込む
             if self.config.vector_store_type == VectorStoreType.FAISS:
-                self._vector_store.save_local(self.config.vector_store_path)
+                self._vector_store_dirty = True
 
             self._logger.debug(f"埋め込みを保存しました: {content_id}")
             return ids[0] if ids else content_id
@@ -209,10 +355,80 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             self._logger.error(f"埋め込み保存エラー: {e}")
             raise
 
+    async def store_embeddings(
+        self, items: List[Tuple[str, str, List[float], Dict[str, Any]]]
+    ) -> List[str]:
+        """
+        埋め込みベクトルをまとめて保存
+
+        生成済みのベクトルをそのまま保存するため、ベクトルストア側で埋め込みを
+        生成し直すことはありません。同じIDのドキュメントがあれば置き換えます
+        （FAISS は置き換えずに追加します）。
+
+        Args:
+            items: (コンテンツID, 本文, 埋め込み, メタデータ) のリスト
+
+        Returns:
+            List[str]: 保存したコンテンツID
+        """
+        if not items:
+            return []
+        if not self._vector_store:
+            await self.connect()
+
+        timestamp = datetime.utcnow().isoformat()
+        content_ids = [content_id for content_id, _, _, _ in items]
+        contents = [content for _, content, _, _ in items]
+        embeddings = [embedding for _, _, embedding, _ in items]
+        metadatas = [
+            {**(metadata or {}), "content_id": content_id, "timestamp": timestamp}
+            for content_id, _, _, metadata in items
+        ]
+
+        try:
+            if self._uses_numpy_index:
+                self._vector_store.add_many(content_ids, embeddings, contents, metadatas)
+            elif self.config.vector_store_type == VectorStoreType.CHROMA:
+                self._vector_store._collection.upsert(
+                    ids=content_ids,
+                    embeddings=embeddings,
+                    documents=contents,
+                    metadatas=metadatas,
+                )
+            else:
+                self._vector_store.add_embeddings(
+                    list(zip(contents, embeddings)), metadatas=metadatas
+                )
+                self._vector_store_dirty = True
+
+            self._logger.debug(f"埋め込みをまとめて保存しました: {len(items)}件")
+            return content_ids
+
+        except Exception as e:
+            self._logger.error(f"埋め込み一括保存エラー: {e}")
+            raise
+
     async def similarity_search(
         self, query: str, limit: int = 10, threshold: float = 0.7, filters: Dict[str, Any] = None
     ) -> List[Tuple[str, float]]:
         """類似性検索"""
+        results = await self.similarity_search_documents(
+            query=query, limit=limit, threshold=threshold, filters=filters
+        )
+        return [(self._content_id(doc), similarity) for doc, similarity in results]
+
+    async def similarity_search_documents(
+        self, query: str, limit: int = 10, threshold: float = 0.7, filters: Dict[str, Any] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        類似性検索（ドキュメントとメタデータも返す）
+
+        検索結果の本文とメタデータを1回の問い合わせで返すため、呼び出し側で
+        結果ごとに取得し直す必要はありません。
+
+        Returns:
+            List[Tuple[Document, float]]: (ドキュメント, 類似度) のリスト
+        """
         if not self._vector_store:
             await self.connect()
 
@@ -222,6 +438,16 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             if filters:
                 search_kwargs["filter"] = filters
 
+            if self._uses_numpy_index:
+                query_embedding = await self._embeddings.aembed_query(query)
+                hits = self._vector_store.search(query_embedding, k=limit, filters=filters)
+                # コサイン類似度をそのまま使う
+                return [
+                    (Document(page_content=document, metadata=metadata), similarity)
+                    for _, document, metadata, similarity in hits
+                    if similarity >= threshold
+                ]
+
             # 類似性検索実行
             results = await self._vector_store.asimilarity_search_with_score(query, **search_kwargs)
 
@@ -232,8 +458,7 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
                 similarity = 1.0 - score if score <= 1.0 else 1.0 / (1.0 + score)
 
                 if similarity >= threshold:
-                    content_id = doc.metadata.get("content_id", str(hash(doc.page_content)))
-                    filtered_results.append((content_id, similarity))
+                    filtered_results.append((doc, similarity))
 
             self._logger.debug(f"類似性検索結果: {len(filtered_results)}件")
             return filtered_results
@@ -242,6 +467,11 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
             self._logger.error(f"類似性検索エラー: {e}")
             return []
 
+    @staticmethod
+    def _content_id(doc: Document) -> str:
+        """ドキュメントのコンテンツIDを取得"""
+        return doc.metadata.get("content_id", str(hash(doc.page_content)))
+
     async def delete_embeddings(self, content_ids: List[str]) -> int:
         """埋め込みベクトルを削除"""
         if not self._vector_store:
@@ -260,6 +490,9 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
                     except:
                         continue
 
+            elif self._uses_numpy_index:
+                deleted_count = self._vector_store.delete(content_ids)
+
             # FAISSの場合は再構築が必要（簡易実装）
             elif self.config.vector_store_type == VectorStoreType.FAISS:
                 # 削除対象以外のドキュメントで再構築
@@ -281,7 +514,11 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
         try:
             stats = {
                 "vector_store_type": self.config.vector_store_type.value,
-                "cache_size": len(self._embedding_cache),
+                "cache_size": self._embedding_cache_size(),
+                "embedding_cache": (
+                    self._embedding_cache.get_stats() if self._embedding_cache is not None else {}
+                ),
+                "embedding_throughput": self._embedding_throughput(),
             }
 
             # Chromaの場合
@@ -295,6 +532,12 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
                     stats["total_documents"] = self._vector_store.index.ntotal
                     stats["index_dimension"] = self._vector_store.index.d
 
+            elif self._uses_numpy_index:
+                index_stats = self._vector_store.get_stats()
+                stats["total_documents"] = index_stats["documents"]
+                stats["index_dimension"] = index_stats["dimension"]
+                stats["index"] = index_stats
+
             return stats
 
         except Exception as e:
@@ -332,61 +575,54 @@ class VectorStoreAdapter(BaseStorageAdapter, VectorStorageAdapter):
         if session_id:
             filters["session_id"] = session_id
 
-        results = await self.similarity_search(
+        results = await self.similarity_search_documents(
             query=query, limit=limit, threshold=threshold, filters=filters
         )
 
-        # 結果をConversationEntryに変換（簡易版）
+        # 検索結果のメタデータからConversationEntryを復元
         conversations = []
-        for content_id, similarity in results:
-            # 実際の実装では、content_idから完全なConversationEntryを復元する必要がある
-            # ここでは簡易的な実装
+        for doc, _ in results:
             try:
-                # ベクトルストアから詳細情報を取得
-                docs = await self._vector_store.asimilarity_search(
-                    query, k=1, filter={"content_id": content_id}
-                )
-
-                if docs:
-                    doc = docs[0]
-                    metadata = doc.metadata
-
-                    # ConversationEntryを復元
-                    entry = ConversationEntry(
-                        id=metadata.get("conversation_id", content_id),
-                        session_id=metadata.get("session_id", ""),
-                        conversation_type=ConversationType(
-                            metadata.get("conversation_type", "user_input")
-                        ),
-                        role=MessageRole(metadata.get("role", "user")),
-                        content=doc.page_content,
-                        timestamp=datetime.fromisoformat(
-                            metadata.get("timestamp", datetime.utcnow().isoformat())
-                        ),
-                        metadata={
-                            k: v
-                            for k, v in metadata.items()
-                            if k
-                            not in [
-                                "conversation_id",
-                                "session_id",
-                                "conversation_type",
-                                "role",
-                                "timestamp",
-                            ]
-                        },
-                    )
-
-                    conversations.append(entry)
-
+                conversations.append(self._conversation_from_document(doc))
             except Exception as e:
                 self._logger.warning(f"会話エントリ復元エラー: {e}")
                 continue
 
         return conversations
 
+    @classmethod
+    def _conversation_from_document(cls, doc: Document) -> ConversationEntry:
+        """store_conversation() で保存したドキュメントを会話エントリに変換"""
+        metadata = doc.metadata
+        return ConversationEntry(
+            id=metadata.get("conversation_id", cls._content_id(doc)),
+            session_id=metadata.get("session_id", ""),
+            conversation_type=ConversationType(metadata.get("conversation_type", "user_input")),
+            role=MessageRole(metadata.get("role", "user")),
+            content=doc.page_content,
+            timestamp=datetime.fromisoformat(
+                metadata.get("timestamp", datetime.utcnow().isoformat())
+            ),
+            metadata={
+                k: v
+                for k, v in metadata.items()
+                if k
+                not in [
+                    "conversation_id",
+                    "session_id",
+                    "conversation_type",
+                    "role",
+                    "timestamp",
+                ]
+            },
+        )
+
     async def get_embedding(self, content_id: str) -> Optional[List[float]]:
         """コンテンツIDから埋め込みベクトルを取得"""
+        if self._uses_numpy_index:
+            # NumPyインデックスは正規化済みのベクトルを返す
+            return self._vector_store.get_vector(content_id)
+
         # 実装は複雑になるため、ここでは None を返す
         # 実際の実装では、ベクトルストアから埋め込みを取得する必要がある
         return None
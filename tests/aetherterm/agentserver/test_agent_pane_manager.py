@@ -0,0 +1,74 @@
+"""
+AgentPaneManager のインデックスとブロードキャストのテスト
+"""
+
+import asyncio
+
+from aetherterm.agentserver.agent_pane_manager import AgentPaneManager, MessageRouter
+from aetherterm.common.agent_protocol import AgentMessage, PaneConfig
+
+
+async def create_manager(count):
+    manager = AgentPaneManager()
+    router = MessageRouter(manager)
+    manager.set_message_router(router)
+    panes = [
+        await manager.create_agent_pane(
+            f"session-{i % 2}", "openhands" if i % 2 else "langchain", PaneConfig()
+        )
+        for i in range(count)
+    ]
+    return manager, router, panes
+
+
+def test_indexes_follow_status_changes_and_destroy():
+    async def scenario():
+        manager, _router, panes = await create_manager(6)
+
+        assert [p.pane_id for p in manager.list_panes(parent_session_id="session-0")] == [
+            panes[0].pane_id, panes[2].pane_id, panes[4].pane_id
+        ]
+        assert manager.count_panes(agent_type="openhands", status="active") == 3
+
+        manager.set_pane_status(panes[1].pane_id, "paused")
+        assert manager.count_panes(status="paused") == 1
+        assert manager.count_panes(agent_type="openhands", status="active") == 2
+
+        # ステータスを戻しても一覧は作成順のまま
+        manager.set_pane_status(panes[3].pane_id, "paused")
+        manager.set_pane_status(panes[3].pane_id, "active")
+        assert [p.pane_id for p in manager.list_panes(status="active")] == [
+            panes[i].pane_id for i in (0, 2, 3, 4, 5)
+        ]
+
+        await manager.destroy_pane(panes[1].pane_id)
+        assert manager.count_panes(status="paused") == 0
+        assert manager.count_panes(agent_type="openhands") == 2
+        assert manager.get_pane_by_agent(panes[1].agent_id) is None
+
+    asyncio.run(scenario())
+
+
+def test_broadcast_serializes_once_and_times_out_slow_handlers():
+    async def scenario():
+        manager, router, panes = await create_manager(4)
+        received = []
+
+        async def slow(message):
+            await asyncio.sleep(10)
+
+        def wire(payload):
+            received.append(payload)
+
+        router.register_handler(panes[0].pane_id, slow)
+        router.register_handler(panes[2].pane_id, wire, serialized=True)
+
+        delivered = await manager.broadcast_to_agents(
+            AgentMessage(), agent_types=["langchain"], timeout=0.05
+        )
+
+        assert delivered == 1
+        assert isinstance(received[0], str)
+        assert router.stats["timeouts"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+"""
+AutoBlocker のブロック解除のテスト
+"""
+
+import asyncio
+
+from aetherterm.agentserver.auto_blocker import AutoBlocker, BlockReason
+
+
+class _RecordingSio:
+    def __init__(self):
+        self.emitted = []
+
+    async def emit(self, event, data):
+        self.emitted.append((event, data))
+
+
+def test_expired_block_is_not_reported_as_admin_unblock():
+    async def run():
+        sio = _RecordingSio()
+        blocker = AutoBlocker(sio)
+        blocker.block_session("s1", BlockReason.CRITICAL_KEYWORD, "blocked", "alert")
+        blocker.block_session("s2", BlockReason.MANUAL_BLOCK, "blocked", "alert")
+
+        blocker._expire_blocks(["s1"])
+        assert blocker.force_unblock_session("s2")
+        await asyncio.sleep(0)
+        return sio.emitted[2:]
+
+    expired, forced = asyncio.run(run())
+    assert expired[0] == "auto_unblock"
+    assert expired[1]["session_id"] == "s1" and expired[1]["reason"] == "expired"
+    assert "管理者" not in expired[1]["message"]
+    assert forced[0] == "force_unblock" and forced[1]["reason"] == "admin"
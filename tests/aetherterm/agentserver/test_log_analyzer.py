@@ -0,0 +1,38 @@
+"""
+LogAnalyzer のスライディングウィンドウ集計のテスト
+"""
+
+from aetherterm.agentserver.log_analyzer import LogAnalyzer, SeverityLevel, SlidingWindowCounter
+
+
+def test_window_drops_old_buckets():
+    window = SlidingWindowCounter(30, bucket_count=10)
+    window.add(SeverityLevel.CRITICAL, 100.0)
+    window.add(SeverityLevel.MEDIUM, 115.0)
+    window.add(SeverityLevel.MEDIUM, 116.0)
+
+    assert window.risk_level(now=120.0) is SeverityLevel.CRITICAL
+    assert window.risk_score(now=120.0) == 102
+    # クリティカルの検出がウィンドウから外れる
+    assert window.counts(now=131.0)[SeverityLevel.CRITICAL] == 0
+    assert window.risk_level(now=131.0) is SeverityLevel.MEDIUM
+    assert window.risk_level(now=200.0) is SeverityLevel.LOW
+    assert window.risk_score(now=200.0) == 0
+
+
+def test_top_risk_sessions():
+    analyzer = LogAnalyzer()
+    analyzer.analyze_output("quiet", "nothing to see")
+    analyzer.analyze_output("warn", "permission denied")
+    analyzer.analyze_output("crit", "sudo rm -rf /")
+    analyzer.analyze_output("warn2", "error")
+    analyzer.analyze_output("warn2", "timeout")
+
+    top = analyzer.get_top_risk_sessions(limit=2)
+    assert [entry["session_id"] for entry in top] == ["crit", "warn2"]
+    assert top[0]["risk_level"] == "critical"
+    assert top[1]["counts"]["medium"] == 2
+
+    stats = analyzer.get_statistics("warn2")
+    assert stats["total_detections"] == 2 and stats["medium_count"] == 2
+    assert analyzer.get_session_risk_level("quiet") is SeverityLevel.LOW
@@ -0,0 +1,85 @@
+"""
+AgentMessage コーデックのテスト
+"""
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from aetherterm.common import agent_codec
+from aetherterm.common.agent_codec import (
+    CODEC_BINARY_V1,
+    CODEC_BINARY_V1_MSGPACK,
+    CODEC_JSON,
+    CodecError,
+    decode_message,
+    encode_binary,
+    encode_message,
+    negotiate_codec,
+)
+from aetherterm.common.agent_protocol import AgentMessage, MessageType
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    [datetime(2025, 6, 18, 12, 0, 1, 123456), datetime(1969, 7, 20, 20, 17, tzinfo=timezone.utc)],
+)
+def test_binary_round_trip(timestamp):
+    message = AgentMessage(
+        from_agent="openhands-1",
+        to_agent="サーバー",
+        message_type=MessageType.PROGRESS_UPDATE,
+        timestamp=timestamp,
+        payload={"progress": 0.5, "message": "ビルド中", "items": [1, 2]},
+        correlation_id=uuid4(),
+    )
+
+    data = encode_message(message, CODEC_BINARY_V1)
+    assert isinstance(data, bytes)
+    assert decode_message(data) == message
+    # JSON形式の辞書もそのまま受け付ける
+    assert decode_message(encode_message(message, CODEC_JSON)) == message
+
+
+def test_empty_payload_and_reply_to():
+    message = AgentMessage(message_type=MessageType.SYNC_RESPONSE, reply_to=uuid4())
+    assert decode_message(encode_binary(message)) == message
+
+
+def test_json_payload_frames_do_not_require_msgpack(monkeypatch):
+    """agent-binary/1 は msgpack のない相手でも復元できる"""
+    message = AgentMessage(payload={"progress": 0.5, "message": "ビルド中"})
+    data = encode_message(message, CODEC_BINARY_V1)
+
+    monkeypatch.setattr(agent_codec, "msgpack", None)
+    assert decode_message(data) == message
+    assert decode_message(encode_binary(AgentMessage(reply_to=uuid4()))).payload == {}
+    with pytest.raises(CodecError):
+        encode_binary(message, use_msgpack=True)
+
+
+def test_msgpack_payload_round_trip():
+    pytest.importorskip("msgpack")
+    message = AgentMessage(payload={"items": [1, 2], "name": "サーバー"})
+    data = encode_message(message, CODEC_BINARY_V1_MSGPACK)
+    assert decode_message(data) == message
+    assert len(data) < len(encode_message(message, CODEC_BINARY_V1))
+    assert decode_message(encode_binary(AgentMessage(), use_msgpack=True)).payload == {}
+
+
+def test_malformed_data_is_rejected():
+    data = encode_binary(AgentMessage(payload={"a": 1}))
+    with pytest.raises(CodecError):
+        decode_message(data[:-1])
+    with pytest.raises(CodecError):
+        decode_message(b"XX" + data[2:])
+
+
+def test_negotiate_codec():
+    assert negotiate_codec([CODEC_BINARY_V1, CODEC_JSON]) == CODEC_BINARY_V1
+    # msgpack のない側は msgpack の payload を選ばない
+    expected = CODEC_BINARY_V1_MSGPACK if agent_codec.msgpack is not None else CODEC_BINARY_V1
+    assert negotiate_codec([CODEC_BINARY_V1_MSGPACK, CODEC_BINARY_V1]) == expected
+    assert negotiate_codec(["agent-binary/9", CODEC_JSON]) == CODEC_JSON
+    assert negotiate_codec([]) == CODEC_JSON
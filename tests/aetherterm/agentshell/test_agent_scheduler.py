@@ -0,0 +1,148 @@
+"""
+タスクスケジューラーのテスト
+"""
+
+import asyncio
+
+from aetherterm.agentshell.agents.base import AgentCapability, AgentInterface, AgentTask
+from aetherterm.agentshell.agents.manager import AgentManager
+from aetherterm.agentshell.agents.scheduler import TaskScheduler
+
+CODE = AgentCapability.CODE_GENERATION
+REVIEW = AgentCapability.CODE_REVIEW
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_task(priority=5, capabilities=(CODE,), timeout=None):
+    return AgentTask(
+        priority=priority, capabilities_required=list(capabilities), timeout_seconds=timeout
+    )
+
+
+def test_priority_order_and_concurrency_limit():
+    scheduler = TaskScheduler(clock=FakeClock())
+    scheduler.add_agent("a", [CODE], max_concurrency=1)
+    low, high = make_task(priority=1), make_task(priority=9)
+    scheduler.enqueue(low)
+    scheduler.enqueue(high)
+
+    assert scheduler.dispatch() == [("a", high)]
+    assert scheduler.dispatch() == []
+    assert scheduler.load("a") == 1
+
+    scheduler.task_finished("a")
+    assert scheduler.dispatch() == [("a", low)]
+
+
+def test_aging_prevents_starvation():
+    clock = FakeClock()
+    scheduler = TaskScheduler(aging_interval=1.0, clock=clock)
+    scheduler.add_agent("a", [CODE], max_concurrency=1)
+    low = make_task(priority=1)
+    scheduler.enqueue(low)
+
+    # 優先度差(9) × aging_interval より長く待った低優先度タスクが先に実行される
+    clock.now = 10.0
+    scheduler.enqueue(make_task(priority=10))
+    assert scheduler.dispatch() == [("a", low)]
+
+
+def test_deadline_moves_task_forward():
+    scheduler = TaskScheduler(aging_interval=5.0, clock=FakeClock())
+    scheduler.add_agent("a", [CODE], max_concurrency=1)
+    scheduler.enqueue(make_task(priority=8))
+    urgent = make_task(priority=3, timeout=1)
+    scheduler.enqueue(urgent)
+
+    assert scheduler.dispatch() == [("a", urgent)]
+
+
+def test_idle_agent_steals_only_runnable_work():
+    scheduler = TaskScheduler(clock=FakeClock())
+    scheduler.add_agent("busy", [CODE, REVIEW], max_concurrency=2)
+    review = make_task(capabilities=(REVIEW,))
+    code = make_task(capabilities=(CODE,))
+    assert scheduler.enqueue(review) == "busy"
+    scheduler.add_agent("idle", [CODE], max_concurrency=1)
+    scheduler.task_started("idle")
+    assert scheduler.enqueue(code) == "busy"
+    scheduler.task_finished("idle")
+    scheduler.task_started("busy")
+    scheduler.task_started("busy")
+
+    # idle は REVIEW を持たないので、後から入った CODE タスクだけを奪う
+    assert scheduler.dispatch() == [("idle", code)]
+    assert scheduler.get_stats()["stolen"] == 1
+    assert scheduler.queued_count() == 1
+
+
+def test_cancel_queued_task():
+    scheduler = TaskScheduler(clock=FakeClock())
+    scheduler.add_agent("a", [CODE], max_concurrency=1)
+    task = make_task()
+    scheduler.enqueue(task)
+
+    assert scheduler.cancel(task.id).task is task
+    assert scheduler.cancel(task.id) is None
+    assert scheduler.dispatch() == []
+
+
+class QueueHookAgent(AgentInterface):
+    """task_queued() が失敗し、task_dequeued() を記録するエージェント"""
+
+    def __init__(self):
+        super().__init__("hooks", [CODE])
+        self.dequeued = []
+
+    async def initialize(self, config):
+        return True
+
+    async def shutdown(self):
+        pass
+
+    def task_queued(self, task):
+        raise RuntimeError("prefetch failed")
+
+    def task_dequeued(self, task):
+        self.dequeued.append(task.id)
+
+    async def execute_task(self, task):
+        raise NotImplementedError
+
+    async def cancel_task(self, task_id):
+        return False
+
+    async def get_task_status(self, task_id):
+        return None
+
+    async def get_task_progress(self, task_id):
+        return None
+
+    async def _wait_for_intervention_response(self, intervention):
+        return None
+
+
+def test_manager_queue_hooks_do_not_fail_submission():
+    async def run():
+        manager = AgentManager()
+        agent = QueueHookAgent()
+        assert await manager.register_agent(agent)
+
+        # task_queued() の例外で受け付けは失敗しない
+        task = make_task()
+        assert await manager.submit_task(task) == task.id
+        assert manager._scheduler.queued_count() == 1
+
+        # 待機中のタスクをキャンセルすると task_dequeued() で準備を破棄できる
+        assert await manager.cancel_task(task.id)
+        assert agent.dequeued == [task.id]
+        assert not await manager.cancel_task(task.id)
+
+    asyncio.run(run())
@@ -0,0 +1,144 @@
+"""
+BatchAnalysisClient（パイプライン化したバッチ解析プロトコル）のテスト
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from aetherterm.agentshell.pty_monitor.analysis_client import BatchAnalysisClient
+
+websockets = pytest.importorskip("websockets")
+
+
+class _Server:
+    """
+    行をそのまま返す解析サーバー
+
+    最初の drop_first 件の要求には応答せず切断し、ignore_ids の要求には応答しない
+    """
+
+    def __init__(self, drop_first=0, error_ids=(), ignore_ids=()):
+        self.requests = []
+        self.connections = 0
+        self.drop_first = drop_first
+        self.error_ids = set(error_ids)
+        self.ignore_ids = set(ignore_ids)
+
+    async def handler(self, websocket):
+        self.connections += 1
+        async for message in websocket:
+            request = json.loads(message)
+            self.requests.append(request)
+            if self.drop_first:
+                self.drop_first -= 1
+                await websocket.close()
+                return
+            if request["id"] in self.ignore_ids:
+                continue
+            if request["id"] in self.error_ids:
+                response = {"status": "error", "id": request["id"], "error": "boom"}
+            else:
+                results = [{"line": line} for line in request["data"]["lines"]]
+                response = {"status": "success", "id": request["id"], "data": {"results": results}}
+            await websocket.send(json.dumps(response))
+
+
+async def _start(server, **kwargs):
+    ws_server = await websockets.serve(server.handler, "127.0.0.1", 0)
+    port = ws_server.sockets[0].getsockname()[1]
+    client = BatchAnalysisClient(f"ws://127.0.0.1:{port}", reconnect_delay=0.01, **kwargs)
+    assert await client.start()
+    return ws_server, client
+
+
+def test_concurrent_callers_share_batches_and_keep_order():
+    async def run():
+        server = _Server()
+        ws_server, client = await _start(server, batch_size=4, linger=0.01)
+        try:
+            results = await asyncio.gather(
+                client.analyze("a"),
+                client.analyze_many(["b", "c", "d", "e"]),
+                client.analyze_many([]),
+            )
+            assert results == [
+                {"line": "a"},
+                [{"line": "b"}, {"line": "c"}, {"line": "d"}, {"line": "e"}],
+                [],
+            ]
+            # 5行は batch_size=4 で2つの要求にまとめられる
+            assert [request["data"]["lines"] for request in server.requests] == [
+                ["a", "b", "c", "d"],
+                ["e"],
+            ]
+            stats = client.get_stats()
+            assert (stats["batches_sent"], stats["batches_acked"], stats["in_flight"]) == (2, 2, 0)
+        finally:
+            await client.close()
+            ws_server.close()
+            await ws_server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_unacked_batch_is_replayed_after_reconnect():
+    async def run():
+        server = _Server(drop_first=1)
+        ws_server, client = await _start(server, linger=0.001)
+        try:
+            assert await client.analyze_many(["x", "y"]) == [{"line": "x"}, {"line": "y"}]
+            assert server.connections == 2
+            assert [request["id"] for request in server.requests] == [1, 1]
+
+            stats = client.get_stats()
+            assert (stats["reconnects"], stats["batches_replayed"]) == (1, 1)
+        finally:
+            await client.close()
+            ws_server.close()
+            await ws_server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_server_error_fails_only_that_batch():
+    async def run():
+        server = _Server(error_ids={1})
+        ws_server, client = await _start(server, linger=0.001)
+        try:
+            with pytest.raises(Exception, match="boom"):
+                await client.analyze("bad")
+            assert await client.analyze("good") == {"line": "good"}
+            assert client.get_stats()["errors"] == 1
+        finally:
+            await client.close()
+            ws_server.close()
+            await ws_server.wait_closed()
+
+        with pytest.raises(RuntimeError):
+            client.submit(["after close"])
+
+    asyncio.run(run())
+
+
+def test_unanswered_batch_expires_and_frees_its_slot():
+    async def run():
+        server = _Server(ignore_ids={1})
+        ws_server, client = await _start(
+            server, linger=0.001, max_in_flight=1, batch_timeout=0.05
+        )
+        try:
+            # 応答のないバッチは期限切れで失敗し、唯一の in-flight 枠を空ける
+            with pytest.raises(asyncio.TimeoutError):
+                await client.analyze("lost")
+            assert await client.analyze("next") == {"line": "next"}
+
+            stats = client.get_stats()
+            assert (stats["batches_expired"], stats["in_flight"]) == (1, 0)
+        finally:
+            await client.close()
+            ws_server.close()
+            await ws_server.wait_closed()
+
+    asyncio.run(run())
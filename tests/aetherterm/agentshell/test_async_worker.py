@@ -0,0 +1,139 @@
+"""
+AsyncWorker（PTYスレッドとイベントループの橋渡し）のテスト
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from aetherterm.agentshell.pty.sync_terminal_pty import AsyncWorker
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("条件が満たされませんでした")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def worker_factory():
+    workers = []
+
+    def create(**kwargs):
+        worker = AsyncWorker(**kwargs)
+        worker.start()
+        workers.append(worker)
+        return worker
+
+    yield create
+    for worker in workers:
+        worker.stop()
+
+
+def test_submit_delivers_items_and_coroutine_results_on_loop_thread(worker_factory):
+    """投入した項目はループスレッドのhandlerに順に渡り、コルーチンの結果も受け取れる"""
+    received = []
+    threads = set()
+
+    async def handler(item):
+        threads.add(threading.get_ident())
+        received.append(item)
+        return item
+
+    worker = worker_factory(handler=handler, batch_size=4)
+    assert all(worker.submit(f"line {n}") for n in range(10))
+
+    result = asyncio.run_coroutine_threadsafe(asyncio.sleep(0, result="done"), worker.loop)
+    worker.run_async_task(asyncio.sleep(0))
+
+    assert result.result(timeout=5) == "done"
+    _wait_until(lambda: worker.get_stats()["processed"] == 11)
+    assert received == [f"line {n}" for n in range(10)]
+    assert threads == {worker.thread.ident}
+    assert worker.get_stats()["failed"] == 0
+
+
+def test_handler_exception_is_counted_without_stopping_the_worker(worker_factory):
+    """handlerの例外は失敗として数えられ、同じバッチの他の項目や後続の投入は処理される"""
+    received = []
+
+    async def handler(item):
+        if item == "bad":
+            raise ValueError("broken")
+        received.append(item)
+
+    async def failing():
+        raise RuntimeError("coroutine failed")
+
+    worker = worker_factory(handler=handler)
+    worker.submit("before")
+    worker.submit("bad")
+    worker.submit(failing())
+    worker.submit("after")
+
+    _wait_until(lambda: worker.get_stats()["processed"] + worker.get_stats()["failed"] == 4)
+    assert worker.get_stats()["failed"] == 2
+    assert received == ["before", "after"]
+
+    # handlerがない場合、コルーチン以外の項目は失敗になる
+    bare = worker_factory()
+    bare.submit("item")
+    _wait_until(lambda: bare.get_stats()["failed"] == 1)
+
+
+def test_overflow_drops_new_items_and_reports_aggregate(worker_factory):
+    """非同期側が詰まるとPTYスレッドをブロックせずに破棄し、件数を集約して通知する"""
+    received = []
+    release = threading.Event()
+
+    async def handler(item):
+        if item == "slow":
+            await asyncio.get_running_loop().run_in_executor(None, release.wait)
+        received.append(item)
+
+    worker = worker_factory(handler=handler, max_pending=2, max_inflight=1)
+    worker.submit("slow", key="error")
+    _wait_until(lambda: worker.get_stats()["inflight"] == 1)
+
+    assert worker.submit("a", key="error") and worker.submit("b", key="error")
+    assert [worker.submit("x", key="error") for _ in range(3)] == [False] * 3
+    assert worker.get_stats()["dropped"] == 3
+
+    release.set()
+    _wait_until(lambda: len(received) == 4)
+    assert received[:3] == ["slow", "a", "b"]
+    assert received[3] == "[集約] 'error' の検出 3 件を省略しました"
+    assert worker.get_stats()["aggregated_reports"] == 1
+
+
+def test_stop_drains_pending_items_and_rejects_later_submits(worker_factory):
+    """停止時は投入済みの項目を処理してから終了し、停止後の投入は破棄する"""
+    received = []
+    release = threading.Event()
+
+    async def handler(item):
+        if item == "slow":
+            await asyncio.get_running_loop().run_in_executor(None, release.wait)
+        received.append(item)
+
+    worker = worker_factory(handler=handler, max_inflight=1)
+    worker.submit("slow")
+    _wait_until(lambda: worker.get_stats()["inflight"] == 1)
+    worker.submit("queued 1")
+    worker.submit("queued 2")
+
+    threading.Timer(0.05, release.set).start()
+    worker.stop()
+
+    assert not worker.thread.is_alive()
+    assert worker.loop.is_closed()
+    # 停止時の残りは max_inflight に関係なく一度に処理される
+    assert sorted(received) == ["queued 1", "queued 2", "slow"]
+
+    coroutine = asyncio.sleep(0)
+    assert worker.submit(coroutine) is False
+    assert coroutine.cr_frame is None  # 破棄したコルーチンは閉じられている
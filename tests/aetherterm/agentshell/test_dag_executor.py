@@ -0,0 +1,114 @@
+"""
+DAG実行エンジンのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from aetherterm.agentshell.agents.base import AgentTask
+from aetherterm.agentshell.service.dag_executor import (
+    DAGCycleError,
+    DAGExecutor,
+    NodeStatus,
+    TaskDAG,
+)
+
+
+def make_diamond():
+    """a -> (b, c) -> d"""
+    dag = TaskDAG()
+    a, b, c, d = (AgentTask(type=name) for name in "abcd")
+    dag.add_task(a)
+    dag.add_task(b, depends_on=[a.id])
+    dag.add_task(c, depends_on=[a.id])
+    dag.add_task(d, depends_on=[b.id, c.id])
+    return dag, a, b, c, d
+
+
+def test_independent_tasks_overlap_and_results_propagate():
+    dag, a, b, c, d = make_diamond()
+    running = 0
+    peak = 0
+
+    async def runner(node, upstream):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return node.task.type + "".join(sorted(upstream[t] for t in upstream))
+
+    result = asyncio.run(DAGExecutor(runner, max_parallel=4).run(dag))
+
+    assert result.success
+    assert peak == 2  # b と c が並行に実行される
+    assert result.results[d.id] == "dbaca"
+    assert result.critical_path[0] == a.id and result.critical_path[-1] == d.id
+    assert len(result.critical_path) == 3
+
+
+def test_failure_skips_descendants_and_rerun_resumes():
+    dag, a, b, c, d = make_diamond()
+    calls = []
+    fail = {b.id}
+
+    async def runner(node, upstream):
+        calls.append(node.task.type)
+        if node.id in fail:
+            raise RuntimeError("boom")
+        return node.task.type
+
+    executor = DAGExecutor(runner, max_parallel=1)
+    result = asyncio.run(executor.run(dag))
+    assert result.failed.keys() == {b.id}
+    assert result.skipped == [d.id]
+    assert dag.nodes[c.id].status == NodeStatus.COMPLETED
+
+    fail.clear()
+    calls.clear()
+    result = asyncio.run(executor.rerun_failed(dag))
+    assert result.success
+    assert sorted(calls) == ["b", "d"]
+
+
+def test_earlier_failure_skips_descendants_regardless_of_insertion_order():
+    dag = TaskDAG()
+    a, b, c = AgentTask(type="a"), AgentTask(type="b"), AgentTask(type="c")
+    # 子孫の c を先に登録する
+    dag.add_task(a)
+    dag.add_task(c)
+    dag.add_task(b, depends_on=[a.id])
+    dag.add_dependency(c.id, b.id)
+    dag.nodes[a.id].status = NodeStatus.FAILED
+
+    async def runner(node, upstream):
+        return node.task.type
+
+    result = asyncio.run(DAGExecutor(runner).run(dag))
+    assert sorted(result.skipped) == sorted([b.id, c.id])
+
+
+def test_cancelled_runner_fails_its_task():
+    dag, a, b, c, d = make_diamond()
+
+    async def runner(node, upstream):
+        if node.id == b.id:
+            raise asyncio.CancelledError()
+        return node.task.type
+
+    result = asyncio.run(DAGExecutor(runner).run(dag))
+    assert result.failed == {b.id: "CancelledError"}
+    assert result.skipped == [d.id]
+    assert c.id in result.completed
+
+
+def test_cycle_is_rejected():
+    dag = TaskDAG()
+    a, b = AgentTask(), AgentTask()
+    dag.add_task(a)
+    dag.add_task(b, depends_on=[a.id])
+    dag.add_dependency(a.id, b.id)
+
+    with pytest.raises(DAGCycleError):
+        dag.topological_order()
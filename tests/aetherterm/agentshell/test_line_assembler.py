@@ -0,0 +1,65 @@
+"""
+行組み立てとキーワード照合のテスト
+"""
+
+from aetherterm.agentshell.pty.line_assembler import KeywordMatcher, LineAssembler
+
+
+def _lines(blocks):
+    return [line for block in blocks for line in block.splitlines(keepends=True)]
+
+
+def test_split_across_chunks():
+    """チャンクを跨いだ行の組み立て"""
+    assembler = LineAssembler()
+
+    assert assembler.feed(b"hello ") == []
+    assert assembler.pending_bytes == 6
+    assert _lines(assembler.feed(b"world\nsecond\nthi")) == [b"hello world\n", b"second\n"]
+    assert _lines(assembler.feed(b"rd\n")) == [b"third\n"]
+    assert assembler.pending_bytes == 0
+    assert assembler.lines_completed == 3
+
+
+def test_long_line_is_truncated():
+    """最大長を超えた行の強制切り出し"""
+    assembler = LineAssembler(max_line_length=8)
+
+    blocks = assembler.feed(b"a" * 20)
+    assert blocks == [b"a" * 8, b"a" * 8]
+    assert assembler.pending_bytes == 4
+    assert assembler.truncated_lines == 2
+
+    blocks = assembler.feed(b"bbbbbbbbb\nok\n")
+    assert blocks == [b"aaaabbbb", b"bbbbb\nok\n"]
+    assert assembler.truncated_lines == 3
+    assert assembler.lines_completed == 5
+
+
+def test_flush_returns_pending_line():
+    """終了時の未完了行の取り出し"""
+    assembler = LineAssembler()
+    assembler.feed(b"no newline")
+
+    assert assembler.flush() == b"no newline"
+    assert assembler.flush() is None
+
+
+def test_keyword_matcher_reports_one_hit_per_line():
+    """1行につき最初のキーワードのみ報告"""
+    matcher = KeywordMatcher(["error", "warning", "fail"])
+
+    block = b"ok\nWARNING: build ERROR\nall good\nTest failed\n"
+    assert matcher.scan(block) == [
+        ("warning", b"WARNING: build ERROR\n"),
+        ("fail", b"Test failed\n"),
+    ]
+
+
+def test_keyword_matcher_search_line():
+    """1行単位の検索"""
+    matcher = KeywordMatcher(["error"])
+
+    assert matcher.search("Fatal Error occurred") == "error"
+    assert matcher.search("everything fine") is None
+    assert KeywordMatcher([]).search("error") is None
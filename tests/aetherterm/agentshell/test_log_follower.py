@@ -0,0 +1,129 @@
+"""
+LogFollower（プロセス内の tail -f）のテスト
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from aetherterm.agentshell.pty_monitor.log_follower import LogFollower
+
+
+class _Collector:
+    def __init__(self):
+        self.lines = []
+        self._lock = threading.Lock()
+
+    def __call__(self, path, lines):
+        with self._lock:
+            self.lines.extend(lines)
+
+    def wait_for(self, count, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while len(self.lines) < count:
+            if time.monotonic() > deadline:
+                raise AssertionError(f"{count} 行を待ちましたが {self.lines} でした")
+            time.sleep(0.01)
+        # 余分な行（重複）が遅れて届かないことも確認する
+        time.sleep(0.1)
+        return list(self.lines)
+
+
+def _append(path, data):
+    with open(path, "a") as f:
+        f.write(data)
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def follow(request, tmp_path):
+    """inotify はポーリング間隔を長くし、変更通知で起きていることを確認する"""
+    use_inotify = request.param == "inotify"
+    followers = []
+
+    def create(path, collector):
+        follower = LogFollower(
+            [str(path)],
+            collector,
+            buffer_size=64,
+            poll_interval=10.0 if use_inotify else 0.02,
+            use_inotify=use_inotify,
+        )
+        follower.start()
+        followers.append(follower)
+        if use_inotify and follower.mode != "inotify":
+            pytest.skip("inotify を利用できません")
+        return follower
+
+    yield create
+    for follower in followers:
+        follower.close()
+
+
+def test_rotation_and_truncation_lose_and_duplicate_nothing(tmp_path, follow):
+    path = tmp_path / "app.log"
+    path.write_text("before start\n")
+    collector = _Collector()
+    follower = follow(path, collector)
+
+    # 起動前の内容は読まない（tail -f と同じ）
+    _append(path, "a\n" + "b" * 100 + "\n")
+    assert collector.wait_for(2) == ["a", "b" * 100]
+
+    # ローテーション: 改行のない最後の行も配信してから新しいファイルへ移る
+    _append(path, "partial")
+    os.rename(path, tmp_path / "app.log.1")
+    path.write_text("c\n")
+    assert collector.wait_for(4)[2:] == ["partial", "c"]
+
+    # 読み取り位置より短くトランケートされたら先頭から読み直す
+    _append(path, "d" * 200 + "\n")
+    collector.wait_for(5)
+    with open(path, "w") as f:
+        f.write("e\n")
+    assert collector.wait_for(6)[5:] == ["e"]
+
+    _append(path, "f\n")
+    assert collector.wait_for(7) == ["a", "b" * 100, "partial", "c", "d" * 200, "e", "f"]
+
+    stats = follower.get_stats()["files"][str(path)]
+    assert (stats["rotations"], stats["truncations"], stats["lines_read"]) == (1, 1, 7)
+
+
+def test_file_created_after_start_is_read_from_beginning(tmp_path, follow):
+    path = tmp_path / "late.log"
+    collector = _Collector()
+    follow(path, collector)
+
+    path.write_text("first\nsecond\n")
+    assert collector.wait_for(2) == ["first", "second"]
+
+
+def test_busy_file_does_not_starve_others(tmp_path):
+    busy, quiet = tmp_path / "busy.log", tmp_path / "quiet.log"
+    delivered = []
+    follower = LogFollower(
+        [str(busy), str(quiet)],
+        lambda path, lines: delivered.append((os.path.basename(path), lines)),
+        buffer_size=64,
+        max_read_per_pass=256,
+        use_inotify=False,
+    )
+    try:
+        busy.write_text("".join(f"busy {n:04d}\n" for n in range(100)))
+        quiet.write_text("quiet\n")
+
+        # 1回の確認では busy から上限までしか読まず、quiet も読まれる
+        more = [follower._check(followed) for followed in follower.files]
+        assert more == [True, False]
+        assert follower.files[0].bytes_read == 256
+        assert ("quiet.log", ["quiet"]) in delivered
+
+        # 残りは続く確認で読み切る
+        while any([follower._check(followed) for followed in follower.files]):
+            pass
+        lines = [line for path, batch in delivered if path == "busy.log" for line in batch]
+        assert lines == [f"busy {n:04d}" for n in range(100)]
+    finally:
+        follower.close()
@@ -0,0 +1,124 @@
+"""
+リソースロックマネージャーのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from aetherterm.agentshell.agents.base import AgentTask
+from aetherterm.agentshell.service.agent_coordinator import AgentCoordinator, ConflictType
+from aetherterm.agentshell.service.resource_locks import (
+    DeadlockError,
+    LockMode,
+    ResourceLockManager,
+)
+
+
+def test_directory_lock_conflicts_with_files_below():
+    locks = ResourceLockManager()
+    assert not locks.try_acquire("a", "src/")
+
+    assert locks.conflicting_owners("b", "src/app.py") == {"a"}
+    assert locks.conflicting_owners("b", "docs/index.md") == set()
+    # 同じ所有者のロックは競合しない
+    assert locks.conflicting_owners("a", "src/app.py") == set()
+
+    assert locks.release("a", "src")
+    assert locks.conflicting_owners("b", "src/app.py") == set()
+
+
+def test_file_lock_conflicts_with_parent_directory():
+    locks = ResourceLockManager()
+    locks.try_acquire("a", "src/app.py", LockMode.READ)
+
+    assert locks.conflicting_owners("b", "src", LockMode.WRITE) == {"a"}
+    assert locks.conflicting_owners("b", "src", LockMode.READ) == set()
+
+
+def test_line_ranges_only_conflict_when_overlapping():
+    locks = ResourceLockManager()
+    assert not locks.try_acquire("a", "src/app.py:10-20")
+
+    assert locks.conflicting_owners("b", "src/app.py:21-30") == set()
+    assert locks.conflicting_owners("b", "src/app.py:15-25") == {"a"}
+    assert locks.conflicting_owners("b", "src/app.py:15-25", LockMode.READ) == {"a"}
+    # ファイル全体・親ディレクトリのロックとは競合する
+    assert locks.conflicting_owners("b", "src/app.py") == {"a"}
+    assert locks.conflicting_owners("b", "src/") == {"a"}
+
+    locks.release_all("a")
+    assert locks.get_stats()["locks_held"] == 0
+    assert locks.conflicting_owners("b", "src/app.py:15-25") == set()
+
+
+def test_waiter_acquires_after_release():
+    async def scenario():
+        locks = ResourceLockManager()
+        locks.try_acquire("a", "src/app.py")
+        waiter = asyncio.create_task(locks.acquire("b", "src/app.py", timeout=1.0))
+        await asyncio.sleep(0.01)
+        assert locks.get_waiting() == {"b": ["a"]}
+
+        locks.release("a", "src/app.py")
+        await waiter
+        assert locks.held_by("b") == ["src/app.py"]
+        assert locks.get_stats()["waits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_deadlock_is_detected():
+    async def scenario():
+        locks = ResourceLockManager()
+        locks.try_acquire("a", "x.py")
+        locks.try_acquire("b", "y.py")
+        waiter = asyncio.create_task(locks.acquire("a", "y.py"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(DeadlockError):
+            await locks.acquire("b", "x.py")
+        assert locks.get_stats()["deadlocks"] == 1
+
+        locks.release_all("b")
+        await asyncio.wait_for(waiter, 1.0)
+
+    asyncio.run(scenario())
+
+
+def test_coordinator_claims_only_file_resources_and_releases_them_when_tasks_end():
+    async def run():
+        coordinator = AgentCoordinator()
+        first, second = AgentTask(type="edit"), AgentTask(type="edit")
+        await coordinator.register_agent_task("a", first, ["api/users", "api:orders", "file:src/"])
+
+        # パスに似たAPIリソースや種別付きリソースはファイルとして競合しない
+        conflicts = await coordinator._detect_conflicts(
+            "b", second, ["api/users", "api:orders", "src/app.py"]
+        )
+        assert [(c["type"], c["file"]) for c in conflicts] == [
+            (ConflictType.FILE_CONFLICT, "src/app.py")
+        ]
+
+        # 失敗したタスクの宣言も解放される
+        async def runner(agent_id, task, upstream):
+            raise RuntimeError("failed")
+
+        _, result = await coordinator.execute_coordinated_work({"a": first}, runner)
+        assert first.id in result.failed
+        assert await coordinator._detect_conflicts("b", second, ["src/app.py"]) == []
+
+        # 終了の記録は重複してもよい（完了通知とキャンセルが両方届く場合など）
+        await coordinator.register_agent_task("b", second, ["src/app.py:1-10"])
+        coordinator.complete_agent_task("b", second.id)
+        coordinator.complete_agent_task("b", second.id)
+        assert await coordinator._detect_conflicts("a", first, ["src/app.py"]) == []
+
+        # 再登録すると前回の宣言は解放され、新しい宣言だけが残る
+        await coordinator.register_agent_task("b", second, ["src/app.py"])
+        await coordinator.register_agent_task("b", second, ["src/other.py"])
+        assert await coordinator._detect_conflicts("a", first, ["src/app.py"]) == []
+        coordinator.complete_agent_task("b", second.id)
+        assert coordinator.get_lock_stats()["claims"]["locks_held"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,123 @@
+"""
+ルールエンジンのテスト
+"""
+
+import os
+import textwrap
+
+import pytest
+
+from aetherterm.agentshell.pty_monitor.rule_engine import RuleEngine, RulePackError
+
+RULE_PACK = """
+version = 1
+
+[levels.critical]
+confidence = 0.9
+block = true
+
+[levels.medium]
+confidence = 0.6
+block = false
+
+[[rules]]
+id = "rm-rf-root"
+level = "critical"
+pattern = 'rm\\s+-rf\\s+/'
+description = "システム全体削除"
+
+[[rules]]
+id = "systemctl-stop"
+level = "medium"
+pattern = 'systemctl\\s+(stop|disable)'
+description = "サービス停止"
+"""
+
+
+@pytest.fixture
+def rule_pack_path(tmp_path):
+    path = tmp_path / "rules.toml"
+    path.write_text(RULE_PACK)
+    return path
+
+
+def test_highest_level_wins(rule_pack_path):
+    """高いレベルのルールが優先される"""
+    engine = RuleEngine(rule_pack_path)
+
+    rule = engine.match("systemctl stop foo && RM -RF /")
+    assert rule.id == "rm-rf-root"
+    assert engine.get_level_policy(rule.level).block is True
+
+    assert engine.match("systemctl disable nginx").id == "systemctl-stop"
+    assert engine.match("ls -la") is None
+
+
+def test_stats_track_hits_and_latency(rule_pack_path):
+    """ルール毎のヒット数とレイテンシの記録"""
+    engine = RuleEngine(rule_pack_path)
+    for line in ["rm -rf /", "rm -rf /tmp", "echo ok"]:
+        engine.match(line)
+
+    stats = engine.get_stats()
+    assert stats["lines_matched"] == 3
+    assert stats["rule_hits"] == {"rm-rf-root": 2}
+    assert stats["latency_max_us"] >= stats["latency_p50_us"] >= 0
+
+
+def test_hot_reload_and_bad_pack_keeps_rules(rule_pack_path):
+    """ファイル更新時の再読み込みと不正なルールパックの無視"""
+    engine = RuleEngine(rule_pack_path, reload_interval=0)
+    assert engine.match("history -c") is None
+
+    rule_pack_path.write_text(
+        RULE_PACK
+        + textwrap.dedent(
+            """
+            [[rules]]
+            id = "history-clear"
+            level = "critical"
+            pattern = 'history\\s+-c'
+            description = "履歴削除"
+            """
+        )
+    )
+    os.utime(rule_pack_path, ns=(1, engine._mtime_ns + 1_000_000))
+    assert engine.match("history -c").id == "history-clear"
+    assert engine.reload_count == 1
+
+    rule_pack_path.write_text("[[rules]]\nid = 'broken'\nlevel = 'critical'\npattern = '('\n")
+    os.utime(rule_pack_path, ns=(1, engine._mtime_ns + 2_000_000))
+    assert engine.maybe_reload() is False
+    assert engine.match("history -c").id == "history-clear"
+
+
+def test_invalid_pack_rejected(tmp_path):
+    """不正なレベルの検出"""
+    path = tmp_path / "rules.toml"
+    path.write_text("[[rules]]\nid = 'x'\nlevel = 'severe'\npattern = 'x'\n")
+
+    with pytest.raises(RulePackError):
+        RuleEngine(path)
+
+
+def test_top_level_alternation_is_not_prefiltered(tmp_path):
+    """トップレベルの選択を含むルールは先頭の枝のリテラルで事前に除外しない"""
+    path = tmp_path / "rules.toml"
+    path.write_text(
+        RULE_PACK
+        + textwrap.dedent(
+            """
+            [[rules]]
+            id = "download"
+            level = "medium"
+            pattern = 'curl|wget'
+            description = "ダウンロード"
+            """
+        )
+    )
+    engine = RuleEngine(path)
+
+    assert engine.match("wget http://example.com/x.sh").id == "download"
+    assert engine.match("curl -O http://example.com/x.sh").id == "download"
+    assert engine.match("systemctl stop nginx").id == "systemctl-stop"
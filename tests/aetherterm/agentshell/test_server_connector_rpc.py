@@ -0,0 +1,163 @@
+"""
+ServerConnector のリクエスト/レスポンスRPCのテスト
+
+2つのコネクターをソケットを介さずに直結して検証する。
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("socketio")
+
+from aetherterm.agentshell.agents.base import AgentTask
+from aetherterm.agentshell.service.agent_orchestrator import AgentOrchestrator
+from aetherterm.agentshell.service.server_connector import ServerConnector
+from aetherterm.common.agent_codec import CODEC_BINARY_V1, decode_message
+from aetherterm.common.agent_protocol import AgentMessage, MessageType
+
+
+class LoopbackClient:
+    """emit されたエージェントメッセージを相手のコネクターに届ける"""
+
+    def __init__(self):
+        self.peer = None
+        self.sent = []
+        self.connected = True
+
+    async def emit(self, event, data):
+        self.sent.append(data)
+        # 実際のソケットと同様に受信側は別タスクで処理する
+        asyncio.get_running_loop().call_soon(
+            asyncio.create_task, self.peer._handle_agent_message(decode_message(data))
+        )
+
+
+def make_pair():
+    a, b = ServerConnector(auto_connect=False), ServerConnector(auto_connect=False)
+    for connector, peer in ((a, b), (b, a)):
+        connector._socket_client = LoopbackClient()
+        connector._socket_client.peer = peer
+        connector._is_enabled = connector._is_connected = True
+        connector._codec = CODEC_BINARY_V1
+    return a, b
+
+
+def test_pipelined_requests_are_matched_to_replies():
+    async def run():
+        client, server = make_pair()
+
+        async def handle(message):
+            # 後に来たリクエストほど早く応答する
+            await asyncio.sleep(0.01 * (5 - message.payload["n"]))
+            return {"n": message.payload["n"] * 10}
+
+        server.register_request_handler(MessageType.SYNC_REQUEST, handle)
+        requests = [
+            AgentMessage(message_type=MessageType.SYNC_REQUEST, payload={"n": n}) for n in range(5)
+        ]
+        replies = await asyncio.gather(*(client.request(r, timeout=1) for r in requests))
+
+        assert [reply.payload["n"] for reply in replies] == [0, 10, 20, 30, 40]
+        assert all(reply.reply_to == r.message_id for reply, r in zip(replies, requests))
+        assert client.get_status()["pending_requests"] == 0
+
+    asyncio.run(run())
+
+
+def test_timeout_propagates_cancellation_to_peer():
+    async def run():
+        client, server = make_pair()
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def handle(message):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        server.register_request_handler(MessageType.TASK_CREATE, handle)
+        with pytest.raises(asyncio.TimeoutError):
+            await client.request(AgentMessage(message_type=MessageType.TASK_CREATE), timeout=0.05)
+
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert started.is_set()
+        assert not server._serving
+
+    asyncio.run(run())
+
+
+def test_late_reply_is_not_served_as_a_new_request():
+    async def run():
+        _client, server = make_pair()
+        served = []
+
+        async def handle(message):
+            served.append(message)
+            return AgentMessage(message_type=MessageType.SYNC_RESPONSE)
+
+        server.register_request_handler(MessageType.SYNC_REQUEST, handle)
+        # タイムアウトしたリクエストへの応答（reply_to に対応する待機がない）
+        late = AgentMessage(message_type=MessageType.SYNC_REQUEST, reply_to=uuid4())
+        await server._handle_agent_message(late)
+        await asyncio.sleep(0)
+
+        assert served == []
+        assert server._socket_client.sent == []
+
+    asyncio.run(run())
+
+
+def test_messages_queued_while_disconnected_are_flushed_in_order():
+    async def run():
+        client, server = make_pair()
+        received = []
+        server.register_handler(MessageType.PROGRESS_UPDATE, received.append)
+        client.max_queued_messages = 3
+        client._is_connected = False
+
+        for n in range(5):
+            await client.send_message(
+                AgentMessage(message_type=MessageType.PROGRESS_UPDATE, payload={"n": n})
+            )
+        assert client._socket_client.sent == []
+        assert client.get_status()["dropped_messages"] == 2
+
+        client._is_connected = True
+        await client._flush_outbound()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert [m.payload["n"] for m in received] == [2, 3, 4]
+
+    asyncio.run(run())
+
+
+def test_orchestrator_task_create_and_cancel_do_not_wait_for_replies():
+    """agentserver は TASK_CREATE/TASK_CANCEL に応答しないため、送信のみで完了する"""
+
+    async def run():
+        connector, server = make_pair()
+        received = []
+        server.register_handler(MessageType.TASK_CREATE, received.append)
+        server.register_handler(MessageType.TASK_CANCEL, received.append)
+        orchestrator = AgentOrchestrator(connector)
+        connector.request_timeout = 5
+
+        task = AgentTask(type="code", description="fix tests")
+        handle = await asyncio.wait_for(orchestrator.create_child_agent("openhands", task), 1)
+        assert handle.agent_id == f"openhands_{task.id.hex[:8]}"
+        assert await asyncio.wait_for(orchestrator.cancel_child_agent(handle.agent_id), 1)
+        assert handle.status == "cancelled"
+
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert [m.message_type for m in received] == [
+            MessageType.TASK_CREATE,
+            MessageType.TASK_CANCEL,
+        ]
+        assert connector.get_status()["pending_requests"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,127 @@
+"""
+セッション永続化ジャーナルのテスト
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from aetherterm.agentshell.domain.models import WrapperSession
+from aetherterm.agentshell.service.session_journal import FsyncPolicy, SessionJournal
+from aetherterm.agentshell.utils import running_pids
+
+
+def make_session(wrapper_id, shell_pid=2):
+    now = datetime(2025, 6, 18, 12, 0)
+    return WrapperSession(
+        wrapper_id=wrapper_id,
+        aetherterm_session_id="",
+        wrapper_pid=1,
+        shell_pid=shell_pid,
+        created_at=now,
+        last_activity=now,
+        environment={"HOME": "/root"},
+    )
+
+
+def test_replay_journal_on_top_of_snapshot(tmp_path):
+    path = tmp_path / "sessions.json"
+    journal = SessionJournal(path, fsync_policy=FsyncPolicy.NEVER)
+    sessions = {"a": make_session("a"), "b": make_session("b")}
+    journal.write_snapshot(journal.prepare_snapshot(sessions))
+
+    for rows in range(30, 40):
+        sessions["a"].terminal_size = (rows, 80)
+        journal.mark("a")
+    sessions.pop("b")
+    journal.mark("b")
+    sessions["c"] = make_session("c")
+    journal.mark("c")
+    lines = journal.collect(sessions)
+    # リサイズが何回あっても1セッション1レコードにまとまる
+    assert len(lines) == 3
+    journal.append(lines)
+    journal.close()
+
+    # クラッシュで書きかけになった末尾のレコードは無視される
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op":"upsert","wrapper_id":"a","fie')
+
+    restored = SessionJournal(path).load()
+    assert sorted(restored) == ["a", "c"]
+    assert WrapperSession.from_dict(restored["a"]).terminal_size == (39, 80)
+    assert WrapperSession.from_dict(restored["c"]) == sessions["c"]
+
+
+def test_compaction_truncates_journal(tmp_path):
+    path = tmp_path / "sessions.json"
+    journal = SessionJournal(path, fsync_policy=FsyncPolicy.ALWAYS, compact_threshold=2)
+    sessions = {"a": make_session("a")}
+    journal.mark("a")
+    journal.append(journal.collect(sessions))
+    sessions["a"].status = "inactive"
+    journal.mark("a")
+    journal.append(journal.collect(sessions))
+    assert journal.needs_compaction
+
+    journal.write_snapshot(journal.prepare_snapshot(sessions))
+    assert journal.journal_path.stat().st_size == 0
+    assert not journal.needs_compaction
+    assert SessionJournal(path).load()["a"]["status"] == "inactive"
+
+
+def test_stale_journal_is_ignored_after_crash_before_truncation(tmp_path):
+    path = tmp_path / "sessions.json"
+    journal = SessionJournal(path, fsync_policy=FsyncPolicy.NEVER)
+    sessions = {"a": make_session("a")}
+    journal.write_snapshot(journal.prepare_snapshot(sessions))
+    sessions["a"].status = "inactive"
+    journal.mark("a")
+    journal.append(journal.collect(sessions))
+    journal.close()
+    stale = journal.journal_path.read_text(encoding="utf-8")
+
+    sessions["a"].status = "active"
+    journal.write_snapshot(journal.prepare_snapshot(sessions))
+    # スナップショットの置き換え後、ジャーナルの切り詰め前にクラッシュした状態
+    journal.journal_path.write_text(stale, encoding="utf-8")
+
+    restored = SessionJournal(path)
+    assert restored.load()["a"]["status"] == "active"
+    assert restored.get_stats()["replayed"] == 0
+
+
+def test_legacy_snapshot_without_generation(tmp_path):
+    path = tmp_path / "sessions.json"
+    path.write_text(json.dumps({"a": make_session("a").to_dict()}), encoding="utf-8")
+    journal = SessionJournal(path, fsync_policy=FsyncPolicy.NEVER)
+    sessions = {"a": WrapperSession.from_dict(journal.load()["a"])}
+    sessions["a"].status = "inactive"
+    journal.mark("a")
+    journal.append(journal.collect(sessions))
+    journal.close()
+
+    assert SessionJournal(path).load()["a"]["status"] == "inactive"
+
+
+def test_interval_policy_syncs_tail_without_new_records(tmp_path):
+    journal = SessionJournal(
+        tmp_path / "sessions.json", fsync_policy=FsyncPolicy.INTERVAL, fsync_interval=0.05
+    )
+    sessions = {"a": make_session("a"), "b": make_session("b")}
+    journal.mark("a")
+    journal.append(journal.collect(sessions))
+    journal.mark("b")
+    journal.append(journal.collect(sessions))
+    assert journal.get_stats()["fsyncs"] == 1
+
+    deadline = time.monotonic() + 2.0
+    while journal.get_stats()["fsyncs"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.get_stats()["fsyncs"] == 2
+    journal.close()
+
+
+def test_running_pids():
+    assert running_pids([os.getpid(), 2**22 + 12345]) == {os.getpid()}
@@ -0,0 +1,70 @@
+"""
+セッション差分同期のテスト
+"""
+
+from datetime import datetime
+
+from aetherterm.agentshell.domain.models import WrapperSession
+from aetherterm.common.session_sync import SessionDeltaTracker, SessionStateStore
+
+
+def make_session(wrapper_id="w1"):
+    now = datetime(2025, 6, 18, 12, 0)
+    return WrapperSession(
+        wrapper_id=wrapper_id,
+        aetherterm_session_id="",
+        wrapper_pid=1,
+        shell_pid=2,
+        created_at=now,
+        last_activity=now,
+        environment={"HOME": "/root", "PATH": "/usr/bin"},
+    )
+
+
+def test_only_changed_fields_are_sent():
+    tracker, store = SessionDeltaTracker(), SessionStateStore()
+    session = make_session()
+
+    created = tracker.diff(session.to_dict())
+    assert created["rev"] == 1 and "environment" in created
+    assert store.apply_patch("sid", created)
+
+    session.terminal_size = (50, 120)
+    session.metadata["cwd"] = "/tmp"
+    patch = tracker.diff(session.to_dict())
+    assert set(patch["fields"]) == {"terminal_size", "metadata"}
+    assert "environment" not in patch
+    assert tracker.diff(session.to_dict()) is None
+    assert store.apply_patch("sid", patch)
+    assert store.get("w1") == {**session.to_dict(), "terminal_size": [50, 120]}
+
+    # 環境変数は置き換えられた時だけ送る
+    session.environment = {"HOME": "/home/user"}
+    patch = tracker.diff(session.to_dict())
+    assert patch["fields"] == {} and patch["environment"] == {"HOME": "/home/user"}
+    assert store.apply_patch("sid", patch)
+
+    removed = tracker.remove("w1")
+    assert store.apply_patch("sid", removed)
+    assert store.get("w1") is None
+
+
+def test_out_of_order_patch_requests_resync():
+    tracker, store = SessionDeltaTracker(), SessionStateStore()
+    session = make_session()
+    store.apply_patch("sid", tracker.diff(session.to_dict()))
+
+    session.status = "inactive"
+    tracker.diff(session.to_dict())  # 失われたパッチ
+    session.status = "closed"
+    assert not store.apply_patch("sid", tracker.diff(session.to_dict()))
+
+    # スナップショットで再同期した後は差分が通る
+    other = make_session("w2")
+    store.apply_patch("sid", SessionDeltaTracker().diff(other.to_dict()))
+    store.apply_snapshot("sid", tracker.snapshot([session.to_dict()]))
+    assert store.get("w1")["status"] == "closed"
+    assert store.get("w2") is None
+
+    session.status = "active"
+    assert store.apply_patch("sid", tracker.diff(session.to_dict()))
@@ -0,0 +1,60 @@
+"""
+階層型タイミングホイールのテスト
+"""
+
+import random
+
+from aetherterm.common.timing_wheel import TimingWheel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timers_fire_on_time_across_levels():
+    clock = FakeClock()
+    wheel = TimingWheel(tick=1.0, slots=4, levels=3, clock=clock)
+    fired = {}
+
+    def on_expire(keys):
+        for key in keys:
+            fired[key] = clock.now
+
+    rng = random.Random(0)
+    # 最上段を超える遠い期限（オーバーフロー領域）も含める
+    delays = {i: rng.randint(1, 200) for i in range(300)}
+    for key, delay in delays.items():
+        wheel.schedule(delay, on_expire, key)
+
+    while len(wheel):
+        clock.now += 1
+        wheel.run_expired()
+
+    assert fired == {key: float(delay) for key, delay in delays.items()}
+
+
+def test_cancel_and_batching():
+    clock = FakeClock()
+    wheel = TimingWheel(tick=1.0, slots=8, levels=2, clock=clock)
+    batches = []
+    handles = [wheel.schedule(5, batches.append, key) for key in range(10)]
+
+    assert wheel.cancel(handles[3])
+    assert not wheel.cancel(handles[3])
+    handles[4] = wheel.reschedule(handles[4], 20)
+
+    clock.now = 5
+    wheel.run_expired()
+    # 同じ tick で期限切れになったキーは1回の呼び出しにまとめられる
+    assert batches == [[0, 1, 2, 5, 6, 7, 8, 9]]
+    assert not handles[0].active
+    assert handles[4].active and len(wheel) == 1
+
+    clock.now = 25
+    wheel.run_expired()
+    assert batches[-1] == [4]
+    assert wheel.get_stats()["pending"] == 0
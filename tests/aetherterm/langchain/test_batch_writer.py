@@ -0,0 +1,85 @@
+"""
+グループコミットライターのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from aetherterm.langchain.storage.batch_writer import GroupCommitWriter
+
+
+def test_concurrent_submissions_share_a_batch():
+    async def run():
+        batches = []
+
+        async def write_batch(items):
+            batches.append(list(items))
+
+        writer = GroupCommitWriter(write_batch, max_batch_size=4, max_delay=0.05)
+        await asyncio.gather(*(writer.submit(n) for n in range(10)))
+
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+        assert sorted(sum(batches, [])) == list(range(10))
+        await writer.close()
+
+    asyncio.run(run())
+
+
+def test_failed_entry_only_fails_its_own_future():
+    async def run():
+        async def write_batch(items):
+            if "bad" in items:
+                raise ValueError("bad row")
+
+        writer = GroupCommitWriter(write_batch, max_delay=0.01)
+        results = await asyncio.gather(
+            writer.submit("a"), writer.submit("bad"), writer.submit("b"), return_exceptions=True
+        )
+
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], ValueError)
+        assert writer.get_stats()["failed"] == 1
+        await writer.close()
+
+    asyncio.run(run())
+
+
+def test_close_drains_queue_and_rejects_new_entries():
+    async def run():
+        written = []
+
+        async def write_batch(items):
+            await asyncio.sleep(0.01)
+            written.extend(items)
+
+        writer = GroupCommitWriter(write_batch, max_batch_size=2, max_queue_size=2)
+        futures = [await writer.enqueue(n) for n in range(2)]
+        # キューが満杯なので3件目は書き込みが進むまで待たされる
+        futures.append(await writer.enqueue(2))
+        await writer.close()
+
+        assert written == [0, 1, 2]
+        assert all(future.done() for future in futures)
+        with pytest.raises(RuntimeError):
+            await writer.submit(3)
+
+    asyncio.run(run())
+
+
+def test_batch_results_are_returned_to_each_caller():
+    async def run():
+        calls = []
+
+        async def embed(texts):
+            calls.append(len(texts))
+            return [text.upper() for text in texts]
+
+        writer = GroupCommitWriter(embed, max_delay=0.01)
+        results = await asyncio.gather(*(writer.submit(text) for text in ("a", "b", "c")))
+
+        assert results == ["A", "B", "C"]
+        assert calls == [3]
+        await writer.close()
+
+    asyncio.run(run())
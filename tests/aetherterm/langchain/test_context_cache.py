@@ -0,0 +1,108 @@
+"""
+SessionContextCache のテスト
+"""
+
+import asyncio
+
+from aetherterm.langchain.memory.context_cache import SessionContextCache
+
+
+def test_prefetch_is_shared_and_writes_invalidate_only_their_session():
+    async def run():
+        loads = []
+        release = asyncio.Event()
+
+        async def loader(session_id, query):
+            loads.append((session_id, query))
+            await release.wait()
+            return {"session": session_id, "query": query, "load": len(loads)}
+
+        cache = SessionContextCache(loader)
+
+        # キュー投入時の取得を、実行時の get() が待って使う（二重に取得しない）
+        cache.prefetch("s1", "fix tests")
+        pending = asyncio.ensure_future(cache.get("s1", "fix tests"))
+        await asyncio.sleep(0)
+        release.set()
+        assert (await pending)["load"] == 1
+        assert loads == [("s1", "fix tests")]
+
+        await cache.get("s2", "fix tests")
+        assert (await cache.get("s1", "fix tests"))["load"] == 1
+        assert cache.get_stats()["hits"] == 2
+
+        # 書き込みのあったセッションだけを取得し直す
+        cache.invalidate("s1")
+        assert (await cache.get("s1", "fix tests"))["load"] == 3
+        assert (await cache.get("s2", "fix tests"))["load"] == 2
+
+    asyncio.run(run())
+
+
+def test_writes_rewarm_only_the_next_prefetched_query_once():
+    async def run():
+        loads = []
+
+        async def loader(session_id, query):
+            loads.append(query)
+            return len(loads)
+
+        cache = SessionContextCache(loader, rewarm_delay=0.01)
+        cache.prefetch("s1", "first")
+        cache.prefetch("s1", "second")
+        await asyncio.sleep(0)
+        assert loads == ["first", "second"]
+
+        # 書き込みが続いても、次に使われるクエリだけを最後の書き込みの後に1回取得し直す
+        for _ in range(5):
+            cache.invalidate("s1")
+        await asyncio.sleep(0.05)
+        assert loads == ["first", "second", "first"]
+        assert await cache.get("s1", "first") == 3
+
+        # 使われたクエリは忘れ、次のクエリが取得し直す対象になる
+        cache.invalidate("s1")
+        await asyncio.sleep(0.05)
+        assert loads[-1] == "second"
+        assert await cache.get("s1", "second") == 4
+
+        # 使われたクエリしかなければ何も取得しない
+        cache.invalidate("s1")
+        await asyncio.sleep(0.05)
+        assert len(loads) == 4
+        assert cache.get_stats()["prefetched_queries"] == 0
+
+    asyncio.run(run())
+
+
+def test_prefetched_queries_are_forgotten_when_discarded_evicted_or_expired():
+    async def run():
+        loads = []
+
+        async def loader(session_id, query):
+            loads.append(query)
+            return query
+
+        cache = SessionContextCache(loader, max_entries=2, rewarm_delay=0)
+
+        # キャンセルされたタスクのクエリは取得し直さない
+        cache.prefetch("s1", "cancelled")
+        cache.discard("s1", "cancelled")
+        cache.invalidate("s1")
+        await asyncio.sleep(0.01)
+        assert loads == ["cancelled"]
+
+        # キャッシュから追い出されたクエリは忘れる
+        for n in range(5):
+            cache.prefetch(f"s{n}", "query")
+        assert cache.get_stats()["prefetched_queries"] == 2
+
+        # TTL を過ぎたクエリは忘れる
+        cache.ttl_seconds = 0
+        await asyncio.sleep(0.01)
+        cache.invalidate("s4")
+        await asyncio.sleep(0.01)
+        assert len(loads) == 6
+        assert cache.get_stats()["prefetched_queries"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+"""
+埋め込みキャッシュのテスト
+"""
+
+import numpy as np
+
+from aetherterm.langchain.storage.embedding_cache import EmbeddingCache, embedding_key
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    # 3次元のfloat32は12バイト
+    cache = EmbeddingCache(max_entries=3, max_bytes=30)
+    a, b, c = (embedding_key(text) for text in "abc")
+
+    cache.put(a, [1.0, 0.0, 0.0])
+    cache.put(b, [0.0, 1.0, 0.0])
+    assert cache.get(a) == [1.0, 0.0, 0.0]
+    # バイト数の上限を超えるため、最も使われていない b が追い出される
+    cache.put(c, [0.0, 0.0, 1.0])
+
+    assert cache.get(b) is None
+    assert cache.get(c) == [0.0, 0.0, 1.0]
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1 and stats["bytes"] == 24
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings")
+    cache = EmbeddingCache(max_entries=1, disk_path=path, disk_capacity=2)
+    keys = [embedding_key(text, model="m") for text in ("x", "y", "z")]
+    for n, key in enumerate(keys):
+        cache.put(key, [float(n), 0.5])
+    cache.flush()
+
+    restarted = EmbeddingCache(max_entries=1, disk_path=path, disk_capacity=2)
+    # 容量2のリングバッファなので最初のエントリは上書きされている
+    assert restarted.get(keys[0]) is None
+    assert restarted.get(keys[1]) == [1.0, 0.5]
+    assert restarted.get(keys[2]) == [2.0, 0.5]
+    assert restarted.get_stats()["disk_hits"] == 2
+    assert embedding_key("x", model="m") != embedding_key("x", model="other")
+
+
+def test_torn_disk_row_is_discarded(tmp_path):
+    path = tmp_path / "embeddings"
+    cache = EmbeddingCache(max_entries=1, disk_path=str(path), disk_capacity=4)
+    keys = [embedding_key(text) for text in ("x", "y")]
+    cache.put(keys[0], [1.0, 2.0])
+    cache.put(keys[1], [3.0, 4.0])
+    cache.flush()
+
+    # 電源断でキーだけが書き込まれ、行列の行が古いまま残った状態
+    vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r+", shape=(4, 2))
+    vectors[0] = [9.0, 9.0]
+    vectors.flush()
+    del vectors
+
+    restarted = EmbeddingCache(max_entries=1, disk_path=str(path), disk_capacity=4)
+    assert restarted.get(keys[0]) is None
+    assert restarted.get(keys[1]) == [3.0, 4.0]
+    assert restarted.get_stats()["disk_entries"] == 1
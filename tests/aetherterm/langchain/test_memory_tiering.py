@@ -0,0 +1,217 @@
+"""
+MemoryTieringEngine のテスト（fakeredis と SQLite を使用）
+"""
+
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from aetherterm.langchain.config.memory_config import MemoryConfig
+from aetherterm.langchain.config.storage_config import StorageConfig
+from aetherterm.langchain.memory.memory_tiering import MemoryTieringEngine, memory_cache_key
+from aetherterm.langchain.models.conversation import ConversationEntry
+from aetherterm.langchain.models.memory import MemoryEntry, MemoryType
+from aetherterm.langchain.storage.redis_adapter import RedisStorageAdapter
+from aetherterm.langchain.storage.sql_adapter import SQLStorageAdapter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class _LongTermStore:
+    """埋め込みを辞書に保存する長期メモリ"""
+
+    def __init__(self):
+        self.documents = {}
+        self.embedded = 0
+
+    async def generate_embeddings(self, texts):
+        self.embedded += len(texts)
+        return [list(hashlib.sha256(text.encode()).digest()[:8]) for text in texts]
+
+    async def store_embeddings(self, items):
+        for content_id, content, _, metadata in items:
+            self.documents[content_id] = (content, metadata)
+        return [content_id for content_id, _, _, _ in items]
+
+    async def get_embedding_statistics(self):
+        return {"total_documents": len(self.documents)}
+
+
+def _engine(tmp_path, **config):
+    redis_storage = RedisStorageAdapter(StorageConfig())
+    redis_storage._redis = fakeredis.FakeAsyncRedis()
+    sql_storage = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{tmp_path / 'm.db'}"))
+    engine = MemoryTieringEngine(
+        MemoryConfig(**config), redis_storage, sql_storage, _LongTermStore()
+    )
+    return engine, redis_storage, sql_storage
+
+
+def test_promotion_respects_budget_and_demotes_aged_short_term(tmp_path):
+    async def run():
+        engine, redis_storage, sql_storage = _engine(
+            tmp_path, tiering_promote_heat=2.0, tiering_short_term_budget_bytes=10
+        )
+        await sql_storage.connect()
+        hot, hotter = (
+            MemoryEntry(session_id="s1", memory_type=MemoryType.MEDIUM_TERM, content=f"entry {n}")
+            for n in range(2)
+        )
+        await sql_storage.store_memory_entries([hot, hotter])
+
+        engine.record_access([hot, hot, hot])
+        assert hot.access_count == 3
+        assert (await engine.run_once())["promoted"] == 1
+        cached = await redis_storage.get(engine.cached_key(str(hot.id)))
+        assert cached["content"] == "entry 0"
+
+        # 予算には1件しか入らないため、より熱いエントリが冷えた方を追い出す
+        engine.record_access([hotter] * 5)
+        result = await engine.run_once()
+        assert (result["promoted"], result["evicted"]) == (1, 1)
+        assert engine.cached_key(str(hot.id)) is None
+        assert engine.cached_key(str(hotter.id)) is not None
+
+        # 古くなった短期メモリは中期メモリへ移る
+        note = MemoryEntry(session_id="s2", memory_type=MemoryType.SHORT_TERM, content="note")
+        key = memory_cache_key("s2", str(note.id))
+        await redis_storage.set_many([(key, note.to_dict(), "s2")])
+        engine.record_write(note)
+        engine._entries[str(note.id)].created_at -= 3600
+
+        assert (await engine.run_once())["demoted"] == 1
+        assert await redis_storage.get(key) is None
+        assert (await sql_storage.retrieve_many([str(note.id)]))[str(note.id)].content == "note"
+
+        await sql_storage.disconnect()
+
+    asyncio.run(run())
+
+
+def test_entries_dropped_from_tracking_while_waiting_are_skipped(tmp_path):
+    async def run():
+        engine, redis_storage, sql_storage = _engine(
+            tmp_path, tiering_promote_heat=2.0, tiering_max_tracked_entries=2
+        )
+        await sql_storage.connect()
+        hot = MemoryEntry(session_id="s1", memory_type=MemoryType.MEDIUM_TERM, content="hot")
+        await sql_storage.store_memory_entries([hot])
+        note = MemoryEntry(session_id="s2", memory_type=MemoryType.SHORT_TERM, content="note")
+        await redis_storage.set_many([(memory_cache_key("s2", str(note.id)), note.to_dict(), "s2")])
+        engine.record_write(note)
+        engine._entries[str(note.id)].created_at -= 3600
+        engine.record_access([hot] * 3)
+
+        retrieve_many = sql_storage.retrieve_many
+
+        async def retrieve_while_writing(entry_ids):
+            # 待機中の書き込みで記録件数の上限を超え、古いエントリが追い出される
+            for n in range(2):
+                engine.record_write(
+                    MemoryEntry(session_id="s3", memory_type=MemoryType.SHORT_TERM, content=f"{n}")
+                )
+            return await retrieve_many(entry_ids)
+
+        sql_storage.retrieve_many = retrieve_while_writing
+        result = await engine.run_once()
+        assert (result["demoted"], result["promoted"]) == (1, 0)
+        assert str(note.id) not in engine._entries and str(hot.id) not in engine._entries
+
+        await sql_storage.disconnect()
+
+    asyncio.run(run())
+
+
+def test_forget_waits_for_a_running_pass(tmp_path):
+    async def run():
+        engine, redis_storage, sql_storage = _engine(tmp_path, tiering_promote_heat=2.0)
+        await sql_storage.connect()
+        hot = MemoryEntry(session_id="s1", memory_type=MemoryType.MEDIUM_TERM, content="hot")
+        await sql_storage.store_memory_entries([hot])
+        engine.record_access([hot] * 3)
+
+        tiering = asyncio.create_task(engine.run_once())
+        await asyncio.sleep(0)
+        await engine.forget([str(hot.id)])
+        assert (await tiering)["promoted"] == 1
+        # 昇格した複製も削除される
+        assert await redis_storage.get(memory_cache_key("s1", str(hot.id))) is None
+        assert str(hot.id) not in engine._entries
+
+        await sql_storage.disconnect()
+
+    asyncio.run(run())
+
+
+def test_archive_summarizes_old_conversations_within_embedding_budget(tmp_path):
+    async def run():
+        engine, _, sql_storage = _engine(
+            tmp_path, tiering_archive_chunk_size=2, tiering_max_embeddings_per_run=2
+        )
+        await sql_storage.connect()
+        old = datetime.utcnow() - timedelta(days=10)
+        sessions = ["s1", "s1", "s2", "s1"]
+        await sql_storage.store_conversations(
+            [
+                ConversationEntry(
+                    session_id=session_id,
+                    content=f"message {n}",
+                    timestamp=old + timedelta(minutes=n),
+                )
+                for n, session_id in enumerate(sessions)
+            ]
+            + [ConversationEntry(session_id="s1", content="recent")]
+        )
+
+        result = await engine.run_once()
+        assert (result["summaries"], result["archived_conversations"]) == (2, 3)
+
+        result = await engine.run_once()
+        assert (result["summaries"], result["archived_conversations"]) == (1, 1)
+        assert (await engine.run_once()).get("summaries", 0) == 0
+
+        documents = engine.vector_storage.documents.values()
+        assert sorted(content for content, _ in documents) == [
+            "user: message 0\nuser: message 1",
+            "user: message 2",
+            "user: message 3",
+        ]
+        assert engine.vector_storage.embedded == 3
+
+        await sql_storage.disconnect()
+
+    asyncio.run(run())
+
+
+def test_archive_does_not_skip_conversations_sharing_the_watermark_time(tmp_path):
+    async def run():
+        engine, redis_storage, sql_storage = _engine(
+            tmp_path, tiering_archive_chunk_size=1, tiering_max_embeddings_per_run=2
+        )
+        await sql_storage.connect()
+        # 1回のアーカイブの上限（2件）をまたいで同じ時刻の会話が並ぶ
+        old = datetime.utcnow() - timedelta(days=10)
+        await sql_storage.store_conversations(
+            [
+                ConversationEntry(session_id=f"s{n}", content=f"message {n}", timestamp=old)
+                for n in range(5)
+            ]
+        )
+
+        archived = 0
+        for _ in range(4):
+            archived += (await engine.run_once()).get("archived_conversations", 0)
+        assert archived == 5
+        assert len(engine.vector_storage.documents) == 5
+
+        # 再起動後も Redis に保存した位置から続ける
+        restarted, _, _ = _engine(tmp_path)
+        restarted.redis_storage = redis_storage
+        assert await restarted._load_watermark() == engine._archive_watermark
+        assert engine.get_stats()["archive_watermark"] == old.isoformat()
+
+        await sql_storage.disconnect()
+
+    asyncio.run(run())
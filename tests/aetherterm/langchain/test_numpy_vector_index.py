@@ -0,0 +1,114 @@
+"""
+NumPyベクトルインデックスのテスト
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+
+from aetherterm.langchain.storage.numpy_vector_index import NumpyVectorIndex
+
+
+def test_search_ranks_by_cosine_and_filters_session():
+    index = NumpyVectorIndex()
+    index.add("a", [1.0, 0.0], "alpha", {"session_id": "s1"})
+    index.add("b", [0.8, 0.6], "beta", {"session_id": "s2"})
+    index.add("c", [0.0, 1.0], "gamma", {"session_id": "s1"})
+
+    hits = index.search([1.0, 0.1], k=2)
+    assert [hit[0] for hit in hits] == ["a", "b"]
+    assert hits[0][1] == "alpha" and hits[0][3] > hits[1][3]
+
+    assert [hit[0] for hit in index.search([1.0, 0.1], k=3, filters={"session_id": "s1"})] == [
+        "a",
+        "c",
+    ]
+    assert index.search([1.0, 0.0], filters={"session_id": "unknown"}) == []
+
+    # 同じIDは置き換えられる
+    index.add("a", [0.0, -1.0], "alpha2", {"session_id": "s1"})
+    assert index.search([1.0, 0.1], k=1)[0][0] == "b"
+    assert index.document_count == 3
+
+
+def test_segments_tombstones_and_compaction_survive_reload(tmp_path):
+    async def run():
+        path = str(tmp_path / "index")
+        index = NumpyVectorIndex(path=path, max_segments=2)
+        index.add("a", [1.0, 0.0], "alpha")
+        index.add("b", [0.0, 1.0], "beta")
+        await index.save()
+        index.add("c", [0.7, 0.7], "gamma")
+        index.delete(["a"])
+        index.add("b", [-1.0, 0.0], "beta2")
+        await index.save()
+
+        reloaded = NumpyVectorIndex(path=path)
+        assert reloaded.document_count == 2
+        assert [hit[0] for hit in reloaded.search([-1.0, 0.0], k=1)] == ["b"]
+        assert reloaded.search([-1.0, 0.0], k=1)[0][1] == "beta2"
+
+        assert index.needs_compaction()
+        await index.compact()
+        index.add("d", [0.0, -1.0], "delta")
+        index.delete(["c"])
+        await index.close()
+
+        compacted = NumpyVectorIndex(path=path)
+        assert sorted(hit[0] for hit in compacted.search([1.0, 1.0], k=10)) == ["b", "d"]
+        assert len(list((tmp_path / "index").glob("seg-*.npy"))) == 2
+
+    asyncio.run(run())
+
+
+def test_ivf_search_finds_nearest_cluster():
+    async def run():
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(8, 16))
+        vectors = np.repeat(centers, 50, axis=0) + rng.normal(scale=0.05, size=(400, 16))
+        index = NumpyVectorIndex(ivf_threshold=100, nprobe=2)
+        index.add_many([str(n) for n in range(400)], vectors, [""] * 400, [{}] * 400)
+
+        assert index.needs_training()
+        await index.train()
+        assert index.get_stats()["ivf_lists"] == 20
+
+        hits = index.search(centers[3], k=10)
+        assert len(hits) == 10
+        assert all(150 <= int(hit[0]) < 200 for hit in hits)
+
+    asyncio.run(run())
+
+
+def test_compact_without_rows_and_save_off_the_loop(tmp_path, monkeypatch):
+    async def run():
+        # 空のインデックスや、まとまっているインデックスの compact() は何もしない
+        await NumpyVectorIndex().compact()
+        empty = NumpyVectorIndex(path=str(tmp_path / "empty"))
+        await empty.compact()
+        await empty.close()
+        assert not (tmp_path / "empty").exists()
+
+        index = NumpyVectorIndex(path=str(tmp_path / "index"))
+        index.add("a", [1.0, 0.0], "alpha")
+
+        # ファイルの書き込みはイベントループのスレッドで行わない
+        loop_thread = threading.get_ident()
+        write_threads = []
+        write_segment = index._write_segment
+
+        def recording_write_segment(*args):
+            write_threads.append(threading.get_ident())
+            write_segment(*args)
+
+        monkeypatch.setattr(index, "_write_segment", recording_write_segment)
+        await index.save()
+        assert write_threads and loop_thread not in write_threads
+
+        segments = sorted((tmp_path / "index").glob("seg-*.npy"))
+        await index.compact()
+        assert sorted((tmp_path / "index").glob("seg-*.npy")) == segments
+        assert NumpyVectorIndex(path=str(tmp_path / "index")).document_count == 1
+
+    asyncio.run(run())
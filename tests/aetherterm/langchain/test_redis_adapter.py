@@ -0,0 +1,112 @@
+"""
+RedisStorageAdapter のテスト（fakeredis を使用）
+"""
+
+import asyncio
+
+import pytest
+
+from aetherterm.langchain.config.storage_config import StorageConfig
+from aetherterm.langchain.models.conversation import ConversationEntry
+from aetherterm.langchain.models.session import SessionContext
+from aetherterm.langchain.storage.redis_adapter import RedisStorageAdapter
+from aetherterm.langchain.storage.redis_codec import decode_value, encode_value
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _adapter(**config) -> RedisStorageAdapter:
+    adapter = RedisStorageAdapter(StorageConfig(**config))
+    adapter._redis = fakeredis.FakeAsyncRedis()
+    return adapter
+
+
+def test_codec_round_trip_and_compression():
+    value = {"content": "x" * 5000, "tokens": 3, "nested": {"ok": True}}
+    encoded = encode_value(value, compression_threshold=1024)
+    assert len(encoded) < 200
+    assert decode_value(encoded) == value
+    assert decode_value(encode_value(value, compression_threshold=None)) == value
+
+
+def test_recent_conversations_are_trimmed_in_one_transaction():
+    async def run():
+        adapter = _adapter()
+        adapter.RECENT_CONVERSATION_LIMIT = 3
+        entries = [ConversationEntry(session_id="s1", content=f"line {n}") for n in range(5)]
+        await adapter.cache_recent_conversations(entries)
+        await adapter.cache_recent_conversation(ConversationEntry(session_id="s2", content="other"))
+
+        recent = await adapter.get_recent_conversations("s1", limit=10)
+        assert [entry.content for entry in recent] == ["line 4", "line 3", "line 2"]
+        assert await adapter._redis.ttl("aetherterm:conv:recent:s1") > 0
+
+        # 旧形式（pickle）の値はキャッシュミスとして扱う
+        await adapter._redis.rpush("aetherterm:conv:recent:s2", b"\x80\x04legacy")
+        assert [entry.content for entry in await adapter.get_recent_conversations("s2")] == [
+            "other"
+        ]
+
+    asyncio.run(run())
+
+
+def test_session_context_near_cache():
+    async def run():
+        adapter = _adapter(redis_near_cache_ttl_seconds=60)
+        await adapter.cache_session_context(SessionContext(session_id="s1", user_id="u1"))
+
+        # Redis側を消してもローカルキャッシュから返る
+        await adapter._redis.flushall()
+        context = await adapter.get_session_context("s1")
+        assert context.user_id == "u1"
+        assert adapter._near_cache_stats["hits"] == 1
+
+        adapter.invalidate_session_context("s1")
+        assert await adapter.get_session_context("s1") is None
+
+    asyncio.run(run())
+
+
+def test_clear_session_and_throttled_cleanup():
+    async def run():
+        adapter = _adapter(cache_cleanup_batch_size=2, cache_cleanup_pause_ms=0)
+        await adapter.cache_session_context(SessionContext(session_id="s1"))
+        await adapter.cache_recent_conversation(ConversationEntry(session_id="s1", content="a"))
+        await adapter.set("short_term:s1:1", {"v": 1}, group="s1")
+        await adapter.set("short_term:s2:1", {"v": 2}, group="s2")
+
+        # s1 のキー3つと集合だけが消え、s2 には触れない
+        assert await adapter.clear_session("s1") == 4
+        assert await adapter.get_session_context("s1") is None
+        assert await adapter.get("short_term:s2:1") == {"v": 2}
+
+        # TTLのないキーだけがバッチ毎に削除される
+        for n in range(5):
+            await adapter._redis.set(f"aetherterm:cache:stale{n}", b"x")
+        assert await adapter.cleanup_old_cache() == 5
+        assert await adapter.get("short_term:s2:1") == {"v": 2}
+
+        progress = adapter.get_cleanup_progress()
+        assert not progress["running"]
+        assert progress["deleted"] == 5
+        assert progress["batches"] >= 3
+
+        assert await adapter.start_background_cleanup() == 0
+
+    asyncio.run(run())
+
+
+def test_recent_conversations_store_compact_projection():
+    async def run():
+        adapter = _adapter()
+        entry = ConversationEntry(session_id="s1", content="ls", metadata={"exit_code": 0})
+        await adapter.cache_recent_conversations([entry])
+
+        projection = adapter._conversation_projection(entry)
+        assert "embedding" not in projection and "thread_id" not in projection
+        assert len(adapter._encode(projection)) < len(adapter._encode(entry.to_dict()))
+
+        (cached,) = await adapter.get_recent_conversations("s1")
+        assert cached.to_dict() == entry.to_dict()
+
+    asyncio.run(run())
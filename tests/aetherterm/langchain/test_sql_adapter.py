@@ -0,0 +1,42 @@
+"""
+SQLStorageAdapter のテスト
+"""
+
+import asyncio
+
+from sqlalchemy import event
+
+from aetherterm.langchain.config.storage_config import StorageConfig
+from aetherterm.langchain.models.memory import MemoryEntry, MemoryType
+from aetherterm.langchain.storage.sql_adapter import SQLStorageAdapter
+
+
+def test_retrieve_many_uses_one_query(tmp_path):
+    async def run():
+        adapter = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{tmp_path / 'm.db'}"))
+        await adapter.connect()
+
+        entries = [
+            MemoryEntry(session_id="s1", memory_type=MemoryType.MEDIUM_TERM, content=f"entry {n}")
+            for n in range(20)
+        ]
+        await asyncio.gather(*(adapter.store_memory_entry(entry) for entry in entries))
+
+        statements = []
+        event.listen(
+            adapter._engine.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+        wanted = [str(entry.id) for entry in entries[:10]] + ["missing"]
+        found = await adapter.retrieve_many(wanted)
+
+        assert len(statements) == 1
+        assert sorted(found) == sorted(wanted[:10])
+        assert found[wanted[3]].content == "entry 3"
+        assert await adapter.retrieve_many([]) == {}
+
+        await adapter.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,132 @@
+"""
+SQLStorageAdapter の全文検索のテスト
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from aetherterm.langchain.config.storage_config import StorageConfig
+from aetherterm.langchain.models.conversation import ConversationEntry
+from aetherterm.langchain.storage.sql_adapter import SQLStorageAdapter
+
+
+def test_ranked_search_uses_fulltext_index(tmp_path):
+    async def run():
+        adapter = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{tmp_path / 'fts.db'}"))
+        await adapter.connect()
+        assert adapter._fulltext_backend == "fts5"
+
+        base = datetime(2026, 1, 1)
+        entries = [
+            ConversationEntry(session_id="s1", content="docker build failed", timestamp=base),
+            ConversationEntry(
+                session_id="s1",
+                content="docker build failed again, docker daemon down",
+                timestamp=base + timedelta(hours=1),
+            ),
+            ConversationEntry(session_id="s2", content="docker compose up", timestamp=base),
+            ConversationEntry(session_id="s2", content="ls -la", timestamp=base),
+        ]
+        await adapter.store_conversations(entries)
+
+        results = await adapter.search_conversations_ranked("docker daemon")
+        assert [entry.id for entry, _ in results][0] == str(entries[1].id)
+        assert len(results) == 3
+        assert all(0.0 < score < 1.0 for _, score in results)
+
+        in_session = await adapter.search_conversations("docker", session_id="s2")
+        assert [entry.id for entry in in_session] == [str(entries[2].id)]
+
+        recent = await adapter.search_conversations("docker", since=base + timedelta(minutes=30))
+        assert [entry.id for entry in recent] == [str(entries[1].id)]
+
+        # 削除した行はトリガーでインデックスからも消える
+        await adapter.delete_old_conversations(days=0)
+        assert await adapter.search_conversations("docker") == []
+
+        await adapter.disconnect()
+
+    asyncio.run(run())
+
+
+def test_japanese_and_substring_terms_match(tmp_path):
+    async def run():
+        adapter = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{tmp_path / 'ja.db'}"))
+        await adapter.connect()
+
+        entries = [
+            ConversationEntry(session_id="s1", content="ビルドでエラーが発生しました"),
+            ConversationEntry(session_id="s1", content="Permission denied: /var/log"),
+            ConversationEntry(session_id="s1", content="ls -la"),
+        ]
+        await adapter.store_conversations(entries)
+
+        async def found(query):
+            return [entry.id for entry, _ in await adapter.search_conversations_ranked(query)]
+
+        # 空白で区切らない日本語も語の一部で一致する
+        assert await found("エラー") == [str(entries[0].id)]
+        assert await found("エラーが発生") == [str(entries[0].id)]
+        assert await found("perm") == [str(entries[1].id)]
+        # 語はいずれかを含めば一致する（OR）
+        assert set(await found("エラー permission")) == {str(entries[0].id), str(entries[1].id)}
+        # 3文字未満の語はトライグラムで検索できないため LIKE で一致させる
+        assert set(await found("ls ビルド")) == {str(entries[0].id), str(entries[2].id)}
+
+        await adapter.disconnect()
+
+    asyncio.run(run())
+
+
+def test_short_term_search_returns_newest_first(tmp_path):
+    async def run():
+        adapter = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{tmp_path / 'ls.db'}"))
+        await adapter.connect()
+
+        base = datetime(2026, 1, 1)
+        entries = [
+            ConversationEntry(
+                session_id="s1", content=f"ls run {i}", timestamp=base + timedelta(hours=i)
+            )
+            for i in (1, 3, 0, 2)
+        ]
+        await adapter.store_conversations(entries)
+
+        results = await adapter.search_conversations_ranked("ls", limit=2)
+        assert [entry.content for entry, _ in results] == ["ls run 3", "ls run 2"]
+
+        await adapter.disconnect()
+
+    asyncio.run(run())
+
+
+def test_word_index_from_older_version_is_rebuilt_with_trigrams(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "old.db"
+    adapter = SQLStorageAdapter(StorageConfig(database_url=f"sqlite:///{path}"))
+    entry = ConversationEntry(session_id="s1", content="ビルドでエラーが発生しました")
+
+    async def store():
+        await adapter.connect()
+        await adapter.store_conversations([entry])
+        await adapter.disconnect()
+
+    asyncio.run(store())
+
+    # 以前の単語単位（unicode61）のインデックスに置き換える
+    with sqlite3.connect(path) as db:
+        for name in ("conversations", "summaries"):
+            db.execute(f"DROP TABLE {name}_fts")
+            db.execute(
+                f"CREATE VIRTUAL TABLE {name}_fts "
+                f"USING fts5(content, content='{name}', content_rowid='rowid')"
+            )
+
+    async def search():
+        await adapter.connect()
+        results = await adapter.search_conversations_ranked("エラー")
+        await adapter.disconnect()
+        return [found.id for found, _ in results]
+
+    assert asyncio.run(search()) == [str(entry.id)]